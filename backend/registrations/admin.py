@@ -3,9 +3,11 @@ Django Admin configuration for Azaan & Takhbira Duty Management.
 """
 
 from django.contrib import admin
+from django.utils import timezone
 from .models import (
-    Registration, AuditionFile, DutyAssignment,
-    UnlockLog, Reminder, ReminderLog
+    Registration, AuditionFile, AuditionUpload, MediaBlob, RegistrationIntake, StatusDocument, DutyAssignment,
+    DutySchedule, UnlockLog, Reminder, ReminderStage, ReminderLog, ReminderArchive, AllotmentDraft,
+    Broadcast
 )
 
 
@@ -30,7 +32,7 @@ class RegistrationAdmin(admin.ModelAdmin):
 
     def delete_queryset(self, request, queryset):
         """Batch soft delete."""
-        queryset.update(is_active=False)
+        queryset.update(is_active=False, updated_at=timezone.now())
 
     @admin.action(description="Hard Delete (Permanently remove from database)")
     def hard_delete(self, request, queryset):
@@ -40,18 +42,51 @@ class RegistrationAdmin(admin.ModelAdmin):
 
 @admin.register(AuditionFile)
 class AuditionFileAdmin(admin.ModelAdmin):
-    list_display = ['audition_display_name', 'registration', 'audition_file_path', 'audition_file_type', 'uploaded_at']
-    list_filter = ['audition_file_type', 'uploaded_at']
+    list_display = ['audition_display_name', 'registration', 'audition_file_path', 'audition_file_type', 'transcode_status', 'uploaded_at']
+    list_filter = ['audition_file_type', 'transcode_status', 'uploaded_at']
     search_fields = ['audition_display_name', 'registration__full_name', 'registration__its_number']
-    readonly_fields = ['uploaded_at', 'audition_file_type', 'audition_display_name']
+    readonly_fields = [
+        'uploaded_at', 'audition_file_type', 'audition_display_name', 'blob',
+        'rendition_path', 'preview_path', 'duration_seconds', 'codec', 'file_size', 'transcode_status'
+    ]
+
+
+@admin.register(RegistrationIntake)
+class RegistrationIntakeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'registration', 'created_at', 'processed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['id', 'payload']
+    readonly_fields = ['id', 'payload', 'status', 'registration', 'error', 'created_at', 'processed_at']
+
+
+@admin.register(StatusDocument)
+class StatusDocumentAdmin(admin.ModelAdmin):
+    list_display = ['its_number', 'registration', 'updated_at']
+    search_fields = ['its_number', 'registration__full_name']
+    readonly_fields = ['registration', 'its_number', 'document', 'updated_at']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'file', 'size', 'ref_count', 'created_at']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'file', 'size', 'ref_count', 'created_at']
+
+
+@admin.register(AuditionUpload)
+class AuditionUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'status', 'received_bytes', 'total_size', 'audition_file', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['filename']
+    readonly_fields = ['id', 'received_bytes', 'audition_file', 'created_at', 'updated_at']
 
 
 @admin.register(DutyAssignment)
 class DutyAssignmentAdmin(admin.ModelAdmin):
-    list_display = ['duty_date', 'namaaz_type', 'assigned_user', 'locked', 'locked_at']
+    list_display = ['duty_date', 'namaaz_type', 'assigned_user', 'reporting_at', 'locked', 'locked_at']
     list_filter = ['namaaz_type', 'locked', 'duty_date']
     search_fields = ['assigned_user__full_name', 'assigned_user__its_number']
-    readonly_fields = ['locked_at', 'created_at', 'updated_at']
+    readonly_fields = ['reporting_at', 'locked_at', 'created_at', 'updated_at']
     ordering = ['duty_date', 'namaaz_type']
     list_per_page = 100
     list_select_related = ['assigned_user']
@@ -63,6 +98,35 @@ class DutyAssignmentAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
 
+@admin.register(DutySchedule)
+class DutyScheduleAdmin(admin.ModelAdmin):
+    list_display = ['namaaz_type', 'duty_date', 'reporting_time', 'updated_at']
+    list_editable = ['reporting_time']
+    list_filter = ['namaaz_type']
+    ordering = ['namaaz_type', 'duty_date']
+
+
+@admin.register(AllotmentDraft)
+class AllotmentDraftAdmin(admin.ModelAdmin):
+    list_display = ['id', 'date_from', 'date_to', 'status', 'created_by', 'created_at', 'published_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['date_from', 'date_to', 'status', 'stats', 'created_by', 'created_at', 'published_at']
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ['id', 'template', 'audience', 'status', 'total', 'sent', 'failed', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'audience', 'created_at']
+    readonly_fields = [
+        'audience', 'filters', 'template', 'parameters', 'status', 'total', 'sent', 'failed',
+        'last_error', 'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
+
+    def has_add_permission(self, request):
+        """Created through POST /api/broadcasts/ (validated audience and template)"""
+        return False
+
+
 @admin.register(UnlockLog)
 class UnlockLogAdmin(admin.ModelAdmin):
     list_display = ['duty_date', 'namaaz_type', 'original_user_name', 'unlocked_by', 'unlocked_at']
@@ -81,17 +145,24 @@ class UnlockLogAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(ReminderStage)
+class ReminderStageAdmin(admin.ModelAdmin):
+    list_display = ['name', 'anchor', 'offset_minutes', 'send_email', 'send_whatsapp', 'send_call', 'active']
+    list_editable = ['active']
+    list_filter = ['anchor', 'active']
+
+
 @admin.register(Reminder)
 class ReminderAdmin(admin.ModelAdmin):
-    list_display = ['duty_assignment', 'scheduled_datetime', 'status', 
-                    'email_sent', 'whatsapp_sent', 'sent_at']
-    list_filter = ['status', 'email_sent', 'whatsapp_sent', 'scheduled_datetime']
+    list_display = ['duty_assignment', 'stage', 'scheduled_datetime', 'status', 
+                    'email_sent', 'whatsapp_sent', 'call_sent', 'call_status', 'sent_at']
+    list_filter = ['stage', 'status', 'email_sent', 'whatsapp_sent', 'call_sent', 'call_status', 'scheduled_datetime']
     search_fields = ['duty_assignment__assigned_user__full_name']
-    readonly_fields = ['duty_assignment', 'scheduled_datetime', 'email_sent', 
-                       'whatsapp_sent', 'sent_at', 'created_at']
+    readonly_fields = ['duty_assignment', 'stage', 'channels', 'scheduled_datetime', 'email_sent', 
+                       'whatsapp_sent', 'call_sent', 'call_sid', 'call_status', 'sent_at', 'created_at']
     ordering = ['scheduled_datetime']
     list_per_page = 100
-    list_select_related = ['duty_assignment', 'duty_assignment__assigned_user']
+    list_select_related = ['stage', 'duty_assignment', 'duty_assignment__assigned_user']
     
     def has_add_permission(self, request):
         """Prevent manual creation - reminders are created automatically"""
@@ -113,3 +184,21 @@ class ReminderLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Prevent editing - logs are immutable"""
         return False
+
+
+@admin.register(ReminderArchive)
+class ReminderArchiveAdmin(admin.ModelAdmin):
+    list_display = ['original_id', 'season', 'duty_date', 'namaaz_type', 'full_name',
+                    'status', 'email_sent', 'whatsapp_sent', 'sent_at']
+    list_filter = ['season', 'status', 'namaaz_type']
+    search_fields = ['its_number', 'full_name']
+    ordering = ['-scheduled_datetime']
+    list_per_page = 100
+    
+    def has_add_permission(self, request):
+        """Prevent manual creation - rows are written by the archiver"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Prevent editing - archived history is immutable"""
+        return False
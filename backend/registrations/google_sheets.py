@@ -66,18 +66,19 @@ def prepare_row_data(registration):
     Enhanced to show all audio files as clickable URLs and allotment details.
     """
     from .utils.reporting import get_reporting_time
+    from .utils.signed_media import signed_media_site_url
 
     # 1. Capture All Media Files
     audition_files = registration.audition_files.all()
     media_urls = []
     
-    site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
+    # Sheets links outlive a browsing session, so they get the long signed-URL TTL
+    sheets_ttl = getattr(settings, 'MEDIA_SIGNED_URL_SHEETS_TTL', 365 * 24 * 3600)
     
     for media_file in audition_files:
         if media_file.audition_file_path:
             filename = os.path.basename(media_file.audition_file_path.name)
-            raw_url = media_file.audition_file_path.url
-            full_url = f"{site_url}{raw_url}" if not raw_url.startswith('http') else raw_url
+            full_url = signed_media_site_url(media_file.audition_file_path, ttl=sheets_ttl)
             
             # Construct formula: =HYPERLINK("url", "label")
             media_urls.append(f'=HYPERLINK("{full_url}", "{filename}")')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from registrations.utils.reminder_archive import archive_reminders, export_season
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Moves finished reminders into the archive tables; optionally exports a season to gzipped JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive reminders older than N days (default: REMINDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--export', metavar='PATH', help='Export the archived --season to PATH (.jsonl.gz)')
+        parser.add_argument('--season', type=int, help='Season (year) to export')
+        parser.add_argument('--purge', action='store_true', help='Delete the archived rows after exporting them')
+
+    def handle(self, *args, **options):
+        if options['export'] and not options['season']:
+            raise CommandError('--export needs --season')
+        try:
+            stats = archive_reminders(older_than_days=options['days'])
+            self.stdout.write(f"Archived {stats['reminders']} reminder(s) and {stats['logs']} log(s)")
+
+            if options['export']:
+                exported = export_season(options['season'], options['export'], purge=options['purge'])
+                self.stdout.write(
+                    f"Exported {exported} archived reminder(s) of {options['season']} to {options['export']}"
+                    + (" and purged them" if options['purge'] else "")
+                )
+            self.stdout.write(self.style.SUCCESS("Reminder archive up to date."))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error archiving reminders: {str(e)}"))
+            logger.error(f"Management command archive_reminders failed: {str(e)}")
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count
+from registrations.models import AuditionFile, MediaBlob
+from registrations.utils.blobs import hash_file
+import logging
+import os
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Moves existing audition files into the content-addressed store, removing duplicate copies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without changing anything.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        stats = {'scanned': 0, 'new_blobs': 0, 'deduped': 0, 'missing': 0, 'bytes_freed': 0}
+
+        legacy = AuditionFile.objects.filter(blob__isnull=True).exclude(audition_file_path='').order_by('id')
+        self.stdout.write(self.style.SUCCESS(f"Scanning {legacy.count()} audition file(s) without a blob..."))
+
+        for audition in legacy.iterator():
+            stats['scanned'] += 1
+            path = default_storage.path(audition.audition_file_path.name)
+            if not os.path.isfile(path):
+                stats['missing'] += 1
+                self.stderr.write(self.style.WARNING(f"AuditionFile {audition.id}: missing on disk ({path})"))
+                continue
+
+            digest = hash_file(path)
+            size = os.path.getsize(path)
+            blob = MediaBlob.objects.filter(sha256=digest).first()
+
+            if blob is None:
+                stats['new_blobs'] += 1
+                if not dry_run:
+                    # Keep the existing path so links already shared (e.g. in Sheets) stay valid
+                    with transaction.atomic():
+                        blob = MediaBlob.objects.create(
+                            sha256=digest, file=audition.audition_file_path.name, size=size, ref_count=0
+                        )
+                        AuditionFile.objects.filter(id=audition.id).update(blob=blob)
+                continue
+
+            stats['deduped'] += 1
+            stats['bytes_freed'] += size
+            if dry_run:
+                self.stdout.write(f"AuditionFile {audition.id} duplicates blob {digest[:12]}")
+                continue
+
+            self._repoint(audition, blob)
+
+        if not dry_run:
+            # ref_count is rebuilt from the actual references, which also repairs drift
+            for blob in MediaBlob.objects.annotate(refs=Count('audition_files')):
+                if blob.ref_count != blob.refs:
+                    MediaBlob.objects.filter(id=blob.id).update(ref_count=blob.refs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[DRY RUN] ' if dry_run else ''}Scanned: {stats['scanned']}\n"
+            f"New blobs: {stats['new_blobs']}\n"
+            f"Duplicates removed: {stats['deduped']}\n"
+            f"Missing files: {stats['missing']}\n"
+            f"Bytes freed: {stats['bytes_freed']}"
+        ))
+        logger.info(f"[Blob] dedupe_audition_media finished: {stats}")
+
+    def _repoint(self, audition, blob):
+        """Point a duplicate at the shared blob and drop its own copies."""
+        old_files = [
+            f.name for f in (audition.audition_file_path, audition.rendition_path, audition.preview_path)
+            if f and f.name
+        ]
+        sibling = AuditionFile.objects.filter(blob=blob, transcode_status='READY').first()
+
+        updates = {'blob': blob, 'audition_file_path': blob.file.name}
+        if sibling:
+            updates.update({
+                field: getattr(sibling, field)
+                for field in ('rendition_path', 'preview_path', 'duration_seconds', 'codec', 'file_size', 'transcode_status')
+            })
+        else:
+            updates.update({'rendition_path': None, 'preview_path': None, 'transcode_status': 'PENDING'})
+
+        with transaction.atomic():
+            AuditionFile.objects.filter(id=audition.id).update(**updates)
+
+        keep = {blob.file.name}
+        if sibling:
+            keep |= {sibling.rendition_path.name, sibling.preview_path.name}
+        for name in old_files:
+            if name in keep:
+                continue
+            path = default_storage.path(name)
+            if os.path.isfile(path):
+                os.remove(path)
+                logger.info(f"[Blob] Removed duplicate file: {path}")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from registrations.utils.intake import drain_intake
+import logging
+import time
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Persists queued (intake mode) registrations in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Submissions per bulk insert.')
+        parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                stats = drain_intake(batch_size=options['batch_size'])
+                if not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Drained {stats['stream']} stream + {stats['database']} database submission(s)."
+                    ))
+                    return
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Error draining intake: {str(e)}"))
+                logger.error(f"Management command drain_intake failed: {str(e)}")
+                if not options['loop']:
+                    return
+            time.sleep(options['interval'])
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from registrations.utils import process_pending_reminders
+from registrations.utils.reminder_dispatch import dispatch_due_reminders
 import logging
 
 logger = logging.getLogger('registrations')
@@ -7,15 +7,25 @@ logger = logging.getLogger('registrations')
 class Command(BaseCommand):
     help = 'Processes pending email and WhatsApp reminders for duty assignments.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Reminders claimed per batch')
+        parser.add_argument('--workers', type=int, help='Concurrent sends')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting reminder processing...'))
         try:
-            stats = process_pending_reminders()
+            stats = dispatch_due_reminders(batch_size=options['batch_size'], workers=options['workers'])
+            latency = ', '.join(
+                f"{channel} avg {l.get('avg_ms', 0)}ms / p95 {l.get('p95_ms', 0)}ms"
+                for channel, l in stats['latency'].items()
+            )
             self.stdout.write(self.style.SUCCESS(
                 f"Successfully processed reminders.\n"
                 f"Total Due: {stats['total_due']}\n"
                 f"Emails Sent: {stats['email_success']}\n"
-                f"WhatsApp Sent: {stats['whatsapp_success']}"
+                f"WhatsApp Sent: {stats['whatsapp_success']}\n"
+                f"Throughput: {stats['reminders_per_second']} reminders/s in {stats['elapsed_seconds']}s\n"
+                f"Latency: {latency}"
             ))
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Error processing reminders: {str(e)}"))
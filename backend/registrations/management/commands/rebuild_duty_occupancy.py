@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from registrations.utils.occupancy import rebuild_occupancy
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-registrant daily occupancy index from DutyAssignment.'
+
+    def handle(self, *args, **options):
+        try:
+            count = rebuild_occupancy()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} occupancy row(s)."))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error rebuilding occupancy: {str(e)}"))
+            logger.error(f"Management command rebuild_duty_occupancy failed: {str(e)}")
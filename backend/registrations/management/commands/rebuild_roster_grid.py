@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from registrations.utils.roster_grid import rebuild_grid
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized roster grid snapshots from DutyAssignment.'
+
+    def handle(self, *args, **options):
+        try:
+            count = rebuild_grid()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} grid snapshot(s)."))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error rebuilding grid: {str(e)}"))
+            logger.error(f"Management command rebuild_roster_grid failed: {str(e)}")
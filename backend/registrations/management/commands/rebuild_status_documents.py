@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from registrations.models import Registration
+from registrations.utils.status_docs import rebuild_status_document
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed public status document for every registration (Redis + table).'
+
+    def handle(self, *args, **options):
+        ids = list(Registration.objects.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilding {len(ids)} status document(s)..."))
+
+        failed = 0
+        for registration_id in ids:
+            try:
+                rebuild_status_document(registration_id)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"Registration {registration_id}: {str(e)}"))
+                logger.error(f"Management command rebuild_status_documents failed for {registration_id}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Rebuilt: {len(ids) - failed}, Failed: {failed}"))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from registrations.models import Reminder
+from registrations.utils.send_window import replan_date, load_curve
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Re-spreads pending reminders over the send window (after changing REMINDER_WINDOW_* or the budget).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Duty date (YYYY-MM-DD); default: every upcoming date')
+        parser.add_argument('--preview', action='store_true', help='Only print the per-minute load')
+
+    def handle(self, *args, **options):
+        try:
+            if options['date']:
+                dates = [parse_date(options['date'])]
+            else:
+                dates = sorted(set(Reminder.objects.filter(
+                    status='PENDING',
+                    duty_assignment__duty_date__gt=timezone.localdate() + timedelta(days=1)
+                ).values_list('duty_assignment__duty_date', flat=True)))
+
+            for duty_date in dates:
+                if not options['preview']:
+                    moved = replan_date(duty_date)
+                    self.stdout.write(f"{duty_date}: moved {moved} reminder(s)")
+                curve = load_curve(duty_date)
+                self.stdout.write(
+                    f"{duty_date}: {curve['total']} reminder(s), peak {curve['peak_per_minute']}/min "
+                    f"(budget {curve['budget_per_minute']}/min)"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Processed {len(dates)} date(s)."))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error replanning reminders: {str(e)}"))
+            logger.error(f"Management command replan_reminders failed: {str(e)}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from registrations.utils.whatsapp_gateway import run_gateway
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Sends all outbound WhatsApp messages at the configured rate, highest priority first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=None, help='Sender threads (default WHATSAPP_GATEWAY_THREADS).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("WhatsApp gateway running, Ctrl+C to stop."))
+        try:
+            run_gateway(threads=options['threads'])
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"WhatsApp gateway failed: {str(e)}"))
+            logger.error(f"Management command run_whatsapp_gateway failed: {str(e)}")
+            raise
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from registrations.utils.allotment import AllotmentError, create_draft, publish_draft
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Solves the duty roster for a date range into an allotment draft (optionally publishing it).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help='First duty date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', required=True, help='Last duty date (YYYY-MM-DD).')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible tie-breaking.')
+        parser.add_argument('--publish', action='store_true', help='Publish the draft right away.')
+
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from'] or '')
+        date_to = parse_date(options['date_to'] or '')
+        if not date_from or not date_to:
+            raise CommandError('--from and --to must be YYYY-MM-DD dates')
+
+        try:
+            draft = create_draft(date_from, date_to, seed=options['seed'])
+            stats = draft.stats
+            self.stdout.write(self.style.SUCCESS(
+                f"Draft {draft.id}: {stats['filled']} filled, {stats['kept']} kept, "
+                f"{stats['unfilled']} unfilled ({stats['solve_seconds']}s)."
+            ))
+            for namaaz_type, count in stats['unfilled_by_type'].items():
+                self.stdout.write(f"  {namaaz_type}: {count} unfilled")
+
+            if options['publish']:
+                with transaction.atomic():
+                    results = publish_draft(draft.id)
+                assigned = sum(1 for r in results if r.get('status') == 'assigned')
+                self.stdout.write(self.style.SUCCESS(
+                    f"Published draft {draft.id}: {assigned} assigned, {len(results) - assigned} conflict(s)."
+                ))
+        except AllotmentError as e:
+            raise CommandError(str(e))
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Error solving roster: {str(e)}"))
+            logger.error(f"Management command solve_roster failed: {str(e)}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from registrations.models import AuditionFile
+from registrations.tasks import transcode_audition_task
+import logging
+
+logger = logging.getLogger('registrations')
+
+class Command(BaseCommand):
+    help = 'Backfills renditions/previews for audition files that have not been transcoded yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry files whose transcode FAILED.')
+        parser.add_argument('--force', action='store_true', help='Re-transcode every audition file.')
+        parser.add_argument('--sync', action='store_true', help='Run in this process instead of queueing Celery tasks.')
+
+    def handle(self, *args, **options):
+        files = AuditionFile.objects.exclude(audition_file_path='')
+        if not options['force']:
+            statuses = ['PENDING', 'FAILED'] if options['failed'] else ['PENDING']
+            files = files.filter(transcode_status__in=statuses)
+
+        ids = list(files.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Transcoding {len(ids)} audition file(s)..."))
+
+        for audition_id in ids:
+            try:
+                if options['sync']:
+                    transcode_audition_task.apply(args=[audition_id], kwargs={'force': options['force']})
+                else:
+                    transcode_audition_task.delay(audition_id, force=options['force'])
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"AuditionFile {audition_id}: {str(e)}"))
+                logger.error(f"Management command transcode_auditions failed for {audition_id}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
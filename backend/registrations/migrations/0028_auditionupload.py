@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:18
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0027_alter_auditionfile_audition_file_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditionUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('UPLOADING', 'Uploading'), ('COMPLETE', 'Complete'), ('ATTACHED', 'Attached')], default='UPLOADING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('audition_file', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='registrations.auditionfile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='registratio_status_4f1c7d_idx')],
+            },
+        ),
+    ]
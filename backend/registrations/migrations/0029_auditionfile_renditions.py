@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0028_auditionupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditionfile',
+            name='codec',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='auditionfile',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditionfile',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditionfile',
+            name='preview_path',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='auditionfile',
+            name='rendition_path',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='auditionfile',
+            name='transcode_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+    ]
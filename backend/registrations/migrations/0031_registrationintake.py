@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:24
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0030_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationIntake',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('COMMITTED', 'Committed'), ('REJECTED', 'Rejected')], default='QUEUED', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('registration', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intakes', to='registrations.registration')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='registratio_status_da1cfb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:26
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0031_registrationintake'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50)),
+                ('object_id', models.CharField(max_length=64)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='khidmatrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='registrationcorrection',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='dutyassignment',
+            index=models.Index(fields=['updated_at'], name='registratio_updated_19d6bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='khidmatrequest',
+            index=models.Index(fields=['updated_at'], name='registratio_updated_46e916_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['updated_at'], name='registratio_updated_ba4e88_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrationcorrection',
+            index=models.Index(fields=['updated_at'], name='registratio_updated_4cc113_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changetombstone',
+            index=models.Index(fields=['deleted_at'], name='registratio_deleted_97912a_idx'),
+        ),
+    ]
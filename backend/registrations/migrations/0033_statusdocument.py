@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0032_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('its_number', models.CharField(max_length=20, unique=True)),
+                ('document', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('registration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='status_document', to='registrations.registration')),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:29
+
+from django.db import migrations, models
+
+
+def build_snapshots(apps, schema_editor):
+    """Backfill one snapshot per existing duty date (same cell shape as the grid endpoint)."""
+    DutyAssignment = apps.get_model('registrations', 'DutyAssignment')
+    RosterGridSnapshot = apps.get_model('registrations', 'RosterGridSnapshot')
+
+    grid = {}
+    for a in DutyAssignment.objects.select_related('assigned_user'):
+        user = a.assigned_user
+        grid.setdefault(a.duty_date, {})[a.namaaz_type] = {
+            'id': a.id,
+            'user_id': user.id if user else None,
+            'user_name': user.full_name if user else None,
+            'user_its': user.its_number if user else None,
+            'user_email': user.email if user else None,
+            'user_phone': user.phone_number if user else None,
+            'locked': a.locked,
+            'locked_at': a.locked_at.isoformat() if a.locked_at else None,
+        }
+
+    RosterGridSnapshot.objects.bulk_create([
+        RosterGridSnapshot(duty_date=duty_date, cells=cells, version=1)
+        for duty_date, cells in grid.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0033_statusdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterGridSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duty_date', models.DateField(unique=True)),
+                ('cells', models.JSONField(default=dict)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['duty_date'],
+            },
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0034_rostergridsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllotmentDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('status', models.CharField(choices=[('DRAFT', 'Draft'), ('PUBLISHED', 'Published'), ('DISCARDED', 'Discarded')], default='DRAFT', max_length=20)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='allotment_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AllotmentDraftCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duty_date', models.DateField()),
+                ('namaaz_type', models.CharField(choices=[('SANAH', 'Sanah'), ('TAJWEED', 'Tajwid Quran Majid Tilawat'), ('DUA_E_JOSHAN', 'Dua e Joshan'), ('YASEEN', 'Yaseen'), ('FAJAR_AZAAN', 'Fajar Azaan'), ('FAJAR_TAKBIRA', 'Fajar Takbira'), ('ZOHAR_AZAAN', 'Zohar Azaan'), ('ZOHAR_TAKBIRA', 'Zohar Takbira'), ('ASAR_TAKBIRA', 'Asar Takbira'), ('MAGRIB_AZAAN', 'Magrib Azaan'), ('MAGRIB_TAKBIRA', 'Magrib Takbira'), ('ISHAA_TAKBIRA', 'Ishaa Takbira')], max_length=20)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cells', to='registrations.allotmentdraft')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draft_cells', to='registrations.registration')),
+            ],
+            options={
+                'ordering': ['duty_date', 'namaaz_type'],
+                'unique_together': {('draft', 'duty_date', 'namaaz_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:37
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# Reporting-time groups as in registrations/utils/reporting.py (frozen for this migration)
+REPORTING_GROUPS = {
+    'SANAH': 'pre_fajr', 'TAJWEED': 'pre_fajr', 'DUA_E_JOSHAN': 'pre_fajr', 'YASEEN': 'pre_fajr',
+    'FAJAR_AZAAN': 'fajar', 'FAJAR_TAKBIRA': 'fajar',
+    'ZOHAR_AZAAN': 'zohar', 'ZOHAR_TAKBIRA': 'zohar', 'ASAR_TAKBIRA': 'zohar',
+    'MAGRIB_AZAAN': 'magrib', 'MAGRIB_TAKBIRA': 'magrib', 'ISHAA_TAKBIRA': 'magrib',
+}
+
+
+def build_occupancy(apps, schema_editor):
+    DutyAssignment = apps.get_model('registrations', 'DutyAssignment')
+    DutyOccupancy = apps.get_model('registrations', 'DutyOccupancy')
+
+    held = defaultdict(list)
+    for user_id, duty_date, namaaz_type in DutyAssignment.objects.filter(
+        assigned_user__isnull=False
+    ).values_list('assigned_user_id', 'duty_date', 'namaaz_type'):
+        held[(user_id, duty_date)].append(namaaz_type)
+
+    rows = []
+    for (user_id, duty_date), types in held.items():
+        groups = [REPORTING_GROUPS.get(t, t) for t in types]
+        rows.append(DutyOccupancy(
+            registration_id=user_id,
+            duty_date=duty_date,
+            namaaz_types=sorted(types),
+            count=len(types),
+            has_clash=len(groups) != len(set(groups)),
+        ))
+    DutyOccupancy.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0035_allotmentdraft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DutyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duty_date', models.DateField()),
+                ('namaaz_types', models.JSONField(default=list)),
+                ('count', models.PositiveSmallIntegerField(default=0)),
+                ('has_clash', models.BooleanField(default=False, help_text='Two duties with the same reporting time')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='registrations.registration')),
+            ],
+            options={
+                'ordering': ['duty_date'],
+                'indexes': [models.Index(fields=['count', 'duty_date'], name='registratio_count_c31cbd_idx')],
+                'unique_together': {('registration', 'duty_date')},
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0036_dutyoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
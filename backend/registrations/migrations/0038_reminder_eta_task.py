@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0037_reminder_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='eta_task_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['status', 'scheduled_datetime'], name='registratio_status_273425_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0038_reminder_eta_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveIntegerField(unique=True)),
+                ('season', models.PositiveSmallIntegerField(help_text='Year of the duty date')),
+                ('duty_assignment_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('duty_date', models.DateField()),
+                ('namaaz_type', models.CharField(max_length=20)),
+                ('registration_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('its_number', models.CharField(blank=True, default='', max_length=20)),
+                ('full_name', models.CharField(blank=True, default='', max_length=255)),
+                ('scheduled_datetime', models.DateTimeField()),
+                ('status', models.CharField(max_length=10)),
+                ('email_sent', models.BooleanField(default=False)),
+                ('whatsapp_sent', models.BooleanField(default=False)),
+                ('email_attempts', models.PositiveSmallIntegerField(default=0)),
+                ('whatsapp_attempts', models.PositiveSmallIntegerField(default=0)),
+                ('whatsapp_message_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-scheduled_datetime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReminderLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('channel', models.CharField(max_length=20)),
+                ('success', models.BooleanField()),
+                ('message', models.TextField()),
+            ],
+            options={
+                'ordering': ['timestamp'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reminderlog',
+            index=models.Index(fields=['reminder', 'timestamp'], name='registratio_reminde_75bfbb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderarchive',
+            index=models.Index(fields=['season', 'status'], name='registratio_season_ec89f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderarchive',
+            index=models.Index(fields=['its_number', 'duty_date'], name='registratio_its_num_81a721_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminderarchive',
+            index=models.Index(fields=['duty_date', 'namaaz_type'], name='registratio_duty_da_3f87c3_idx'),
+        ),
+        migrations.AddField(
+            model_name='reminderlogarchive',
+            name='reminder',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='registrations.reminderarchive'),
+        ),
+    ]
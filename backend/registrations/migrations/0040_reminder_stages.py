@@ -0,0 +1,129 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_stages(apps, schema_editor):
+    ReminderStage = apps.get_model('registrations', 'ReminderStage')
+    Reminder = apps.get_model('registrations', 'Reminder')
+    DutyReminderCall = apps.get_model('registrations', 'DutyReminderCall')
+
+    # The two schedules that existed before the reminder plan
+    day_before = ReminderStage.objects.create(
+        name='day-before', anchor='WINDOW', offset_minutes=0, send_email=True, send_whatsapp=True
+    )
+    call = ReminderStage.objects.create(name='call', anchor='REPORTING', offset_minutes=-120, send_call=True)
+    Reminder.objects.update(stage=day_before)
+
+    # Pending voice calls move into the reminder table (one per duty)
+    pending = {}
+    for voice in DutyReminderCall.objects.filter(call_status='PENDING', duty_assignment__isnull=False).order_by('id'):
+        pending.setdefault(voice.duty_assignment_id, voice)
+    Reminder.objects.bulk_create([
+        Reminder(
+            duty_assignment_id=duty_assignment_id,
+            stage=call,
+            channels='call',
+            scheduled_datetime=voice.scheduled_time,
+            status='PENDING',
+        )
+        for duty_assignment_id, voice in pending.items()
+    ], batch_size=1000)
+    DutyReminderCall.objects.filter(call_status='PENDING', duty_assignment__isnull=False).update(call_status='MIGRATED')
+
+
+def unseed_stages(apps, schema_editor):
+    Reminder = apps.get_model('registrations', 'Reminder')
+    DutyReminderCall = apps.get_model('registrations', 'DutyReminderCall')
+
+    # Back to one reminder per duty
+    Reminder.objects.exclude(stage__name='day-before').delete()
+    DutyReminderCall.objects.filter(call_status='MIGRATED').update(call_status='PENDING')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0039_reminder_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('anchor', models.CharField(choices=[('WINDOW', 'Evening send window, day before'), ('REPORTING', 'Reporting time')], default='REPORTING', max_length=20)),
+                ('offset_minutes', models.IntegerField(default=0)),
+                ('send_email', models.BooleanField(default=False)),
+                ('send_whatsapp', models.BooleanField(default=False)),
+                ('send_call', models.BooleanField(default=False)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='call_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='call_sent',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='call_sid',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='channels',
+            field=models.CharField(default='email,whatsapp', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='reminderarchive',
+            name='call_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reminderarchive',
+            name='call_sent',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='reminderarchive',
+            name='call_sid',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='reminderarchive',
+            name='stage',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='reminder',
+            name='duty_assignment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='registrations.dutyassignment'),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='stage',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reminders', to='registrations.reminderstage'),
+        ),
+        migrations.RunPython(seed_stages, unseed_stages),
+        migrations.AlterField(
+            model_name='reminder',
+            name='stage',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reminders', to='registrations.reminderstage'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(fields=('duty_assignment', 'stage'), name='unique_reminder_per_stage'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:03
+
+from datetime import datetime, time
+
+import pytz
+from django.db import migrations, models
+
+# The fixed reporting times used before the schedule table (utils/reporting.py)
+PRE_FAJR, FAJAR, ZOHR, MAGRIB = time(4, 30), time(5, 20), time(12, 30), time(17, 40)
+REPORTING_TIMES = {
+    'SANAH': PRE_FAJR, 'TAJWEED': PRE_FAJR, 'DUA_E_JOSHAN': PRE_FAJR, 'YASEEN': PRE_FAJR,
+    'JOSHAN': PRE_FAJR, 'TILAWAT': PRE_FAJR,
+    'FAJAR_AZAAN': FAJAR, 'FAJAR_TAKBIRA': FAJAR,
+    'ZOHR_AZAAN': ZOHR, 'ZOHAR_AZAAN': ZOHR, 'ZOHR_TAKBIRA': ZOHR, 'ZOHAR_TAKBIRA': ZOHR,
+    'ASHAR_AZAAN': ZOHR, 'ASAR_AZAAN': ZOHR, 'ASHAR_TAKBIRA': ZOHR, 'ASAR_TAKBIRA': ZOHR,
+    'MAGRIB_AZAAN': MAGRIB, 'MAGRIB_TAKBIRA': MAGRIB,
+    'ISHA_AZAAN': MAGRIB, 'ISHAA_AZAAN': MAGRIB, 'ISHA_TAKBIRA': MAGRIB, 'ISHAA_TAKBIRA': MAGRIB,
+}
+NAMAAZ_TYPES = [
+    'SANAH', 'TAJWEED', 'DUA_E_JOSHAN', 'YASEEN', 'FAJAR_AZAAN', 'FAJAR_TAKBIRA', 'ZOHAR_AZAAN',
+    'ZOHAR_TAKBIRA', 'ASAR_TAKBIRA', 'MAGRIB_AZAAN', 'MAGRIB_TAKBIRA', 'ISHAA_TAKBIRA',
+]
+
+
+def seed_schedule(apps, schema_editor):
+    DutySchedule = apps.get_model('registrations', 'DutySchedule')
+    DutyAssignment = apps.get_model('registrations', 'DutyAssignment')
+
+    DutySchedule.objects.bulk_create([
+        DutySchedule(namaaz_type=namaaz_type, reporting_time=REPORTING_TIMES[namaaz_type])
+        for namaaz_type in NAMAAZ_TYPES
+    ])
+
+    ist = pytz.timezone('Asia/Kolkata')
+    assignments = []
+    for assignment in DutyAssignment.objects.only('id', 'namaaz_type', 'duty_date').iterator():
+        reporting_time = REPORTING_TIMES.get(assignment.namaaz_type.upper())
+        if reporting_time is not None:
+            assignment.reporting_at = ist.localize(datetime.combine(assignment.duty_date, reporting_time))
+            assignments.append(assignment)
+    DutyAssignment.objects.bulk_update(assignments, ['reporting_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0040_reminder_stages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DutySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namaaz_type', models.CharField(choices=[('SANAH', 'Sanah'), ('TAJWEED', 'Tajwid Quran Majid Tilawat'), ('DUA_E_JOSHAN', 'Dua e Joshan'), ('YASEEN', 'Yaseen'), ('FAJAR_AZAAN', 'Fajar Azaan'), ('FAJAR_TAKBIRA', 'Fajar Takbira'), ('ZOHAR_AZAAN', 'Zohar Azaan'), ('ZOHAR_TAKBIRA', 'Zohar Takbira'), ('ASAR_TAKBIRA', 'Asar Takbira'), ('MAGRIB_AZAAN', 'Magrib Azaan'), ('MAGRIB_TAKBIRA', 'Magrib Takbira'), ('ISHAA_TAKBIRA', 'Ishaa Takbira')], max_length=20)),
+                ('duty_date', models.DateField(blank=True, help_text='Leave empty for the default of every date', null=True)),
+                ('reporting_time', models.TimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['namaaz_type', 'duty_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dutyassignment',
+            name='reporting_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dutyassignment',
+            index=models.Index(fields=['reporting_at'], name='registratio_reporti_788ee2_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dutyschedule',
+            unique_together={('namaaz_type', 'duty_date')},
+        ),
+        migrations.RunPython(seed_schedule, migrations.RunPython.noop),
+    ]
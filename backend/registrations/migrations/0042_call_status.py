@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0041_duty_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='call_status',
+            field=models.CharField(default='none', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reminderarchive',
+            name='call_status',
+            field=models.CharField(default='none', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['call_sid'], name='registratio_call_si_840096_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0043_broadcasts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditionupload',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
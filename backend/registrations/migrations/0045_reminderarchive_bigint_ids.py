@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0044_auditionupload_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reminderarchive',
+            name='duty_assignment_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='reminderarchive',
+            name='original_id',
+            field=models.PositiveBigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='reminderarchive',
+            name='registration_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
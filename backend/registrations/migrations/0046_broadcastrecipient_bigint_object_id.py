@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0045_reminderarchive_bigint_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='broadcastrecipient',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -9,7 +9,24 @@ import logging
 
 logger = logging.getLogger('registrations')
 
-class Registration(models.Model):
+AUDIO_EXTENSIONS = ['mp3', 'wav', 'm4a', 'aac']
+AUDITION_EXTENSIONS = AUDIO_EXTENSIONS + ['mp4', 'mov', 'webm', 'ogg']
+
+
+class UpdatedAtMixin:
+    """
+    Keeps `updated_at` (auto_now) current on partial saves too.
+    Django skips auto_now fields that are not listed in update_fields,
+    which would hide those changes from the /api/changes/ feed.
+    """
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['updated_at']
+        super().save(*args, **kwargs)
+
+
+class Registration(UpdatedAtMixin, models.Model):
     """
     User registration for Azaan & Takhbira duties.
     """
@@ -45,12 +62,14 @@ class Registration(models.Model):
     
     is_active = models.BooleanField(default=True, help_text="Soft delete flag")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['its_number']),
             models.Index(fields=['email']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -84,10 +103,27 @@ def audition_file_path(instance, filename):
     
     ext = filename.split('.')[-1].lower()
     new_filename = f"{its}_{name}_{pref_str}.{ext}"
-    subfolder = 'audio' if ext in ['mp3', 'wav', 'm4a', 'aac'] else 'video'
+    subfolder = 'audio' if ext in AUDIO_EXTENSIONS else 'video'
     
     return os.path.join('auditions files', subfolder, new_filename)
 
+
+class MediaBlob(models.Model):
+    """
+    Content-addressed audition media, keyed by SHA-256.
+    Identical recordings share one blob; `ref_count` tracks how many
+    AuditionFiles point at it so the file is only removed with the last one.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class AuditionFile(models.Model):
     FILE_TYPES = [('audio', 'Audio'), ('video', 'Video')]
 
@@ -98,15 +134,36 @@ class AuditionFile(models.Model):
     )
     audition_file_path = models.FileField(
         upload_to=audition_file_path,
-        validators=[FileExtensionValidator(allowed_extensions=['mp3', 'wav', 'm4a', 'aac', 'mp4', 'mov', 'webm', 'ogg'])],
+        validators=[FileExtensionValidator(allowed_extensions=AUDITION_EXTENSIONS)],
         default="",
         blank=True,
         null=True
     )
+    blob = models.ForeignKey(
+        MediaBlob,
+        related_name='audition_files',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True
+    )
     audition_file_type = models.CharField(max_length=10, choices=FILE_TYPES, default='audio')
     audition_display_name = models.CharField(max_length=255, default='')
     is_selected = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    # Light renditions produced by the background transcoding pipeline
+    TRANSCODE_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+    rendition_path = models.FileField(max_length=255, null=True, blank=True)
+    preview_path = models.FileField(max_length=255, null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    codec = models.CharField(max_length=50, blank=True, default='')
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    transcode_status = models.CharField(max_length=20, choices=TRANSCODE_STATUS_CHOICES, default='PENDING')
     
     def __str__(self):
         return self.audition_display_name
@@ -114,7 +171,7 @@ class AuditionFile(models.Model):
     def save(self, *args, **kwargs):
         if not self.audition_file_type:
             ext = self.audition_file_path.name.split('.')[-1].lower()
-            self.audition_file_type = 'audio' if ext in ['mp3', 'wav', 'm4a', 'aac'] else 'video'
+            self.audition_file_type = 'audio' if ext in AUDIO_EXTENSIONS else 'video'
         
         if not self.audition_display_name:
             self.audition_display_name = f"{self.registration.full_name} – Audition"
@@ -122,7 +179,86 @@ class AuditionFile(models.Model):
         super().save(*args, **kwargs)
 
 
-class DutyAssignment(models.Model):
+class AuditionUpload(models.Model):
+    """
+    Resumable upload session for a single audition file.
+    Chunks are appended to a spool file on disk; once complete the file
+    is attached to a Registration by its upload id.
+    """
+    STATUS_CHOICES = [
+        ('UPLOADING', 'Uploading'),
+        ('COMPLETE', 'Complete'),
+        ('ATTACHED', 'Attached'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='UPLOADING')
+    # SHA-256 of the spool, taken on completion (blob store key)
+    sha256 = models.CharField(max_length=64, blank=True)
+    audition_file = models.OneToOneField(
+        AuditionFile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+    @property
+    def extension(self):
+        return self.filename.rsplit('.', 1)[-1].lower() if '.' in self.filename else ''
+
+
+class RegistrationIntake(models.Model):
+    """
+    A registration submission accepted in intake (queued) mode.
+    Doubles as the database fallback queue when Redis is unavailable and
+    as the durable status record behind the intake status endpoint.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('COMMITTED', 'Committed'),
+        ('REJECTED', 'Rejected'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    registration = models.ForeignKey(
+        Registration,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='intakes'
+    )
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Intake {self.id} ({self.status})"
+
+
+class DutyAssignment(UpdatedAtMixin, models.Model):
     NAMAAZ_CHOICES = [
         ('SANAH', 'Sanah'),
         ('TAJWEED', 'Tajwid Quran Majid Tilawat'),
@@ -150,6 +286,8 @@ class DutyAssignment(models.Model):
     locked = models.BooleanField(default=False)
     allotment_notification_sent = models.BooleanField(default=False)
     locked_at = models.DateTimeField(null=True, blank=True)
+    # Computed from the DutySchedule on save (utils/reporting.py); None without a rule
+    reporting_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -171,12 +309,65 @@ class DutyAssignment(models.Model):
         indexes = [
             models.Index(fields=['duty_date']),
             models.Index(fields=['namaaz_type']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['reporting_at']),
         ]
     
     def __str__(self):
         user_name = self.assigned_user.full_name if self.assigned_user else "Unassigned"
         return f"{self.duty_date} - {self.namaaz_type} → {user_name}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'duty_date', 'namaaz_type'} & set(update_fields):
+            from .utils.reporting import compute_reporting_at
+            self.reporting_at = compute_reporting_at(self.namaaz_type, self.duty_date)
+            if update_fields is not None and 'reporting_at' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['reporting_at']
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Who held the slot (and when) when loaded, so signals can refresh both sides of a reassignment
+        instance._loaded_assigned_user_id = instance.__dict__.get('assigned_user_id')
+        instance._loaded_duty_date = instance.__dict__.get('duty_date')
+        return instance
+
+
+class DutySchedule(models.Model):
+    """
+    Reporting time of a namaaz type, for every date (duty_date empty) or as
+    an override for one date. Stored on each DutyAssignment as reporting_at.
+    """
+    namaaz_type = models.CharField(max_length=20, choices=DutyAssignment.NAMAAZ_CHOICES)
+    duty_date = models.DateField(null=True, blank=True, help_text="Leave empty for the default of every date")
+    # Wall-clock time in IST on the duty date
+    reporting_time = models.TimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('namaaz_type', 'duty_date')
+        ordering = ['namaaz_type', 'duty_date']
+
+    def __str__(self):
+        return f"{self.namaaz_type} {self.duty_date or '(default)'} → {self.reporting_time:%I:%M %p}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The slots covered before an edit also need their reporting_at refreshed
+        instance._loaded_key = (instance.__dict__.get('namaaz_type'), instance.__dict__.get('duty_date'))
+        return instance
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        # NULL never collides in a unique index, so check the default row here
+        if self.duty_date is None and DutySchedule.objects.filter(
+            namaaz_type=self.namaaz_type, duty_date__isnull=True
+        ).exclude(pk=self.pk).exists():
+            raise ValidationError(f"{self.namaaz_type} already has a default reporting time")
+
 
 class UnlockLog(models.Model):
     duty_assignment = models.ForeignKey(
@@ -197,12 +388,53 @@ class UnlockLog(models.Model):
         ordering = ['-unlocked_at']
 
 
+class ReminderStage(models.Model):
+    """
+    One step of the reminder plan (see utils/reminder_plan.py): every duty
+    gets a Reminder per active stage, sent on the stage's channels.
+    """
+    ANCHOR_WINDOW = 'WINDOW'
+    ANCHOR_REPORTING = 'REPORTING'
+    ANCHOR_CHOICES = [
+        (ANCHOR_WINDOW, 'Evening send window, day before'),
+        (ANCHOR_REPORTING, 'Reporting time'),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    anchor = models.CharField(max_length=20, choices=ANCHOR_CHOICES, default=ANCHOR_REPORTING)
+    # Minutes after the anchor (negative = before), e.g. -120 = 2 hours before reporting
+    offset_minutes = models.IntegerField(default=0)
+    send_email = models.BooleanField(default=False)
+    send_whatsapp = models.BooleanField(default=False)
+    send_call = models.BooleanField(default=False)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def channels(self):
+        """Comma-separated channel list, as stored on its reminders."""
+        return ','.join(
+            channel for channel, enabled in (
+                ('email', self.send_email), ('whatsapp', self.send_whatsapp), ('call', self.send_call)
+            ) if enabled
+        )
+
+
 class Reminder(models.Model):
-    duty_assignment = models.OneToOneField(
+    duty_assignment = models.ForeignKey(
         DutyAssignment,
         on_delete=models.CASCADE,
-        related_name='reminder'
+        related_name='reminders'
     )
+    stage = models.ForeignKey(ReminderStage, on_delete=models.PROTECT, related_name='reminders')
+    # Copied from the stage when planned, so due scans need no join
+    channels = models.CharField(max_length=50, default='email,whatsapp')
     scheduled_datetime = models.DateTimeField()
     email_sent = models.BooleanField(default=False)
     whatsapp_sent = models.BooleanField(default=False)
@@ -211,12 +443,34 @@ class Reminder(models.Model):
     status = models.CharField(max_length=10, default='PENDING')
     email_attempts = models.IntegerField(default=0)
     whatsapp_attempts = models.IntegerField(default=0)
+    call_sent = models.BooleanField(default=False)
+    call_attempts = models.IntegerField(default=0)
+    call_sid = models.CharField(max_length=100, null=True, blank=True)
+    # PLACED when Exotel accepts the call, then its outcome from the status callback (utils/call_status.py)
+    call_status = models.CharField(max_length=20, default='none')
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     last_error = models.TextField(blank=True)
+    # Set when a dispatcher run claims the reminder (status PROCESSING)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Celery task enqueued with ETA = scheduled_datetime (utils/reminder_dispatch.py)
+    eta_task_id = models.CharField(max_length=64, null=True, blank=True)
     
     class Meta:
         ordering = ['scheduled_datetime']
+        constraints = [
+            models.UniqueConstraint(fields=['duty_assignment', 'stage'], name='unique_reminder_per_stage'),
+        ]
+        indexes = [
+            # Due-reminder scans: status IN (...) AND scheduled_datetime <= ...
+            models.Index(fields=['status', 'scheduled_datetime']),
+            # Exotel status callbacks
+            models.Index(fields=['call_sid']),
+        ]
+
+    @property
+    def channel_list(self):
+        return [channel for channel in self.channels.split(',') if channel]
 
     def mark_sent(self):
         """Mark reminder as sent in DB."""
@@ -242,7 +496,7 @@ class Reminder(models.Model):
 
     def update_status(self, new_status):
         """Generic status update with validation."""
-        valid_statuses = ['PENDING', 'SENT', 'DELIVERED', 'FAILED', 'CANCELLED']
+        valid_statuses = ['PENDING', 'PROCESSING', 'SENT', 'DELIVERED', 'FAILED', 'CANCELLED']
         if new_status in valid_statuses:
             self.status = new_status
             self.save(update_fields=['status'])
@@ -261,9 +515,66 @@ class ReminderLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['reminder', 'timestamp']),
+        ]
 
 
-class KhidmatRequest(models.Model):
+class ReminderArchive(models.Model):
+    """
+    Completed / failed / cancelled reminder moved out of the hot Reminder
+    table (utils/reminder_archive.py). Keeps a snapshot of the duty and the
+    registrant, so it survives the assignment being deleted.
+    """
+    original_id = models.PositiveBigIntegerField(unique=True)
+    season = models.PositiveSmallIntegerField(help_text="Year of the duty date")
+    duty_assignment_id = models.PositiveBigIntegerField(null=True, blank=True)
+    duty_date = models.DateField()
+    namaaz_type = models.CharField(max_length=20)
+    registration_id = models.PositiveBigIntegerField(null=True, blank=True)
+    its_number = models.CharField(max_length=20, blank=True, default='')
+    full_name = models.CharField(max_length=255, blank=True, default='')
+    stage = models.CharField(max_length=50, blank=True, default='')
+    scheduled_datetime = models.DateTimeField()
+    status = models.CharField(max_length=10)
+    email_sent = models.BooleanField(default=False)
+    whatsapp_sent = models.BooleanField(default=False)
+    call_sent = models.BooleanField(default=False)
+    email_attempts = models.PositiveSmallIntegerField(default=0)
+    whatsapp_attempts = models.PositiveSmallIntegerField(default=0)
+    call_attempts = models.PositiveSmallIntegerField(default=0)
+    whatsapp_message_id = models.CharField(max_length=100, null=True, blank=True)
+    call_sid = models.CharField(max_length=100, null=True, blank=True)
+    call_status = models.CharField(max_length=20, default='none')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-scheduled_datetime']
+        indexes = [
+            models.Index(fields=['season', 'status']),
+            models.Index(fields=['its_number', 'duty_date']),
+            models.Index(fields=['duty_date', 'namaaz_type']),
+        ]
+
+    def __str__(self):
+        return f"Archived reminder {self.original_id} ({self.duty_date} {self.namaaz_type}, {self.status})"
+
+
+class ReminderLogArchive(models.Model):
+    reminder = models.ForeignKey(ReminderArchive, on_delete=models.CASCADE, related_name='logs')
+    timestamp = models.DateTimeField()
+    channel = models.CharField(max_length=20)
+    success = models.BooleanField()
+    message = models.TextField()
+
+    class Meta:
+        ordering = ['timestamp']
+
+
+class KhidmatRequest(UpdatedAtMixin, models.Model):
     assignment = models.ForeignKey(
         DutyAssignment, 
         on_delete=models.CASCADE, 
@@ -277,9 +588,20 @@ class KhidmatRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     reviewed_at = models.DateTimeField(null=True, blank=True)
     reviewed_by_name = models.CharField(max_length=255, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status when loaded, so signals can tell a review from other edits
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
 
 class AssignmentRequestLog(models.Model):
@@ -295,7 +617,7 @@ class AssignmentRequestLog(models.Model):
         related_name='request_logs'
     )
 
-class RegistrationCorrection(models.Model):
+class RegistrationCorrection(UpdatedAtMixin, models.Model):
     """
     Tracks correction requests from Admins to Users.
     No data is deleted; users are given a token to update specific fields.
@@ -313,8 +635,205 @@ class RegistrationCorrection(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+
+class RosterGridSnapshot(models.Model):
+    """
+    Materialized roster grid row for one duty date: {namaaz_type: cell}.
+    Refreshed after commit whenever an assignment on that date changes;
+    `version` increases on every refresh and feeds the grid ETag.
+    """
+    duty_date = models.DateField(unique=True)
+    cells = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['duty_date']
+
+    def __str__(self):
+        return f"Grid {self.duty_date} v{self.version}"
+
+
+class DutyOccupancy(models.Model):
+    """
+    Duties one registrant holds on one day (maintained from DutyAssignment).
+    Lets an assignment be checked against a single row and over-allocated
+    days be listed with one indexed query.
+    """
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='occupancy')
+    duty_date = models.DateField()
+    namaaz_types = models.JSONField(default=list)
+    count = models.PositiveSmallIntegerField(default=0)
+    has_clash = models.BooleanField(default=False, help_text="Two duties with the same reporting time")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('registration', 'duty_date')
+        ordering = ['duty_date']
+        indexes = [
+            models.Index(fields=['count', 'duty_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.registration_id} on {self.duty_date}: {self.count}"
+
+
+class AllotmentDraft(models.Model):
+    """
+    Roster proposed by the allotment solver for a date range.
+    Reviewed by an admin, then published into DutyAssignment (or discarded).
+    """
+    STATUS_CHOICES = [
+        ('DRAFT', 'Draft'),
+        ('PUBLISHED', 'Published'),
+        ('DISCARDED', 'Discarded'),
+    ]
+
+    date_from = models.DateField()
+    date_to = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
+    stats = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='allotment_drafts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Allotment draft {self.id} ({self.date_from} - {self.date_to}, {self.status})"
+
+
+class AllotmentDraftCell(models.Model):
+    draft = models.ForeignKey(AllotmentDraft, on_delete=models.CASCADE, related_name='cells')
+    duty_date = models.DateField()
+    namaaz_type = models.CharField(max_length=20, choices=DutyAssignment.NAMAAZ_CHOICES)
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='draft_cells')
+
+    class Meta:
+        unique_together = ('draft', 'duty_date', 'namaaz_type')
+        ordering = ['duty_date', 'namaaz_type']
+
+    def __str__(self):
+        return f"{self.duty_date} - {self.namaaz_type} → {self.registration_id}"
+
+
+class Broadcast(models.Model):
+    """
+    One WhatsApp template sent to a whole audience (see utils/broadcast.py).
+    The counters move while it runs; per-recipient results are in
+    BroadcastRecipient.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('CANCELLED', 'Cancelled'),
+        ('FAILED', 'Failed'),
+    ]
+
+    audience = models.CharField(max_length=50)
+    filters = models.JSONField(default=dict, blank=True)
+    template = models.CharField(max_length=100)
+    # Audience fields filling the template's body parameters, in order
+    parameters = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='broadcasts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Touched by every progress write; a RUNNING broadcast that stops moving can be resumed
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Broadcast {self.id} ({self.template} to {self.audience}, {self.status})"
+
+
+class BroadcastRecipient(models.Model):
+    """Result of one broadcast message; kept narrow, a broadcast can have thousands."""
+    PENDING = 0
+    SENT = 1
+    FAILED = 2
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='recipients')
+    # Primary key of the audience row (duty, registration or appointment)
+    object_id = models.PositiveBigIntegerField()
+    phone = models.CharField(max_length=20)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=PENDING)
+    message_id = models.CharField(max_length=100, blank=True, default='')
+    error = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        unique_together = ('broadcast', 'object_id')
+        indexes = [
+            models.Index(fields=['broadcast', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Broadcast {self.broadcast_id} → {self.object_id} ({self.get_status_display()})"
+
+
+class StatusDocument(models.Model):
+    """
+    Denormalized public status payload per registration (served by ITS lookup).
+    Rebuilt by signals; Redis holds a hot copy of the same document.
+    """
+    registration = models.OneToOneField(Registration, on_delete=models.CASCADE, related_name='status_document')
+    its_number = models.CharField(max_length=20, unique=True)
+    document = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Status document for {self.its_number}"
+
+
+class ChangeTombstone(models.Model):
+    """
+    Records deletes of change-tracked models so /api/changes/ can report them.
+    Pruned after CHANGE_TOMBSTONE_RETENTION_DAYS.
+    """
+    model_name = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} {self.object_id} deleted at {self.deleted_at}"
 
 class DutyReminderCall(models.Model):
+    """
+    Legacy voice reminders. Calls are now the 'call' channel of a
+    ReminderStage; kept for the history of calls placed before that.
+    """
     registration = models.ForeignKey(Registration, on_delete=models.CASCADE)
     duty_assignment = models.ForeignKey(DutyAssignment, on_delete=models.CASCADE, related_name='voice_reminders', null=True)
     scheduled_time = models.DateTimeField()
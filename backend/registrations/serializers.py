@@ -1,12 +1,77 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Registration, AuditionFile, DutyAssignment, UnlockLog, Reminder, ReminderLog, KhidmatRequest, RegistrationCorrection
+from .models import (
+    Registration, AuditionFile, AuditionUpload, DutyAssignment, UnlockLog,
+    Reminder, ReminderLog, ReminderArchive, ReminderLogArchive, KhidmatRequest, RegistrationCorrection, AllotmentDraft, AllotmentDraftCell, Broadcast, BroadcastRecipient,
+    AUDITION_EXTENSIONS
+)
+from .utils.signed_media import signed_media_url
+from .utils.occupancy import check_assignment
 
 
 class AuditionFileSerializer(serializers.ModelSerializer):
+    """
+    `playback_url` points at the light rendition once transcoding is READY,
+    otherwise (or when the context asks for `original`) at the uploaded file.
+    """
+    playback_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+
     class Meta:
         model = AuditionFile
-        fields = ['id', 'audition_file_path', 'audition_file_type', 'audition_display_name', 'is_selected', 'uploaded_at']
-        read_only_fields = ['uploaded_at', 'audition_file_type', 'audition_display_name']
+        fields = [
+            'id', 'audition_file_path', 'audition_file_type', 'audition_display_name', 'is_selected', 'uploaded_at',
+            'playback_url', 'preview_url', 'duration_seconds', 'codec', 'file_size', 'transcode_status'
+        ]
+        read_only_fields = [
+            'uploaded_at', 'audition_file_type', 'audition_display_name',
+            'duration_seconds', 'codec', 'file_size', 'transcode_status'
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Media is only reachable through short-lived signed links
+        data['audition_file_path'] = self._absolute_url(instance.audition_file_path)
+        return data
+
+    def _absolute_url(self, field):
+        return signed_media_url(field, self.context.get('request'))
+
+    def get_playback_url(self, obj):
+        if obj.transcode_status == 'READY' and obj.rendition_path and not self.context.get('original'):
+            return self._absolute_url(obj.rendition_path)
+        return self._absolute_url(obj.audition_file_path)
+
+    def get_preview_url(self, obj):
+        if obj.transcode_status != 'READY':
+            return None
+        return self._absolute_url(obj.preview_path)
+
+
+class AuditionUploadSerializer(serializers.ModelSerializer):
+    """Start / inspect a resumable audition upload session."""
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = AuditionUpload
+        fields = ['upload_id', 'filename', 'total_size', 'received_bytes', 'status', 'created_at']
+        read_only_fields = ['received_bytes', 'status', 'created_at']
+
+    def validate_filename(self, value):
+        ext = value.rsplit('.', 1)[-1].lower() if '.' in value else ''
+        if ext not in AUDITION_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Unsupported file type. Allowed: {', '.join(AUDITION_EXTENSIONS)}"
+            )
+        return value
+
+    def validate_total_size(self, value):
+        from .utils.uploads import MAX_AUDITION_FILE_SIZE
+        if value <= 0:
+            raise serializers.ValidationError("File size must be greater than zero.")
+        if value > MAX_AUDITION_FILE_SIZE:
+            raise serializers.ValidationError("File exceeds 15MB limit.")
+        return value
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -121,6 +186,34 @@ class RegistrationCreateSerializer(serializers.ModelSerializer):
         return list(set(normalized))
 
 
+class RegistrationIntakeSerializer(RegistrationCreateSerializer):
+    """
+    Cheap validation for queued (intake mode) registrations.
+    Field checks only; ITS uniqueness is resolved by the batch drainer.
+    """
+    its_number = serializers.CharField(max_length=20)
+    upload_ids = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+
+    class Meta(RegistrationCreateSerializer.Meta):
+        fields = RegistrationCreateSerializer.Meta.fields + ['upload_ids']
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'getlist'):
+            new_data = data.dict()
+            for key in ('preference', 'upload_ids'):
+                values = data.getlist(key)
+                if values:
+                    new_data[key] = values
+            data = new_data
+        return super().to_internal_value(data)
+
+    def validate_upload_ids(self, value):
+        from .utils.uploads import MAX_AUDITION_FILES
+        if len(value) > MAX_AUDITION_FILES:
+            raise serializers.ValidationError(f"Maximum {MAX_AUDITION_FILES} audition files allowed")
+        return value
+
+
 class DutyAssignmentSerializer(serializers.ModelSerializer):
     assigned_user_name = serializers.CharField(source='assigned_user.full_name', read_only=True)
     assigned_user_its = serializers.CharField(source='assigned_user.its_number', read_only=True)
@@ -140,12 +233,13 @@ class DutyAssignmentSerializer(serializers.ModelSerializer):
             'assigned_user_its',
             'assigned_user_email',
             'assigned_user_phone',
+            'reporting_at',
             'locked',
             'locked_at',
             'created_at',
             'updated_at'
         ]
-        read_only_fields = ['locked', 'locked_at', 'created_at', 'updated_at']
+        read_only_fields = ['reporting_at', 'locked', 'locked_at', 'created_at', 'updated_at']
 
 
 class DutyAssignmentCreateSerializer(serializers.Serializer):
@@ -171,10 +265,33 @@ class DutyAssignmentCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "This duty slot is already assigned. Unlock it first to reassign."
             )
+
+        # Same-day clashes / daily and weekly limits, from the occupancy index
+        error = check_assignment(data['assigned_user_id'], data['duty_date'], data['namaaz_type'])
+        if error:
+            raise serializers.ValidationError(error)
         
         return data
 
 
+class DutyAssignmentCellSerializer(serializers.Serializer):
+    """One cell of a bulk assignment (existence/duplicate checks run in bulk)"""
+    duty_date = serializers.DateField()
+    namaaz_type = serializers.ChoiceField(choices=DutyAssignment.NAMAAZ_CHOICES)
+    assigned_user_id = serializers.IntegerField()
+
+
+class DutyAssignmentBulkSerializer(serializers.Serializer):
+    """Serializer for bulk duty assignment requests"""
+    cells = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_cells(self, value):
+        max_cells = getattr(settings, 'DUTY_BULK_ASSIGN_MAX_CELLS', 500)
+        if len(value) > max_cells:
+            raise serializers.ValidationError(f"At most {max_cells} cells per request.")
+        return value
+
+
 class UnlockSerializer(serializers.Serializer):
     """Serializer for emergency unlock requests"""
     reason = serializers.CharField(
@@ -209,18 +326,24 @@ class UnlockLogSerializer(serializers.ModelSerializer):
 
 class ReminderSerializer(serializers.ModelSerializer):
     duty_details = serializers.SerializerMethodField()
+    stage = serializers.CharField(source='stage.name', read_only=True)
     
     class Meta:
         model = Reminder
         fields = [
             'id',
             'duty_details',
+            'stage',
+            'channels',
             'scheduled_datetime',
             'email_sent',
             'whatsapp_sent',
+            'call_sent',
             'status',
             'email_attempts',
             'whatsapp_attempts',
+            'call_attempts',
+            'call_status',
             'created_at',
             'sent_at',
             'last_error'
@@ -249,6 +372,36 @@ class ReminderLogSerializer(serializers.ModelSerializer):
         ]
 
 
+class ReminderLogArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReminderLogArchive
+        fields = ['timestamp', 'channel', 'success', 'message']
+
+
+class ReminderArchiveSerializer(serializers.ModelSerializer):
+    """
+    Archived reminder (see utils/reminder_archive.py). Logs are only included
+    on the detail view.
+    """
+
+    class Meta:
+        model = ReminderArchive
+        fields = [
+            'id', 'original_id', 'season', 'duty_assignment_id', 'duty_date', 'namaaz_type',
+            'registration_id', 'its_number', 'full_name', 'stage', 'scheduled_datetime', 'status',
+            'email_sent', 'whatsapp_sent', 'call_sent', 'email_attempts', 'whatsapp_attempts',
+            'call_attempts', 'whatsapp_message_id', 'call_sid', 'call_status', 'sent_at', 'last_error',
+            'created_at', 'archived_at'
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.context.get('include_logs'):
+            data['logs'] = ReminderLogArchiveSerializer(instance.logs.all(), many=True).data
+        return data
+
+
 class KhidmatRequestSerializer(serializers.ModelSerializer):
     """
     Serializer for Khidmat (duty) cancellation and reallocation requests.
@@ -368,3 +521,85 @@ class RegistrationCorrectionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['token', 'created_at', 'resolved_at']
 
+
+
+class AllotmentDraftCellSerializer(serializers.ModelSerializer):
+    registration_name = serializers.CharField(source='registration.full_name', read_only=True)
+    registration_its = serializers.CharField(source='registration.its_number', read_only=True)
+
+    class Meta:
+        model = AllotmentDraftCell
+        fields = ['id', 'duty_date', 'namaaz_type', 'registration', 'registration_name', 'registration_its']
+
+
+class AllotmentDraftSerializer(serializers.ModelSerializer):
+    """
+    Solver output for review. Cells are only included on the detail view.
+    """
+    created_by = serializers.CharField(source='created_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = AllotmentDraft
+        fields = ['id', 'date_from', 'date_to', 'status', 'stats', 'created_by', 'created_at', 'published_at']
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.context.get('include_cells'):
+            cells = instance.cells.select_related('registration')
+            data['cells'] = AllotmentDraftCellSerializer(cells, many=True).data
+        return data
+
+
+class AllotmentDraftCreateSerializer(serializers.Serializer):
+    """Date range (inclusive) to solve, plus an optional seed for reproducible tie-breaking"""
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    seed = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data['date_to'] < data['date_from']:
+            raise serializers.ValidationError("date_to must not be before date_from.")
+        if (data['date_to'] - data['date_from']).days >= 366:
+            raise serializers.ValidationError("Date range must be shorter than a year.")
+        return data
+
+
+class BroadcastRecipientSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = BroadcastRecipient
+        fields = ['id', 'object_id', 'phone', 'status', 'message_id', 'error']
+        read_only_fields = fields
+
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    """Broadcast with its progress; failed recipients are only included on the detail view."""
+    created_by = serializers.CharField(source='created_by.username', read_only=True, default=None)
+
+    class Meta:
+        model = Broadcast
+        fields = [
+            'id', 'audience', 'filters', 'template', 'parameters', 'status',
+            'total', 'sent', 'failed', 'last_error', 'created_by',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        from .utils.broadcast import progress_data
+        data = super().to_representation(instance)
+        data['progress'] = progress_data(instance)
+        if self.context.get('include_failures'):
+            failures = instance.recipients.filter(status=BroadcastRecipient.FAILED).order_by('id')[:500]
+            data['failures'] = BroadcastRecipientSerializer(failures, many=True).data
+        return data
+
+
+class BroadcastCreateSerializer(serializers.Serializer):
+    """Audience name and filters, template, and the audience fields filling its parameters"""
+    audience = serializers.CharField()
+    filters = serializers.DictField(required=False, default=dict)
+    template = serializers.CharField(max_length=100)
+    parameters = serializers.ListField(child=serializers.CharField(), required=False, default=list)
@@ -1,18 +1,28 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.db import transaction
 import logging
 import os
 
-from .models import Registration, DutyAssignment, AuditionFile
+from .models import Registration, DutyAssignment, DutySchedule, AuditionFile, KhidmatRequest, RegistrationCorrection
 from .utils import safe_task_delay
 from .tasks import (
     send_registration_confirmation_task, 
     send_duty_allotment_notification_task,
     sync_to_sheets_task,
-    schedule_voice_reminder_task
+    plan_reminders_task,
+    transcode_audition_task
 )
 from .utils.email_notifications import send_registration_email, send_allotment_email
+from .utils.blobs import release_blob
+from .utils.changes import record_tombstone, touch_registration
+from .utils.status_docs import schedule_status_rebuild, forget_status_document
+from .utils.occupancy import refresh_occupancy, OCCUPANCY_FIELDS
+from .utils.reporting import forget_schedule, refresh_reporting_at
+from .utils.live_events import publish_event, duty_event_data, khidmat_request_event_data
+from .utils.roster_grid import (
+    schedule_grid_refresh, schedule_grid_refresh_for_user, CELL_USER_FIELDS, CELL_ASSIGNMENT_FIELDS
+)
 
 logger = logging.getLogger('registrations')
 
@@ -27,7 +37,13 @@ logger = logging.getLogger('registrations')
 def duty_assignment_post_save(sender, instance, created, **kwargs):
     """
     Trigger WhatsApp notification for new duty assignments.
+    Also refreshes the materialized roster grid for the duty date (on every save
+    that can change a cell, which covers assignment, reassignment and unassign_khidmat).
     """
+    update_fields = kwargs.get('update_fields')
+    if not update_fields or not update_fields.isdisjoint(CELL_ASSIGNMENT_FIELDS):
+        schedule_grid_refresh(instance.duty_date)
+
     if not created:
         return
     
@@ -51,12 +67,12 @@ def duty_assignment_post_save(sender, instance, created, **kwargs):
         except Exception as e:
             logger.error(f"[OnCommit] Failed to schedule task for duty {instance.id}: {str(e)}")
     
-    # Schedule voice reminder
+    # Plan reminder stages (no-op when the view already planned them)
     try:
-        transaction.on_commit(lambda: safe_task_delay(schedule_voice_reminder_task, instance.id, non_blocking=True))
-        logger.info(f"[Signal] Voice reminder scheduling task enqueued for duty {instance.id}")
+        transaction.on_commit(lambda: safe_task_delay(plan_reminders_task, instance.id, non_blocking=True))
+        logger.info(f"[Signal] Reminder planning task enqueued for duty {instance.id}")
     except Exception as e:
-        logger.error(f"[Signal] Failed to enqueue voice reminder task for duty {instance.id}: {str(e)}")
+        logger.error(f"[Signal] Failed to enqueue reminder planning task for duty {instance.id}: {str(e)}")
 
     try:
         transaction.on_commit(schedule_tasks)
@@ -65,15 +81,184 @@ def duty_assignment_post_save(sender, instance, created, **kwargs):
         logger.error(f"[Signal] Failed to register on_commit callback for duty {instance.id}: {str(e)}")
 
 
+@receiver(post_save, sender=AuditionFile)
+def audition_file_post_save(sender, instance, created, **kwargs):
+    """
+    Queue the rendition/preview transcode for newly uploaded auditions.
+    """
+    # Audition files are nested in the registration payload of the change feed
+    touch_registration(instance.registration_id)
+
+    if not created or not instance.audition_file_path:
+        return
+
+    transaction.on_commit(lambda: safe_task_delay(transcode_audition_task, instance.id, non_blocking=True))
+
+
 @receiver(post_delete, sender=AuditionFile)
 def audition_file_post_delete(sender, instance, **kwargs):
     """
-    Delete physical file from disk when AuditionFile record is deleted.
+    Delete physical file (and its rendition/preview) from disk when AuditionFile record is deleted.
+    Blob-backed files may be shared, so they only drop a reference.
     """
-    if instance.audition_file_path:
+    touch_registration(instance.registration_id)
+
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+        return
+
+    for field in (instance.audition_file_path, instance.rendition_path, instance.preview_path):
+        if not field:
+            continue
         try:
-            if os.path.isfile(instance.audition_file_path.path):
-                os.remove(instance.audition_file_path.path)
-                logger.info(f"[Signal] Deleted file from disk: {instance.audition_file_path.path}")
+            if os.path.isfile(field.path):
+                os.remove(field.path)
+                logger.info(f"[Signal] Deleted file from disk: {field.path}")
         except Exception as e:
             logger.error(f"[Signal] Failed to delete file or access path: {str(e)}")
+
+
+@receiver(post_delete, sender=Registration)
+@receiver(post_delete, sender=DutyAssignment)
+@receiver(post_delete, sender=KhidmatRequest)
+@receiver(post_delete, sender=RegistrationCorrection)
+def change_tracked_post_delete(sender, instance, **kwargs):
+    """
+    Record a tombstone so /api/changes/ can report the delete.
+    """
+    try:
+        record_tombstone(instance)
+    except Exception as e:
+        logger.error(f"[Signal] Failed to record tombstone for {sender.__name__} {instance.pk}: {str(e)}")
+
+
+# --- Public status documents (see utils/status_docs.py) ---
+
+@receiver(post_save, sender=Registration)
+def registration_status_doc(sender, instance, **kwargs):
+    schedule_status_rebuild(instance.id)
+
+
+@receiver(post_delete, sender=Registration)
+def registration_status_doc_delete(sender, instance, **kwargs):
+    forget_status_document(instance.its_number)
+
+
+@receiver(post_save, sender=DutyAssignment)
+@receiver(post_delete, sender=DutyAssignment)
+def duty_assignment_status_doc(sender, instance, **kwargs):
+    # Refresh both the current holder and whoever held the slot when it was loaded
+    previous = getattr(instance, '_loaded_assigned_user_id', None)
+    for registration_id in {instance.assigned_user_id, previous}:
+        schedule_status_rebuild(registration_id)
+
+
+@receiver(post_save, sender=KhidmatRequest)
+@receiver(post_delete, sender=KhidmatRequest)
+def khidmat_request_status_doc(sender, instance, **kwargs):
+    assigned_user_id = DutyAssignment.objects.filter(
+        pk=instance.assignment_id
+    ).values_list('assigned_user_id', flat=True).first()
+    schedule_status_rebuild(assigned_user_id)
+
+
+@receiver(post_save, sender=AuditionFile)
+@receiver(post_delete, sender=AuditionFile)
+def audition_file_status_doc(sender, instance, **kwargs):
+    schedule_status_rebuild(instance.registration_id)
+
+
+# --- Daily occupancy index (see utils/occupancy.py) ---
+
+@receiver(post_save, sender=DutyAssignment)
+@receiver(post_delete, sender=DutyAssignment)
+def duty_assignment_occupancy(sender, instance, update_fields=None, **kwargs):
+    # Runs inside the transaction so the next assignment check sees it
+    if update_fields and OCCUPANCY_FIELDS.isdisjoint(update_fields):
+        return
+    refresh_occupancy([
+        (instance.assigned_user_id, instance.duty_date),
+        (getattr(instance, '_loaded_assigned_user_id', None), getattr(instance, '_loaded_duty_date', None)),
+    ])
+
+
+# --- Reporting times (see utils/reporting.py) ---
+
+@receiver(post_save, sender=DutySchedule)
+@receiver(post_delete, sender=DutySchedule)
+def duty_schedule_changed(sender, instance, **kwargs):
+    keys = {(instance.namaaz_type, instance.duty_date)}
+    loaded = getattr(instance, '_loaded_key', None)
+    if loaded and loaded[0]:
+        keys.add(loaded)
+    instance._loaded_key = (instance.namaaz_type, instance.duty_date)
+    forget_schedule()
+    for namaaz_type, duty_date in keys:
+        transaction.on_commit(lambda t=namaaz_type, d=duty_date: refresh_reporting_at(t, d))
+
+
+# --- Materialized roster grid (see utils/roster_grid.py) ---
+
+@receiver(post_delete, sender=DutyAssignment)
+def duty_assignment_grid_delete(sender, instance, **kwargs):
+    schedule_grid_refresh(instance.duty_date)
+
+
+@receiver(post_save, sender=Registration)
+def registration_grid_cells(sender, instance, created, update_fields=None, **kwargs):
+    # Grid cells copy name/ITS/contact; status-only saves don't touch them
+    if created or (update_fields is not None and not CELL_USER_FIELDS.intersection(update_fields)):
+        return
+    schedule_grid_refresh_for_user(instance.id)
+
+
+@receiver(pre_delete, sender=Registration)
+def registration_grid_cells_delete(sender, instance, **kwargs):
+    # Assignments are SET_NULL by a bulk update (no signals), so capture the dates first
+    schedule_grid_refresh_for_user(instance.id)
+
+
+# --- Live dashboard events (see utils/live_events.py) ---
+
+@receiver(post_save, sender=DutyAssignment)
+def duty_assignment_live_event(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and CELL_ASSIGNMENT_FIELDS.isdisjoint(update_fields):
+        return
+    data = duty_event_data(instance)
+    if created or getattr(instance, '_loaded_assigned_user_id', None) != instance.assigned_user_id:
+        event_type = 'duty.assigned' if instance.assigned_user_id else 'duty.unassigned'
+    else:
+        event_type = 'duty.updated'
+    previous_date = getattr(instance, '_loaded_duty_date', None)
+    if not created and previous_date and previous_date != instance.duty_date:
+        data['previous_duty_date'] = previous_date.isoformat()
+    publish_event(event_type, data)
+
+
+@receiver(post_delete, sender=DutyAssignment)
+def duty_assignment_live_event_delete(sender, instance, **kwargs):
+    publish_event('duty.deleted', {
+        'id': instance.id,
+        'duty_date': instance.duty_date.isoformat(),
+        'namaaz_type': instance.namaaz_type,
+    })
+
+
+@receiver(post_save, sender=KhidmatRequest)
+def khidmat_request_live_event(sender, instance, created, **kwargs):
+    if created:
+        publish_event('khidmat_request.created', khidmat_request_event_data(instance))
+    elif getattr(instance, '_loaded_status', None) != instance.status:
+        publish_event('khidmat_request.updated', khidmat_request_event_data(instance))
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=RegistrationCorrection)
+def correction_live_event(sender, instance, created, **kwargs):
+    if instance.status == 'RESOLVED' and getattr(instance, '_loaded_status', None) != 'RESOLVED':
+        publish_event('correction.resolved', {
+            'id': instance.id,
+            'registration_id': instance.registration_id,
+            'field_name': instance.field_name,
+        })
+    instance._loaded_status = instance.status
@@ -4,8 +4,9 @@ These tasks run in the background on a schedule.
 """
 
 from celery import shared_task
-from django.utils import timezone
+from django.conf import settings
 import logging
+import os
 
 from .utils import process_pending_reminders
 from .google_sheets import sync_registration_to_sheets
@@ -35,16 +36,25 @@ def sync_to_sheets_task(self, registration_id):
 
 
 @shared_task(name='registrations.process_reminders')
-def process_reminders_task():
+def process_reminders_task(fan_out=True):
     """
     Celery task to process pending reminders.
     Runs periodically (every 15 minutes recommended).
+
+    When more than one batch is due, enqueues up to REMINDER_DISPATCH_TASKS - 1
+    extra copies so several workers split the backlog (claims make this safe).
     
     Returns:
         dict: Processing statistics
     """
     try:
         logger.info("[Celery] Starting reminder processing task...")
+        if fan_out:
+            from .utils.reminder_dispatch import count_due_reminders
+            batch_size = getattr(settings, 'REMINDER_DISPATCH_BATCH_SIZE', 100)
+            batches = -(-count_due_reminders() // batch_size)
+            for _ in range(min(batches, getattr(settings, 'REMINDER_DISPATCH_TASKS', 4)) - 1):
+                process_reminders_task.delay(fan_out=False)
         # We wrap the utility call to ensure task-level reporting
         stats = process_pending_reminders()
         logger.info(f"[Celery] Reminder processing completed: {stats}")
@@ -56,33 +66,171 @@ def process_reminders_task():
         raise
 
 
+@shared_task(name='registrations.send_reminder', ignore_result=True)
+def send_reminder_task(reminder_id):
+    """
+    Sends one reminder at its scheduled time (enqueued with an ETA by
+    utils/reminder_dispatch.arm_reminders). No-op if it was cancelled, moved
+    or already sent.
+    """
+    from .utils.reminder_dispatch import send_reminder
+    try:
+        send_reminder(reminder_id)
+    except Exception as e:
+        # The reconciler picks up whatever is still due
+        logger.error(f"[Celery] ETA reminder {reminder_id} failed: {str(e)}")
+
+
+@shared_task(name='registrations.reconcile_reminders')
+def reconcile_reminders_task():
+    """
+    Arms ETA tasks for reminders entering the horizon and sends stragglers.
+    Runs every 5 minutes.
+    """
+    from .utils.reminder_dispatch import reconcile_reminders
+    stats = reconcile_reminders()
+    logger.info(f"[Celery] Reminder reconciliation: {stats}")
+    return stats
+
+
 @shared_task(name='registrations.cleanup_old_reminders')
 def cleanup_old_reminders():
     """
     Cleanup task to archive old sent/failed reminders.
     Runs daily to keep database clean.
     
-    Keeps reminders for 90 days after sending.
+    Moves finished reminders older than REMINDER_ARCHIVE_AFTER_DAYS (and their
+    logs) into the archive tables, see utils/reminder_archive.py.
     """
-    from datetime import timedelta
-    from .models import Reminder
+    from .utils.reminder_archive import archive_reminders
     
     try:
-        cutoff_date = timezone.now() - timedelta(days=90)
-        
-        deleted_count, _ = Reminder.objects.filter(
-            status__in=['SENT', 'FAILED', 'CANCELLED'],
-            sent_at__lt=cutoff_date
-        ).delete()
-        
-        logger.info(f"Cleaned up {deleted_count} old reminders")
-        return {'deleted': deleted_count}
+        stats = archive_reminders()
+        logger.info(f"Archived {stats['reminders']} old reminders")
+        return stats
         
     except Exception as e:
         logger.error(f"Cleanup task failed: {str(e)}")
         raise
 
 
+@shared_task(
+    name='registrations.transcode_audition',
+    bind=True,
+    max_retries=2,
+    default_retry_delay=120
+)
+def transcode_audition_task(self, audition_file_id, force=False):
+    """
+    Produce the light rendition + preview for an AuditionFile and record
+    duration, codec and size on the row.
+    Admin endpoints fall back to the original file until this completes.
+    """
+    from django.core.files.storage import default_storage
+    from .models import AuditionFile
+    from .utils.media import probe_media, transcode_audio, rendition_names, MediaProcessingError
+    from .utils.changes import touch_registration
+
+    try:
+        audition = AuditionFile.objects.get(id=audition_file_id)
+    except AuditionFile.DoesNotExist:
+        logger.error(f"[Transcode] AuditionFile {audition_file_id} not found")
+        return
+
+    if not audition.audition_file_path:
+        return
+    if audition.transcode_status == 'READY' and not force:
+        return
+
+    AuditionFile.objects.filter(id=audition.id).update(transcode_status='PROCESSING')
+
+    src = audition.audition_file_path.path
+    rendition_name, preview_name = rendition_names(audition.audition_file_path.name)
+    preview_seconds = getattr(settings, 'AUDITION_PREVIEW_SECONDS', 30)
+
+    try:
+        info = probe_media(src)
+        transcode_audio(src, default_storage.path(rendition_name))
+        transcode_audio(src, default_storage.path(preview_name), preview_seconds=preview_seconds)
+    except MediaProcessingError as e:
+        logger.error(f"[Transcode] Failed for AuditionFile {audition.id}: {str(e)}")
+        AuditionFile.objects.filter(id=audition.id).update(transcode_status='FAILED')
+        if self.request.retries < self.max_retries and 'not installed' not in str(e):
+            raise self.retry(exc=e)
+        return
+
+    AuditionFile.objects.filter(id=audition.id).update(
+        rendition_path=rendition_name,
+        preview_path=preview_name,
+        duration_seconds=info['duration'],
+        codec=info['codec'],
+        file_size=os.path.getsize(src),
+        transcode_status='READY'
+    )
+    touch_registration(audition.registration_id)
+    logger.info(f"[Transcode] AuditionFile {audition.id} ready ({info['codec']}, {info['duration']}s)")
+
+
+@shared_task(name='registrations.cleanup_stale_uploads')
+def cleanup_stale_uploads_task():
+    """
+    Remove abandoned resumable upload sessions and their spool files.
+    Runs daily.
+    """
+    from .utils.uploads import cleanup_stale_uploads
+
+    try:
+        return cleanup_stale_uploads()
+    except Exception as e:
+        logger.error(f"Upload cleanup task failed: {str(e)}")
+        raise
+
+
+@shared_task(name='registrations.drain_registration_intake')
+def drain_registration_intake_task():
+    """
+    Persist queued (intake mode) registrations in batches.
+    Runs every few seconds; a no-op when the queue is empty.
+    """
+    from .utils.intake import drain_intake
+
+    try:
+        return drain_intake(max_batches=getattr(settings, 'REGISTRATION_INTAKE_MAX_BATCHES_PER_RUN', 20))
+    except Exception as e:
+        logger.error(f"Intake drain task failed: {str(e)}")
+        raise
+
+
+@shared_task(name='registrations.apply_call_statuses')
+def apply_call_statuses_task():
+    """
+    Apply queued Exotel call status callbacks in batches (answered, or
+    retried on the call ladder). Runs every few seconds.
+    """
+    from .utils.call_status import drain_call_statuses
+
+    try:
+        return drain_call_statuses()
+    except Exception as e:
+        logger.error(f"Call status task failed: {str(e)}")
+        raise
+
+
+@shared_task(name='registrations.prune_change_tombstones')
+def prune_change_tombstones_task():
+    """
+    Drop change-feed tombstones older than CHANGE_TOMBSTONE_RETENTION_DAYS.
+    Runs daily.
+    """
+    from .utils.changes import prune_tombstones
+
+    try:
+        return prune_tombstones()
+    except Exception as e:
+        logger.error(f"Tombstone prune task failed: {str(e)}")
+        raise
+
+
 @shared_task(
     name='registrations.send_registration_confirmation',
     bind=True,
@@ -230,6 +378,31 @@ def send_duty_allotment_notification_task(self, duty_assignment_id):
     logger.info(f"[Task] send_duty_allotment_notification: Completed for duty_assignment_id={duty_assignment_id}")
 
 
+@shared_task(name='registrations.send_bulk_allotment_notifications')
+def send_bulk_allotment_notifications_task(duty_assignment_ids):
+    """
+    Single fan-out for a bulk assignment (see utils/bulk_assign.py).
+    Hands each allotment notification to its own task so retries stay per
+    duty (reminders, calls included, were planned by bulk_assign). Without a
+    broker the notifications run sequentially here instead of one thread per duty.
+    """
+    from celery import group
+
+    if getattr(settings, 'CELERY_ENABLED', True):
+        try:
+            group(send_duty_allotment_notification_task.s(i) for i in duty_assignment_ids).apply_async()
+            logger.info(f"[Task] send_bulk_allotment_notifications: Enqueued {len(duty_assignment_ids)} notification(s)")
+            return
+        except Exception as e:
+            logger.warning(f"[Task] send_bulk_allotment_notifications: Celery failed, sending in-process: {str(e)}")
+
+    for duty_assignment_id in duty_assignment_ids:
+        try:
+            send_duty_allotment_notification_task.run(duty_assignment_id)
+        except Exception as e:
+            logger.error(f"[Task] send_bulk_allotment_notifications: Duty {duty_assignment_id} failed: {str(e)}")
+
+
 @shared_task(
     name='registrations.send_correction_notification',
     bind=True,
@@ -328,125 +501,53 @@ def send_correction_completed_notification_task(self, registration_id):
 # Voice reminder system isolated from core registration logic.
 # Failure here must never affect registration or allotment.
 
-@shared_task(name='registrations.schedule_voice_reminder')
-def schedule_voice_reminder_task(duty_assignment_id):
+@shared_task(name='registrations.run_broadcast')
+def run_broadcast_task(broadcast_id):
     """
-    Calculates reporting time and schedules a DutyReminderCall 2 hours before.
-    Isolated from core flow. No block on failure.
+    Send a WhatsApp broadcast to its audience (see utils/broadcast.py).
+    Safe to run again: only recipients still pending are sent.
     """
-    from .models import DutyAssignment, DutyReminderCall
-    from .utils.reporting import get_reporting_time
-    from datetime import datetime, timedelta
-    import pytz
-
-    try:
-        assignment = DutyAssignment.objects.select_related('assigned_user').get(id=duty_assignment_id)
-        
-        # 1. Safety check: Check if PENDING reminder already exists for this duty
-        existing = DutyReminderCall.objects.filter(
-            duty_assignment=assignment,
-            call_status='PENDING'
-        ).first()
-        
-        if existing:
-            logger.info(f"[VoiceTask] Pending reminder already exists for duty {duty_assignment_id}. Skipping.")
-            return
+    from .utils.broadcast import run_broadcast
+    return run_broadcast(broadcast_id)
 
-        reporting_time_str = get_reporting_time(assignment)
-        if not reporting_time_str:
-            logger.warning(f"[VoiceTask] No reporting time rule for assignment {duty_assignment_id}")
-            return
 
-        # Timezone Logic Implementation
-        ist = pytz.timezone('Asia/Kolkata')
-        time_obj = datetime.strptime(reporting_time_str, "%I:%M %p").time()
-        
-        naive_dt = datetime.combine(assignment.duty_date, time_obj)
-        aware_dt_ist = ist.localize(naive_dt)
-        
-        # Subtract 2 hours
-        scheduled_time_ist = aware_dt_ist - timedelta(hours=2)
-        scheduled_time_utc = scheduled_time_ist.astimezone(pytz.UTC)
-        
-        # Debug Logs (Requirement 1)
-        logger.info(f"[VoiceTask] Timezone Validation for duty {duty_assignment_id}:")
-        logger.info(f"  Reporting Time IST: {aware_dt_ist}")
-        logger.info(f"  Scheduled Time IST: {scheduled_time_ist}")
-        logger.info(f"  Scheduled Time UTC: {scheduled_time_utc}")
-        logger.info(f"  Current UTC: {timezone.now()}")
-
-        # Create record (Requirement 2: Duplicate protection)
-        reminder, created = DutyReminderCall.objects.get_or_create(
-            registration=assignment.assigned_user,
-            duty_assignment=assignment,
-            scheduled_time=scheduled_time_utc,
-            defaults={'call_status': 'PENDING'}
-        )
-        
-        if created:
-            logger.info(f"[VoiceTask] Scheduled new call for {assignment.assigned_user.its_number} at {scheduled_time_utc}")
-        else:
-            logger.info(f"[VoiceTask] Voice reminder already exists for {assignment.assigned_user.its_number} at {scheduled_time_utc}")
+@shared_task(name='registrations.plan_reminders')
+def plan_reminders_task(duty_assignment_id):
+    """
+    Create the duty's missing reminders, one per active reminder stage
+    (see utils/reminder_plan.py). Idempotent.
+    """
+    from django.db import transaction
+    from .models import DutyAssignment
+    from .utils.reminder_plan import plan_reminders
+    from .utils.reminder_dispatch import arm_reminders
 
+    try:
+        assignment = DutyAssignment.objects.get(id=duty_assignment_id)
+        with transaction.atomic():
+            planned = plan_reminders([assignment])
+        if planned:
+            arm_reminders([duty_assignment_id])
+        return planned
     except DutyAssignment.DoesNotExist:
-        logger.error(f"[VoiceTask] DutyAssignment {duty_assignment_id} not found")
+        logger.error(f"[ReminderPlan] DutyAssignment {duty_assignment_id} not found")
     except Exception as e:
-        logger.error(f"[VoiceTask] [Isolated] Failed to schedule voice reminder: {str(e)}")
+        logger.error(f"[ReminderPlan] Failed to plan reminders for duty {duty_assignment_id}: {str(e)}")
+
+
+# Voice calls are a reminder stage now; these names stay registered for
+# messages queued and beat entries created before the reminder plan.
+
+@shared_task(name='registrations.schedule_voice_reminder')
+def schedule_voice_reminder_task(duty_assignment_id):
+    """Deprecated: plans all reminder stages, see plan_reminders_task."""
+    return plan_reminders_task.run(duty_assignment_id)
 
 
 @shared_task(name='registrations.process_due_reminder_calls')
 def process_due_reminder_calls_task():
-    """
-    Periodic task to trigger due voice calls.
-    Uses select_for_update() and transaction.atomic() for race condition safety.
-    """
-    from .models import DutyReminderCall
-    from .utils.exotel import make_exotel_call
-    from .utils.reporting import get_reporting_time
-    from django.db import transaction
-    
-    now = timezone.now()
-    
-    try:
-        with transaction.atomic():
-            # select_for_update() prevents other workers from picking the same row
-            due_calls = DutyReminderCall.objects.select_for_update(skip_locked=True).filter(
-                call_status='PENDING',
-                scheduled_time__lte=now
-            ).select_related('registration', 'duty_assignment')
-
-            if not due_calls.exists():
-                return
-            
-            logger.info(f"[VoiceTask] Processing {due_calls.count()} due voice reminders")
-            
-            for call in due_calls:
-                try:
-                    reporting_time = get_reporting_time(call.duty_assignment)
-                    
-                    # Log attempt
-                    logger.info(f"[VoiceTask] [Worker] Calling Exotel for CallID: {call.id}")
-                    
-                    result = make_exotel_call(call.registration, call.duty_assignment, reporting_time)
-                    
-                    if result.get('success'):
-                        call.call_status = 'SENT'
-                        call.exotel_call_sid = result.get('call_sid')
-                        logger.info(f"[VoiceTask] Call SUCCESS: {call.exotel_call_sid}")
-                    else:
-                        call.call_status = 'FAILED'
-                        error_msg = result.get('error')
-                        logger.error(f"[VoiceTask] Call FAILED for {call.id}: {error_msg}")
-                    
-                    call.save()
-                    
-                except Exception as e:
-                    logger.error(f"[VoiceTask] Error in loop for call {call.id}: {str(e)}")
-                    call.call_status = 'FAILED'
-                    call.save()
-                    
-    except Exception as exc:
-        logger.error(f"[VoiceTask] [Fatal] Periodic task failed: {str(exc)}")
+    """Deprecated: calls go through the reminder dispatcher (reconcile_reminders)."""
+    return None
 
 @shared_task(
     name='registrations.send_khidmat_request_notification',
@@ -1,3 +1,1566 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import (
+    AuditionUpload, Broadcast, BroadcastRecipient, DutyAssignment, DutyOccupancy, MediaBlob, Registration,
+    Reminder, ReminderArchive, ReminderLog, ReminderLogArchive, ReminderStage, StatusDocument,
+)
+from .utils import broadcast as broadcast_module
+from .utils import call_slots, call_status, reminder_dispatch, whatsapp_gateway as gateway
+from .utils.allotment import (
+    AZAAN_TYPES, AllotmentError, create_draft, eligible_types, publish_draft, solve_roster,
+)
+from .utils.blobs import save_audition_upload
+from .utils.changes import CursorError, CursorExpired, collect_changes, decode_cursor, encode_cursor
+from .utils.intake import drain_intake, enqueue_submission, get_submission_status
+from .utils.media import rendition_names
+from .utils.occupancy import (
+    check_assignment, clash_groups, find_conflicts, occupancy_error, rebuild_occupancy, week_start,
+)
+from .utils.reminder_archive import archive_reminders, export_season
+from .utils.reminder_plan import plan_reminders
+from .utils.reminder_writes import ReminderWriteBuffer
+from .utils.reporting import IST, compute_reporting_at
+from .utils.send_window import window_bounds
+from .utils.signed_media import InvalidMediaToken, parse_range, sign_media_name, unsign_media_token
+from .utils.status_docs import DOC_KEY as STATUS_DOC_KEY, MISSING as STATUS_MISSING, get_status_document
+from .utils.uploads import MAX_AUDITION_FILE_SIZE, UploadError, parse_upload_id, parse_upload_ids, spool_path
+
+
+# --- Helpers ---
+
+class FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the Redis commands used by the registrations
+    utils, including their Lua scripts (run here in Python).
+    """
+
+    def __init__(self):
+        self.lists = defaultdict(list)
+        self.hashes = defaultdict(dict)
+        self.zsets = defaultdict(dict)
+        self.values = {}
+        self._changed = threading.Condition()
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    # Lists
+    def llen(self, key):
+        return len(self.lists[key])
+
+    def rpush(self, key, *values):
+        with self._changed:
+            self.lists[key].extend(values)
+            self._changed.notify_all()
+            return len(self.lists[key])
+
+    def lpush(self, key, *values):
+        with self._changed:
+            for value in values:
+                self.lists[key].insert(0, value)
+            self._changed.notify_all()
+            return len(self.lists[key])
+
+    def lrange(self, key, start, stop):
+        items = self.lists[key]
+        return items[start:] if stop == -1 else items[start:stop + 1]
+
+    def ltrim(self, key, start, stop):
+        self.lists[key] = self.lrange(key, start, stop)
+        return True
+
+    def lrem(self, key, count, value):
+        with self._changed:
+            if value in self.lists[key]:
+                self.lists[key].remove(value)
+                return 1
+            return 0
+
+    def blpop(self, keys, timeout=0):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                for key in keys:
+                    if self.lists[key]:
+                        return key, self.lists[key].pop(0)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    # Keys and hashes
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.values.pop(key, None) is not None)
+
+    def expire(self, key, seconds):
+        return True
+
+    def hincrby(self, key, field, amount=1):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+        return self.hashes[key][field]
+
+    def hgetall(self, key):
+        return {field: str(value) for field, value in self.hashes.get(key, {}).items()}
+
+    def hmget(self, key, *fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    # Sorted sets
+    def zrem(self, key, member):
+        return int(self.zsets[key].pop(member, None) is not None)
+
+    # Scripts
+    def eval(self, script, numkeys, key, *args):
+        with self._changed:
+            if script == call_status.POP_SCRIPT:
+                count = int(args[0])
+                items, self.lists[key] = self.lists[key][:count], self.lists[key][count:]
+                return items
+            if script == call_slots.ACQUIRE_SCRIPT:
+                now, ttl, limit, token = float(args[0]), float(args[1]), int(args[2]), args[3]
+                slots = {m: s for m, s in self.zsets[key].items() if s > now - ttl}
+                self.zsets[key] = slots
+                if len(slots) < limit:
+                    slots[token] = now
+                    return 1
+                return 0
+            if script == gateway.BUCKET_SCRIPT:
+                rate, burst, now = float(args[0]), float(args[1]), float(args[2])
+                state = self.hashes[key]
+                tokens = float(state.get('tokens', burst))
+                ts = float(state.get('ts', now))
+                tokens = min(burst, tokens + max(0, now - ts) * rate)
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                state.update(tokens=tokens, ts=now)
+                return str(wait)
+        raise NotImplementedError(script)
+
+
+def make_registrant(index, **fields):
+    values = {
+        'full_name': f'Registrant {index}',
+        'its_number': f'{40000000 + index}',
+        'email': f'r{index}@example.com',
+        'phone_number': f'98765{index:05d}',
+        'status': 'ALLOTTED',
+    }
+    values.update(fields)
+    return Registration.objects.create(**values)
+
+
+def make_duties(cells):
+    """New DutyAssignments for (registration, duty date, namaaz type), without the assignment signals."""
+    existing = set(DutyAssignment.objects.values_list('id', flat=True))
+    DutyAssignment.objects.bulk_create([
+        DutyAssignment(
+            duty_date=duty_date, namaaz_type=namaaz_type, assigned_user=registration,
+            reporting_at=compute_reporting_at(namaaz_type, duty_date)
+        )
+        for registration, duty_date, namaaz_type in cells
+    ])
+    return list(DutyAssignment.objects.exclude(id__in=existing).order_by('id'))
+
+
+def seed_stages():
+    """The two seeded reminder stages, whatever the migrations left behind."""
+    ReminderStage.objects.update(active=False)
+    window, _ = ReminderStage.objects.update_or_create(name='day-before', defaults={
+        'anchor': ReminderStage.ANCHOR_WINDOW, 'offset_minutes': 0, 'send_email': True,
+        'send_whatsapp': True, 'send_call': False, 'active': True,
+    })
+    call, _ = ReminderStage.objects.update_or_create(name='call', defaults={
+        'anchor': ReminderStage.ANCHOR_REPORTING, 'offset_minutes': -120, 'send_email': False,
+        'send_whatsapp': False, 'send_call': True, 'active': True,
+    })
+    return window, call
+
+
+def tomorrow_ist():
+    return (timezone.now().astimezone(IST) + timedelta(days=1)).date()
+
+
+# --- Resumable uploads ---
+
+class AuditionUploadTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        patcher = override_settings(
+            MEDIA_ROOT=media_root, AUDITION_UPLOAD_SPOOL_DIR=os.path.join(media_root, 'uploads_tmp'),
+            AUDITION_UPLOAD_CHUNK_MAX_SIZE=8,
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.client = APIClient()
+        self.content = b'0123456789abcdef'
+        response = self.client.post(
+            '/api/audition-uploads/', {'filename': 'audition.mp3', 'total_size': len(self.content)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.data['upload_id']
+
+    def put_chunk(self, offset, data, upload_id=None):
+        return self.client.put(
+            f'/api/audition-uploads/{upload_id or self.upload_id}/chunk/', data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def complete(self, upload_id=None, **data):
+        return self.client.post(f'/api/audition-uploads/{upload_id or self.upload_id}/complete/', data, format='json')
+
+    def upload(self):
+        return AuditionUpload.objects.get(pk=self.upload_id)
+
+    def test_chunks_resume_from_the_reported_offset(self):
+        response = self.put_chunk(0, self.content[:8])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], '8')
+        self.assertEqual(self.client.get(f'/api/audition-uploads/{self.upload_id}/').data['received_bytes'], 8)
+
+        self.assertEqual(self.put_chunk(8, self.content[8:]).status_code, 200)
+        response = self.complete()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'COMPLETE')
+        self.assertEqual(self.upload().sha256, hashlib.sha256(self.content).hexdigest())
+        with open(spool_path(self.upload()), 'rb') as spool:
+            self.assertEqual(spool.read(), self.content)
+
+    def test_offset_must_match_what_was_received(self):
+        self.put_chunk(0, self.content[:8])
+
+        for offset in (0, 4, 12):  # a duplicate, an overlap and a gap
+            response = self.put_chunk(offset, self.content[offset:offset + 4])
+            self.assertEqual(response.status_code, 409, offset)
+            self.assertEqual(response['Upload-Offset'], '8')
+            self.assertIn('Offset mismatch', response.data['error'])
+
+        self.assertEqual(self.upload().received_bytes, 8)
+        with open(spool_path(self.upload()), 'rb') as spool:
+            self.assertEqual(spool.read(), self.content[:8])
+
+    def test_size_limits(self):
+        response = self.client.post(
+            '/api/audition-uploads/', {'filename': 'big.mp3', 'total_size': MAX_AUDITION_FILE_SIZE + 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.put_chunk(0, self.content[:9])
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Chunk exceeds 8 bytes', response.data['error'])
+
+        self.put_chunk(0, self.content[:8])
+        response = self.put_chunk(8, self.content[8:] + b'!')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Chunk exceeds', response.data['error'])
+        self.assertEqual(self.upload().received_bytes, 8)
+
+    def test_complete_needs_every_byte(self):
+        self.put_chunk(0, self.content[:8])
+
+        response = self.complete()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('8/16', response.data['error'])
+        self.assertEqual(self.upload().status, 'UPLOADING')
+
+    def test_checksum_mismatch_restarts_the_upload(self):
+        self.put_chunk(0, self.content[:8])
+        self.put_chunk(8, self.content[8:])
+
+        response = self.complete(sha256=hashlib.sha256(b'something else').hexdigest())
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('Checksum mismatch', response.data['error'])
+        upload = self.upload()
+        self.assertEqual((upload.status, upload.received_bytes, upload.sha256), ('UPLOADING', 0, ''))
+
+        # Sent again from the start, it completes
+        self.put_chunk(0, self.content[:8])
+        self.put_chunk(8, self.content[8:])
+        response = self.complete(sha256=hashlib.sha256(self.content).hexdigest().upper())
+        self.assertEqual(response.data['status'], 'COMPLETE')
+        self.assertEqual(self.complete(sha256='not-a-digest').status_code, 400)
+
+    def test_bad_upload_id_is_rejected(self):
+        self.assertEqual(self.put_chunk(0, b'abc', upload_id='not-a-uuid').status_code, 400)
+        self.assertEqual(self.complete(upload_id='not-a-uuid').status_code, 400)
+        missing = '00000000-0000-0000-0000-000000000000'
+        self.assertEqual(self.put_chunk(0, b'abc', upload_id=missing).status_code, 404)
+        self.assertEqual(self.complete(upload_id=missing).status_code, 404)
+
+        with self.assertRaises(UploadError):
+            parse_upload_id('12345')
+        self.assertEqual(parse_upload_id(self.upload_id.upper()), self.upload_id)
+        self.assertEqual(parse_upload_ids(self.upload_id), [self.upload_id])
+        with self.assertRaises(UploadError):
+            parse_upload_ids({'id': self.upload_id})
+
+
+# --- Blob store ---
+
+@mock.patch('registrations.signals.safe_task_delay')
+class BlobStoreTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        patcher = override_settings(MEDIA_ROOT=self.media_root)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.content = b'the same recitation'
+
+    def save(self, index, execute=True):
+        registration = make_registrant(index)
+        with self.captureOnCommitCallbacks(execute=execute):
+            return save_audition_upload(registration, SimpleUploadedFile('recitation.mp3', self.content))
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+
+    def test_identical_uploads_share_one_blob(self, delay):
+        first, second = self.save(1), self.save(2)
+
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual({first.blob_id, second.blob_id}, {blob.id})
+        self.assertEqual(first.audition_file_path.name, blob.file.name)
+        self.assertEqual(self.stored_files(), [blob.file.name])
+        with default_storage.open(blob.file.name) as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_file_goes_with_the_last_reference(self, delay):
+        first, second = self.save(1), self.save(2)
+        blob = MediaBlob.objects.get()
+        for name in rendition_names(blob.file.name):
+            default_storage.save(name, ContentFile(b'mp3'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertEqual(len(self.stored_files()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_rolled_back_upload_leaves_no_file(self, delay):
+        registration = make_registrant(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                save_audition_upload(registration, SimpleUploadedFile('recitation.mp3', self.content))
+                raise RuntimeError('registration failed')
+
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_missing_file_is_written_again_on_reuse(self, delay):
+        # The first writer has not placed its file (or died before it could)
+        self.save(1, execute=False)
+        blob = MediaBlob.objects.get()
+        self.assertFalse(default_storage.exists(blob.file.name))
+
+        self.save(2)
+
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        with default_storage.open(blob.file.name) as stored:
+            self.assertEqual(stored.read(), self.content)
+
+
+# --- Registration intake ---
+
+@override_settings(REGISTRATION_INTAKE_ENABLED=True)
+@mock.patch('registrations.utils.safe_task_delay')
+class IntakeDrainTests(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        for patcher in (
+            # Submissions take the database queue; status documents use Redis
+            mock.patch('registrations.utils.intake.get_redis', return_value=None),
+            mock.patch('registrations.utils.status_docs.get_redis', return_value=self.redis),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def submit(self, index, **fields):
+        data = {
+            'full_name': f'Registrant {index}', 'its_number': f'{40000000 + index}',
+            'email': f'r{index}@example.com', 'phone_number': f'98765{index:05d}', 'preference': [],
+        }
+        data.update(fields)
+        return enqueue_submission(data, [])
+
+    def test_drain_builds_status_documents_and_drops_cached_misses(self, delay):
+        first, second = self.submit(1), self.submit(2)
+        taken = self.submit(3, its_number='40000001')
+        # Looked up while still queued: cached as missing
+        self.assertIsNone(get_status_document('40000001'))
+        self.assertEqual(self.redis.get(STATUS_DOC_KEY.format('40000001')), STATUS_MISSING)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_intake(), {'stream': 0, 'database': 3})
+
+        registrations = Registration.objects.order_by('its_number')
+        self.assertEqual([r.its_number for r in registrations], ['40000001', '40000002'])
+        self.assertEqual(get_submission_status(taken)['status'], 'REJECTED')
+        for tracking_id, registration in zip((first, second), registrations):
+            self.assertEqual(get_submission_status(tracking_id)['registration_id'], registration.id)
+            self.assertTrue(StatusDocument.objects.filter(registration=registration).exists())
+            document = get_status_document(registration.its_number)
+            self.assertEqual(document['its_number'], registration.its_number)
+        # Confirmation and Sheets sync for each new registration
+        self.assertEqual(delay.call_count, 4)
+
+
+# --- Signed media ---
+
+class SignedMediaTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        patcher = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND='')
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.content = bytes(range(100))
+        self.name = default_storage.save('auditions files/recitation.mp3', ContentFile(self.content))
+
+    def get(self, token=None, **headers):
+        return self.client.get(f'/api/media/{token or sign_media_name(self.name)}/recitation.mp3', **headers)
+
+    def test_parse_range(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))  # multi-range: whole file
+        self.assertIsNone(parse_range('items=0-9', 100))
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        for header in ('bytes=100-', 'bytes=20-10', 'bytes=-0'):
+            with self.assertRaises(ValueError, msg=header):
+                parse_range(header, 100)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '100')
+
+    def test_byte_ranges(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[95:])
+
+        response = self.get(HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_expired_and_tampered_tokens_are_refused(self):
+        token = sign_media_name(self.name)
+        self.assertEqual(unsign_media_token(token)[0], self.name)
+
+        expired = sign_media_name(self.name, ttl=-10)
+        with self.assertRaisesMessage(InvalidMediaToken, 'expired'):
+            unsign_media_token(expired)
+        response = self.get(expired)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.content, b'Media link has expired')
+
+        tampered = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+        with self.assertRaisesMessage(InvalidMediaToken, 'Invalid'):
+            unsign_media_token(tampered)
+        self.assertEqual(self.get(tampered).status_code, 403)
+
+        self.assertEqual(self.get(sign_media_name('../outside.mp3')).status_code, 403)
+        self.assertEqual(self.get(sign_media_name('auditions files/missing.mp3')).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_SENDFILE_PREFIX='/protected-media/')
+    def test_web_server_sends_the_file(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/auditions%20files/recitation.mp3')
+        self.assertEqual(response.content, b'')
+
+
+# --- Change feed ---
+
+@override_settings(CHANGES_SAFETY_WINDOW_SECONDS=0)
+class ChangesFeedTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def changes(self, since):
+        return self.client.get('/api/changes/', {'since': since})
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now().replace(microsecond=123456)
+        self.assertEqual(decode_cursor(encode_cursor(moment)), moment)
+        with self.assertRaises(CursorError):
+            decode_cursor('yesterday')
+
+        cursor = self.client.get('/api/changes/').data['cursor']
+        registrant = make_registrant(1)
+
+        response = self.changes(cursor)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['full_resync'])
+        self.assertEqual([r['id'] for r in response.data['registrations']], [registrant.id])
+        self.assertEqual(response.data['deleted']['registrations'], [])
+
+        # Nothing changed since the new cursor
+        cursor = response.data['cursor']
+        self.assertEqual(self.changes(cursor).data['registrations'], [])
+
+        registrant.full_name = 'Renamed'
+        registrant.save()
+        response = self.changes(cursor)
+        self.assertEqual([r['full_name'] for r in response.data['registrations']], ['Renamed'])
+
+    def test_safety_window_reads_rows_just_before_the_cursor(self):
+        registrant = make_registrant(1)
+        since = registrant.updated_at + timedelta(seconds=2)
+
+        with override_settings(CHANGES_SAFETY_WINDOW_SECONDS=5):
+            _, rows, _, _ = collect_changes(since)
+        self.assertEqual(rows['registrations'], [registrant])
+        _, rows, _, _ = collect_changes(since)
+        self.assertEqual(rows['registrations'], [])
+
+    def test_deletes_are_reported_as_tombstones(self):
+        registrant = make_registrant(1)
+        cursor = self.client.get('/api/changes/').data['cursor']
+        registrant_id = registrant.id
+
+        registrant.delete()
+
+        response = self.changes(cursor)
+        self.assertEqual(response.data['deleted']['registrations'], [registrant_id])
+        self.assertEqual(response.data['deleted']['duty_assignments'], [])
+        self.assertEqual(response.data['registrations'], [])
+
+    def test_expired_and_malformed_cursors(self):
+        old = encode_cursor(timezone.now() - timedelta(days=31))
+        with self.assertRaises(CursorExpired):
+            collect_changes(decode_cursor(old))
+
+        response = self.changes(old)
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['full_resync'])
+        self.assertEqual(self.changes('not-a-cursor').status_code, 400)
+
+    @override_settings(CHANGES_MAX_ROWS=2)
+    def test_too_many_changes_ask_for_a_full_resync(self):
+        cursor = self.client.get('/api/changes/').data['cursor']
+        make_registrant(1)
+        make_registrant(2)
+        self.assertFalse(collect_changes(decode_cursor(cursor))[3])
+
+        make_registrant(3)
+
+        self.assertTrue(collect_changes(decode_cursor(cursor))[3])
+        response = self.changes(cursor)
+        self.assertTrue(response.data['full_resync'])
+        self.assertNotIn('registrations', response.data)
+
+
+# --- Roster allotment ---
+
+class AllotmentTests(TestCase):
+
+    def setUp(self):
+        today = timezone.localdate()
+        # A Monday a few weeks out, so a week of dates is one calendar week
+        self.monday = today + timedelta(days=21 - today.weekday())
+
+    def registrants(self, preference, count, start=0, **fields):
+        fields = {'status': 'APPROVED', **fields}
+        return [make_registrant(start + i, preference=preference, **fields) for i in range(count)]
+
+    def solve(self, days=1, seed=None):
+        return solve_roster(self.monday, self.monday + timedelta(days=days - 1), seed=seed)
+
+    def test_only_eligible_registrants_are_used(self):
+        self.assertEqual(eligible_types('azaan'), set(AZAAN_TYPES))
+        self.assertEqual(eligible_types(['TILAWAT', 'unknown']), {'TAJWEED'})
+        azaan, = self.registrants(['AZAAN'], 1)
+        sanah, = self.registrants(['SANAH'], 1, start=1)
+        self.registrants(['BOTH'], 1, start=2, status='PENDING')
+        self.registrants(['BOTH'], 1, start=3, is_active=False)
+
+        cells, stats = self.solve()
+
+        by_person = {registration_id: namaaz_type for _, namaaz_type, registration_id in cells}
+        self.assertEqual(set(by_person), {azaan.id, sanah.id})
+        self.assertIn(by_person[azaan.id], AZAAN_TYPES)
+        self.assertEqual(by_person[sanah.id], 'SANAH')
+        self.assertEqual((stats['registrants'], stats['filled']), (2, 2))
+        self.assertEqual(stats['unfilled'], stats['slots'] - 2)
+
+    def test_duties_are_spread_evenly(self):
+        people = self.registrants(['SANAH'], 3)
+        make_registrant(9, preference=['SANAH'], status='ALLOTTED')
+        DutyAssignment.objects.create(
+            duty_date=self.monday, namaaz_type='SANAH', assigned_user=people[0]
+        )
+
+        cells, stats = self.solve(days=7)
+
+        self.assertEqual(stats['kept'], 1)
+        self.assertEqual(len(cells), 6)
+        loads = Counter(registration_id for _, _, registration_id in cells)
+        loads[people[0].id] += 1
+        self.assertEqual(sorted(loads.values()), [1, 2, 2, 2])
+        # The slot already held is kept as it is
+        self.assertNotIn(self.monday, [d for d, _, _ in cells])
+
+    @override_settings(DUTY_MAX_PER_DAY=2)
+    def test_daily_limit_and_same_reporting_time(self):
+        self.registrants(['BOTH'], 1)
+
+        cells, _ = self.solve()
+
+        self.assertEqual(len(cells), 2)
+        groups = clash_groups()
+        self.assertNotEqual(groups[cells[0][1]], groups[cells[1][1]])
+
+    @override_settings(DUTY_MAX_PER_WEEK=3)
+    def test_weekly_limit(self):
+        self.registrants(['SANAH'], 1)
+
+        cells, _ = self.solve(days=14)
+
+        weeks = Counter(week_start(duty_date) for duty_date, _, _ in cells)
+        self.assertEqual(weeks, {self.monday: 3, self.monday + timedelta(days=7): 3})
+
+    def test_seed_makes_the_roster_repeatable(self):
+        self.registrants(['SANAH'], 10)
+
+        self.assertEqual(self.solve(days=3, seed=7)[0], self.solve(days=3, seed=7)[0])
+        self.assertGreater(len({tuple(self.solve(days=3, seed=seed)[0]) for seed in range(10)}), 1)
+        with self.assertRaises(AllotmentError):
+            solve_roster(self.monday, self.monday - timedelta(days=1))
+
+    def test_publish_reports_slots_taken_since_the_draft(self):
+        first, second = self.registrants(['SANAH'], 2)
+        draft = create_draft(self.monday, self.monday + timedelta(days=1), seed=1)
+        self.assertEqual(draft.cells.count(), 2)
+        taken = draft.cells.first()
+        outsider = make_registrant(5, preference=['SANAH'], status='APPROVED')
+        DutyAssignment.objects.create(duty_date=taken.duty_date, namaaz_type=taken.namaaz_type, assigned_user=outsider)
+
+        results = publish_draft(draft.id)
+
+        self.assertEqual([r['status'] for r in results].count('assigned'), 1)
+        conflict, = [r for r in results if r.get('status') == 'error']
+        self.assertEqual(conflict['duty_date'], taken.duty_date.isoformat())
+        self.assertIn('already assigned', conflict['error'])
+        self.assertEqual(
+            DutyAssignment.objects.get(duty_date=taken.duty_date, namaaz_type=taken.namaaz_type).assigned_user_id,
+            outsider.id
+        )
+        draft.refresh_from_db()
+        self.assertEqual((draft.status, draft.stats['published'], draft.stats['conflicts']), ('PUBLISHED', 1, 1))
+        with self.assertRaisesMessage(AllotmentError, 'already published'):
+            publish_draft(draft.id)
+
+
+# --- Occupancy index ---
+
+@mock.patch('registrations.signals.safe_task_delay')
+class OccupancyTests(TestCase):
+
+    def setUp(self):
+        self.person = make_registrant(1)
+        self.day = timezone.localdate() + timedelta(days=21 - timezone.localdate().weekday())
+
+    def assign(self, namaaz_type, day=None, person=None):
+        return DutyAssignment.objects.create(
+            duty_date=day or self.day, namaaz_type=namaaz_type, assigned_user=person or self.person
+        )
+
+    def test_same_reporting_time_and_daily_limit(self, delay):
+        occupancy = {(self.person.id, self.day): ['FAJAR_AZAAN']}
+
+        self.assertIn('same reporting time', occupancy_error(occupancy, self.person.id, self.day, 'FAJAR_TAKBIRA'))
+        self.assertIn('limit 1', occupancy_error(occupancy, self.person.id, self.day, 'ZOHAR_AZAAN'))
+        self.assertIsNone(occupancy_error(occupancy, self.person.id, self.day + timedelta(days=1), 'ZOHAR_AZAAN'))
+        with override_settings(DUTY_MAX_PER_DAY=2):
+            self.assertIsNone(occupancy_error(occupancy, self.person.id, self.day, 'ZOHAR_AZAAN'))
+            self.assertIsNotNone(occupancy_error(occupancy, self.person.id, self.day, 'FAJAR_TAKBIRA'))
+
+    @override_settings(DUTY_MAX_PER_WEEK=2)
+    def test_weekly_limit(self, delay):
+        self.assign('SANAH')
+        self.assign('SANAH', day=self.day + timedelta(days=2))
+
+        self.assertIn('this week (limit 2)', check_assignment(self.person.id, self.day + timedelta(days=6), 'SANAH'))
+        self.assertIsNone(check_assignment(self.person.id, self.day + timedelta(days=7), 'SANAH'))
+
+    def test_index_follows_assignments(self, delay):
+        duty = self.assign('FAJAR_AZAAN')
+        row = DutyOccupancy.objects.get(registration=self.person, duty_date=self.day)
+        self.assertEqual((row.namaaz_types, row.count, row.has_clash), (['FAJAR_AZAAN'], 1, False))
+
+        other = make_registrant(2)
+        duty = DutyAssignment.objects.get(pk=duty.pk)
+        duty.assigned_user = other
+        duty.save()
+        self.assertFalse(DutyOccupancy.objects.filter(registration=self.person).exists())
+        self.assertEqual(DutyOccupancy.objects.get(registration=other).namaaz_types, ['FAJAR_AZAAN'])
+
+        duty.delete()
+        self.assertFalse(DutyOccupancy.objects.exists())
+
+    @override_settings(DUTY_MAX_PER_WEEK=3)
+    def test_find_conflicts(self, delay):
+        # Written around the checks, as an import or a manual edit would
+        DutyAssignment.objects.bulk_create([
+            DutyAssignment(duty_date=self.day, namaaz_type=t, assigned_user=self.person)
+            for t in ('FAJAR_AZAAN', 'FAJAR_TAKBIRA')
+        ] + [
+            DutyAssignment(duty_date=self.day + timedelta(days=i), namaaz_type='SANAH', assigned_user=self.person)
+            for i in (1, 2)
+        ])
+        self.assertEqual(rebuild_occupancy(), 3)
+
+        conflicts = find_conflicts()
+
+        day, = conflicts['days']
+        self.assertEqual((day['duty_date'], day['count']), (self.day.isoformat(), 2))
+        self.assertEqual(day['reasons'], ['same_reporting_time', 'over_daily_limit'])
+        week, = conflicts['weeks']
+        self.assertEqual((week['week_start'], week['count']), (self.day.isoformat(), 4))
+        self.assertEqual(find_conflicts(date_from=self.day + timedelta(days=1))['days'], [])
+        with override_settings(DUTY_MAX_PER_DAY=2, DUTY_MAX_PER_WEEK=0):
+            self.assertEqual(find_conflicts()['days'][0]['reasons'], ['same_reporting_time'])
+            self.assertEqual(find_conflicts()['weeks'], [])
+
+
+class ConcurrentAssignmentTests(TransactionTestCase):
+
+    @mock.patch('registrations.signals.safe_task_delay')
+    def test_concurrent_assigns_to_one_person_are_serialized(self, delay):
+        person = make_registrant(1)
+        day = timezone.localdate() + timedelta(days=7)
+        first_checked, second_started = threading.Event(), threading.Event()
+        outcomes = {}
+
+        def assign(namaaz_type, before_write):
+            try:
+                with transaction.atomic():
+                    error = check_assignment(person.id, day, namaaz_type)
+                    before_write()
+                    if error:
+                        outcomes[namaaz_type] = error
+                        return
+                    DutyAssignment.objects.create(duty_date=day, namaaz_type=namaaz_type, assigned_user=person)
+                    outcomes[namaaz_type] = 'assigned'
+            except DatabaseError as e:
+                # Backends without row locks (sqlite) refuse the second writer instead
+                outcomes[namaaz_type] = str(e)
+            finally:
+                connection.close()
+
+        def first_waits():
+            first_checked.set()
+            second_started.wait(5)
+            # Long enough for the second assign to reach (and, with row locks, wait on) its check
+            time.sleep(0.2)
+
+        def second():
+            first_checked.wait(5)
+            second_started.set()
+            assign('ZOHAR_AZAAN', lambda: None)
+
+        threads = [
+            threading.Thread(target=assign, args=('FAJAR_AZAAN', first_waits)),
+            threading.Thread(target=second),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(len(outcomes), 2)
+        self.assertEqual(list(outcomes.values()).count('assigned'), 1)
+        row = DutyOccupancy.objects.get(registration=person, duty_date=day)
+        self.assertEqual(row.count, 1)
+        self.assertEqual(DutyAssignment.objects.filter(assigned_user=person).count(), 1)
+
+
+# --- Reminder dispatch ---
+
+WHATSAPP_OK = {'success': True, 'message_id': 'wamid.1'}
+CALL_OK = {'success': True, 'call_sid': 'CA1'}
+
+
+@override_settings(CELERY_ENABLED=False)
+class ReminderDispatchTests(TransactionTestCase):
+
+    def setUp(self):
+        self.window, self.call = seed_stages()
+        self.registrants = [make_registrant(i) for i in range(3)]
+        self.duties = make_duties([
+            (registrant, tomorrow_ist() + timedelta(days=1), namaaz_type)
+            for registrant, namaaz_type in zip(self.registrants, ('FAJAR_AZAAN', 'SANAH', 'ZOHAR_AZAAN'))
+        ])
+        plan_reminders(self.duties)
+        self.now = timezone.now()
+
+    def due(self, stage, **filters):
+        reminders = Reminder.objects.filter(stage=stage, **filters)
+        reminders.update(scheduled_datetime=self.now - timedelta(minutes=1))
+        return list(reminders.order_by('id').values_list('id', flat=True))
+
+    def patch_senders(self, email=True, whatsapp=WHATSAPP_OK, call=CALL_OK):
+        senders = {
+            'email': mock.patch('registrations.utils.email_notifications.send_reminder_email', return_value=email),
+            'whatsapp': mock.patch('registrations.utils.whatsapp.send_duty_reminder_tomorrow', return_value=whatsapp),
+            'call': mock.patch('registrations.utils.exotel.make_exotel_call', return_value=call),
+        }
+        mocks = {channel: patcher.start() for channel, patcher in senders.items()}
+        for patcher in senders.values():
+            self.addCleanup(patcher.stop)
+        return mocks
+
+    def test_claim_batch_claims_each_due_reminder_once_per_run(self):
+        due = self.due(self.window)
+        started_at = timezone.now()
+
+        first = reminder_dispatch.claim_batch(started_at, 2)
+        second = reminder_dispatch.claim_batch(started_at, 2)
+        self.assertEqual([r.id for r in first], due[:2])
+        self.assertEqual([r.id for r in second], due[2:])
+        self.assertEqual(reminder_dispatch.claim_batch(started_at, 2), [])
+        self.assertEqual(Reminder.objects.filter(status='PROCESSING').count(), 3)
+        # The call reminders are not due yet
+        self.assertFalse(Reminder.objects.filter(stage=self.call).exclude(status='PENDING').exists())
+
+    def test_stale_claims_are_released(self):
+        due = self.due(self.window)
+        Reminder.objects.filter(id=due[0]).update(status='PROCESSING', claimed_at=self.now - timedelta(hours=1))
+        Reminder.objects.filter(id=due[1]).update(status='PROCESSING', claimed_at=self.now)
+
+        self.assertEqual(reminder_dispatch.release_stale_claims(), 1)
+        self.assertEqual(Reminder.objects.get(id=due[0]).status, 'PENDING')
+        self.assertEqual(Reminder.objects.get(id=due[1]).status, 'PROCESSING')
+
+    def test_dispatch_sends_every_channel_and_writes_the_results(self):
+        senders = self.patch_senders()
+        due = self.due(self.window)
+
+        stats = reminder_dispatch.dispatch_due_reminders(batch_size=2, workers=2)
+
+        self.assertEqual((stats['claimed'], stats['batches'], stats['completed']), (3, 2, 3))
+        self.assertEqual((stats['email_success'], stats['whatsapp_success']), (3, 3))
+        self.assertEqual(senders['email'].call_count, 3)
+        self.assertEqual(set(Reminder.objects.filter(id__in=due).values_list('status', flat=True)), {'SENT'})
+        self.assertEqual(ReminderLog.objects.filter(reminder_id__in=due, success=True).count(), 6)
+
+    def test_failed_channel_is_retried_until_its_attempts_run_out(self):
+        senders = self.patch_senders(whatsapp={'success': False, 'response': {'error': {'message': 'nope'}}})
+        reminder_id = self.due(self.window, duty_assignment=self.duties[0])[0]
+
+        reminder_dispatch.dispatch_due_reminders()
+        reminder = Reminder.objects.get(id=reminder_id)
+        self.assertEqual(reminder.status, 'PENDING')
+        self.assertTrue(reminder.email_sent)
+        self.assertEqual(reminder.whatsapp_attempts, 1)
+
+        reminder_dispatch.dispatch_due_reminders()
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.status, 'FAILED')
+        self.assertEqual(reminder.whatsapp_attempts, 2)
+        # The email went out once
+        self.assertEqual(senders['email'].call_count, 1)
+
+    def test_busy_gateway_defers_without_using_an_attempt(self):
+        self.patch_senders(whatsapp={'success': False, 'busy': True})
+        reminder_id = self.due(self.window, duty_assignment=self.duties[0])[0]
+
+        stats = reminder_dispatch.dispatch_due_reminders()
+
+        self.assertEqual(stats['whatsapp_deferred'], 1)
+        reminder = Reminder.objects.get(id=reminder_id)
+        self.assertEqual((reminder.status, reminder.whatsapp_attempts), ('PENDING', 0))
+
+    def test_calls_go_through_the_call_lane(self):
+        self.patch_senders()
+        due = self.due(self.call)
+
+        stats = reminder_dispatch.dispatch_due_reminders(batch_size=10)
+
+        self.assertEqual((stats['call_success'], stats['completed']), (3, 3))
+        self.assertEqual(
+            set(Reminder.objects.filter(id__in=due).values_list('status', 'call_status', 'call_sid')),
+            {('SENT', 'PLACED', 'CA1')}
+        )
+
+    def test_no_free_call_slot_defers_without_using_an_attempt(self):
+        self.patch_senders(call={'success': False, 'busy': True})
+        due = self.due(self.call)
+
+        stats = reminder_dispatch.dispatch_due_reminders()
+
+        self.assertEqual(stats['call_deferred'], 3)
+        self.assertEqual(set(Reminder.objects.filter(id__in=due).values_list('status', 'call_attempts')), {('PENDING', 0)})
+
+    def test_send_reminder_claims_once(self):
+        senders = self.patch_senders()
+        reminder_id = self.due(self.window, duty_assignment=self.duties[0])[0]
+
+        self.assertTrue(reminder_dispatch.send_reminder(reminder_id))
+        self.assertFalse(reminder_dispatch.send_reminder(reminder_id))
+        self.assertEqual(senders['whatsapp'].call_count, 1)
+        self.assertEqual(Reminder.objects.get(id=reminder_id).status, 'SENT')
+
+    @override_settings(REMINDER_DIGEST_ENABLED=True, REMINDER_WINDOW_START='00:00', REMINDER_WINDOW_END='23:59')
+    def test_digest_merges_only_siblings_inside_the_send_window(self):
+        senders = self.patch_senders()
+        digest_email = mock.patch('registrations.utils.email_notifications.send_reminder_digest_email', return_value=True)
+        digest_email.start()
+        self.addCleanup(digest_email.stop)
+        registrant = self.registrants[0]
+        magrib, = make_duties([(registrant, self.duties[0].duty_date, 'MAGRIB_AZAAN')])
+        plan_reminders([magrib])
+        fajar_reminder = self.due(self.window, duty_assignment=self.duties[0])[0]
+        _, window_end = window_bounds(magrib.duty_date)
+        Reminder.objects.filter(stage=self.window, duty_assignment=magrib).update(scheduled_datetime=window_end)
+        self.due(self.call, duty_assignment=self.duties[0])
+
+        self.assertTrue(reminder_dispatch.send_reminder(fajar_reminder))
+
+        self.assertEqual(senders['whatsapp'].call_count, 1)
+        self.assertIn('Magrib', senders['whatsapp'].call_args.kwargs['duty_time'])
+        self.assertEqual(
+            set(Reminder.objects.filter(stage=self.window, duty_assignment__assigned_user=registrant).values_list('status', flat=True)),
+            {'SENT'}
+        )
+
+        # The later duty's call (2 hours before its reporting time) keeps its own schedule
+        call_reminder = Reminder.objects.filter(stage=self.call, duty_assignment=self.duties[0]).get()
+        self.assertTrue(reminder_dispatch.send_reminder(call_reminder.id))
+        self.assertIsNone(senders['call'].call_args.kwargs.get('duty_name'))
+        self.assertEqual(Reminder.objects.get(stage=self.call, duty_assignment=magrib).status, 'PENDING')
+
+
+# --- Reminder archive ---
+
+class ReminderArchiveTests(TestCase):
+
+    def setUp(self):
+        self.window, _ = seed_stages()
+        old_date = tomorrow_ist() - timedelta(days=200)
+        duties = make_duties([
+            (make_registrant(i), old_date if i < 3 else tomorrow_ist(), namaaz_type)
+            for i, namaaz_type in enumerate(('FAJAR_AZAAN', 'SANAH', 'ZOHAR_AZAAN', 'SANAH'))
+        ])
+        plan_reminders(duties)
+        self.sent, self.failed, self.pending, self.recent = Reminder.objects.filter(stage=self.window).order_by('id')
+        Reminder.objects.filter(id=self.sent.id).update(status='SENT', email_sent=True)
+        Reminder.objects.filter(id=self.failed.id).update(status='FAILED', last_error='no answer')
+        Reminder.objects.filter(id=self.recent.id).update(status='SENT')
+        for reminder, success in ((self.sent, True), (self.sent, True), (self.failed, False)):
+            ReminderLog.objects.create(reminder=reminder, channel='EMAIL', success=success, message='attempt')
+        self.season = old_date.year
+
+    def test_finished_old_reminders_move_with_their_logs(self):
+        stats = archive_reminders(older_than_days=90, batch_size=1)
+
+        self.assertEqual(stats, {'reminders': 2, 'logs': 3})
+        self.assertEqual(
+            set(Reminder.objects.filter(stage=self.window).values_list('id', flat=True)), {self.pending.id, self.recent.id}
+        )
+        self.assertFalse(ReminderLog.objects.exists())
+        sent = ReminderArchive.objects.get(original_id=self.sent.id)
+        self.assertEqual((sent.status, sent.email_sent, sent.season), ('SENT', True, self.season))
+        self.assertEqual(sent.its_number, self.sent.duty_assignment.assigned_user.its_number)
+        self.assertEqual(sent.logs.count(), 2)
+        failed = ReminderArchive.objects.get(original_id=self.failed.id)
+        self.assertEqual((failed.last_error, failed.logs.get().success), ('no answer', False))
+        # Nothing left to move
+        self.assertEqual(archive_reminders(older_than_days=90), {'reminders': 0, 'logs': 0})
+
+    def test_export_writes_json_lines_before_purging(self):
+        archive_reminders(older_than_days=90)
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir, ignore_errors=True)
+
+        with self.assertRaises(OSError):
+            export_season(self.season, os.path.join(export_dir, 'missing', 'season.jsonl.gz'), purge=True)
+        self.assertEqual(ReminderArchive.objects.filter(season=self.season).count(), 2)
+
+        path = os.path.join(export_dir, 'season.jsonl.gz')
+        self.assertEqual(export_season(self.season, path, purge=True), 2)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            records = [json.loads(line) for line in exported]
+        self.assertEqual([r['id'] for r in records], [self.sent.id, self.failed.id])
+        self.assertEqual([len(r['logs']) for r in records], [2, 1])
+        self.assertEqual(records[1]['status'], 'FAILED')
+        self.assertFalse(ReminderArchive.objects.exists())
+        self.assertFalse(ReminderLogArchive.objects.exists())
+
+
+# --- Reminder write buffer ---
+
+class ReminderWriteBufferTests(TestCase):
+
+    def setUp(self):
+        seed_stages()
+        duties = make_duties([(make_registrant(i), tomorrow_ist(), t) for i, t in enumerate(('FAJAR_AZAAN', 'SANAH'))])
+        plan_reminders(duties)
+        self.first, self.second = Reminder.objects.filter(stage__name='day-before').order_by('id')
+
+    def test_flush_groups_updates_and_writes_logs(self):
+        writes = ReminderWriteBuffer()
+        self.first.email_sent, self.first.email_attempts = True, 1
+        writes.update(self.first, 'email_sent', 'email_attempts')
+        self.second.last_error = 'boom'
+        writes.update(self.second, 'last_error')
+        writes.log(self.first, 'EMAIL', True, 'sent')
+        writes.log(self.second, 'EMAIL', False, 'boom')
+        self.assertEqual(len(writes), 4)
+
+        self.assertEqual(writes.flush(), (2, 2))
+        self.assertEqual(len(writes), 0)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertTrue(self.first.email_sent)
+        self.assertEqual(self.second.last_error, 'boom')
+        self.assertEqual(ReminderLog.objects.count(), 2)
+
+    def test_logs_of_deleted_reminders_are_dropped(self):
+        writes = ReminderWriteBuffer()
+        writes.log(self.first, 'EMAIL', True, 'sent')
+        writes.log(self.second, 'EMAIL', True, 'sent')
+        Reminder.objects.filter(id=self.second.id).delete()
+
+        self.assertEqual(writes.flush(), (0, 1))
+        self.assertEqual(list(ReminderLog.objects.values_list('reminder_id', flat=True)), [self.first.id])
+
+
+# --- Reminder plan ---
+
+class ReminderPlanTests(TestCase):
+
+    def setUp(self):
+        self.window, self.call = seed_stages()
+        self.registrant = make_registrant(1)
+        self.duty_date = tomorrow_ist() + timedelta(days=7)
+        self.duty, = make_duties([(self.registrant, self.duty_date, 'FAJAR_AZAAN')])
+
+    def test_one_reminder_per_active_stage(self):
+        self.assertEqual(plan_reminders([self.duty]), 2)
+
+        window_reminder = Reminder.objects.get(stage=self.window)
+        start, end = window_bounds(self.duty_date)
+        self.assertEqual(window_reminder.channels, 'email,whatsapp')
+        self.assertTrue(start <= window_reminder.scheduled_datetime <= end)
+
+        call_reminder = Reminder.objects.get(stage=self.call)
+        self.assertEqual(call_reminder.channels, 'call')
+        self.assertEqual(call_reminder.scheduled_datetime, self.duty.reporting_at - timedelta(minutes=120))
+
+    def test_planning_twice_is_harmless(self):
+        plan_reminders([self.duty])
+        self.assertEqual(plan_reminders([self.duty]), 0)
+        self.assertEqual(Reminder.objects.count(), 2)
+
+    def test_reset_reschedules_a_reassigned_slot(self):
+        plan_reminders([self.duty])
+        Reminder.objects.update(status='SENT', email_sent=True, email_attempts=1, call_sid='CA1')
+
+        self.assertEqual(plan_reminders([self.duty], reset_ids={self.duty.id}), 2)
+        for reminder in Reminder.objects.all():
+            self.assertEqual(reminder.status, 'PENDING')
+            self.assertFalse(reminder.email_sent)
+            self.assertEqual(reminder.email_attempts, 0)
+            self.assertIsNone(reminder.call_sid)
+
+    def test_inactive_stage_is_not_planned(self):
+        ReminderStage.objects.filter(id=self.call.id).update(active=False)
+        plan_reminders([self.duty])
+        self.assertEqual(list(Reminder.objects.values_list('stage_id', flat=True)), [self.window.id])
+
+    def test_reporting_stage_skips_duties_under_way(self):
+        past, = make_duties([(make_registrant(2), tomorrow_ist() - timedelta(days=3), 'SANAH')])
+        plan_reminders([past])
+        self.assertEqual(list(Reminder.objects.values_list('stage_id', flat=True)), [self.window.id])
+
+
+# --- Call slots ---
+
+class CallSlotTests(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch('registrations.utils.call_slots.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(EXOTEL_MAX_CONCURRENT_CALLS=2)
+    def test_slots_are_shared_through_redis(self):
+        # Another worker holds one of the two slots
+        self.redis.zsets[call_slots.SLOTS_KEY]['other-worker'] = time.time()
+        with call_slots.call_slot(wait=0) as first:
+            with call_slots.call_slot(wait=0) as second:
+                self.assertEqual((first, second), (True, False))
+        self.assertEqual(list(self.redis.zsets[call_slots.SLOTS_KEY]), ['other-worker'])
+
+    @override_settings(EXOTEL_MAX_CONCURRENT_CALLS=1)
+    def test_expired_slots_are_freed(self):
+        self.redis.zsets[call_slots.SLOTS_KEY]['dead-worker'] = time.time() - call_slots.CALL_SLOT_TTL_SECONDS - 1
+        with call_slots.call_slot(wait=0) as acquired:
+            self.assertTrue(acquired)
+
+    @override_settings(EXOTEL_MAX_CONCURRENT_CALLS=1)
+    def test_without_redis_the_limit_applies_per_process(self):
+        with mock.patch('registrations.utils.call_slots.get_redis', return_value=None):
+            with call_slots.call_slot(wait=0) as first:
+                with call_slots.call_slot(wait=0) as second:
+                    self.assertEqual((first, second), (True, False))
+            with call_slots.call_slot(wait=0) as again:
+                self.assertTrue(again)
+
+
+# --- Call outcomes ---
+
+@override_settings(CELERY_ENABLED=False, EXOTEL_CALL_RETRY_MINUTES=[15, 30], EXOTEL_CALL_RETRY_CUTOFF_MINUTES=30)
+class CallStatusTests(TestCase):
+
+    def setUp(self):
+        _, call_stage = seed_stages()
+        duty, = make_duties([(make_registrant(1), tomorrow_ist() + timedelta(days=2), 'MAGRIB_AZAAN')])
+        self.reminder = Reminder.objects.create(
+            duty_assignment=duty, stage=call_stage, channels='call', status='SENT',
+            scheduled_datetime=timezone.now(), call_sent=True, call_attempts=1, call_sid='CA1', call_status='PLACED'
+        )
+        self.redis = FakeRedis()
+        patcher = mock.patch('registrations.utils.call_status.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self):
+        return self.redis.lists[call_status.CALLBACK_QUEUE]
+
+    def test_completed_call_is_recorded_from_the_queue(self):
+        call_status.enqueue_call_status('CA1', 'completed')
+        self.assertEqual(len(self.queue()), 1)
+
+        totals = call_status.drain_call_statuses()
+
+        self.assertEqual((totals['events'], totals['completed']), (1, 1))
+        self.assertEqual(self.queue(), [])
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.call_status, 'COMPLETED')
+
+    def test_unanswered_call_is_retried_on_the_ladder(self):
+        before = timezone.now()
+        stats = call_status.apply_call_statuses([{'sid': 'CA1', 'status': 'no-answer'}])
+
+        self.assertEqual(stats['retried'], 1)
+        self.reminder.refresh_from_db()
+        self.assertEqual((self.reminder.status, self.reminder.call_sent, self.reminder.call_status), ('PENDING', False, 'NO_ANSWER'))
+        self.assertGreaterEqual(self.reminder.scheduled_datetime, before + timedelta(minutes=15))
+
+    def test_ladder_used_up_gives_up(self):
+        Reminder.objects.filter(id=self.reminder.id).update(call_attempts=3)
+        stats = call_status.apply_call_statuses([{'sid': 'CA1', 'status': 'busy'}])
+
+        self.assertEqual(stats['given_up'], 1)
+        self.reminder.refresh_from_db()
+        self.assertEqual((self.reminder.status, self.reminder.call_status), ('SENT', 'BUSY'))
+
+    def test_repeated_webhook_is_ignored(self):
+        call_status.apply_call_statuses([{'sid': 'CA1', 'status': 'completed'}])
+        stats = call_status.apply_call_statuses([{'sid': 'CA1', 'status': 'failed'}])
+
+        self.assertEqual(stats['matched'], 0)
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.call_status, 'COMPLETED')
+
+    def test_malformed_items_go_to_the_dead_letter_list(self):
+        self.redis.rpush(call_status.CALLBACK_QUEUE, '{broken', '[1]', json.dumps({'sid': 'CA1', 'status': 'completed'}))
+
+        totals = call_status.drain_call_statuses(batch_size=2)
+
+        self.assertEqual(totals['completed'], 1)
+        self.assertEqual(self.redis.lists[call_status.CALLBACK_DEAD_LETTER], ['{broken', '[1]'])
+        self.assertEqual(self.queue(), [])
+
+    def test_batch_that_fails_to_apply_is_requeued_in_order(self):
+        items = [json.dumps({'sid': sid, 'status': 'completed'}) for sid in ('CA1', 'CA2', 'CA3')]
+        self.redis.rpush(call_status.CALLBACK_QUEUE, *items)
+
+        with mock.patch('registrations.utils.call_status.apply_call_statuses', side_effect=RuntimeError('db down')):
+            call_status.drain_call_statuses(batch_size=2)
+
+        self.assertEqual([json.loads(item)['sid'] for item in self.queue()], ['CA1', 'CA2', 'CA3'])
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.call_status, 'PLACED')
+
+    def test_without_redis_the_outcome_is_applied_at_once(self):
+        with mock.patch('registrations.utils.call_status.get_redis', return_value=None):
+            call_status.enqueue_call_status('CA1', 'completed')
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.call_status, 'COMPLETED')
+
+
+# --- WhatsApp gateway ---
+
+def meta_response(status_code=200, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {'messages': [{'id': 'wamid.1'}]}).encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+@override_settings(
+    WHATSAPP_PHONE_NUMBER_ID='1', WHATSAPP_ACCESS_TOKEN='token', WHATSAPP_GATEWAY_WAIT_SECONDS=0.2,
+    WHATSAPP_SEND_RATE=1000, WHATSAPP_SEND_BURST=100
+)
+class WhatsAppGatewayTests(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.redis.set(gateway.HEARTBEAT_KEY, 'running')
+        for patcher in (
+            mock.patch('registrations.utils.whatsapp_gateway.get_redis', return_value=self.redis),
+            mock.patch('registrations.utils.whatsapp_gateway.POLL_SECONDS', 0.02),
+            mock.patch('registrations.utils.whatsapp_gateway._reply_wait', return_value=0.2),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def outcomes(self):
+        return gateway.gateway_stats(1)['last_minute']
+
+    def serve(self):
+        """Run one gateway sender thread until the test ends."""
+        stop = threading.Event()
+        thread = threading.Thread(target=gateway._serve, args=(stop,), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+    @override_settings(WHATSAPP_GATEWAY_MAX_QUEUE=1)
+    def test_full_queue_refuses_at_once(self):
+        self.redis.rpush(gateway.queue_key(gateway.PRIORITY_REMINDER), 'queued')
+
+        with self.assertRaises(gateway.GatewayBusy):
+            gateway.submit({'to': '1'}, (1, 1), gateway.PRIORITY_REMINDER)
+        self.assertEqual(self.outcomes()['busy'], 1)
+
+    def test_message_not_picked_up_in_time_is_withdrawn(self):
+        with self.assertRaises(gateway.GatewayBusy):
+            gateway.submit({'to': '1'}, (1, 1), gateway.PRIORITY_BULK)
+
+        self.assertEqual(self.redis.llen(gateway.queue_key(gateway.PRIORITY_BULK)), 0)
+        self.assertEqual(self.outcomes()['busy'], 1)
+
+    def test_picked_up_message_without_reply_is_not_reported_busy(self):
+        # A gateway takes the message off the queue, then dies
+        taker = threading.Thread(
+            target=self.redis.blpop, args=([gateway.queue_key(gateway.PRIORITY_REMINDER)],), kwargs={'timeout': 2}
+        )
+        taker.start()
+        self.addCleanup(taker.join)
+
+        with self.assertRaises(gateway.GatewayNoReply) as raised:
+            gateway.submit({'to': '1'}, (1, 1), gateway.PRIORITY_REMINDER)
+
+        self.assertIsInstance(raised.exception, requests.Timeout)
+        self.assertNotIsInstance(raised.exception, gateway.GatewayBusy)
+        outcomes = self.outcomes()
+        self.assertEqual((outcomes['unknown'], outcomes['busy']), (1, 0))
+
+    def test_lost_reply_counts_as_an_attempt_for_the_sender(self):
+        from .utils.whatsapp import send_duty_reminder_tomorrow
+
+        with mock.patch('registrations.utils.whatsapp_gateway.submit', side_effect=gateway.GatewayNoReply('lost')):
+            result = send_duty_reminder_tomorrow('9876543210', 'A', '1 March 2026', 'Fajar Azaan', '05:20 AM')
+
+        self.assertFalse(result['success'])
+        self.assertFalse(result.get('busy'))
+        self.assertEqual(result['status_code'], 408)
+
+    def test_gateway_reply_is_returned_to_the_caller(self):
+        self.serve()
+        with mock.patch('registrations.utils.whatsapp_client.send_now', return_value=meta_response()) as send_now:
+            response = gateway.submit({'to': '1'}, (1, 1), gateway.PRIORITY_CONFIRMATION)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['messages'][0]['id'], 'wamid.1')
+        send_now.assert_called_once()
+        self.assertEqual(self.outcomes()['sent'], 1)
+
+    def test_higher_priorities_are_sent_first(self):
+        deadline = time.time() + 5
+        for priority in (gateway.PRIORITY_BULK, gateway.PRIORITY_CONFIRMATION, gateway.PRIORITY_REMINDER):
+            self.redis.rpush(gateway.queue_key(priority), json.dumps({
+                'id': priority, 'priority': priority, 'payload': {'to': priority},
+                'timeout': [1, 1], 'deadline': deadline,
+            }))
+        sent = []
+
+        def send_now(payload, timeout):
+            sent.append(payload['to'])
+            return meta_response()
+
+        with mock.patch('registrations.utils.whatsapp_client.send_now', side_effect=send_now):
+            self.serve()
+            for priority in gateway.PRIORITIES:
+                self.assertIsNotNone(self.redis.blpop(gateway.REPLY_PREFIX + priority, timeout=2))
+
+        self.assertEqual(sent, list(gateway.PRIORITIES))
+
+
+# --- Broadcasts ---
+
+BROADCAST_SETTINGS = dict(
+    WHATSAPP_PHONE_NUMBER_ID='1', WHATSAPP_ACCESS_TOKEN='token', WHATSAPP_SEND_RATE=1000,
+    WHATSAPP_SEND_BURST=100, BROADCAST_CONCURRENCY=2, BROADCAST_FLUSH_SECONDS=0.05,
+)
+
+
+@override_settings(**BROADCAST_SETTINGS)
+class BroadcastTests(TransactionTestCase):
+
+    def setUp(self):
+        self.registrants = [make_registrant(i) for i in range(6)]
+        self.requests = []
+        self.delay = 0.01
+        self.respond = lambda request, phone: httpx.Response(200, json={'messages': [{'id': f'wamid.{phone}'}]})
+
+        async def handler(request):
+            phone = json.loads(request.content)['to']
+            self.requests.append(phone)
+            await asyncio.sleep(self.delay)
+            result = self.respond(request, phone)
+            return await result if asyncio.iscoroutine(result) else result
+
+        real_client = httpx.AsyncClient
+        for patcher in (
+            mock.patch.object(httpx, 'AsyncClient', side_effect=lambda **kwargs: real_client(
+                transport=httpx.MockTransport(handler), **kwargs
+            )),
+            mock.patch('registrations.utils.whatsapp_gateway.get_redis', return_value=None),
+            mock.patch('registrations.utils.broadcast.publish_event'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def create(self):
+        return Broadcast.objects.create(
+            audience='registrants', filters={}, template='reg_received_v2',
+            parameters=['full_name', 'its_number'], total=len(self.registrants)
+        )
+
+    def statuses(self, broadcast):
+        return sorted(broadcast.recipients.values_list('status', flat=True))
+
+    def test_run_sends_to_every_recipient_once(self):
+        broadcast = self.create()
+
+        data = broadcast_module.run_broadcast(broadcast.id)
+
+        self.assertEqual((data['status'], data['sent'], data['pending']), ('DONE', 6, 0))
+        self.assertEqual(len(self.requests), 6)
+        self.assertEqual(len(set(self.requests)), 6)
+        self.assertTrue(all(r.message_id.startswith('wamid.') for r in broadcast.recipients.all()))
+        # Finished: a second run does nothing
+        self.assertIsNone(broadcast_module.run_broadcast(broadcast.id))
+        self.assertEqual(len(self.requests), 6)
+
+    def test_bad_responses_fail_only_their_recipient(self):
+        phones = [f'9198765{i:05d}' for i in range(6)]
+
+        def respond(request, phone):
+            if phone == phones[0]:
+                return httpx.Response(400, json={'error': {'message': 'Invalid parameter'}})
+            if phone == phones[1]:
+                return httpx.Response(200, json=['not', 'an', 'object'])
+            return httpx.Response(200, json={'messages': [{'id': f'wamid.{phone}'}]})
+        self.respond = respond
+        broadcast = self.create()
+
+        data = broadcast_module.run_broadcast(broadcast.id)
+
+        self.assertEqual((data['status'], data['sent'], data['failed']), ('DONE', 5, 1))
+        failed = broadcast.recipients.get(status=BroadcastRecipient.FAILED)
+        self.assertEqual(failed.phone, phones[0])
+        self.assertIn('Invalid parameter', failed.error)
+        self.assertEqual(broadcast.recipients.get(phone=phones[1]).message_id, '')
+
+    @override_settings(BROADCAST_CONCURRENCY=1, BROADCAST_FLUSH_SECONDS=0.01)
+    def test_cancel_stops_sending(self):
+        broadcast = self.create()
+        self.delay = 0
+        real_flush = broadcast_module._flush
+        cancelled = threading.Event()
+
+        def flush(broadcast_id, results):
+            # Cancelled on the flush thread once two were sent, so the write
+            # never races another connection
+            if len(self.requests) < 2 or cancelled.is_set():
+                return real_flush(broadcast_id, results)
+            self.assertTrue(broadcast_module.cancel_broadcast(broadcast_id))
+            broadcast = real_flush(broadcast_id, results)
+            cancelled.set()
+            return broadcast
+
+        async def respond(request, phone):
+            # Past the second send, hold each request until the cancel is in
+            if len(self.requests) > 2:
+                await asyncio.to_thread(cancelled.wait, 5)
+            return httpx.Response(200, json={'messages': [{'id': f'wamid.{phone}'}]})
+        self.respond = respond
+
+        with mock.patch('registrations.utils.broadcast._flush', side_effect=flush):
+            data = broadcast_module.run_broadcast(broadcast.id)
+
+        self.assertTrue(cancelled.is_set())
+        self.assertEqual(data['status'], 'CANCELLED')
+        # The request held at the cancel, and at most one more already taken
+        self.assertIn(len(self.requests), (3, 4))
+        self.assertEqual(broadcast.recipients.filter(status=BroadcastRecipient.SENT).count(), len(self.requests))
+        self.assertEqual(broadcast.recipients.filter(status=BroadcastRecipient.PENDING).count(), 6 - len(self.requests))
+        self.assertFalse(broadcast_module.cancel_broadcast(broadcast.id))
+
+    def test_failed_run_resumes_without_sending_twice(self):
+        broadcast = self.create()
+        self.delay = 0.03
+        real_flush = broadcast_module._flush
+        calls = []
+
+        def flaky_flush(broadcast_id, results):
+            calls.append(len(results))
+            if len(calls) == 1:
+                raise RuntimeError('database went away')
+            return real_flush(broadcast_id, results)
+
+        with mock.patch('registrations.utils.broadcast._flush', side_effect=flaky_flush):
+            data = broadcast_module.run_broadcast(broadcast.id)
+        self.assertEqual(data['status'], 'FAILED')
+        # Every request made has its result stored; the rest are still pending
+        self.assertEqual(broadcast.recipients.exclude(status=BroadcastRecipient.PENDING).count(), len(self.requests))
+        self.assertLess(len(self.requests), 6)
+
+        with mock.patch('registrations.utils.safe_task_delay') as delay:
+            broadcast_module.resume_broadcast(broadcast.id)
+        delay.assert_called_once()
+        data = broadcast_module.run_broadcast(broadcast.id)
+
+        self.assertEqual((data['status'], data['sent']), ('DONE', 6))
+        self.assertEqual(sorted(self.requests), sorted(set(self.requests)))
+        self.assertEqual(len(self.requests), 6)
+
+    def test_unexpected_error_fails_one_recipient_and_the_run_goes_on(self):
+        real_take_token = broadcast_module._take_token
+        calls = []
+
+        async def take_token():
+            calls.append(1)
+            if len(calls) == 3:
+                raise AttributeError('boom')
+            await real_take_token()
+
+        broadcast = self.create()
+        with mock.patch('registrations.utils.broadcast._take_token', side_effect=take_token):
+            data = broadcast_module.run_broadcast(broadcast.id)
+
+        self.assertEqual((data['status'], data['sent'], data['failed']), ('DONE', 5, 1))
+        self.assertIn('Internal error: boom', broadcast.recipients.get(status=BroadcastRecipient.FAILED).error)
+
+    def test_only_failed_or_stalled_broadcasts_resume(self):
+        broadcast = self.create()
+        with self.assertRaises(broadcast_module.BroadcastError):
+            broadcast_module.resume_broadcast(broadcast.id)
+
+        Broadcast.objects.filter(id=broadcast.id).update(
+            status='RUNNING', updated_at=timezone.now() - timedelta(hours=1)
+        )
+        with mock.patch('registrations.utils.safe_task_delay') as delay:
+            broadcast_module.resume_broadcast(broadcast.id)
+        delay.assert_called_once()
+
+    def test_unknown_broadcast_is_not_found(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        for path in ('/api/broadcasts/abc/cancel/', '/api/broadcasts/abc/resume/', '/api/broadcasts/999/cancel/'):
+            self.assertEqual(client.post(path).status_code, 404, path)
@@ -7,30 +7,50 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     RegistrationViewSet,
     DutyAssignmentViewSet,
+    AllotmentDraftViewSet,
+    BroadcastViewSet,
     AuditionFileViewSet,
+    AuditionUploadViewSet,
     UnlockLogViewSet,
     ReminderViewSet,
     ReminderLogViewSet,
+    ReminderArchiveViewSet,
     KhidmatRequestViewSet,
     CorrectionViewSet,
     MeView,
-    HealthCheckView
+    HealthCheckView,
+    SignedMediaView,
+    ExotelCallStatusView,
+    WhatsAppGatewayView,
+    ChangesView,
+    EventTicketView,
+    EventStreamView
 )
 
 # Create router and register viewsets
 router = DefaultRouter()
 router.register(r'registrations', RegistrationViewSet, basename='registration')
 router.register(r'duty-assignments', DutyAssignmentViewSet, basename='duty-assignment')
+router.register(r'allotment-drafts', AllotmentDraftViewSet, basename='allotment-draft')
+router.register(r'broadcasts', BroadcastViewSet, basename='broadcast')
 router.register(r'audition-files', AuditionFileViewSet, basename='audition-file')
+router.register(r'audition-uploads', AuditionUploadViewSet, basename='audition-upload')
 router.register(r'unlock-logs', UnlockLogViewSet, basename='unlock-log')
 router.register(r'reminders', ReminderViewSet, basename='reminder')
 router.register(r'reminder-logs', ReminderLogViewSet, basename='reminder-log')
+router.register(r'reminder-archive', ReminderArchiveViewSet, basename='reminder-archive')
 router.register(r'khidmat-requests', KhidmatRequestViewSet, basename='khidmat-request')
 router.register(r'corrections', CorrectionViewSet, basename='correction')
 
 urlpatterns = [
     path('auth/me/', MeView.as_view(), name='me'),
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('changes/', ChangesView.as_view(), name='changes'),
+    path('events/', EventStreamView.as_view(), name='events'),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
+    path('media/<str:token>/<str:filename>', SignedMediaView.as_view(), name='signed-media'),
+    path('exotel/call-status/', ExotelCallStatusView.as_view(), name='exotel-call-status'),
+    path('whatsapp/gateway/', WhatsAppGatewayView.as_view(), name='whatsapp-gateway'),
     path('unassign-khidmat/', DutyAssignmentViewSet.as_view({'post': 'unassign_khidmat'}), name='unassign-khidmat'),
     path('', include(router.urls)),
 ]
@@ -40,9 +60,35 @@ API Endpoints:
 
 Registrations:
 - GET    /api/registrations/                  - List all registrations
-- POST   /api/registrations/                  - Create registration (with files)
+- POST   /api/registrations/                  - Create registration (with files or upload_ids)
 - GET    /api/registrations/{id}/             - Get registration details
 - GET    /api/registrations/{id}/audition_files/ - Get audition files
+- GET    /api/registrations/intake/{tracking_id}/ - Status of a queued (intake mode) submission
+- GET    /api/registrations/search/?its={its}  - Public status (precomputed document lookup)
+- GET    /api/registrations/status-metrics/    - Status document hit rate (admin)
+
+Change Feed (Admin delta sync):
+- GET    /api/changes/                        - Get a starting cursor
+- GET    /api/changes/?since={cursor}         - Rows changed since cursor + deleted ids (410 = full resync)
+
+Live Events (Admin, Server-Sent Events):
+- POST   /api/events/ticket/                  - Short-lived ticket for the stream
+- GET    /api/events/?ticket={ticket}         - text/event-stream of duty / request changes (ASGI)
+
+Media (Signed URLs):
+- GET    /api/media/{token}/{filename}          - Serve audition media (Range, X-Accel-Redirect/X-Sendfile)
+
+Exotel (Webhook):
+- POST   /api/exotel/call-status/?token={token} - Call outcome callback (queued, applied in batches)
+
+WhatsApp Gateway (Admin):
+- GET    /api/whatsapp/gateway/?minutes=5     - Outbound queue depth, rate limit and send counts
+
+Audition Uploads (Resumable):
+- POST   /api/audition-uploads/                  - Start upload session {filename, total_size}
+- GET    /api/audition-uploads/{id}/             - Get received offset (resume point)
+- PUT    /api/audition-uploads/{id}/chunk/       - Append chunk at Upload-Offset header
+- POST   /api/audition-uploads/{id}/complete/    - Finalize upload {sha256?}
 
 Duty Assignments:
 - GET    /api/duty-assignments/               - List all assignments
@@ -50,7 +96,25 @@ Duty Assignments:
 - GET    /api/duty-assignments/{id}/          - Get assignment details
 - DELETE /api/duty-assignments/{id}/          - Delete assignment (cancel reminder)
 - POST   /api/duty-assignments/{id}/unlock/   - Emergency unlock
-- GET    /api/duty-assignments/grid/          - Get Excel-style grid data
+- POST   /api/duty-assignments/bulk/          - Assign many cells in one transaction (per-cell results)
+- GET    /api/duty-assignments/conflicts/     - Over-allocated registrants per day/week (?from=&to=)
+- GET    /api/duty-assignments/grid/          - Get Excel-style grid data (?from=&to= window, ETag/304)
+- GET    /api/duty-assignments/reporting/     - Duties reporting in the next ?hours=3 (?assigned=true)
+
+Allotment Drafts (Automatic roster solver, admin):
+- POST   /api/allotment-drafts/               - Solve a date range into a draft {date_from, date_to, seed?}
+- GET    /api/allotment-drafts/               - List drafts
+- GET    /api/allotment-drafts/{id}/          - Draft with its cells, for review
+- POST   /api/allotment-drafts/{id}/publish/  - Assign the draft's cells (per-cell results)
+- POST   /api/allotment-drafts/{id}/discard/  - Discard a draft
+
+WhatsApp Broadcasts (admin):
+- GET    /api/broadcasts/audiences/           - Audiences with their filters and parameter fields
+- POST   /api/broadcasts/                     - Queue a broadcast {audience, filters, template, parameters}
+- GET    /api/broadcasts/                     - List broadcasts with progress
+- GET    /api/broadcasts/{id}/                - Progress and failed recipients
+- POST   /api/broadcasts/{id}/cancel/         - Stop sending
+- POST   /api/broadcasts/{id}/resume/         - Resume a failed / stalled broadcast
 
 Unlock Logs (Read-only):
 - GET    /api/unlock-logs/                    - List all unlock logs
@@ -61,11 +125,16 @@ Reminders (Read-only):
 - GET    /api/reminders/{id}/                 - Get reminder details
 - GET    /api/reminders/pending/              - Get pending reminders
 - GET    /api/reminders/upcoming/             - Get reminders for next 7 days
+- GET    /api/reminders/schedule/?date={date} - Per-minute send load of a duty date's reminder window
 
 Reminder Logs (Read-only):
 - GET    /api/reminder-logs/                  - List all reminder logs
 - GET    /api/reminder-logs/{id}/             - Get reminder log details
 
+Reminder Archive (Read-only, admin):
+- GET    /api/reminder-archive/               - Archived reminders (?season=, ?status=, ?its=, ?from=&to=)
+- GET    /api/reminder-archive/{id}/          - Archived reminder with its logs
+
 Khidmat Requests:
 - POST   /api/khidmat-requests/               - Create new request (user)
 - GET    /api/khidmat-requests/?status=pending - List requests (admin)
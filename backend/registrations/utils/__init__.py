@@ -21,6 +21,7 @@ from .whatsapp import (
     send_correction_done_v1
 )
 from .reporting import get_reporting_time
+from .reminder_writes import ReminderWriteBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -90,60 +91,46 @@ def send_whatsapp_message_for_allotment(duty_assignment):
 IST = pytz.timezone('Asia/Kolkata')
 
 # Reminder configuration
-REMINDER_TIME_HOUR = getattr(settings, 'REMINDER_TIME_HOUR', 18)  # Default: 6 PM
-REMINDER_TIME_MINUTE = getattr(settings, 'REMINDER_TIME_MINUTE', 0)
 MAX_RETRY_ATTEMPTS = 2
 
 
-def calculate_reminder_datetime(duty_date):
+def calculate_reminder_datetime(duty_date, assignment_id=None):
     """
     Calculate when reminder should be sent.
-    ONE DAY BEFORE at configured time (default 6 PM IST).
+    ONE DAY BEFORE, inside the send window (default 5:30-6:30 PM IST);
+    an assignment gets its own jittered time (see utils/send_window.py).
+    Creation paths use send_window.send_times(), which also applies the per-minute budget.
     """
-    # Reminder date = duty_date - 1 day
-    reminder_date = duty_date - timedelta(days=1)
-    
-    # Create datetime at configured time in IST
-    naive_dt = datetime.combine(
-        reminder_date,
-        datetime.min.time().replace(
-            hour=REMINDER_TIME_HOUR,
-            minute=REMINDER_TIME_MINUTE
-        )
-    )
-    
-    # Make timezone-aware
-    aware_dt = IST.localize(naive_dt)
-    
-    return aware_dt
+    from .send_window import window_bounds, preferred_send_time
+    if assignment_id is None:
+        return window_bounds(duty_date)[0]
+    return preferred_send_time(duty_date, assignment_id)
 
 
 def create_reminder_for_assignment(duty_assignment):
     """
-    Create a reminder for a newly created duty assignment.
+    Create the reminders for a newly created duty assignment, one per
+    active reminder stage (see utils/reminder_plan.py).
     Called automatically when duty is assigned.
     
     Args:
         duty_assignment: DutyAssignment instance
     
     Returns:
-        Reminder instance or None
+        The first Reminder instance or None
     """
     try:
-        # Cancel any existing reminder for this assignment (in case of reassignment)
-        Reminder.objects.filter(duty_assignment=duty_assignment).update(status='CANCELLED')
-        
-        # Calculate when to send reminder
-        scheduled_dt = calculate_reminder_datetime(duty_assignment.duty_date)
+        # Reschedule any existing reminders for this assignment (in case of reassignment)
+        from .reminder_plan import plan_reminders
+        plan_reminders([duty_assignment], reset_ids={duty_assignment.id})
+        reminder = duty_assignment.reminders.order_by('scheduled_datetime').first()
         
-        # Create new reminder
-        reminder = Reminder.objects.create(
-            duty_assignment=duty_assignment,
-            scheduled_datetime=scheduled_dt,
-            status='PENDING'
-        )
-        
-        logger.info(f"Created reminder {reminder.id} for {duty_assignment}, scheduled at {scheduled_dt}")
+        logger.info(f"Created reminders for {duty_assignment}, first at {reminder.scheduled_datetime if reminder else None}")
+
+        # Exact-time delivery if it is already close (otherwise the reconciler arms it later)
+        from django.db import transaction
+        from .reminder_dispatch import arm_reminders
+        transaction.on_commit(lambda: arm_reminders([duty_assignment.id]))
         return reminder
         
     except Exception as e:
@@ -159,10 +146,16 @@ def cancel_reminders_for_assignment(duty_assignment):
         duty_assignment: DutyAssignment instance
     """
     try:
-        cancelled_count = Reminder.objects.filter(
+        from .reminder_dispatch import revoke_eta_tasks
+
+        # PROCESSING too: the dispatcher won't overwrite a reminder cancelled mid-send
+        reminders = Reminder.objects.filter(
             duty_assignment=duty_assignment,
-            status='PENDING'
-        ).update(status='CANCELLED')
+            status__in=['PENDING', 'PROCESSING']
+        )
+        eta_task_ids = list(reminders.values_list('eta_task_id', flat=True))
+        cancelled_count = reminders.update(status='CANCELLED', eta_task_id=None)
+        revoke_eta_tasks(eta_task_ids)
         
         logger.info(f"Cancelled {cancelled_count} reminders for {duty_assignment}")
         
@@ -170,7 +163,13 @@ def cancel_reminders_for_assignment(duty_assignment):
         logger.error(f"Failed to cancel reminders for {duty_assignment}: {str(e)}")
 
 
-def send_email_reminder(reminder):
+def send_email_reminder(reminder, writes=None):
+    """
+    Send the email reminder. Field changes and the log row go to `writes`
+    (a ReminderWriteBuffer flushed by the dispatcher); without one they are
+    written immediately.
+    """
+    buffer = ReminderWriteBuffer() if writes is None else writes
     try:
         duty = reminder.duty_assignment
         user = duty.assigned_user
@@ -194,15 +193,10 @@ def send_email_reminder(reminder):
             # Update reminder fields directly before mark_sent logic
             reminder.email_sent = True
             reminder.email_attempts += 1
-            reminder.save(update_fields=['email_sent', 'email_attempts'])
+            buffer.update(reminder, 'email_sent', 'email_attempts')
             
             # Log success
-            ReminderLog.objects.create(
-                reminder=reminder,
-                channel='EMAIL',
-                success=True,
-                message=f"Email sent to {user.email}"
-            )
+            buffer.log(reminder, 'EMAIL', True, f"Email sent to {user.email}")
             return True
         else:
             raise Exception("Email service returned False")
@@ -213,20 +207,23 @@ def send_email_reminder(reminder):
         
         reminder.email_attempts += 1
         reminder.last_error = error_msg
-        reminder.save(update_fields=['email_attempts', 'last_error'])
+        buffer.update(reminder, 'email_attempts', 'last_error')
         
         # Log failure
-        ReminderLog.objects.create(
-            reminder=reminder,
-            channel='EMAIL',
-            success=False,
-            message=error_msg
-        )
+        buffer.log(reminder, 'EMAIL', False, error_msg)
         
         return False
+    finally:
+        if writes is None:
+            buffer.flush()
 
 
-def send_whatsapp_reminder(reminder):
+def send_whatsapp_reminder(reminder, writes=None):
+    """
+    Send the WhatsApp reminder; writes are buffered as in send_email_reminder.
+    Returns None when the WhatsApp gateway was busy (see utils/whatsapp_gateway.py).
+    """
+    buffer = ReminderWriteBuffer() if writes is None else writes
     try:
         duty = reminder.duty_assignment
         user = duty.assigned_user
@@ -253,119 +250,99 @@ def send_whatsapp_reminder(reminder):
             duty_time=time_label,
             reporting_time=reporting_time
         )
+        if result.get('busy'):
+            # Nothing sent: not an attempt, retried on the next run
+            return None
         
         success = result.get('success', False)
         
-        # Save metadata securely using update_fields
         reminder.whatsapp_message_id = result.get('message_id')
         reminder.whatsapp_status = 'SENT' if success else 'FAILED'
         
         if success:
-             reminder.whatsapp_sent = True
-             reminder.whatsapp_attempts += 1
-             reminder.sent_at = timezone.now()
-             reminder.last_error = ""
-             reminder.save(update_fields=['whatsapp_message_id', 'whatsapp_status', 'whatsapp_sent', 'whatsapp_attempts', 'sent_at', 'last_error'])
-        else:
-             error_data = result.get('response', {}).get('error', {})
-             error_msg = str(error_data) if isinstance(error_data, dict) else str(result.get('response'))
-             reminder.whatsapp_attempts += 1
-             reminder.last_error = error_msg
-             reminder.save(update_fields=['whatsapp_message_id', 'whatsapp_status', 'whatsapp_attempts', 'last_error'])
-        
-        if success:
-            ReminderLog.objects.create(
-                reminder=reminder,
-                channel='WHATSAPP',
-                success=True,
-                message=f"WhatsApp sent via template to {user.phone_number} (ID: {reminder.whatsapp_message_id})"
+            reminder.whatsapp_sent = True
+            reminder.whatsapp_attempts += 1
+            reminder.sent_at = timezone.now()
+            reminder.last_error = ""
+            buffer.update(reminder, 'whatsapp_message_id', 'whatsapp_status', 'whatsapp_sent', 'whatsapp_attempts', 'sent_at', 'last_error')
+            buffer.log(
+                reminder, 'WHATSAPP', True,
+                f"WhatsApp sent via template to {user.phone_number} (ID: {reminder.whatsapp_message_id})"
             )
             return True
         else:
-            raise Exception(f"Template delivery failed: {reminder.last_error}")
+            error_data = result.get('response', {}).get('error', {})
+            error_msg = str(error_data) if isinstance(error_data, dict) else str(result.get('response'))
+            # Counted once, in the handler below
+            raise Exception(f"Template delivery failed: {error_msg}")
             
     except Exception as e:
         error_msg = f"WhatsApp reminder failed: {str(e)}"
         logger.error(f"Reminder {reminder.id} - {error_msg}")
         
+        reminder.whatsapp_status = 'FAILED'
         reminder.whatsapp_attempts += 1
         reminder.last_error = error_msg
-        reminder.save(update_fields=['whatsapp_attempts', 'last_error'])
+        buffer.update(reminder, 'whatsapp_message_id', 'whatsapp_status', 'whatsapp_attempts', 'last_error')
         
-        ReminderLog.objects.create(
-            reminder=reminder,
-            channel='WHATSAPP',
-            success=False,
-            message=error_msg
-        )
+        buffer.log(reminder, 'WHATSAPP', False, error_msg)
         return False
+    finally:
+        if writes is None:
+            buffer.flush()
+
+
+def send_call_reminder(reminder, writes=None):
+    """
+    Place the Exotel reminder call; writes are buffered as in send_email_reminder.
+    Returns None when no call slot was free (see utils/call_slots.py).
+    """
+    buffer = ReminderWriteBuffer() if writes is None else writes
+    try:
+        duty = reminder.duty_assignment
+        user = duty.assigned_user
+        
+        from .exotel import make_exotel_call
+        result = make_exotel_call(user, duty, get_reporting_time(duty))
+        if result.get('busy'):
+            # No call slot free: not an attempt, retried on the next run
+            return None
+        
+        if result.get('success'):
+            reminder.call_sent = True
+            reminder.call_attempts += 1
+            reminder.call_sid = result.get('call_sid')
+            # The outcome arrives later through the Exotel status callback
+            reminder.call_status = 'PLACED'
+            buffer.update(reminder, 'call_sent', 'call_attempts', 'call_sid', 'call_status')
+            buffer.log(reminder, 'CALL', True, f"Call placed to {user.phone_number} (Sid: {reminder.call_sid})")
+            return True
+        else:
+            raise Exception(result.get('error'))
+    
+    except Exception as e:
+        error_msg = f"Call failed: {str(e)}"
+        logger.error(f"Reminder {reminder.id} - {error_msg}")
+        
+        reminder.call_attempts += 1
+        reminder.last_error = error_msg
+        buffer.update(reminder, 'call_attempts', 'last_error')
+        
+        buffer.log(reminder, 'CALL', False, error_msg)
+        return False
+    finally:
+        if writes is None:
+            buffer.flush()
 
 
 def process_pending_reminders():
     """
     Process all pending reminders that are due.
-    Called by Celery beat task periodically.
+    Called by Celery beat task periodically; safe to run on several workers
+    at once (see utils/reminder_dispatch.py).
     """
-    from django.db import transaction
-    now = timezone.now()
-    
-    # Find all reminders that need processing (PENDING or FAILED)
-    # We allow retrying FAILED if attempts < MAX_RETRY_ATTEMPTS
-    due_reminders = Reminder.objects.filter(
-        status__in=['PENDING', 'FAILED'],
-        scheduled_datetime__lte=now
-    ).select_related('duty_assignment', 'duty_assignment__assigned_user')
-    
-    stats = {
-        'total_due': due_reminders.count(),
-        'email_success': 0,
-        'email_failed': 0,
-        'whatsapp_success': 0,
-        'whatsapp_failed': 0,
-        'completed': 0,
-        'failed': 0
-    }
-    
-    logger.info(f"Processing {stats['total_due']} due reminders...")
-    
-    for reminder in due_reminders:
-        try:
-            with transaction.atomic():
-                # Refresh from DB to ensure we have latest status
-                reminder.refresh_from_db()
-                
-                # Double-check status to avoid race conditions
-                if reminder.status in ['SENT', 'DELIVERED', 'CANCELLED']:
-                    continue
-
-                email_ok = reminder.email_sent
-                whatsapp_ok = reminder.whatsapp_sent
-                
-                # Send email (if not already sent)
-                if not email_ok and reminder.email_attempts < MAX_RETRY_ATTEMPTS:
-                    email_ok = send_email_reminder(reminder)
-                    if email_ok: stats['email_success'] += 1
-                    else: stats['email_failed'] += 1
-                
-                # Send WhatsApp (if not already sent)
-                if not whatsapp_ok and reminder.whatsapp_attempts < MAX_RETRY_ATTEMPTS:
-                    whatsapp_ok = send_whatsapp_reminder(reminder)
-                    if whatsapp_ok: stats['whatsapp_success'] += 1
-                    else: stats['whatsapp_failed'] += 1
-                
-                # Update high-level reminder status
-                if email_ok and whatsapp_ok:
-                    reminder.mark_sent()
-                    stats['completed'] += 1
-                elif reminder.email_attempts >= MAX_RETRY_ATTEMPTS and reminder.whatsapp_attempts >= MAX_RETRY_ATTEMPTS:
-                    reminder.mark_failed("Max retry attempts reached for all channels")
-                    stats['failed'] += 1
-        except Exception as e:
-            logger.error(f"Error processing reminder {reminder.id}: {str(e)}")
-            # Error here doesn't crash the loop, just logs and continues
-    
-    logger.info(f"Reminder processing complete: {stats}")
-    return stats
+    from .reminder_dispatch import dispatch_due_reminders
+    return dispatch_due_reminders()
 
 
 def safe_task_delay(task_func, *args, **kwargs):
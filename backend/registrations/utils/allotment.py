@@ -0,0 +1,233 @@
+"""
+Automatic roster allotment.
+
+`solve_roster()` fills every open slot (date x namaaz type) in a date range
+from approved registrations:
+- only registrants whose `preference` covers the namaaz type are eligible
+  (AZAAN -> the Azaan slots, TAKHBIRA -> the Takbira slots, BOTH -> both,
+  SANAH / TILAWAT / JOSHAN / YASEEN -> their own slot)
+- slots already held by someone are kept as they are
+- a registrant never gets two duties with the same reporting time on one
+  day, nor more than DUTY_MAX_PER_DAY duties on one day (or DUTY_MAX_PER_WEEK
+  in a calendar week) - the same rules as manual assignment (utils/occupancy.py)
+- duties are spread fairly: each slot goes to the eligible registrant with
+  the fewest duties in the range, then the one whose last duty is furthest
+  back, then a seeded random order
+
+Dates are filled in order and, within a date, the namaaz types with the
+fewest eligible registrants go first. Each type keeps a heap of its
+candidates keyed on (load, last duty); entries go stale when a registrant is
+picked for another type and are re-keyed lazily when popped, so a month of
+slots for thousands of registrants solves in well under a second.
+
+The result is stored as an AllotmentDraft for review; `publish_draft()`
+writes it through the bulk assignment path (utils/bulk_assign.py).
+"""
+
+import heapq
+import random
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Registration, DutyAssignment, AllotmentDraft, AllotmentDraftCell
+from .bulk_assign import bulk_assign
+from .occupancy import clash_groups, max_per_day, max_per_week, week_start
+
+logger = logging.getLogger('registrations')
+
+NAMAAZ_TYPES = [value for value, _ in DutyAssignment.NAMAAZ_CHOICES]
+AZAAN_TYPES = [t for t in NAMAAZ_TYPES if t.endswith('_AZAAN')]
+TAKBIRA_TYPES = [t for t in NAMAAZ_TYPES if t.endswith('_TAKBIRA')]
+
+# Registration.preference value -> namaaz types it qualifies for
+PREFERENCE_TYPES = {
+    'AZAAN': AZAAN_TYPES,
+    'TAKHBIRA': TAKBIRA_TYPES,
+    'BOTH': AZAAN_TYPES + TAKBIRA_TYPES,
+    'SANAH': ['SANAH'],
+    'TILAWAT': ['TAJWEED'],
+    'JOSHAN': ['DUA_E_JOSHAN'],
+    'YASEEN': ['YASEEN'],
+}
+
+ELIGIBLE_STATUSES = ['APPROVED', 'ALLOTTED']
+
+
+class AllotmentError(Exception):
+    """Raised when a draft cannot be solved or published."""
+    pass
+
+
+def eligible_types(preference):
+    """Namaaz types a registration's preference qualifies for."""
+    if isinstance(preference, str):
+        preference = [preference]
+    types = set()
+    for value in preference or []:
+        types.update(PREFERENCE_TYPES.get(str(value).upper(), []))
+    return types
+
+
+def solve_roster(date_from, date_to, seed=None):
+    """
+    Returns (cells, stats): `cells` is a list of (duty_date, namaaz_type, registration_id)
+    for the open slots that could be filled.
+    """
+    if date_to < date_from:
+        raise AllotmentError("date_to must not be before date_from")
+
+    day_limit = max_per_day()
+    week_limit = max_per_week()
+    clash_group = clash_groups()
+    dates = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+
+    candidates = defaultdict(list)
+    registrants = 0
+    for registration_id, preference in Registration.objects.filter(
+        is_active=True, status__in=ELIGIBLE_STATUSES
+    ).values_list('id', 'preference'):
+        types = eligible_types(preference)
+        registrants += 1 if types else 0
+        for namaaz_type in types:
+            candidates[namaaz_type].append(registration_id)
+
+    load = defaultdict(int)
+    last_duty = {}
+    busy = defaultdict(list)  # (registration_id, date) -> clash groups held that day
+    weekly = defaultdict(int)  # (registration_id, week start) -> duties that week
+    taken = set()
+    for duty_date, namaaz_type, user_id in DutyAssignment.objects.filter(
+        duty_date__range=(week_start(date_from), week_start(date_to) + timedelta(days=6)),
+        assigned_user__isnull=False
+    ).values_list('duty_date', 'namaaz_type', 'assigned_user_id'):
+        # Weeks are counted whole, even where they overhang the range
+        weekly[(user_id, week_start(duty_date))] += 1
+        if not date_from <= duty_date <= date_to:
+            continue
+        taken.add((duty_date, namaaz_type))
+        load[user_id] += 1
+        last_duty[user_id] = max(last_duty.get(user_id, duty_date), duty_date)
+        busy[(user_id, duty_date)].append(clash_group.get(namaaz_type, namaaz_type))
+
+    rng = random.Random(seed if seed is not None else f"{date_from}:{date_to}")
+    rank = {}
+    for user_id in sorted({u for users in candidates.values() for u in users}):
+        rank[user_id] = rng.random()
+
+    def key(user_id):
+        last = last_duty.get(user_id)
+        return (load[user_id], last.toordinal() if last else 0, rank[user_id], user_id)
+
+    heaps = {t: [key(u) for u in users] for t, users in candidates.items()}
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    # Scarce types first so popular registrants are not used up on easy slots
+    type_order = sorted(NAMAAZ_TYPES, key=lambda t: len(candidates.get(t, [])))
+
+    cells = []
+    unfilled = defaultdict(int)
+    for duty_date in dates:
+        week = week_start(duty_date)
+        for namaaz_type in type_order:
+            if (duty_date, namaaz_type) in taken:
+                continue
+            heap = heaps.get(namaaz_type)
+            group = clash_group[namaaz_type]
+            chosen = None
+            skipped = []
+            while heap:
+                entry = heapq.heappop(heap)
+                user_id = entry[-1]
+                current = key(user_id)
+                if entry != current:
+                    heapq.heappush(heap, current)
+                    continue
+                held = busy[(user_id, duty_date)]
+                if group in held or len(held) >= day_limit or (
+                    week_limit and weekly[(user_id, week)] >= week_limit
+                ):
+                    skipped.append(entry)
+                    continue
+                chosen = user_id
+                break
+
+            if chosen is None:
+                unfilled[namaaz_type] += 1
+            else:
+                cells.append((duty_date, namaaz_type, chosen))
+                load[chosen] += 1
+                last_duty[chosen] = duty_date
+                busy[(chosen, duty_date)].append(group)
+                weekly[(chosen, week)] += 1
+                heapq.heappush(heap, key(chosen))
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+
+    loads = [load[u] for u in rank]
+    stats = {
+        'slots': len(dates) * len(NAMAAZ_TYPES),
+        'kept': len(taken),
+        'filled': len(cells),
+        'unfilled': sum(unfilled.values()),
+        'unfilled_by_type': dict(unfilled),
+        'registrants': registrants,
+        'max_duties_per_person': max(loads) if loads else 0,
+        'min_duties_per_person': min(loads) if loads else 0,
+    }
+    return cells, stats
+
+
+def create_draft(date_from, date_to, user=None, seed=None):
+    """Solve the range and store the result as an AllotmentDraft."""
+    started = timezone.now()
+    cells, stats = solve_roster(date_from, date_to, seed=seed)
+    stats['solve_seconds'] = round((timezone.now() - started).total_seconds(), 3)
+
+    with transaction.atomic():
+        draft = AllotmentDraft.objects.create(
+            date_from=date_from,
+            date_to=date_to,
+            stats=stats,
+            created_by=user if user and user.is_authenticated else None
+        )
+        AllotmentDraftCell.objects.bulk_create([
+            AllotmentDraftCell(draft=draft, duty_date=d, namaaz_type=t, registration_id=r)
+            for d, t, r in cells
+        ], batch_size=1000)
+
+    logger.info(
+        f"[Allotment] Draft {draft.id} for {date_from}..{date_to}: "
+        f"{stats['filled']} filled, {stats['unfilled']} unfilled in {stats['solve_seconds']}s"
+    )
+    return draft
+
+
+def publish_draft(draft_id):
+    """
+    Assign every cell of a DRAFT through bulk_assign. Cells whose slot was
+    taken since the draft was solved are reported, not overwritten.
+    Must run inside a transaction. Returns the per-cell results.
+    """
+    draft = AllotmentDraft.objects.select_for_update().filter(pk=draft_id).first()
+    if draft is None:
+        raise AllotmentError("Draft not found")
+    if draft.status != 'DRAFT':
+        raise AllotmentError(f"Draft is already {draft.status.lower()}")
+
+    cells = [
+        {'duty_date': d, 'namaaz_type': t, 'assigned_user_id': r}
+        for d, t, r in draft.cells.values_list('duty_date', 'namaaz_type', 'registration_id')
+    ]
+    results, assignments = bulk_assign(cells) if cells else ([], {})
+
+    draft.status = 'PUBLISHED'
+    draft.published_at = timezone.now()
+    draft.stats = {**draft.stats, 'published': len(assignments), 'conflicts': len(cells) - len(assignments)}
+    draft.save(update_fields=['status', 'published_at', 'stats'])
+    logger.info(f"[Allotment] Draft {draft.id} published: {len(assignments)} assigned, {len(cells) - len(assignments)} conflict(s)")
+    return results
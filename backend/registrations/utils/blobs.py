@@ -0,0 +1,195 @@
+"""
+Content-addressed audition storage.
+
+Every audition is stored once per SHA-256 digest under
+`auditions files/blobs/<aa>/<digest>.<ext>`. AuditionFile rows point at a
+MediaBlob and reuse its storage name, so URLs, renditions and serializers
+work exactly as before. Blobs are reference counted; the file on disk is
+only removed after the last AuditionFile using it is deleted. New files are
+written into the store after the transaction that references them commits;
+a reference to a blob whose file is missing writes it again.
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import AuditionFile, MediaBlob, AUDIO_EXTENSIONS
+from .media import rendition_names
+
+logger = logging.getLogger('registrations')
+
+BLOB_DIR = os.path.join('auditions files', 'blobs')
+HASH_BUFFER_SIZE = 64 * 1024
+
+
+def blob_name(digest, ext):
+    return os.path.join(BLOB_DIR, digest[:2], f"{digest}.{ext}" if ext else digest)
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def hash_file(path):
+    """SHA-256 of a file on disk, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(HASH_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _place_file(dest, write):
+    """Write a store file through a temp file beside `dest`, then rename it into place."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix='.tmp')
+    try:
+        os.close(fd)
+        write(tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _place_on_commit(name, digest, size, write):
+    """Write the store file for `name` once the current transaction commits."""
+    def place(dest=default_storage.path(name)):
+        try:
+            _place_file(dest, write)
+            logger.info(f"[Blob] Stored blob {digest[:12]} ({size} bytes)")
+        except OSError as e:
+            logger.error(f"[Blob] Could not store blob {digest[:12]}: {str(e)}")
+
+    transaction.on_commit(place)
+
+
+def _acquire_blob(digest, ext, size, write):
+    """
+    Return the blob for `digest` with one more reference. New content is
+    written with `write(path)` only after the transaction commits, so a
+    rolled back registration leaves no file behind.
+    """
+    while True:
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                blob.refresh_from_db(fields=['ref_count'])
+                logger.info(f"[Blob] Reused {digest[:12]} (refs={blob.ref_count})")
+                if not default_storage.exists(blob.file.name):
+                    # Its first writer has not placed the file yet, or failed
+                    # to: write our copy too, before our transcode is queued
+                    logger.warning(f"[Blob] File for {digest[:12]} is missing, writing it again")
+                    _place_on_commit(blob.file.name, digest, size, write)
+                return blob
+
+            name = blob_name(digest, ext)
+            try:
+                with transaction.atomic():
+                    blob = MediaBlob.objects.create(sha256=digest, file=name, size=size, ref_count=1)
+            except IntegrityError:
+                # Another request stored the same content first; take a reference to it
+                continue
+
+            _place_on_commit(name, digest, size, write)
+            return blob
+
+
+def store_uploaded_file(uploaded_file):
+    """
+    Add an UploadedFile to the blob store: hashed now, written after commit
+    (the upload stays readable until the request ends). Returns the
+    referenced MediaBlob.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in uploaded_file.chunks(HASH_BUFFER_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+
+    def write(path):
+        with open(path, 'wb') as out:
+            for chunk in uploaded_file.chunks(HASH_BUFFER_SIZE):
+                out.write(chunk)
+
+    return _acquire_blob(digest.hexdigest(), file_extension(uploaded_file.name), size, write)
+
+
+def store_local_file(path, filename, digest=None):
+    """
+    Add a file already on disk (e.g. a finished upload spool) to the blob store.
+    Pass its `digest` when known; hashing inside a transaction holds its locks
+    for the whole read. The source is linked (or copied) after commit, so it
+    must stay in place until then and can be cleaned up by its owner afterwards.
+    """
+    digest = digest or hash_file(path)
+
+    def write(tmp_path):
+        os.remove(tmp_path)
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+
+    return _acquire_blob(digest, file_extension(filename), os.path.getsize(path), write)
+
+
+def create_audition_file(registration, blob, filename):
+    """Create an AuditionFile that references `blob`."""
+    ext = file_extension(filename)
+    audition = AuditionFile(
+        registration=registration,
+        blob=blob,
+        audition_file_path=blob.file.name,
+        audition_file_type='audio' if ext in AUDIO_EXTENSIONS else 'video'
+    )
+    # Identical content was already transcoded for someone else
+    sibling = AuditionFile.objects.filter(blob=blob, transcode_status='READY').first()
+    if sibling:
+        for field in ('rendition_path', 'preview_path', 'duration_seconds', 'codec', 'file_size', 'transcode_status'):
+            setattr(audition, field, getattr(sibling, field))
+    audition.save()
+    return audition
+
+
+def save_audition_upload(registration, uploaded_file):
+    """Replacement for AuditionFile.objects.create(..., audition_file_path=f)."""
+    blob = store_uploaded_file(uploaded_file)
+    return create_audition_file(registration, blob, uploaded_file.name)
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference. When none are left the blob row is deleted and its
+    file (plus rendition/preview) is removed after commit.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if not blob:
+            return
+        if blob.ref_count > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return
+
+        paths = [default_storage.path(blob.file.name)]
+        paths += [default_storage.path(n) for n in rendition_names(blob.file.name)]
+        blob.delete()
+
+    def remove_files():
+        for path in paths:
+            try:
+                if os.path.isfile(path):
+                    os.remove(path)
+                    logger.info(f"[Blob] Deleted file from disk: {path}")
+            except OSError as e:
+                logger.error(f"[Blob] Failed to delete {path}: {str(e)}")
+
+    transaction.on_commit(remove_files)
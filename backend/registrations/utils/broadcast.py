@@ -0,0 +1,538 @@
+"""
+WhatsApp broadcasts: one template to a whole audience.
+
+An audience is a named, filterable queryset (AUDIENCES), e.g. every
+assigned duty of a date range or every confirmed Vajebaat appointment of a
+date. A broadcast names the audience, its filters, the template and the
+audience fields filling the template's body parameters, in order:
+
+    {"audience": "allotted_duties",
+     "filters": {"date_from": "2026-03-01", "date_to": "2026-03-30"},
+     "template": "duty_allot_v2",
+     "parameters": ["full_name", "duty_date", "khidmat", "reporting_time"]}
+
+Running it (registrations.run_broadcast):
+1. The audience is read in one query (.values()) and rendered in memory;
+   one BroadcastRecipient row per message is bulk-inserted.
+2. Messages go out from one asyncio loop over an httpx.AsyncClient, at most
+   BROADCAST_CONCURRENCY in flight. Each takes a token from the outbound
+   gateway's shared bucket and waits while reminders or confirmations are
+   queued (whatsapp_gateway.py), so a broadcast never delays them.
+3. Every BROADCAST_FLUSH_SECONDS the results are written in one batch
+   (recipient rows plus the broadcast's sent / failed counters) and
+   published as a `broadcast.progress` live event. A cancelled broadcast
+   stops at the next flush.
+
+A re-run only sends to recipients still pending, so a broadcast whose worker
+died (RUNNING without progress for BROADCAST_STALE_SECONDS) can be resumed.
+A message that errors unexpectedly is marked failed rather than pending, and
+if the run itself fails the requests in flight finish and are written
+first, so a resume never sends a message twice.
+"""
+
+import re
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ..models import Broadcast, BroadcastRecipient, DutyAssignment, Registration
+from . import whatsapp_gateway as gateway
+from .live_events import publish_event
+from .phone import normalize_phone_number
+from .reporting import IST
+from .whatsapp import TEMPLATE_PARAM_COUNTS, build_template_payload
+from .whatsapp_client import GRAPH_API_URL, whatsapp_config
+
+logger = logging.getLogger('registrations')
+
+TEMPLATE_NAME = re.compile(r'^[a-z0-9_]{1,100}$')
+
+
+class BroadcastError(Exception):
+    """Raised when a broadcast cannot be created or run."""
+    pass
+
+
+# --- Audiences ---
+
+def _date(value):
+    parsed = parse_date(str(value))
+    if parsed is None:
+        raise ValueError(f"'{value}' is not a date (YYYY-MM-DD)")
+    return parsed
+
+
+def _one_of(choices):
+    def parse(value):
+        if value not in choices:
+            raise ValueError(f"'{value}' is not one of {', '.join(choices)}")
+        return value
+    return parse
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _long_date(value):
+    return value.strftime('%d %B %Y') if value else 'TBD'
+
+
+def _clock(value):
+    return value.astimezone(IST).strftime('%I:%M %p') if value else 'N/A'
+
+
+def _slot_time(start, end):
+    if start is None or end is None:
+        return 'To be assigned'
+    return f"{start.strftime('%H:%M')} – {end.strftime('%H:%M')}"
+
+
+KHIDMAT_LABELS = dict(DutyAssignment.NAMAAZ_CHOICES)
+REGISTRATION_STATUSES = [value for value, _ in Registration._meta.get_field('status').choices]
+
+
+class Audience:
+    """
+    A named queryset.
+    `fields`: parameter name -> (value paths, render(*values) -> text)
+    `filters`: filter name -> (queryset lookup, parse(value))
+    """
+
+    def __init__(self, description, queryset, phone, fields, filters):
+        self.description = description
+        self._queryset = queryset
+        self.phone = phone
+        self.fields = fields
+        self.filters = filters
+
+    def queryset(self, filters):
+        queryset = self._queryset()
+        for name, value in filters.items():
+            lookup, parse = self.filters[name]
+            queryset = queryset.filter(**{lookup: parse(value)})
+        return queryset
+
+    def rows(self, filters, parameters):
+        """(object id, phone, rendered parameters) per audience row, in one query."""
+        paths = list(dict.fromkeys(
+            ['pk', self.phone] + [path for name in parameters for path in self.fields[name][0]]
+        ))
+        for row in self.queryset(filters).order_by('pk').values(*paths).iterator(chunk_size=2000):
+            yield row['pk'], row[self.phone], [
+                self.fields[name][1](*(row[path] for path in self.fields[name][0]))
+                for name in parameters
+            ]
+
+
+def _vajebaat_appointments():
+    from vajebaat.models import VajebaatAppointment
+    return VajebaatAppointment.objects.filter(status__in=['CONFIRMED', 'RESCHEDULED'], slot__isnull=False)
+
+
+AUDIENCES = {
+    'allotted_duties': Audience(
+        "Every assigned duty, one message per duty",
+        lambda: DutyAssignment.objects.filter(assigned_user__isnull=False),
+        phone='assigned_user__phone_number',
+        fields={
+            'full_name': (('assigned_user__full_name',), _text),
+            'its_number': (('assigned_user__its_number',), _text),
+            'duty_date': (('duty_date',), _long_date),
+            'khidmat': (('namaaz_type',), lambda namaaz_type: KHIDMAT_LABELS.get(namaaz_type, namaaz_type)),
+            'reporting_time': (('reporting_at',), _clock),
+        },
+        filters={
+            'date': ('duty_date', _date),
+            'date_from': ('duty_date__gte', _date),
+            'date_to': ('duty_date__lte', _date),
+            'namaaz_type': ('namaaz_type', _one_of(list(KHIDMAT_LABELS))),
+        },
+    ),
+    'registrants': Audience(
+        "Active registrations",
+        lambda: Registration.objects.filter(is_active=True),
+        phone='phone_number',
+        fields={
+            'full_name': (('full_name',), _text),
+            'its_number': (('its_number',), _text),
+            'status': (('status',), _text),
+        },
+        filters={
+            'status': ('status', _one_of(REGISTRATION_STATUSES)),
+        },
+    ),
+    'vajebaat_appointments': Audience(
+        "Confirmed or rescheduled Vajebaat appointments with a slot",
+        _vajebaat_appointments,
+        phone='mobile',
+        fields={
+            'name': (('name',), _text),
+            'its_number': (('its_number',), _text),
+            'date': (('slot__date__date',), _long_date),
+            'slot_time': (('slot__start_time', 'slot__end_time'), _slot_time),
+        },
+        filters={
+            'date': ('slot__date__date', _date),
+        },
+    ),
+}
+
+
+def describe_audiences():
+    """Audiences with their filters and parameter fields (for the API)."""
+    return {
+        name: {
+            'description': audience.description,
+            'filters': list(audience.filters),
+            'parameters': list(audience.fields),
+        }
+        for name, audience in AUDIENCES.items()
+    }
+
+
+def validate_broadcast(audience_name, filters, template, parameters):
+    """Returns the Audience; raises BroadcastError."""
+    audience = AUDIENCES.get(audience_name)
+    if audience is None:
+        raise BroadcastError(f"Unknown audience '{audience_name}' (one of: {', '.join(AUDIENCES)})")
+
+    unknown = sorted(set(filters) - set(audience.filters))
+    if unknown:
+        raise BroadcastError(f"Unknown filter(s) {', '.join(unknown)} (one of: {', '.join(audience.filters)})")
+    for name, value in filters.items():
+        try:
+            audience.filters[name][1](value)
+        except ValueError as e:
+            raise BroadcastError(f"Filter '{name}': {str(e)}")
+
+    if not TEMPLATE_NAME.match(template or ''):
+        raise BroadcastError("Template must be an approved template name (lowercase letters, digits, _)")
+    unknown = sorted(set(parameters) - set(audience.fields))
+    if unknown:
+        raise BroadcastError(f"Unknown parameter(s) {', '.join(unknown)} (one of: {', '.join(audience.fields)})")
+    expected = TEMPLATE_PARAM_COUNTS.get(template)
+    if expected is not None and len(parameters) != expected:
+        raise BroadcastError(f"Template '{template}' takes {expected} parameter(s), got {len(parameters)}")
+    return audience
+
+
+def create_broadcast(audience_name, filters, template, parameters, user=None):
+    """Validate, save and enqueue a broadcast. Raises BroadcastError."""
+    from . import safe_task_delay
+    from ..tasks import run_broadcast_task
+
+    audience = validate_broadcast(audience_name, filters, template, parameters)
+    total = audience.queryset(filters).count()
+    if not total:
+        raise BroadcastError("The audience is empty")
+    broadcast = Broadcast.objects.create(
+        audience=audience_name,
+        filters=filters,
+        template=template,
+        parameters=parameters,
+        total=total,
+        created_by=user,
+    )
+    transaction.on_commit(lambda: safe_task_delay(run_broadcast_task, broadcast.id, non_blocking=True))
+    return broadcast
+
+
+def resume_broadcast(broadcast_id):
+    """Re-enqueue a stalled or failed broadcast. Raises BroadcastError."""
+    from . import safe_task_delay
+    from ..tasks import run_broadcast_task
+
+    if not Broadcast.objects.filter(_resumable(), id=broadcast_id).exists():
+        raise BroadcastError("Only failed broadcasts, or running ones without progress, can be resumed")
+    transaction.on_commit(lambda: safe_task_delay(run_broadcast_task, broadcast_id, non_blocking=True))
+
+
+def cancel_broadcast(broadcast_id):
+    """Stop a broadcast at its next progress write. Returns False when it had already finished."""
+    updated = Broadcast.objects.filter(id=broadcast_id, status__in=['PENDING', 'RUNNING']).update(
+        status='CANCELLED', finished_at=timezone.now(), updated_at=timezone.now()
+    )
+    return bool(updated)
+
+
+def progress_data(broadcast):
+    done = broadcast.sent + broadcast.failed
+    return {
+        'id': broadcast.id,
+        'status': broadcast.status,
+        'total': broadcast.total,
+        'sent': broadcast.sent,
+        'failed': broadcast.failed,
+        'pending': max(0, broadcast.total - done),
+        'percent': round(done * 100 / broadcast.total, 1) if broadcast.total else 100.0,
+    }
+
+
+# --- Running ---
+
+def _resumable():
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'BROADCAST_STALE_SECONDS', 300))
+    return Q(status='FAILED') | Q(status='RUNNING', updated_at__lt=stale)
+
+
+def _prepare(broadcast):
+    """
+    Render the audience, store its recipients (kept from an earlier run) and
+    reset the counters. Returns (recipient id, payload) of the pending ones.
+    """
+    audience = AUDIENCES[broadcast.audience]
+    rendered = {}
+    recipients = []
+    for object_id, phone, parameters in audience.rows(broadcast.filters, broadcast.parameters):
+        try:
+            to, error = normalize_phone_number(phone), ''
+        except ValueError as e:
+            to, error = None, f"Invalid phone number: {str(e)}"
+        rendered[object_id] = (to, parameters)
+        recipients.append(BroadcastRecipient(
+            broadcast=broadcast,
+            object_id=object_id,
+            phone=(to or phone or '')[:20],
+            status=BroadcastRecipient.PENDING if to else BroadcastRecipient.FAILED,
+            error=error[:255],
+        ))
+    BroadcastRecipient.objects.bulk_create(recipients, batch_size=1000, ignore_conflicts=True)
+
+    pending, gone = [], []
+    for recipient_id, object_id in broadcast.recipients.filter(
+        status=BroadcastRecipient.PENDING
+    ).values_list('id', 'object_id'):
+        if object_id in rendered:
+            pending.append((recipient_id, build_template_payload(rendered[object_id][0], broadcast.template, rendered[object_id][1])))
+        else:
+            gone.append(recipient_id)
+    if gone:
+        # Left the audience between runs (e.g. a cancelled duty)
+        broadcast.recipients.filter(id__in=gone).update(status=BroadcastRecipient.FAILED, error="No longer in the audience")
+
+    counts = broadcast.recipients.aggregate(
+        total=Count('id'),
+        sent=Count('id', filter=Q(status=BroadcastRecipient.SENT)),
+        failed=Count('id', filter=Q(status=BroadcastRecipient.FAILED)),
+    )
+    Broadcast.objects.filter(id=broadcast.id).update(updated_at=timezone.now(), **counts)
+    return pending
+
+
+def _flush(broadcast_id, results):
+    """Write a batch of (recipient id, status, message id, error). Returns the broadcast."""
+    now = timezone.now()
+    with transaction.atomic():
+        if results:
+            BroadcastRecipient.objects.bulk_update(
+                [BroadcastRecipient(id=rid, status=st, message_id=mid, error=err) for rid, st, mid, err in results],
+                ['status', 'message_id', 'error'],
+                batch_size=500,
+            )
+        sent = sum(1 for _, st, _, _ in results if st == BroadcastRecipient.SENT)
+        # queryset update skips auto_now; updated_at doubles as the heartbeat
+        Broadcast.objects.filter(id=broadcast_id).update(
+            sent=F('sent') + sent, failed=F('failed') + len(results) - sent, updated_at=now
+        )
+        broadcast = Broadcast.objects.get(id=broadcast_id)
+    publish_event('broadcast.progress', progress_data(broadcast))
+    return broadcast
+
+
+async def _take_token():
+    """Wait for a send token; bulk sends yield while higher-priority messages are queued."""
+    while True:
+        if await asyncio.to_thread(gateway.queued_ahead, gateway.PRIORITY_BULK):
+            await asyncio.sleep(gateway.POLL_SECONDS)
+            continue
+        wait = await asyncio.to_thread(gateway.try_take_token)
+        if wait <= 0:
+            return
+        await asyncio.sleep(wait)
+
+
+async def _record(outcome):
+    # record_outcome is a blocking Redis round trip
+    await asyncio.to_thread(gateway.record_outcome, gateway.PRIORITY_BULK, outcome)
+
+
+def _json_body(response):
+    """The response body if it is a JSON object, else {}."""
+    try:
+        data = response.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _message_id(response):
+    try:
+        return str(_json_body(response)['messages'][0]['id'])[:100]
+    except (KeyError, IndexError, TypeError):
+        return ''
+
+
+def _retry_after(response, attempt):
+    try:
+        return min(30.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return 0.5 * 2 ** attempt
+
+
+async def _send_one(client, url, payload):
+    """(status, message id, error) of one message. Same retry rules as the sync client."""
+    import httpx
+
+    retries = getattr(settings, 'WHATSAPP_HTTP_RETRIES', 2)
+    error = ''
+    for attempt in range(retries + 1):
+        await _take_token()
+        try:
+            response = await client.post(url, json=payload)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            # Nothing reached Meta
+            error = f"Connection failed: {str(e) or type(e).__name__}"
+            if attempt < retries:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            break
+        except httpx.HTTPError as e:
+            # Possibly delivered (e.g. read timeout): never retried
+            error = f"Request failed: {str(e) or type(e).__name__}"
+            break
+
+        if response.status_code in (200, 201):
+            await _record('sent')
+            return BroadcastRecipient.SENT, _message_id(response), ''
+
+        if response.status_code == 429:
+            await _record('throttled')
+        detail = _json_body(response).get('error')
+        detail = detail.get('message', '') if isinstance(detail, dict) else response.text[:200]
+        error = f"Meta API Error {response.status_code}: {detail}"
+        if response.status_code in (429, 503) and attempt < retries:
+            await asyncio.sleep(_retry_after(response, attempt))
+            continue
+        break
+
+    await _record('failed')
+    return BroadcastRecipient.FAILED, '', error[:255]
+
+
+async def _send_all(broadcast_id, messages):
+    """Send `messages` at bounded concurrency, flushing results as they come. Returns the broadcast."""
+    import httpx
+
+    phone_id, access_token, api_version = whatsapp_config()
+    url = f"{GRAPH_API_URL}/{api_version}/{phone_id}/messages"
+    concurrency = max(1, getattr(settings, 'BROADCAST_CONCURRENCY', 16))
+    flush_every = getattr(settings, 'BROADCAST_FLUSH_SECONDS', 2)
+    flush = sync_to_async(_flush)
+
+    queue = iter(messages)
+    results = []
+    stopped = asyncio.Event()
+
+    async def sender(client):
+        for recipient_id, payload in queue:
+            if stopped.is_set():
+                return
+            try:
+                result = await _send_one(client, url, payload)
+            except Exception as e:
+                # One bad message must not stop the others. Failed, not
+                # pending: a resume never sends it again
+                logger.exception(f"[Broadcast] {broadcast_id}: recipient {recipient_id} failed: {str(e)}")
+                result = (BroadcastRecipient.FAILED, '', f"Internal error: {str(e)}"[:255])
+            results.append((recipient_id,) + result)
+
+    async def reporter(senders):
+        while True:
+            await asyncio.wait([senders], timeout=flush_every)
+            # Checked before flushing: results that land during the flush are
+            # picked up by the next pass
+            done = senders.done()
+            batch = results[:]
+            broadcast = await flush(broadcast_id, batch)
+            # Dropped only once written; senders only append
+            del results[:len(batch)]
+            if done:
+                return broadcast
+            if broadcast.status == 'CANCELLED':
+                stopped.set()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(
+        getattr(settings, 'WHATSAPP_READ_TIMEOUT', 10),
+        connect=getattr(settings, 'WHATSAPP_CONNECT_TIMEOUT', 3.05),
+    )
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    try:
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout) as client:
+            senders = asyncio.ensure_future(asyncio.gather(
+                *(sender(client) for _ in range(concurrency)), return_exceptions=True
+            ))
+            try:
+                return await reporter(senders)
+            except Exception:
+                # Let the requests in flight finish and keep their results:
+                # those that reached Meta must not stay pending for a resume
+                stopped.set()
+                await senders
+                try:
+                    await flush(broadcast_id, results)
+                except Exception as e:
+                    logger.error(f"[Broadcast] {broadcast_id}: could not save {len(results)} result(s): {str(e)}")
+                raise
+    finally:
+        # _flush ran on asgiref's worker thread; close that thread's connection
+        await sync_to_async(connections.close_all)()
+
+
+def run_broadcast(broadcast_id):
+    """
+    Task body: claim the broadcast (pending, or resumable), send to its
+    pending recipients and finish it. Returns the progress data, or None when
+    it was not claimable.
+    """
+    now = timezone.now()
+    claimed = Broadcast.objects.filter(Q(status='PENDING') | _resumable(), id=broadcast_id).update(
+        status='RUNNING', last_error='', updated_at=now
+    )
+    if not claimed:
+        logger.info(f"[Broadcast] {broadcast_id} is not pending or resumable, skipping")
+        return None
+    Broadcast.objects.filter(id=broadcast_id, started_at__isnull=True).update(started_at=now)
+    broadcast = Broadcast.objects.get(id=broadcast_id)
+
+    try:
+        phone_id, access_token, _ = whatsapp_config()
+        if not phone_id or not access_token:
+            raise BroadcastError("WHATSAPP_PHONE_NUMBER_ID / WHATSAPP_ACCESS_TOKEN are not configured")
+        messages = _prepare(broadcast)
+        logger.info(f"[Broadcast] {broadcast_id}: sending '{broadcast.template}' to {len(messages)} recipient(s) of {broadcast.audience}")
+        asyncio.run(_send_all(broadcast_id, messages))
+    except Exception as e:
+        logger.exception(f"[Broadcast] {broadcast_id} failed: {str(e)}")
+        Broadcast.objects.filter(id=broadcast_id, status='RUNNING').update(
+            status='FAILED', last_error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    else:
+        # A cancelled broadcast keeps its status
+        Broadcast.objects.filter(id=broadcast_id, status='RUNNING').update(
+            status='DONE', finished_at=timezone.now(), updated_at=timezone.now()
+        )
+
+    broadcast = Broadcast.objects.get(id=broadcast_id)
+    data = progress_data(broadcast)
+    publish_event('broadcast.progress', data)
+    logger.info(f"[Broadcast] {broadcast_id} finished: {data}")
+    return data
@@ -0,0 +1,153 @@
+"""
+Bulk duty assignment behind POST /api/duty-assignments/bulk/.
+
+Filling a roster one cell at a time costs a request, a post_save signal, a
+reminder insert and two notification threads per cell. `bulk_assign()`
+validates the whole list (slots, same-day clashes and duty limits from the
+occupancy index) with a handful of queries, writes assignments,
+registration statuses and reminders in bulk inside one transaction, and
+enqueues a single fan-out task for the allotment notifications. Every cell gets its own result so a partly invalid batch still
+assigns the valid cells.
+
+Slots that exist but were emptied by unassign_khidmat are reused rather
+than recreated (duty_date + namaaz_type is unique).
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Registration, DutyAssignment
+from . import safe_task_delay
+from .status_docs import schedule_status_rebuild
+from .roster_grid import schedule_grid_refresh
+from .live_events import publish_events, duty_event_data
+from .reminder_dispatch import arm_reminders
+from .reminder_plan import plan_reminders
+from .occupancy import clash_groups, load_occupancy, lock_registrants, occupancy_error, refresh_occupancy
+from .reporting import compute_reporting_at
+
+logger = logging.getLogger('registrations')
+
+
+def _slot(cell):
+    return (cell['duty_date'], cell['namaaz_type'])
+
+
+def bulk_assign(cells):
+    """
+    Assign validated cells ({'duty_date', 'namaaz_type', 'assigned_user_id'}).
+    Must run inside a transaction. Returns (results, assignments) where
+    `results` is one dict per input cell (same order) and `assignments`
+    maps slot -> DutyAssignment for the cells that were assigned.
+    """
+    results = [{
+        'duty_date': cell['duty_date'].isoformat(),
+        'namaaz_type': cell['namaaz_type'],
+        'assigned_user_id': cell['assigned_user_id'],
+    } for cell in cells]
+
+    user_ids = {c['assigned_user_id'] for c in cells}
+    # Locked until commit: a concurrent assign to the same people waits for this one
+    known_users = lock_registrants(user_ids)
+
+    dates = {c['duty_date'] for c in cells}
+    existing = {
+        (a.duty_date, a.namaaz_type): a
+        for a in DutyAssignment.objects.select_for_update().filter(duty_date__in=dates)
+    }
+
+    occupancy = load_occupancy(user_ids, dates, for_update=True)
+    groups = clash_groups()
+
+    accepted = {}
+    for cell, result in zip(cells, results):
+        slot = _slot(cell)
+        user_id = cell['assigned_user_id']
+        if user_id not in known_users:
+            error = 'User not found'
+        elif slot in accepted:
+            error = 'Duplicate cell in this request.'
+        elif slot in existing and existing[slot].assigned_user_id:
+            error = 'This duty slot is already assigned. Unlock it first to reassign.'
+        else:
+            error = occupancy_error(occupancy, user_id, cell['duty_date'], cell['namaaz_type'], groups)
+        if error is None:
+            accepted[slot] = cell
+            # Later cells in this request see this one
+            occupancy.setdefault((user_id, cell['duty_date']), []).append(cell['namaaz_type'])
+            continue
+        result.update(status='error', error=error)
+
+    if not accepted:
+        return results, {}
+
+    now = timezone.now()
+    to_create = []
+    to_reuse = []
+    for slot, cell in accepted.items():
+        assignment = existing.get(slot)
+        if assignment is None:
+            to_create.append(DutyAssignment(
+                duty_date=cell['duty_date'],
+                namaaz_type=cell['namaaz_type'],
+                assigned_user_id=cell['assigned_user_id'],
+                locked=True,
+                locked_at=now,
+                # bulk_create skips save(), which normally fills this in
+                reporting_at=compute_reporting_at(cell['namaaz_type'], cell['duty_date']),
+            ))
+        else:
+            assignment.assigned_user_id = cell['assigned_user_id']
+            assignment.locked = True
+            assignment.locked_at = now
+            assignment.allotment_notification_sent = False
+            assignment.updated_at = now
+            to_reuse.append(assignment)
+
+    DutyAssignment.objects.bulk_create(to_create, batch_size=500)
+    if to_reuse:
+        DutyAssignment.objects.bulk_update(
+            to_reuse, ['assigned_user', 'locked', 'locked_at', 'allotment_notification_sent', 'updated_at']
+        )
+
+    # bulk_create does not return primary keys on MySQL, refetch by slot
+    assignments = {
+        (a.duty_date, a.namaaz_type): a
+        for a in DutyAssignment.objects.filter(
+            duty_date__in={d for d, _ in accepted}
+        ).select_related('assigned_user')
+        if (a.duty_date, a.namaaz_type) in accepted
+    }
+
+    # Registration status -> ALLOTTED (updated_at by hand: queryset updates skip save())
+    Registration.objects.filter(id__in={c['assigned_user_id'] for c in accepted.values()}).exclude(
+        status='ALLOTTED'
+    ).update(status='ALLOTTED', updated_at=now)
+
+    # One reminder per active stage; reused slots have theirs reset
+    plan_reminders(assignments.values(), reset_ids={a.id for a in to_reuse})
+    refresh_occupancy((a.assigned_user_id, a.duty_date) for a in assignments.values())
+
+    for cell, result in zip(cells, results):
+        if 'error' not in result:
+            result.update(status='assigned', id=assignments[_slot(cell)].id)
+
+    assignment_ids = [a.id for a in assignments.values()]
+    for registration_id in {a.assigned_user_id for a in assignments.values()}:
+        schedule_status_rebuild(registration_id)
+    schedule_grid_refresh(*{d for d, _ in assignments})
+    publish_events([('duty.assigned', duty_event_data(a)) for a in assignments.values()])
+    transaction.on_commit(lambda: _schedule_notifications(assignment_ids))
+    transaction.on_commit(lambda: arm_reminders(assignment_ids))
+
+    logger.info(f"[BulkAssign] Assigned {len(assignments)} of {len(cells)} cell(s)")
+    return results, assignments
+
+
+def _schedule_notifications(assignment_ids):
+    from ..tasks import send_bulk_allotment_notifications_task
+
+    if assignment_ids:
+        safe_task_delay(send_bulk_allotment_notifications_task, assignment_ids, non_blocking=True)
@@ -0,0 +1,106 @@
+"""
+Exotel call slots.
+
+Exotel caps how many calls an account can place at once. Every call
+(make_exotel_call) first takes a slot: a token in a Redis sorted set shared
+by all workers, at most EXOTEL_MAX_CONCURRENT_CALLS at a time. Tokens expire
+after CALL_SLOT_TTL_SECONDS, so a worker that dies mid-request frees its
+slot. Without Redis the limit applies per process.
+
+A caller that gets no slot within EXOTEL_CALL_SLOT_WAIT_SECONDS skips the
+call without using up an attempt; the reminder is retried on the next run.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .redis_client import get_redis, reset_redis
+
+logger = logging.getLogger('registrations')
+
+SLOTS_KEY = 'registrations:exotel:call_slots'
+# Well above the 10 s Exotel request timeout
+CALL_SLOT_TTL_SECONDS = 60
+
+# Drop expired tokens, then take a slot if one is free (atomic on the server)
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_local = {'semaphore': None, 'limit': None}
+_local_lock = threading.Lock()
+
+
+def max_concurrent_calls():
+    return max(1, getattr(settings, 'EXOTEL_MAX_CONCURRENT_CALLS', 4))
+
+
+def _process_semaphore():
+    limit = max_concurrent_calls()
+    with _local_lock:
+        if _local['limit'] != limit:
+            _local.update(semaphore=threading.BoundedSemaphore(limit), limit=limit)
+        return _local['semaphore']
+
+
+def _take_shared(deadline):
+    """Token of a shared slot, None when Redis is unavailable, False on timeout."""
+    r = get_redis()
+    if r is None:
+        return None
+    token = uuid.uuid4().hex
+    try:
+        while True:
+            if r.eval(ACQUIRE_SCRIPT, 1, SLOTS_KEY, time.time(), CALL_SLOT_TTL_SECONDS, max_concurrent_calls(), token):
+                return token
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[Exotel] Shared call slots unavailable, limiting per process: {str(e)}")
+        return None
+
+
+def _release_shared(token):
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        r.zrem(SLOTS_KEY, token)
+    except Exception as e:
+        # The token expires after CALL_SLOT_TTL_SECONDS anyway
+        reset_redis()
+        logger.warning(f"[Exotel] Could not release call slot: {str(e)}")
+
+
+@contextmanager
+def call_slot(wait=None):
+    """Yields True while holding a call slot, or False when none freed up in time."""
+    wait = getattr(settings, 'EXOTEL_CALL_SLOT_WAIT_SECONDS', 30) if wait is None else wait
+    deadline = time.monotonic() + wait
+    semaphore = _process_semaphore()
+    if not semaphore.acquire(timeout=wait):
+        yield False
+        return
+    token = None
+    try:
+        token = _take_shared(deadline)
+        yield token is not False
+    finally:
+        if token:
+            _release_shared(token)
+        semaphore.release()
+
@@ -0,0 +1,223 @@
+"""
+Exotel call outcomes and the call retry ladder.
+
+A reminder call counts as placed (call_status PLACED) as soon as Exotel
+accepts the request. Exotel then posts the outcome to
+/api/exotel/call-status/ (StatusCallback, see make_exotel_call). The view
+only appends the webhook to a Redis list; `apply_call_statuses` (beat, every
+few seconds) applies the queued outcomes in batches, matching reminders on
+the indexed call_sid. Without Redis the outcome is applied in the request.
+
+Outcomes:
+- completed: call_status COMPLETED
+- busy / no-answer / failed: the call is retried after the next
+  EXOTEL_CALL_RETRY_MINUTES step (e.g. 15 then 30 minutes), unless that is
+  later than EXOTEL_CALL_RETRY_CUTOFF_MINUTES before reporting time or the
+  ladder is used up; then the outcome stays as the final call_status
+
+Only reminders still waiting for an outcome (PLACED with that sid) change,
+so repeated webhooks are ignored and a retried call is never placed twice.
+
+Drains take their batch off the queue atomically (POP_SCRIPT), so
+overlapping drains never share or skip items; a batch that fails to apply
+goes back to the head of the queue. Unparseable items are moved to
+CALLBACK_DEAD_LETTER.
+"""
+
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Reminder
+from .redis_client import get_redis, reset_redis
+from .reminder_writes import ReminderWriteBuffer
+from .reporting import get_reporting_datetime
+
+logger = logging.getLogger('registrations')
+
+CALLBACK_QUEUE = 'registrations:exotel:call_status'
+CALLBACK_DEAD_LETTER = 'registrations:exotel:call_status:dead'
+DEAD_LETTER_MAX = 1000
+
+# Take up to ARGV[1] items off the head of the list in one step
+POP_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+end
+return items
+"""
+
+# Exotel status -> Reminder.call_status
+CALL_STATUSES = {
+    'completed': 'COMPLETED',
+    'busy': 'BUSY',
+    'no-answer': 'NO_ANSWER',
+    'failed': 'FAILED',
+    'canceled': 'CANCELED',
+}
+RETRY_STATUSES = {'BUSY', 'NO_ANSWER', 'FAILED'}
+
+
+def retry_ladder():
+    """Minutes to wait before each repeat call, e.g. [15, 30]."""
+    return list(getattr(settings, 'EXOTEL_CALL_RETRY_MINUTES', [15, 30]))
+
+
+def max_call_attempts():
+    """Call attempts allowed per reminder: the first call plus the ladder."""
+    from . import MAX_RETRY_ATTEMPTS
+    return max(MAX_RETRY_ATTEMPTS, len(retry_ladder()) + 1)
+
+
+def callback_url():
+    """StatusCallback URL passed to Exotel, or None when no token is configured."""
+    token = getattr(settings, 'EXOTEL_CALLBACK_TOKEN', '')
+    if not token:
+        return None
+    return f"{getattr(settings, 'SITE_URL', '').rstrip('/')}/api/exotel/call-status/?token={token}"
+
+
+def enqueue_call_status(call_sid, status):
+    """Queue a webhook for the next batch (applied at once without Redis)."""
+    event = {'sid': call_sid, 'status': status, 'received_at': timezone.now().isoformat()}
+    r = get_redis()
+    if r is not None:
+        try:
+            r.rpush(CALLBACK_QUEUE, json.dumps(event))
+            return
+        except Exception as e:
+            reset_redis()
+            logger.warning(f"[CallStatus] Redis enqueue failed, applying now: {str(e)}")
+    apply_call_statuses([event])
+
+
+def _retry_at(reminder, now):
+    """When to call again after an unanswered call, or None to stop."""
+    ladder = retry_ladder()
+    step = reminder.call_attempts - 1
+    if step >= len(ladder) or reminder.call_attempts >= max_call_attempts():
+        return None
+    retry_at = now + timedelta(minutes=ladder[step])
+    reporting = get_reporting_datetime(reminder.duty_assignment)
+    cutoff = timedelta(minutes=getattr(settings, 'EXOTEL_CALL_RETRY_CUTOFF_MINUTES', 30))
+    if reporting is None or retry_at > reporting - cutoff:
+        return None
+    return retry_at
+
+
+def apply_call_statuses(events):
+    """
+    Apply webhook events ({'sid', 'status'}) in one pass. The last event of a
+    sid wins. Returns counts.
+    """
+    from .reminder_dispatch import arm_reminders
+
+    latest = {}
+    for event in events:
+        status = CALL_STATUSES.get((event.get('status') or '').lower())
+        if event.get('sid') and status:
+            latest[event['sid']] = status
+    stats = {'events': len(events), 'matched': 0, 'completed': 0, 'retried': 0, 'given_up': 0}
+    if not latest:
+        return stats
+
+    now = timezone.now()
+    writes = ReminderWriteBuffer()
+    retried = set()
+    with transaction.atomic():
+        reminders = Reminder.objects.filter(
+            call_sid__in=latest, call_status='PLACED'
+        ).select_related('duty_assignment')
+        for reminder in reminders:
+            status = latest[reminder.call_sid]
+            stats['matched'] += 1
+            reminder.call_status = status
+            writes.update(reminder, 'call_status')
+            if status == 'COMPLETED':
+                stats['completed'] += 1
+                writes.log(reminder, 'CALL', True, f"Call {reminder.call_sid} answered")
+                continue
+            if status not in RETRY_STATUSES:
+                writes.log(reminder, 'CALL', False, f"Call {reminder.call_sid} {status.lower()}")
+                continue
+
+            # A cancelled duty or a reminder mid-send keeps its status
+            retry_at = _retry_at(reminder, now) if reminder.status in ('SENT', 'PENDING') else None
+            if retry_at is None:
+                stats['given_up'] += 1
+                writes.log(reminder, 'CALL', False, f"Call {reminder.call_sid} {status.lower()}, not retried")
+                continue
+            reminder.call_sent = False
+            reminder.status = 'PENDING'
+            reminder.scheduled_datetime = retry_at
+            reminder.claimed_at = None
+            reminder.eta_task_id = None
+            writes.update(reminder, 'call_sent', 'status', 'scheduled_datetime', 'claimed_at', 'eta_task_id')
+            writes.log(reminder, 'CALL', False, f"Call {reminder.call_sid} {status.lower()}, calling again at {timezone.localtime(retry_at):%H:%M}")
+            retried.add(reminder.duty_assignment_id)
+            stats['retried'] += 1
+        writes.flush()
+
+    if retried:
+        arm_reminders(list(retried))
+    logger.info(f"[CallStatus] Applied {len(events)} callback(s): {stats}")
+    return stats
+
+
+def _parse_events(r, raw):
+    """Decode queued webhooks; items that are not a JSON object go to the dead letter list."""
+    events, dead = [], []
+    for item in raw:
+        try:
+            event = json.loads(item)
+        except ValueError:
+            event = None
+        if isinstance(event, dict):
+            events.append(event)
+        else:
+            dead.append(item)
+    if dead:
+        logger.error(f"[CallStatus] Dropping {len(dead)} malformed callback(s) to {CALLBACK_DEAD_LETTER}")
+        pipe = r.pipeline()
+        pipe.rpush(CALLBACK_DEAD_LETTER, *dead)
+        pipe.ltrim(CALLBACK_DEAD_LETTER, -DEAD_LETTER_MAX, -1)
+        pipe.execute()
+    return events
+
+
+def drain_call_statuses(batch_size=None, max_batches=20):
+    """Apply queued webhooks in batches until the queue is empty. Returns counts."""
+    batch_size = batch_size or getattr(settings, 'EXOTEL_CALLBACK_BATCH_SIZE', 500)
+    totals = {'events': 0, 'matched': 0, 'completed': 0, 'retried': 0, 'given_up': 0}
+    r = get_redis()
+    if r is None:
+        return totals
+    for _ in range(max_batches):
+        try:
+            raw = r.eval(POP_SCRIPT, 1, CALLBACK_QUEUE, batch_size)
+            if not raw:
+                break
+            events = _parse_events(r, raw)
+        except Exception as e:
+            reset_redis()
+            logger.warning(f"[CallStatus] Redis drain failed: {str(e)}")
+            break
+        try:
+            stats = apply_call_statuses(events)
+        except Exception as e:
+            logger.exception(f"[CallStatus] Could not apply {len(events)} callback(s), requeued: {str(e)}")
+            try:
+                # Back to the head, in order; re-applying a batch is a no-op
+                r.lpush(CALLBACK_QUEUE, *[json.dumps(event) for event in reversed(events)])
+            except Exception as e:
+                reset_redis()
+                logger.error(f"[CallStatus] Lost {len(events)} callback(s), Redis requeue failed: {str(e)}")
+            break
+        for key in totals:
+            totals[key] += stats[key]
+    return totals
@@ -0,0 +1,118 @@
+"""
+Change feed behind /api/changes/.
+
+Clients keep an opaque cursor and ask only for rows created, updated or
+deleted since then. Rows are selected by `updated_at`; deletes come from
+ChangeTombstone. Each poll re-reads a small safety window before the
+cursor so rows committed slightly out of timestamp order are not missed;
+clients apply rows as idempotent upserts keyed by id.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import (
+    Registration, DutyAssignment, KhidmatRequest, RegistrationCorrection, ChangeTombstone
+)
+
+logger = logging.getLogger('registrations')
+
+# Feed key -> model. Tombstones are recorded under the same key.
+TRACKED_MODELS = {
+    'registrations': Registration,
+    'duty_assignments': DutyAssignment,
+    'khidmat_requests': KhidmatRequest,
+    'corrections': RegistrationCorrection,
+}
+
+
+class CursorError(Exception):
+    """Raised for malformed cursors."""
+    pass
+
+
+class CursorExpired(Exception):
+    """Raised when the cursor predates the tombstone retention window."""
+    pass
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    try:
+        return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise CursorError("Invalid cursor")
+
+
+def feed_key_for(model):
+    for key, tracked in TRACKED_MODELS.items():
+        if tracked is model:
+            return key
+    return None
+
+
+def record_tombstone(instance):
+    key = feed_key_for(type(instance))
+    if key and instance.pk is not None:
+        ChangeTombstone.objects.create(model_name=key, object_id=str(instance.pk))
+
+
+def touch_registration(registration_id):
+    """Bump a registration's updated_at when nested data (audition files) changes."""
+    if registration_id:
+        Registration.objects.filter(pk=registration_id).update(updated_at=timezone.now())
+
+
+def _querysets():
+    return {
+        'registrations': Registration.objects.prefetch_related('audition_files'),
+        'duty_assignments': DutyAssignment.objects.select_related('assigned_user'),
+        'khidmat_requests': KhidmatRequest.objects.select_related('assignment__assigned_user'),
+        'corrections': RegistrationCorrection.objects.select_related('registration'),
+    }
+
+
+def collect_changes(since):
+    """
+    Returns (cursor, rows, deleted, truncated) for changes after `since`.
+    `rows` maps feed keys to model instances; `truncated` is True when any feed
+    exceeds CHANGES_MAX_ROWS and the client should resync in full.
+    """
+    retention = timedelta(days=getattr(settings, 'CHANGE_TOMBSTONE_RETENTION_DAYS', 30))
+    now = timezone.now()
+    if since < now - retention:
+        raise CursorExpired("Cursor is older than the change retention window")
+
+    window = timedelta(seconds=getattr(settings, 'CHANGES_SAFETY_WINDOW_SECONDS', 5))
+    max_rows = getattr(settings, 'CHANGES_MAX_ROWS', 1000)
+    floor = since - window
+
+    rows = {}
+    truncated = False
+    for key, qs in _querysets().items():
+        changed = qs.filter(updated_at__gt=floor, updated_at__lte=now).order_by('updated_at')
+        rows[key] = list(changed[:max_rows + 1])
+        if len(rows[key]) > max_rows:
+            truncated = True
+
+    deleted = {key: [] for key in TRACKED_MODELS}
+    for model_name, object_id in ChangeTombstone.objects.filter(
+        deleted_at__gt=floor, deleted_at__lte=now
+    ).values_list('model_name', 'object_id'):
+        if model_name in deleted:
+            deleted[model_name].append(int(object_id) if object_id.isdigit() else object_id)
+
+    return encode_cursor(now), rows, deleted, truncated
+
+
+def prune_tombstones():
+    retention = timedelta(days=getattr(settings, 'CHANGE_TOMBSTONE_RETENTION_DAYS', 30))
+    deleted, _ = ChangeTombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+    logger.info(f"[Changes] Pruned {deleted} tombstone(s)")
+    return deleted
@@ -112,6 +112,35 @@ Reporting Time: {reporting_str}
 
 Please ensure you arrive at the mosque on time.
 
+JazakAllah Khair,
+Jamaat Administration
+"""
+    return send_email(user.email, subject, body)
+
+def send_reminder_digest_email(user, date_str, duties):
+    """
+    Trigger: 24 hours before, when a registrant has several duties that day
+    Subject: "Reminder: Sherullah Khidmat Tomorrow"
+
+    duties: [(duty_name, reporting_time), ...] in reporting order
+    """
+    subject = "Reminder: Sherullah Khidmat Tomorrow"
+    
+    duty_lines = "\n".join(
+        f"- {duty_name} (Reporting Time: {reporting_time or 'N/A'})"
+        for duty_name, reporting_time in duties
+    )
+    
+    body = f"""Afzalus salam {user.full_name},
+
+This is a reminder for your Sherullah khidmat tomorrow.
+
+Date: {date_str}
+Khidmat:
+{duty_lines}
+
+Please ensure you arrive at the mosque on time.
+
 JazakAllah Khair,
 Jamaat Administration
 """
@@ -3,18 +3,21 @@ import os
 import logging
 from requests.auth import HTTPBasicAuth
 
+from .call_slots import call_slot
+from .call_status import callback_url
+
 # Voice reminder system isolated from core registration logic.
 # Failure here must never affect registration or allotment.
 
 logger = logging.getLogger('registrations')
 
-def make_exotel_call(registration, assignment, reporting_time_str):
+def make_exotel_call(registration, assignment, reporting_time_str, duty_name=None):
     """
     Triggers an Exotel Voice Flow call.
     
     Variables passed to Flow:
     - name: User Full Name
-    - duty_name: Duty Display Name
+    - duty_name: Duty Display Name (or `duty_name`, e.g. a digest of several duties)
     - duty_date: Date of duty (DD/MM/YYYY)
     - reporting_time: Human readable reporting time
     """
@@ -36,7 +39,7 @@ def make_exotel_call(registration, assignment, reporting_time_str):
     # but usually CustomField is used to pass data to the flow.
     # Format: Var1=Val1&Var2=Val2
     
-    duty_name = assignment.get_namaaz_type_display()
+    duty_name = duty_name or assignment.get_namaaz_type_display()
     duty_date = assignment.duty_date.strftime('%d/%m/%Y')
     
     # Note: Exotel variables often need to be URL encoded within the CustomField
@@ -62,25 +65,37 @@ def make_exotel_call(registration, assignment, reporting_time_str):
     # If your account prefers FlowId directly:
     # payload['FlowId'] = flow_id
 
-    try:
-        logger.info(f"[Exotel] Attempting call to {registration.phone_number} for {duty_name}")
-        response = requests.post(
-            url,
-            auth=HTTPBasicAuth(api_key, api_token),
-            data=payload,
-            timeout=10
-        )
+    # Exotel posts the call's outcome here (utils/call_status.py)
+    status_callback = callback_url()
+    if status_callback:
+        payload['StatusCallback'] = status_callback
+        payload['StatusCallbackEvents[0]'] = 'terminal'
+
+    # At most EXOTEL_MAX_CONCURRENT_CALLS calls in progress across workers (utils/call_slots.py)
+    with call_slot() as acquired:
+        if not acquired:
+            logger.warning(f"[Exotel] No free call slot for {registration.phone_number}, deferring")
+            return {"success": False, "busy": True, "error": "All call slots busy"}
+
+        try:
+            logger.info(f"[Exotel] Attempting call to {registration.phone_number} for {duty_name}")
+            response = requests.post(
+                url,
+                auth=HTTPBasicAuth(api_key, api_token),
+                data=payload,
+                timeout=10
+            )
         
-        result = response.json()
+            result = response.json()
         
-        if response.status_code == 200:
-            call_sid = result.get('Call', {}).get('Sid')
-            logger.info(f"[Exotel] Call triggered successfully. Sid: {call_sid}")
-            return {"success": True, "call_sid": call_sid}
-        else:
-            logger.error(f"[Exotel] API Error: {response.text}")
-            return {"success": False, "error": response.text}
+            if response.status_code == 200:
+                call_sid = result.get('Call', {}).get('Sid')
+                logger.info(f"[Exotel] Call triggered successfully. Sid: {call_sid}")
+                return {"success": True, "call_sid": call_sid}
+            else:
+                logger.error(f"[Exotel] API Error: {response.text}")
+                return {"success": False, "error": response.text}
             
-    except Exception as e:
-        logger.error(f"[Exotel] Request failed: {str(e)}")
-        return {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"[Exotel] Request failed: {str(e)}")
+            return {"success": False, "error": str(e)}
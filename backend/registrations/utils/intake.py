@@ -0,0 +1,302 @@
+"""
+Spike-absorbing registration intake.
+
+With REGISTRATION_INTAKE_ENABLED the public registration endpoint only does
+cheap field validation, appends the submission to a Redis stream (or the
+RegistrationIntake table when Redis is down) and answers 202 with a
+tracking id. `drain_intake()` then persists queued submissions in batches
+with a single uniqueness query and `bulk_create` per batch.
+
+Stream entries are read through a consumer group and acknowledged only
+after the batch commits, so a drainer that dies mid-batch leaves its
+entries pending; they are reclaimed by the next drainer after
+REGISTRATION_INTAKE_CLAIM_IDLE_SECONDS.
+"""
+
+import os
+import json
+import socket
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from redis.exceptions import RedisError, ResponseError
+
+from ..models import Registration, RegistrationIntake, AuditionUpload
+from .redis_client import get_redis, reset_redis
+from .status_docs import forget_status_document, schedule_status_rebuild
+from .uploads import UploadError, attach_uploads
+
+logger = logging.getLogger('registrations')
+
+INTAKE_STREAM = 'registrations:intake'
+INTAKE_GROUP = 'intake-drainers'
+STATUS_KEY = 'registrations:intake:status:{}'
+
+REGISTRATION_FIELDS = ['full_name', 'its_number', 'email', 'phone_number', 'preference', 'status']
+
+
+def intake_enabled():
+    return getattr(settings, 'REGISTRATION_INTAKE_ENABLED', False)
+
+
+def _status_ttl():
+    return getattr(settings, 'REGISTRATION_INTAKE_STATUS_TTL', 7 * 24 * 3600)
+
+
+def _consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue_submission(validated_data, upload_ids):
+    """
+    Queue a validated submission. Returns the tracking id (str).
+    """
+    intake = RegistrationIntake(payload={
+        'data': {k: validated_data[k] for k in REGISTRATION_FIELDS if k in validated_data},
+        'upload_ids': [str(u) for u in upload_ids],
+    })
+    tracking_id = str(intake.id)
+
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.xadd(INTAKE_STREAM, {
+                'id': tracking_id,
+                'payload': json.dumps(intake.payload),
+                'received_at': intake.created_at.isoformat(),
+            })
+            pipe.set(STATUS_KEY.format(tracking_id), json.dumps({'status': 'QUEUED'}), ex=_status_ttl())
+            pipe.execute()
+            return tracking_id
+        except Exception as e:
+            reset_redis()
+            logger.warning(f"[Intake] Redis enqueue failed, using database queue: {str(e)}")
+
+    intake.save()
+    return tracking_id
+
+
+def get_submission_status(tracking_id):
+    """
+    Returns {'tracking_id', 'status', 'registration_id', 'error'} or None.
+    """
+    result = None
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = r.get(STATUS_KEY.format(tracking_id))
+            result = json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"[Intake] Redis status lookup failed: {str(e)}")
+
+    if result is None:
+        intake = RegistrationIntake.objects.filter(pk=tracking_id).first()
+        if intake is None:
+            return None
+        result = {'status': intake.status, 'registration_id': intake.registration_id, 'error': intake.error}
+
+    return {
+        'tracking_id': str(tracking_id),
+        'status': result.get('status'),
+        'registration_id': result.get('registration_id'),
+        'error': result.get('error') or None,
+    }
+
+
+def _persist_batch(entries):
+    """
+    Persist a batch of (tracking_id, payload) inside the caller's transaction.
+    Returns {tracking_id: (status, registration_id, error)}.
+    """
+    results = {}
+
+    its_numbers = [p['data'].get('its_number') for _, p in entries]
+    taken = set(Registration.objects.filter(its_number__in=its_numbers).values_list('its_number', flat=True))
+
+    all_upload_ids = {u for _, p in entries for u in p.get('upload_ids', [])}
+    ready_uploads = set(
+        str(u) for u in AuditionUpload.objects.filter(pk__in=all_upload_ids, status='COMPLETE').values_list('id', flat=True)
+    ) if all_upload_ids else set()
+
+    accepted = []
+    for tracking_id, payload in entries:
+        its = payload['data'].get('its_number')
+        if its in taken:
+            results[tracking_id] = ('REJECTED', None, 'ITS Number already registered.')
+            continue
+        if any(u not in ready_uploads for u in payload.get('upload_ids', [])):
+            results[tracking_id] = ('REJECTED', None, 'One or more uploads are missing, incomplete or already attached.')
+            continue
+        taken.add(its)
+        accepted.append((tracking_id, payload))
+
+    if not accepted:
+        return results
+
+    objs = [Registration(**payload['data']) for _, payload in accepted]
+    try:
+        with transaction.atomic():
+            Registration.objects.bulk_create(objs, batch_size=500)
+    except IntegrityError:
+        # A direct (non-queued) registration raced us; fall back to row-by-row
+        for tracking_id, payload in accepted:
+            try:
+                with transaction.atomic():
+                    Registration.objects.create(**payload['data'])
+            except IntegrityError:
+                results[tracking_id] = ('REJECTED', None, 'ITS Number already registered.')
+
+    # bulk_create does not return primary keys on MySQL, refetch by ITS
+    created = Registration.objects.in_bulk(
+        [p['data']['its_number'] for t, p in accepted if t not in results], field_name='its_number'
+    )
+
+    for tracking_id, payload in accepted:
+        if tracking_id in results:
+            continue
+        registration = created[payload['data']['its_number']]
+        error = ''
+        if payload.get('upload_ids'):
+            try:
+                with transaction.atomic():
+                    attach_uploads(registration, payload['upload_ids'])
+            except UploadError as e:
+                error = str(e)
+                logger.error(f"[Intake] Registration {registration.id} saved without audition files: {error}")
+        results[tracking_id] = ('COMMITTED', registration.id, error)
+
+    committed = [
+        (results[tracking_id][1], payload['data']['its_number'])
+        for tracking_id, payload in accepted if results[tracking_id][0] == 'COMMITTED'
+    ]
+    transaction.on_commit(lambda: _schedule_registration_tasks(committed))
+    return results
+
+
+def _schedule_registration_tasks(registrations):
+    """Post-save work for (registration id, ITS number) pairs; bulk_create sends no post_save."""
+    from ..tasks import send_registration_confirmation_task, sync_to_sheets_task
+    from . import safe_task_delay
+
+    for registration_id, its_number in registrations:
+        # A status lookup made while the submission was queued cached the ITS as missing
+        forget_status_document(its_number)
+        schedule_status_rebuild(registration_id)
+        safe_task_delay(send_registration_confirmation_task, registration_id)
+        safe_task_delay(sync_to_sheets_task, registration_id)
+
+
+def _read_stream(r, batch_size):
+    try:
+        r.xgroup_create(INTAKE_STREAM, INTAKE_GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+    consumer = _consumer_name()
+    idle_ms = getattr(settings, 'REGISTRATION_INTAKE_CLAIM_IDLE_SECONDS', 60) * 1000
+
+    # Entries left pending by a drainer that died mid-batch
+    _, messages, *_ = r.xautoclaim(INTAKE_STREAM, INTAKE_GROUP, consumer, idle_ms, start_id='0-0', count=batch_size)
+    messages = [m for m in messages if m and m[1]]
+
+    if len(messages) < batch_size:
+        response = r.xreadgroup(INTAKE_GROUP, consumer, {INTAKE_STREAM: '>'}, count=batch_size - len(messages))
+        for _, stream_messages in response or []:
+            messages.extend(stream_messages)
+    return messages
+
+
+def _drain_stream(batch_size):
+    r = get_redis()
+    if r is None:
+        return 0
+
+    messages = _read_stream(r, batch_size)
+    if not messages:
+        return 0
+
+    entries = []
+    received = {}
+    for message_id, fields in messages:
+        tracking_id = fields['id']
+        entries.append((tracking_id, json.loads(fields['payload'])))
+        received[tracking_id] = fields.get('received_at')
+
+    now = timezone.now()
+    with transaction.atomic():
+        results = _persist_batch(entries)
+        # Durable record of the outcome, so status outlives the Redis key
+        RegistrationIntake.objects.bulk_create([
+            RegistrationIntake(
+                id=tracking_id,
+                payload=payload,
+                status=results[tracking_id][0],
+                registration_id=results[tracking_id][1],
+                error=results[tracking_id][2],
+                created_at=received.get(tracking_id) or now,
+                processed_at=now,
+            )
+            for tracking_id, payload in entries
+        ], ignore_conflicts=True)
+
+    pipe = r.pipeline()
+    for tracking_id, (status, registration_id, error) in results.items():
+        pipe.set(STATUS_KEY.format(tracking_id), json.dumps({
+            'status': status, 'registration_id': registration_id, 'error': error
+        }), ex=_status_ttl())
+    message_ids = [m[0] for m in messages]
+    pipe.xack(INTAKE_STREAM, INTAKE_GROUP, *message_ids)
+    pipe.xdel(INTAKE_STREAM, *message_ids)
+    pipe.execute()
+    return len(entries)
+
+
+def _drain_database(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        intakes = list(
+            RegistrationIntake.objects.select_for_update(skip_locked=True)
+            .filter(status='QUEUED').order_by('created_at')[:batch_size]
+        )
+        if not intakes:
+            return 0
+
+        results = _persist_batch([(str(i.id), i.payload) for i in intakes])
+        for intake in intakes:
+            intake.status, intake.registration_id, intake.error = results[str(intake.id)]
+            intake.processed_at = now
+        RegistrationIntake.objects.bulk_update(intakes, ['status', 'registration', 'error', 'processed_at'])
+    return len(intakes)
+
+
+def drain_intake(batch_size=None, max_batches=None):
+    """
+    Persist queued submissions until both queues are empty (or `max_batches`
+    batches were processed). Returns {'stream': n, 'database': n}.
+    """
+    batch_size = batch_size or getattr(settings, 'REGISTRATION_INTAKE_BATCH_SIZE', 200)
+    stats = {'stream': 0, 'database': 0}
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        try:
+            from_stream = _drain_stream(batch_size)
+        except RedisError as e:
+            reset_redis()
+            logger.warning(f"[Intake] Redis drain failed, draining database queue only: {str(e)}")
+            from_stream = 0
+        from_db = _drain_database(batch_size)
+
+        stats['stream'] += from_stream
+        stats['database'] += from_db
+        batches += 1
+        if not from_stream and not from_db:
+            break
+
+    if stats['stream'] or stats['database']:
+        logger.info(f"[Intake] Drained {stats['stream']} stream + {stats['database']} database submission(s)")
+    return stats
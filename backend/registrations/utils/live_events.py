@@ -0,0 +1,157 @@
+"""
+Live push of roster and request changes to admin dashboards (SSE).
+
+Writers call `publish_event()`; after the transaction commits the event is
+PUBLISHed on the Redis channel `registrations:events`, so every worker's
+open /api/events/ streams receive it no matter which worker made the
+change. Events are compact deltas ({"type", "data", "ts"}); a dashboard
+that missed some (reconnect, Redis blip) catches up through /api/changes/.
+
+EventSource cannot send an Authorization header, so the stream takes a
+short-lived signed ticket from POST /api/events/ticket/ instead of putting
+the JWT in the URL.
+
+The stream holds its connection open: serve /api/events/ from ASGI workers
+(sherullah_service/asgi.py), not from sync gunicorn workers.
+"""
+
+import json
+import time
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+
+from .redis_client import get_redis
+
+logger = logging.getLogger('registrations')
+
+EVENTS_CHANNEL = 'registrations:events'
+TICKET_SALT = 'registrations.events'
+
+
+class InvalidStreamTicket(Exception):
+    pass
+
+
+def _message(event_type, data):
+    return json.dumps({'type': event_type, 'data': data, 'ts': round(time.time(), 3)}, default=str)
+
+
+def _publish(messages):
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        for message in messages:
+            pipe.publish(EVENTS_CHANNEL, message)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"[Events] Publish failed: {str(e)}")
+
+
+def publish_event(event_type, data):
+    """Publish one event after the current transaction commits."""
+    message = _message(event_type, data)
+    transaction.on_commit(lambda: _publish([message]))
+
+
+def publish_events(events):
+    """Publish many (event_type, data) pairs in one round trip after commit."""
+    messages = [_message(event_type, data) for event_type, data in events]
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+# --- Event payloads ---
+
+def duty_event_data(assignment):
+    """Slot plus the same cell shape the roster grid serves."""
+    from .roster_grid import build_cell
+    return {
+        'id': assignment.id,
+        'duty_date': assignment.duty_date.isoformat(),
+        'namaaz_type': assignment.namaaz_type,
+        'cell': build_cell(assignment),
+    }
+
+
+def khidmat_request_event_data(khidmat_request):
+    return {
+        'id': khidmat_request.id,
+        'assignment_id': khidmat_request.assignment_id,
+        'request_type': khidmat_request.request_type,
+        'status': khidmat_request.status,
+    }
+
+
+# --- Stream tickets ---
+
+def issue_stream_ticket(user):
+    return signing.dumps({'u': user.id}, salt=TICKET_SALT)
+
+
+def read_stream_ticket(ticket):
+    """Returns the user id or raises InvalidStreamTicket."""
+    try:
+        data = signing.loads(ticket, salt=TICKET_SALT, max_age=getattr(settings, 'EVENTS_TICKET_TTL', 60))
+    except signing.SignatureExpired:
+        raise InvalidStreamTicket("Stream ticket has expired")
+    except signing.BadSignature:
+        raise InvalidStreamTicket("Invalid stream ticket")
+    return data['u']
+
+
+# --- Stream ---
+
+async def open_subscription():
+    """
+    (client, pubsub) subscribed to the events channel, or None when Redis is
+    unreachable. One connection per open stream; closed by event_stream().
+    """
+    import redis.asyncio as aioredis
+
+    client = aioredis.from_url(
+        getattr(settings, 'REDIS_URL', settings.CELERY_BROKER_URL),
+        decode_responses=True,
+        socket_connect_timeout=2,
+    )
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(EVENTS_CHANNEL)
+    except Exception as e:
+        logger.warning(f"[Events] Subscribe failed: {str(e)}")
+        await pubsub.aclose()
+        await client.aclose()
+        return None
+    return client, pubsub
+
+
+async def event_stream(client, pubsub):
+    """
+    SSE body: forwards channel messages and sends a comment line every
+    EVENTS_HEARTBEAT_SECONDS so proxies keep the connection open.
+    Ends (and the browser reconnects) if the Redis connection drops.
+    """
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+    try:
+        yield f"retry: {getattr(settings, 'EVENTS_RETRY_MS', 5000)}\n: connected\n\n"
+        while True:
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+            except Exception as e:
+                logger.warning(f"[Events] Stream read failed: {str(e)}")
+                return
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {message['data']}\n\n"
+    finally:
+        # Also runs when the client disconnects and the server cancels the stream
+        try:
+            await pubsub.aclose()
+            await client.aclose()
+        except Exception:
+            pass
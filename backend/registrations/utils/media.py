@@ -0,0 +1,95 @@
+"""
+Audition media processing (ffmpeg / ffprobe).
+
+Produces the light renditions admins stream in the master sheet:
+- a loudness-normalized, low-bitrate mono MP3 of the whole audition
+- a short MP3 preview clip from the start of the audition
+
+Video auditions are reduced to their audio track; reviewers only listen.
+"""
+
+import os
+import json
+import logging
+import subprocess
+
+from django.conf import settings
+
+logger = logging.getLogger('registrations')
+
+RENDITION_DIR = os.path.join('auditions files', 'renditions')
+PREVIEW_DIR = os.path.join('auditions files', 'previews')
+
+
+class MediaProcessingError(Exception):
+    """Raised when ffmpeg / ffprobe fails or is not installed."""
+    pass
+
+
+def _run(cmd, timeout):
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=timeout, check=False)
+    except FileNotFoundError:
+        raise MediaProcessingError(f"{cmd[0]} is not installed")
+    except subprocess.TimeoutExpired:
+        raise MediaProcessingError(f"{cmd[0]} timed out after {timeout}s")
+
+    if result.returncode != 0:
+        stderr = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        raise MediaProcessingError(stderr[-1] if stderr else f"{cmd[0]} exited with {result.returncode}")
+    return result.stdout
+
+
+def probe_media(path):
+    """
+    Returns {'duration': float|None, 'codec': str} for the first audio stream.
+    """
+    ffprobe = getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+    output = _run([
+        ffprobe, '-v', 'error',
+        '-show_entries', 'format=duration:stream=codec_name,codec_type',
+        '-of', 'json', path
+    ], timeout=60)
+
+    data = json.loads(output or b'{}')
+    streams = data.get('streams', [])
+    audio = next((st for st in streams if st.get('codec_type') == 'audio'), streams[0] if streams else {})
+
+    try:
+        duration = float(data.get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+
+    return {'duration': duration, 'codec': audio.get('codec_name', '')}
+
+
+def transcode_audio(src, dst, preview_seconds=None):
+    """
+    Transcode `src` to a normalized mono MP3 at AUDITION_RENDITION_BITRATE.
+    When `preview_seconds` is given, only the first N seconds are kept.
+    """
+    ffmpeg = getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+    bitrate = getattr(settings, 'AUDITION_RENDITION_BITRATE', '64k')
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    cmd = [ffmpeg, '-y', '-v', 'error', '-i', src, '-vn', '-ac', '1', '-ar', '44100']
+    if preview_seconds:
+        cmd += ['-t', str(preview_seconds)]
+    cmd += ['-af', 'loudnorm=I=-16:TP=-1.5:LRA=11', '-codec:a', 'libmp3lame', '-b:a', bitrate, dst]
+
+    _run(cmd, timeout=getattr(settings, 'AUDITION_TRANSCODE_TIMEOUT', 300))
+    return dst
+
+
+def rendition_names(source_name):
+    """
+    Storage names for the rendition and preview of a stored audition file.
+    They keep the whole source name, extension included: storage names are
+    unique, so x.mp3 and x.mp4 never share (or delete) each other's rendition.
+    """
+    name = os.path.basename(source_name)
+    return (
+        os.path.join(RENDITION_DIR, f"{name}.mp3"),
+        os.path.join(PREVIEW_DIR, f"{name}.mp3"),
+    )
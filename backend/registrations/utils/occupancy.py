@@ -0,0 +1,245 @@
+"""
+Per-registrant daily occupancy index.
+
+DutyOccupancy holds one row per (registration, duty_date) listing the namaaz
+types that registrant holds that day. Rows are recomputed from
+DutyAssignment whenever an assignment is created, reassigned, moved or
+deleted (signals, plus the bulk assignment path which bypasses them), so an
+assignment can be checked against a single row instead of the whole grid.
+
+A day is over-allocated when it holds more than DUTY_MAX_PER_DAY duties or
+two duties with the same reporting time (a clash). Both need at least two
+duties, so every over-allocated day is found with one indexed
+`count >= 2` query. DUTY_MAX_PER_WEEK (0 = off) adds a per calendar week
+(Monday start) limit.
+
+Assignment checks lock the registrants' rows first (lock_registrants) and
+read the index with a locking read, so two concurrent assigns to the same
+person are checked one after the other.
+
+With the default DUTY_MAX_PER_DAY of 1 nobody holds two duties on a day; the
+reminder digest (reminder_digest.py) only applies once it is raised.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+from ..models import DutyAssignment, DutyOccupancy, Registration
+from .reporting import get_reporting_time
+
+logger = logging.getLogger('registrations')
+
+# DutyAssignment fields that move a duty between (registrant, date) rows
+OCCUPANCY_FIELDS = {'duty_date', 'namaaz_type', 'assigned_user', 'assigned_user_id'}
+
+
+def clash_groups():
+    """Namaaz type -> reporting time; two duties with the same reporting time clash."""
+    return {
+        t: get_reporting_time(DutyAssignment(namaaz_type=t)) or t
+        for t, _ in DutyAssignment.NAMAAZ_CHOICES
+    }
+
+
+def max_per_day():
+    return getattr(settings, 'DUTY_MAX_PER_DAY', 1)
+
+
+def max_per_week():
+    return getattr(settings, 'DUTY_MAX_PER_WEEK', 0)
+
+
+def week_start(duty_date):
+    return duty_date - timedelta(days=duty_date.weekday())
+
+
+def _has_clash(namaaz_types, groups):
+    held = [groups.get(t, t) for t in namaaz_types]
+    return len(held) != len(set(held))
+
+
+def refresh_occupancy(pairs):
+    """Recompute the rows for an iterable of (registration_id, duty_date)."""
+    pairs = {(r, d) for r, d in pairs if r and d}
+    if not pairs:
+        return
+
+    held = defaultdict(list)
+    for user_id, duty_date, namaaz_type in DutyAssignment.objects.filter(
+        assigned_user_id__in={r for r, _ in pairs},
+        duty_date__in={d for _, d in pairs}
+    ).values_list('assigned_user_id', 'duty_date', 'namaaz_type'):
+        if (user_id, duty_date) in pairs:
+            held[(user_id, duty_date)].append(namaaz_type)
+
+    groups = clash_groups()
+    existing = {
+        (o.registration_id, o.duty_date): o
+        for o in DutyOccupancy.objects.filter(
+            registration_id__in={r for r, _ in pairs},
+            duty_date__in={d for _, d in pairs}
+        )
+        if (o.registration_id, o.duty_date) in pairs
+    }
+
+    to_create, to_update, to_delete = [], [], []
+    for pair in pairs:
+        types = sorted(held.get(pair, []))
+        row = existing.get(pair)
+        if not types:
+            if row:
+                to_delete.append(row.id)
+            continue
+        if row is None:
+            row = DutyOccupancy(registration_id=pair[0], duty_date=pair[1])
+            to_create.append(row)
+        elif row.namaaz_types == types:
+            continue
+        else:
+            to_update.append(row)
+        row.namaaz_types = types
+        row.count = len(types)
+        row.has_clash = _has_clash(types, groups)
+
+    if to_delete:
+        DutyOccupancy.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        DutyOccupancy.objects.bulk_update(to_update, ['namaaz_types', 'count', 'has_clash'])
+    DutyOccupancy.objects.bulk_create(to_create, ignore_conflicts=True)
+
+
+def lock_registrants(registration_ids):
+    """
+    Lock the registrants' rows (in id order) until the transaction ends, so
+    concurrent assignments of the same person wait for each other. Returns
+    the ids that exist. Must run inside a transaction.
+    """
+    return set(
+        Registration.objects.select_for_update().filter(
+            id__in=set(registration_ids)
+        ).order_by('id').values_list('id', flat=True)
+    )
+
+
+def load_occupancy(registration_ids, duty_dates, for_update=False):
+    """
+    {(registration_id, duty_date): [namaaz types]} for the given registrants,
+    covering whole calendar weeks when DUTY_MAX_PER_WEEK is set.
+    `for_update` reads with a locking read, which sees the latest committed
+    rows whatever the transaction's snapshot.
+    """
+    duty_dates = set(duty_dates)
+    rows = DutyOccupancy.objects.filter(registration_id__in=set(registration_ids))
+    if for_update:
+        rows = rows.select_for_update()
+    if max_per_week():
+        starts = {week_start(d) for d in duty_dates}
+        rows = rows.filter(duty_date__gte=min(starts), duty_date__lt=max(starts) + timedelta(days=7))
+    else:
+        rows = rows.filter(duty_date__in=duty_dates)
+    return {
+        (o.registration_id, o.duty_date): list(o.namaaz_types)
+        for o in rows.only('registration_id', 'duty_date', 'namaaz_types')
+    }
+
+
+def occupancy_error(occupancy, registration_id, duty_date, namaaz_type, groups=None):
+    """
+    Reason the registrant cannot also take this duty, or None.
+    `occupancy` is the mapping returned by load_occupancy().
+    """
+    groups = groups or clash_groups()
+    held = occupancy.get((registration_id, duty_date), [])
+    if groups.get(namaaz_type, namaaz_type) in {groups.get(t, t) for t in held}:
+        return "This registrant already has a duty at the same reporting time on this day."
+    if len(held) >= max_per_day():
+        return f"This registrant already has {len(held)} duty(ies) on this day (limit {max_per_day()})."
+
+    limit = max_per_week()
+    if limit:
+        start = week_start(duty_date)
+        week = sum(
+            len(occupancy.get((registration_id, start + timedelta(days=i)), []))
+            for i in range(7)
+        )
+        if week >= limit:
+            return f"This registrant already has {week} duty(ies) this week (limit {limit})."
+    return None
+
+
+def check_assignment(registration_id, duty_date, namaaz_type):
+    """
+    Single-assignment check: one unique-key row lookup (up to 7 with a weekly
+    limit). Call inside the assigning transaction; the registrant stays
+    locked until it commits.
+    """
+    lock_registrants([registration_id])
+    occupancy = load_occupancy([registration_id], [duty_date], for_update=True)
+    return occupancy_error(occupancy, registration_id, duty_date, namaaz_type)
+
+
+def find_conflicts(date_from=None, date_to=None):
+    """
+    Every over-allocated registrant day (and week, when DUTY_MAX_PER_WEEK is set).
+    Returns {'days': [...], 'weeks': [...]}.
+    """
+    limit = max_per_day()
+    rows = DutyOccupancy.objects.filter(count__gte=2).select_related('registration')
+    if date_from:
+        rows = rows.filter(duty_date__gte=date_from)
+    if date_to:
+        rows = rows.filter(duty_date__lte=date_to)
+
+    days = []
+    for o in rows.order_by('duty_date', 'registration_id'):
+        reasons = []
+        if o.has_clash:
+            reasons.append('same_reporting_time')
+        if o.count > limit:
+            reasons.append('over_daily_limit')
+        if reasons:
+            days.append({
+                'registration_id': o.registration_id,
+                'full_name': o.registration.full_name,
+                'its_number': o.registration.its_number,
+                'duty_date': o.duty_date.isoformat(),
+                'namaaz_types': o.namaaz_types,
+                'count': o.count,
+                'reasons': reasons,
+            })
+
+    weeks = []
+    week_limit = max_per_week()
+    if week_limit:
+        totals = DutyOccupancy.objects.all()
+        if date_from:
+            totals = totals.filter(duty_date__gte=week_start(date_from))
+        if date_to:
+            totals = totals.filter(duty_date__lte=date_to)
+        for row in totals.annotate(week=TruncWeek('duty_date')).values(
+            'registration_id', 'registration__full_name', 'registration__its_number', 'week'
+        ).annotate(total=Sum('count')).filter(total__gt=week_limit).order_by('week', 'registration_id'):
+            weeks.append({
+                'registration_id': row['registration_id'],
+                'full_name': row['registration__full_name'],
+                'its_number': row['registration__its_number'],
+                'week_start': row['week'].isoformat(),
+                'count': row['total'],
+                'reasons': ['over_weekly_limit'],
+            })
+
+    return {'days': days, 'weeks': weeks}
+
+
+def rebuild_occupancy():
+    """Rebuild the whole index from DutyAssignment (repair / backfill). Returns the row count."""
+    DutyOccupancy.objects.all().delete()
+    refresh_occupancy(
+        DutyAssignment.objects.filter(assigned_user__isnull=False).values_list('assigned_user_id', 'duty_date').distinct()
+    )
+    return DutyOccupancy.objects.count()
@@ -0,0 +1,61 @@
+"""
+Shared Redis connection for application data (not Celery).
+
+Returns None when Redis is unreachable so callers can fall back to the
+database. After a failed connect the client is not retried until
+REDIS_RETRY_SECONDS have passed, so an outage does not add a connect
+timeout to every request.
+"""
+
+import time
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger('registrations')
+
+_client = None
+_failed_at = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Return a connected redis.Redis (decode_responses=True) or None."""
+    global _client, _failed_at
+
+    if _client is not None:
+        return _client
+
+    retry_after = getattr(settings, 'REDIS_RETRY_SECONDS', 30)
+    if _failed_at and time.monotonic() - _failed_at < retry_after:
+        return None
+
+    with _lock:
+        if _client is not None:
+            return _client
+        try:
+            import redis
+            client = redis.Redis.from_url(
+                getattr(settings, 'REDIS_URL', settings.CELERY_BROKER_URL),
+                decode_responses=True,
+                socket_connect_timeout=1,
+                socket_timeout=2,
+                health_check_interval=30,
+            )
+            client.ping()
+        except Exception as e:
+            _failed_at = time.monotonic()
+            logger.warning(f"[Redis] Unavailable, using fallback: {str(e)}")
+            return None
+
+        _client = client
+        _failed_at = None
+        return _client
+
+
+def reset_redis():
+    """Drop the cached client (e.g. after a connection error mid-operation)."""
+    global _client, _failed_at
+    _client = None
+    _failed_at = time.monotonic()
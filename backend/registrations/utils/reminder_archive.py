@@ -0,0 +1,168 @@
+"""
+Reminder archival tier.
+
+Finished reminders (SENT, DELIVERED, FAILED, CANCELLED) scheduled more than
+REMINDER_ARCHIVE_AFTER_DAYS ago are moved, with their ReminderLog rows, into
+ReminderArchive / ReminderLogArchive, keeping the hot tables down to the
+current season. Age is taken from scheduled_datetime, which every reminder
+has (FAILED and CANCELLED ones have no sent_at).
+
+Archived rows keep a snapshot of the duty and the registrant and stay
+queryable through /api/reminder-archive/. A whole season can be exported to
+gzipped JSON Lines (one reminder per line, logs nested) and then purged.
+"""
+
+import gzip
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Reminder, ReminderLog, ReminderArchive, ReminderLogArchive
+
+logger = logging.getLogger('registrations')
+
+TERMINAL_STATUSES = ['SENT', 'DELIVERED', 'FAILED', 'CANCELLED']
+
+
+def _snapshot(reminder):
+    duty = reminder.duty_assignment
+    user = duty.assigned_user
+    return ReminderArchive(
+        original_id=reminder.id,
+        season=duty.duty_date.year,
+        duty_assignment_id=duty.id,
+        duty_date=duty.duty_date,
+        namaaz_type=duty.namaaz_type,
+        registration_id=user.id if user else None,
+        its_number=user.its_number if user else '',
+        full_name=user.full_name if user else '',
+        stage=reminder.stage.name,
+        scheduled_datetime=reminder.scheduled_datetime,
+        status=reminder.status,
+        email_sent=reminder.email_sent,
+        whatsapp_sent=reminder.whatsapp_sent,
+        call_sent=reminder.call_sent,
+        email_attempts=reminder.email_attempts,
+        whatsapp_attempts=reminder.whatsapp_attempts,
+        call_attempts=reminder.call_attempts,
+        whatsapp_message_id=reminder.whatsapp_message_id,
+        call_sid=reminder.call_sid,
+        call_status=reminder.call_status,
+        sent_at=reminder.sent_at,
+        last_error=reminder.last_error,
+        created_at=reminder.created_at,
+    )
+
+
+def archive_reminders(older_than_days=None, batch_size=None):
+    """
+    Move finished reminders older than the cutoff (and their logs) into the
+    archive tables, one transaction per batch. Returns counts.
+    """
+    older_than_days = older_than_days if older_than_days is not None else getattr(settings, 'REMINDER_ARCHIVE_AFTER_DAYS', 90)
+    batch_size = batch_size or getattr(settings, 'REMINDER_ARCHIVE_BATCH_SIZE', 1000)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    stats = {'reminders': 0, 'logs': 0}
+    while True:
+        with transaction.atomic():
+            # Locked rows belong to a concurrent run
+            ids = list(
+                Reminder.objects.filter(
+                    status__in=TERMINAL_STATUSES,
+                    scheduled_datetime__lt=cutoff
+                ).select_for_update(skip_locked=True).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            batch = list(
+                Reminder.objects.filter(id__in=ids).select_related('stage', 'duty_assignment', 'duty_assignment__assigned_user')
+            )
+
+            ReminderArchive.objects.bulk_create([_snapshot(r) for r in batch])
+            # bulk_create does not return primary keys on MySQL, refetch
+            archive_ids = dict(
+                ReminderArchive.objects.filter(original_id__in=ids).values_list('original_id', 'id')
+            )
+            logs = [
+                ReminderLogArchive(
+                    reminder_id=archive_ids[log.reminder_id],
+                    timestamp=log.timestamp,
+                    channel=log.channel,
+                    success=log.success,
+                    message=log.message,
+                )
+                for log in ReminderLog.objects.filter(reminder_id__in=ids).order_by('id')
+            ]
+            ReminderLogArchive.objects.bulk_create(logs, batch_size=1000)
+            Reminder.objects.filter(id__in=ids).delete()  # Cascades to ReminderLog
+
+        stats['reminders'] += len(batch)
+        stats['logs'] += len(logs)
+
+    if stats['reminders']:
+        logger.info(f"[Archive] Archived {stats['reminders']} reminder(s) and {stats['logs']} log(s) older than {cutoff:%Y-%m-%d}")
+    return stats
+
+
+def _record(archive, logs):
+    return {
+        'id': archive.original_id,
+        'season': archive.season,
+        'duty_assignment_id': archive.duty_assignment_id,
+        'duty_date': archive.duty_date.isoformat(),
+        'namaaz_type': archive.namaaz_type,
+        'registration_id': archive.registration_id,
+        'its_number': archive.its_number,
+        'full_name': archive.full_name,
+        'stage': archive.stage,
+        'scheduled_datetime': archive.scheduled_datetime.isoformat(),
+        'status': archive.status,
+        'email_sent': archive.email_sent,
+        'whatsapp_sent': archive.whatsapp_sent,
+        'call_sent': archive.call_sent,
+        'email_attempts': archive.email_attempts,
+        'whatsapp_attempts': archive.whatsapp_attempts,
+        'call_attempts': archive.call_attempts,
+        'whatsapp_message_id': archive.whatsapp_message_id,
+        'call_sid': archive.call_sid,
+        'call_status': archive.call_status,
+        'sent_at': archive.sent_at.isoformat() if archive.sent_at else None,
+        'last_error': archive.last_error,
+        'created_at': archive.created_at.isoformat(),
+        'logs': [
+            {'timestamp': l.timestamp.isoformat(), 'channel': l.channel, 'success': l.success, 'message': l.message}
+            for l in logs
+        ],
+    }
+
+
+def export_season(season, path, purge=False, chunk_size=1000):
+    """
+    Write a season's archived reminders to `path` as gzipped JSON Lines.
+    With purge=True the exported rows are then deleted. Returns the row count.
+    """
+    rows = ReminderArchive.objects.filter(season=season).order_by('id')
+    exported = 0
+    last_id = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        while True:
+            chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            logs = {}
+            for log in ReminderLogArchive.objects.filter(reminder_id__in=[a.id for a in chunk]).order_by('timestamp', 'id'):
+                logs.setdefault(log.reminder_id, []).append(log)
+            for archive in chunk:
+                out.write(json.dumps(_record(archive, logs.get(archive.id, []))) + '\n')
+            exported += len(chunk)
+            last_id = chunk[-1].id
+
+    if purge and exported:
+        ReminderArchive.objects.filter(season=season, id__lte=last_id).delete()
+    logger.info(f"[Archive] Exported {exported} archived reminder(s) of season {season} to {path}" + (" and purged them" if purge else ""))
+    return exported
@@ -0,0 +1,180 @@
+"""
+Per-registrant reminder digests.
+
+When DUTY_MAX_PER_DAY is raised above its default of 1, a registrant can
+hold several duties on one date (e.g. SANAH and FAJAR_AZAAN), each with its
+own Reminder per stage. With the default every reminder is sent on its own. With
+REMINDER_DIGEST_ENABLED the dispatcher claims a registrant's unsent
+reminders of a stage for a date together, as long as they fall inside the
+same send window (reminder_dispatch._merge_limit), and sends one email, one WhatsApp message and one call listing every duty
+with its reporting time. Every grouped row is then marked from that single
+send.
+
+The WhatsApp digest reuses the approved duty_remind_v2 template: {{3}} lists
+the duties and {{4}} carries the earliest reporting time.
+"""
+
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .reporting import get_reporting_time
+
+logger = logging.getLogger('registrations')
+
+
+def digest_enabled():
+    return getattr(settings, 'REMINDER_DIGEST_ENABLED', True)
+
+
+def _duty_label(duty):
+    if hasattr(duty, 'slot') and duty.slot:
+        return duty.slot.time_label
+    return duty.get_namaaz_type_display()
+
+
+def _reporting_order(reporting_time):
+    try:
+        return datetime.strptime(reporting_time, "%I:%M %p").time()
+    except (TypeError, ValueError):
+        return datetime.max.time()
+
+
+def duty_lines(duties):
+    """[(label, reporting time)] for DutyAssignments, earliest reporting first."""
+    lines = [(_duty_label(duty), get_reporting_time(duty)) for duty in duties]
+    return sorted(lines, key=lambda line: _reporting_order(line[1]))
+
+
+def group_reminders(reminders):
+    """Claimed reminders as send groups: one per registrant, duty date and stage (or one each)."""
+    if not digest_enabled():
+        return [[reminder] for reminder in reminders]
+    groups = {}
+    for reminder in reminders:
+        duty = reminder.duty_assignment
+        groups.setdefault((duty.assigned_user_id, duty.duty_date, reminder.stage_id), []).append(reminder)
+    return list(groups.values())
+
+
+def send_email_digest(reminders, writes):
+    """One email for several reminders of the same registrant and date."""
+    duty = reminders[0].duty_assignment
+    user = duty.assigned_user
+    try:
+        from .email_notifications import send_reminder_digest_email
+        lines = duty_lines([r.duty_assignment for r in reminders])
+        if not send_reminder_digest_email(user, duty.duty_date.strftime('%d %B %Y'), lines):
+            raise Exception("Email service returned False")
+
+        for reminder in reminders:
+            reminder.email_sent = True
+            reminder.email_attempts += 1
+            writes.update(reminder, 'email_sent', 'email_attempts')
+            writes.log(reminder, 'EMAIL', True, f"Digest email ({len(reminders)} duties) sent to {user.email}")
+        return True
+
+    except Exception as e:
+        error_msg = f"Email send failed: {str(e)}"
+        logger.error(f"[Digest] Reminders {[r.id for r in reminders]} - {error_msg}")
+        for reminder in reminders:
+            reminder.email_attempts += 1
+            reminder.last_error = error_msg
+            writes.update(reminder, 'email_attempts', 'last_error')
+            writes.log(reminder, 'EMAIL', False, error_msg)
+        return False
+
+
+def send_whatsapp_digest(reminders, writes):
+    """One duty_remind_v2 message for several reminders of the same registrant and date (None: gateway busy)."""
+    duty = reminders[0].duty_assignment
+    user = duty.assigned_user
+    try:
+        from .whatsapp import send_duty_reminder_tomorrow
+        lines = duty_lines([r.duty_assignment for r in reminders])
+        result = send_duty_reminder_tomorrow(
+            phone=user.phone_number,
+            full_name=user.full_name,
+            duty_date=duty.duty_date.strftime('%d %B %Y'),
+            # Template parameters cannot contain line breaks
+            duty_time=", ".join(f"{label} ({reporting or 'N/A'})" for label, reporting in lines),
+            reporting_time=lines[0][1]
+        )
+        if result.get('busy'):
+            # Gateway busy: nothing sent, retried on the next run
+            return None
+        if not result.get('success', False):
+            error_data = result.get('response', {}).get('error', {})
+            error_msg = str(error_data) if isinstance(error_data, dict) else str(result.get('response'))
+            raise Exception(f"Template delivery failed: {error_msg}")
+
+        sent_at = timezone.now()
+        for reminder in reminders:
+            reminder.whatsapp_message_id = result.get('message_id')
+            reminder.whatsapp_status = 'SENT'
+            reminder.whatsapp_sent = True
+            reminder.whatsapp_attempts += 1
+            reminder.sent_at = sent_at
+            reminder.last_error = ""
+            writes.update(reminder, 'whatsapp_message_id', 'whatsapp_status', 'whatsapp_sent', 'whatsapp_attempts', 'sent_at', 'last_error')
+            writes.log(
+                reminder, 'WHATSAPP', True,
+                f"Digest WhatsApp ({len(reminders)} duties) sent to {user.phone_number} (ID: {reminder.whatsapp_message_id})"
+            )
+        return True
+
+    except Exception as e:
+        error_msg = f"WhatsApp reminder failed: {str(e)}"
+        logger.error(f"[Digest] Reminders {[r.id for r in reminders]} - {error_msg}")
+        for reminder in reminders:
+            reminder.whatsapp_status = 'FAILED'
+            reminder.whatsapp_attempts += 1
+            reminder.last_error = error_msg
+            writes.update(reminder, 'whatsapp_status', 'whatsapp_attempts', 'last_error')
+            writes.log(reminder, 'WHATSAPP', False, error_msg)
+        return False
+
+
+def send_call_digest(reminders, writes):
+    """One Exotel call for several reminders of the same registrant and date (None: no call slot)."""
+    duty = reminders[0].duty_assignment
+    user = duty.assigned_user
+    try:
+        from .exotel import make_exotel_call
+        lines = duty_lines([r.duty_assignment for r in reminders])
+        result = make_exotel_call(
+            user, duty, lines[0][1],
+            duty_name=" and ".join(label for label, _ in lines)
+        )
+        if result.get('busy'):
+            return None
+        if not result.get('success'):
+            raise Exception(result.get('error'))
+
+        for reminder in reminders:
+            reminder.call_sent = True
+            reminder.call_attempts += 1
+            reminder.call_sid = result.get('call_sid')
+            reminder.call_status = 'PLACED'
+            writes.update(reminder, 'call_sent', 'call_attempts', 'call_sid', 'call_status')
+            writes.log(reminder, 'CALL', True, f"Digest call ({len(reminders)} duties) placed to {user.phone_number} (Sid: {reminder.call_sid})")
+        return True
+
+    except Exception as e:
+        error_msg = f"Call failed: {str(e)}"
+        logger.error(f"[Digest] Reminders {[r.id for r in reminders]} - {error_msg}")
+        for reminder in reminders:
+            reminder.call_attempts += 1
+            reminder.last_error = error_msg
+            writes.update(reminder, 'call_attempts', 'last_error')
+            writes.log(reminder, 'CALL', False, error_msg)
+        return False
+
+
+DIGEST_CHANNELS = {
+    'email': send_email_digest,
+    'whatsapp': send_whatsapp_digest,
+    'call': send_call_digest,
+}
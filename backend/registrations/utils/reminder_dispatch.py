@@ -0,0 +1,497 @@
+"""
+Claim-based, parallel reminder dispatcher behind process_pending_reminders().
+
+At REMINDER_TIME_HOUR the whole next day's roster comes due in one tick.
+Instead of sending each reminder inside its own transaction, the dispatcher:
+1. claims a batch of due reminders with SELECT ... FOR UPDATE SKIP LOCKED,
+   flips them to PROCESSING and commits, so the row locks are held for
+   milliseconds and several Celery workers can run at once without sending
+   a reminder twice
+2. sends the channels of every claimed reminder (email, WhatsApp, Exotel
+   call, as set by its ReminderStage, see reminder_plan.py) concurrently on a bounded thread pool (REMINDER_DISPATCH_WORKERS)
+3. writes the batch's send results and logs (buffered by the senders, see
+   reminder_writes.py) and final statuses back in one transaction
+
+Reminders left with only their call to place (the 'call' stage) go to a
+separate call lane instead: at most EXOTEL_MAX_CONCURRENT_CALLS calls at a
+time (account-wide, utils/call_slots.py), each result written back on its
+own as soon as Exotel answers. The batch does not wait for them, so a slow
+Exotel response no longer holds up the emails and WhatsApp messages. A call
+that finds no free slot is retried on the next run without using an attempt.
+
+In digest mode (reminder_digest.py) a claim also takes the registrant's other
+unsent reminders of the same stage and duty date that are already due or,
+for window stages, scheduled inside the same send window; each group gets
+one message per channel. Later ones (e.g. a call 2h before a later duty)
+keep their own schedule.
+
+A reminder is claimed at most once per run; channels that failed are
+retried on the next run, as before. Claims left behind by a worker that
+died are released after REMINDER_CLAIM_TIMEOUT_SECONDS.
+
+On time delivery: once a reminder is within REMINDER_ETA_HORIZON_SECONDS of
+its scheduled time it gets a Celery task with that exact ETA (`arm_reminders`,
+id kept in Reminder.eta_task_id so a cancel can revoke it). The horizon stays
+below the Redis broker's visibility timeout, which would otherwise redeliver
+far-future ETA tasks. `reconcile_reminders` runs every few minutes: it arms
+reminders entering the horizon and sends stragglers (due more than
+REMINDER_ETA_GRACE_SECONDS ago, e.g. a lost ETA task) through the batch
+dispatcher. The claim makes a duplicate ETA task harmless.
+"""
+
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Reminder, ReminderStage
+from . import send_email_reminder, send_whatsapp_reminder, send_call_reminder, MAX_RETRY_ATTEMPTS
+from .reminder_writes import ReminderWriteBuffer
+from .reminder_digest import digest_enabled, group_reminders, DIGEST_CHANNELS
+from .call_slots import max_concurrent_calls
+from .call_status import max_call_attempts
+from .send_window import window_bounds
+
+logger = logging.getLogger('registrations')
+
+CHANNELS = {
+    'email': send_email_reminder,
+    'whatsapp': send_whatsapp_reminder,
+    'call': send_call_reminder,
+}
+
+
+def eta_horizon():
+    return timedelta(seconds=getattr(settings, 'REMINDER_ETA_HORIZON_SECONDS', 1800))
+
+
+def _sendable():
+    """Unclaimed reminders with at least one channel left to try."""
+    return Reminder.objects.filter(
+        status__in=['PENDING', 'FAILED']
+    ).filter(
+        Q(channels__contains='email', email_sent=False, email_attempts__lt=MAX_RETRY_ATTEMPTS)
+        | Q(channels__contains='whatsapp', whatsapp_sent=False, whatsapp_attempts__lt=MAX_RETRY_ATTEMPTS)
+        | Q(channels__contains='call', call_sent=False, call_attempts__lt=max_call_attempts())
+    )
+
+
+def _due_reminders(now):
+    """Due reminders with at least one channel left to try."""
+    return _sendable().filter(scheduled_datetime__lte=now)
+
+
+def _merge_limit(duty_date, anchor, offset_minutes, due_before):
+    """
+    Latest scheduled time a sibling may have to join a digest sent now: the
+    end of its send window for window stages, otherwise only if already due.
+    """
+    if anchor == ReminderStage.ANCHOR_WINDOW:
+        _, end = window_bounds(duty_date)
+        return max(due_before, end + timedelta(minutes=offset_minutes))
+    return due_before
+
+
+def _sibling_ids(ids, due_before):
+    """
+    Other sendable reminders of the same registrants, duty dates and stages
+    that may be sent with `ids` (digest mode, see _merge_limit).
+    """
+    if not ids or not digest_enabled():
+        return []
+    keys = set(Reminder.objects.filter(id__in=ids).values_list(
+        'duty_assignment__assigned_user_id', 'duty_assignment__duty_date', 'stage_id'
+    ))
+    rows = _sendable().filter(
+        duty_assignment__assigned_user_id__in={key[0] for key in keys},
+        duty_assignment__duty_date__in={key[1] for key in keys},
+        stage_id__in={key[2] for key in keys}
+    ).exclude(id__in=ids).values_list(
+        'id', 'duty_assignment__assigned_user_id', 'duty_assignment__duty_date', 'stage_id',
+        'stage__anchor', 'stage__offset_minutes', 'scheduled_datetime'
+    )
+    return [
+        row[0] for row in rows
+        if row[1:4] in keys and row[6] <= _merge_limit(row[2], row[4], row[5], due_before)
+    ]
+
+
+def count_due_reminders(now=None):
+    return _due_reminders(now or timezone.now()).count()
+
+
+def release_stale_claims():
+    """Return PROCESSING reminders whose worker died to PENDING. Returns the count."""
+    timeout = getattr(settings, 'REMINDER_CLAIM_TIMEOUT_SECONDS', 900)
+    return Reminder.objects.filter(
+        status='PROCESSING',
+        claimed_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status='PENDING')
+
+
+def claim_batch(started_at, limit, due_before=None):
+    """
+    Claim up to `limit` reminders due by `due_before` (default: run start)
+    not yet claimed in this run.
+    The claim is committed before returning. Returns the claimed reminders.
+    """
+    unclaimed = Q(claimed_at__isnull=True) | Q(claimed_at__lt=started_at)
+    due_before = due_before or started_at
+    with transaction.atomic():
+        ids = list(
+            _due_reminders(due_before).filter(unclaimed).select_for_update(
+                skip_locked=True
+            ).order_by('scheduled_datetime', 'id').values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        siblings = _sibling_ids(ids, due_before)
+        if siblings:
+            # Locked separately: the sibling lookup joins duty_assignment
+            ids += list(
+                _sendable().filter(unclaimed, id__in=siblings).select_for_update(
+                    skip_locked=True
+                ).values_list('id', flat=True)
+            )
+        Reminder.objects.filter(id__in=ids).update(status='PROCESSING', claimed_at=timezone.now())
+
+    return list(
+        Reminder.objects.filter(id__in=ids, status='PROCESSING').select_related(
+            'duty_assignment', 'duty_assignment__assigned_user'
+        )
+    )
+
+
+def _max_attempts(channel):
+    # Unanswered calls are retried on the call ladder (utils/call_status.py)
+    return max_call_attempts() if channel == 'call' else MAX_RETRY_ATTEMPTS
+
+
+def _channels_to_send(reminder):
+    return [
+        channel for channel in reminder.channel_list
+        if not getattr(reminder, f'{channel}_sent') and getattr(reminder, f'{channel}_attempts') < _max_attempts(channel)
+    ]
+
+
+def _all_sent(reminder):
+    return all(getattr(reminder, f'{channel}_sent') for channel in reminder.channel_list)
+
+
+class _Latency:
+    """Per-channel send timings, shared by the worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {channel: [] for channel in CHANNELS}
+
+    def add(self, channel, seconds):
+        with self._lock:
+            self._samples[channel].append(seconds)
+
+    def summary(self):
+        result = {}
+        for channel, samples in self._samples.items():
+            if not samples:
+                result[channel] = {'count': 0}
+                continue
+            ordered = sorted(samples)
+            result[channel] = {
+                'count': len(ordered),
+                'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+            }
+        return result
+
+
+def _outcome(channel, result):
+    """Stats key of a send result (None: deferred, no call slot or WhatsApp gateway busy)."""
+    return f"{channel}_{'deferred' if result is None else 'success' if result else 'failed'}"
+
+
+def _send(channel, reminders, latency, writes):
+    """Send one channel for a send group: a single reminder or a digest."""
+    started = time.monotonic()
+    try:
+        if len(reminders) == 1:
+            return CHANNELS[channel](reminders[0], writes=writes)
+        return DIGEST_CHANNELS[channel](reminders, writes)
+    except Exception as e:
+        # The senders log their own failures; this only guards the pool
+        logger.error(f"[Reminders] {channel} send crashed for reminder(s) {[r.id for r in reminders]}: {str(e)}")
+        return False
+    finally:
+        latency.add(channel, time.monotonic() - started)
+
+
+def _send_jobs(reminders):
+    """(channel, reminders) sends for a claimed batch, one per channel and group."""
+    pending = {reminder.id: _channels_to_send(reminder) for reminder in reminders}
+    jobs = []
+    for group in group_reminders(reminders):
+        for channel in CHANNELS:
+            targets = [reminder for reminder in group if channel in pending[reminder.id]]
+            if targets:
+                jobs.append((channel, targets))
+    return jobs
+
+
+def _call_only(reminders):
+    """True when placing the call is all that is left for these reminders."""
+    return all(_channels_to_send(reminder) == ['call'] for reminder in reminders)
+
+
+def _place_calls(reminders, latency, stats, stats_lock):
+    """Call lane job: one call (or call digest), its result written straight away."""
+    writes = ReminderWriteBuffer()
+    result = _send('call', reminders, latency, writes)
+    try:
+        with stats_lock:
+            stats[_outcome('call', result)] += 1
+            _finish(reminders, writes, stats)
+    except Exception as e:
+        # Left PROCESSING; release_stale_claims() hands them back
+        logger.error(f"[Reminders] Could not write call result for reminder(s) {[r.id for r in reminders]}: {str(e)}")
+
+
+def _close_worker_connections(pool, workers):
+    """
+    Django opens one DB connection per thread; close them before the pool's
+    threads exit. The barrier makes each worker thread run exactly one closer.
+    """
+    barrier = threading.Barrier(workers)
+
+    def close():
+        try:
+            barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        connection.close()
+
+    for future in [pool.submit(close) for _ in range(workers)]:
+        future.result()
+
+
+def _finish(reminders, writes, stats):
+    """
+    Flush the senders' buffered writes and the outcome of each claimed
+    reminder (the senders update the instances) in one transaction.
+    """
+    with transaction.atomic():
+        stats['logs_written'] = stats.get('logs_written', 0) + writes.flush()[1]
+        _write_statuses(reminders, stats)
+
+
+def _write_statuses(reminders, stats):
+    sent, exhausted, retry = [], [], []
+    for reminder in reminders:
+        if _all_sent(reminder):
+            sent.append(reminder.id)
+        elif not _channels_to_send(reminder):
+            # Every unsent channel is out of attempts
+            exhausted.append(reminder.id)
+        else:
+            retry.append(reminder.id)
+
+    # status='PROCESSING' guard: a reminder cancelled mid-send stays cancelled
+    claimed = Reminder.objects.filter(status='PROCESSING')
+    if sent:
+        claimed.filter(id__in=sent).update(status='SENT', sent_at=timezone.now())
+    if exhausted:
+        claimed.filter(id__in=exhausted).update(status='FAILED', last_error="Max retry attempts reached")
+    if retry:
+        claimed.filter(id__in=retry).update(status='PENDING')
+    stats['completed'] += len(sent)
+    stats['failed'] += len(exhausted)
+    stats['retrying'] += len(retry)
+
+
+def dispatch_due_reminders(batch_size=None, workers=None, max_batches=None, due_before=None):
+    """
+    Claim and send due reminders until none are left (or max_batches).
+    `due_before` limits the run to reminders due by then (the straggler sweep).
+    Safe to run on several workers at once. Returns run statistics.
+    """
+    batch_size = batch_size or getattr(settings, 'REMINDER_DISPATCH_BATCH_SIZE', 100)
+    workers = workers or getattr(settings, 'REMINDER_DISPATCH_WORKERS', 8)
+    max_batches = max_batches or getattr(settings, 'REMINDER_DISPATCH_MAX_BATCHES', 50)
+
+    started_at = timezone.now()
+    started = time.monotonic()
+    released = release_stale_claims()
+    stats = {
+        'total_due': count_due_reminders(due_before or started_at),
+        'released_claims': released,
+        'claimed': 0,
+        'batches': 0,
+        'email_success': 0,
+        'email_failed': 0,
+        'whatsapp_success': 0,
+        'whatsapp_failed': 0,
+        'whatsapp_deferred': 0,
+        'call_success': 0,
+        'call_failed': 0,
+        'call_deferred': 0,
+        'completed': 0,
+        'failed': 0,
+        'retrying': 0,
+        'logs_written': 0,
+        'digests': 0,
+    }
+    latency = _Latency()
+    call_workers = max_concurrent_calls()
+    stats_lock = threading.Lock()
+    calls = set()
+    logger.info(f"[Reminders] Dispatching {stats['total_due']} due reminder(s) with {workers} worker(s) and {call_workers} call line(s)")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminders') as pool, \
+            ThreadPoolExecutor(max_workers=call_workers, thread_name_prefix='calls') as lane:
+        try:
+            while stats['batches'] < max_batches:
+                # Claimed calls waiting for a line must go out before their claim expires
+                while len(calls) >= batch_size:
+                    _, calls = wait(calls, return_when=FIRST_COMPLETED)
+
+                reminders = claim_batch(started_at, batch_size, due_before)
+                if not reminders:
+                    break
+                stats['batches'] += 1
+                stats['claimed'] += len(reminders)
+
+                writes = ReminderWriteBuffer()
+                jobs = _send_jobs(reminders)
+                stats['digests'] += sum(1 for _, targets in jobs if len(targets) > 1)
+                futures = []
+                in_lane = set()
+                for channel, targets in jobs:
+                    if channel == 'call' and _call_only(targets):
+                        calls.add(lane.submit(_place_calls, targets, latency, stats, stats_lock))
+                        in_lane.update(reminder.id for reminder in targets)
+                    else:
+                        futures.append((channel, pool.submit(_send, channel, targets, latency, writes)))
+                results = [(channel, future.result()) for channel, future in futures]
+
+                with stats_lock:
+                    for channel, result in results:
+                        stats[_outcome(channel, result)] += 1
+                    _finish([r for r in reminders if r.id not in in_lane], writes, stats)
+        finally:
+            wait(calls)
+            _close_worker_connections(pool, workers)
+            _close_worker_connections(lane, call_workers)
+
+    elapsed = time.monotonic() - started
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['reminders_per_second'] = round(stats['claimed'] / elapsed, 1) if elapsed else 0
+    stats['latency'] = latency.summary()
+    logger.info(f"[Reminders] Dispatch complete: {stats}")
+    return stats
+
+
+# --- ETA scheduling ---
+
+def arm_reminders(duty_assignment_ids=None):
+    """
+    Enqueue an ETA task for PENDING reminders due within the horizon that have
+    none yet (optionally only for the given assignments). Returns the count.
+    """
+    if not getattr(settings, 'CELERY_ENABLED', True):
+        # Eager mode would send immediately; the reconciler covers this setup
+        return 0
+    from ..tasks import send_reminder_task
+
+    reminders = Reminder.objects.filter(
+        status='PENDING',
+        eta_task_id__isnull=True,
+        scheduled_datetime__lte=timezone.now() + eta_horizon()
+    )
+    if duty_assignment_ids is not None:
+        reminders = reminders.filter(duty_assignment_id__in=duty_assignment_ids)
+
+    armed = []
+    for reminder in reminders.only('id', 'scheduled_datetime'):
+        try:
+            result = send_reminder_task.apply_async(args=[reminder.id], eta=reminder.scheduled_datetime)
+        except Exception as e:
+            logger.warning(f"[Reminders] Could not enqueue ETA task for reminder {reminder.id}: {str(e)}")
+            break
+        reminder.eta_task_id = result.id
+        armed.append(reminder)
+    if armed:
+        Reminder.objects.bulk_update(armed, ['eta_task_id'], batch_size=500)
+        logger.info(f"[Reminders] Armed {len(armed)} ETA task(s)")
+    return len(armed)
+
+
+def revoke_eta_tasks(task_ids):
+    """Best effort: the task also re-checks the reminder's status when it runs."""
+    task_ids = [t for t in task_ids if t]
+    if not task_ids or not getattr(settings, 'CELERY_ENABLED', True):
+        return
+    try:
+        from celery import current_app
+        current_app.control.revoke(task_ids)
+    except Exception as e:
+        logger.warning(f"[Reminders] Could not revoke {len(task_ids)} ETA task(s): {str(e)}")
+
+
+def send_reminder(reminder_id):
+    """
+    ETA task body: claim one reminder (and, in digest mode, its same-day
+    siblings) if it is still due and unsent, then send the remaining
+    channels. Returns False when there was nothing to do.
+    """
+    now = timezone.now()
+    # A few seconds of slack for clock skew between beat/web and the worker
+    due_before = now + timedelta(seconds=5)
+    claimed = _due_reminders(due_before).filter(id=reminder_id).update(
+        status='PROCESSING', claimed_at=now
+    )
+    if not claimed:
+        return False
+    ids = [reminder_id]
+    siblings = _sibling_ids(ids, due_before)
+    if siblings:
+        # Siblings locked or claimed elsewhere are left alone
+        with transaction.atomic():
+            ids += list(
+                _sendable().filter(id__in=siblings).select_for_update(
+                    skip_locked=True
+                ).values_list('id', flat=True)
+            )
+            Reminder.objects.filter(id__in=ids[1:]).update(status='PROCESSING', claimed_at=now)
+
+    reminders = list(Reminder.objects.filter(id__in=ids).select_related(
+        'duty_assignment', 'duty_assignment__assigned_user'
+    ))
+    latency = _Latency()
+    writes = ReminderWriteBuffer()
+    for channel, targets in _send_jobs(reminders):
+        _send(channel, targets, latency, writes)
+    stats = {'completed': 0, 'failed': 0, 'retrying': 0}
+    _finish(reminders, writes, stats)
+    return True
+
+
+def reconcile_reminders():
+    """
+    Periodic sweep: arm reminders entering the ETA horizon, then send
+    stragglers whose ETA task never ran. Returns statistics.
+    """
+    grace = timedelta(seconds=getattr(settings, 'REMINDER_ETA_GRACE_SECONDS', 120))
+    release_stale_claims()
+    due_before = timezone.now() - grace
+    stragglers = count_due_reminders(due_before)
+    stats = {'stragglers': stragglers}
+    if stragglers:
+        logger.warning(f"[Reminders] {stragglers} reminder(s) missed their ETA task, dispatching")
+        stats['dispatch'] = dispatch_due_reminders(due_before=due_before)
+    stats['armed'] = arm_reminders()
+    return stats
@@ -0,0 +1,125 @@
+"""
+Reminder plan.
+
+Every duty gets one Reminder per active ReminderStage (admin: Reminder
+stages). A stage is anchored either to the evening send window of the day
+before (utils/send_window.py, spread under the per-minute budget) or to the
+duty's reporting time, plus `offset_minutes`, and names its channels (email,
+WhatsApp, Exotel call). All stages live in the one Reminder table and go
+through the one dispatcher (utils/reminder_dispatch.py), so adding e.g.
+"WhatsApp 30 minutes before reporting" is a new stage row, no code.
+
+Seeded stages: 'day-before' (window, email + WhatsApp) and 'call' (2 hours
+before reporting, call), matching the previous Reminder / DutyReminderCall
+behaviour. Changing a stage affects reminders planned after the change.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..models import Reminder, ReminderStage
+from .reporting import get_reporting_datetime
+from .send_window import send_times
+
+logger = logging.getLogger('registrations')
+
+
+def active_stages():
+    return list(ReminderStage.objects.filter(active=True))
+
+
+def stage_send_times(stage, assignments):
+    """
+    {assignment_id: send time} for a stage. Reporting-anchored stages skip
+    duties without a reporting time rule and duties already under way.
+    """
+    offset = timedelta(minutes=stage.offset_minutes)
+    planned = {}
+    if stage.anchor == ReminderStage.ANCHOR_WINDOW:
+        by_date = defaultdict(list)
+        for assignment in assignments:
+            by_date[assignment.duty_date].append(assignment.id)
+        for duty_date, assignment_ids in by_date.items():
+            for assignment_id, send_at in send_times(duty_date, assignment_ids).items():
+                planned[assignment_id] = send_at + offset
+        return planned
+
+    now = timezone.now()
+    for assignment in assignments:
+        reporting = get_reporting_datetime(assignment)
+        if reporting is None or reporting <= now:
+            continue
+        planned[assignment.id] = reporting + offset
+    return planned
+
+
+def _reset(reminder, stage, send_at):
+    """Reuse an existing reminder row for a reassigned slot."""
+    reminder.channels = stage.channels
+    reminder.scheduled_datetime = send_at
+    reminder.status = 'PENDING'
+    reminder.email_sent = False
+    reminder.whatsapp_sent = False
+    reminder.call_sent = False
+    reminder.email_attempts = 0
+    reminder.whatsapp_attempts = 0
+    reminder.call_attempts = 0
+    reminder.whatsapp_message_id = None
+    reminder.call_sid = None
+    reminder.call_status = 'none'
+    reminder.sent_at = None
+    reminder.last_error = ''
+    reminder.claimed_at = None
+    reminder.eta_task_id = None
+
+
+RESET_FIELDS = [
+    'channels', 'scheduled_datetime', 'status', 'email_sent', 'whatsapp_sent', 'call_sent',
+    'email_attempts', 'whatsapp_attempts', 'call_attempts', 'whatsapp_message_id', 'call_sid',
+    'call_status', 'sent_at', 'last_error', 'claimed_at', 'eta_task_id',
+]
+
+
+def plan_reminders(assignments, reset_ids=()):
+    """
+    Give each assignment a Reminder for every active stage. Existing reminders
+    of assignments in `reset_ids` (a slot that was reassigned) are rescheduled
+    from scratch; other existing reminders are left as they are, so planning
+    twice is harmless. Returns the number of reminders created or reset.
+    """
+    from .reminder_dispatch import revoke_eta_tasks
+
+    assignments = [a for a in assignments if a.assigned_user_id]
+    if not assignments:
+        return 0
+    existing = {
+        (r.duty_assignment_id, r.stage_id): r
+        for r in Reminder.objects.filter(duty_assignment_id__in=[a.id for a in assignments])
+    }
+
+    to_create, to_reset = [], []
+    for stage in active_stages():
+        needed = [a for a in assignments if (a.id, stage.id) not in existing or a.id in reset_ids]
+        for assignment_id, send_at in stage_send_times(stage, needed).items():
+            reminder = existing.get((assignment_id, stage.id))
+            if reminder is None:
+                to_create.append(Reminder(
+                    duty_assignment_id=assignment_id,
+                    stage=stage,
+                    channels=stage.channels,
+                    scheduled_datetime=send_at,
+                    status='PENDING'
+                ))
+            else:
+                revoke_eta_tasks([reminder.eta_task_id])
+                _reset(reminder, stage, send_at)
+                to_reset.append(reminder)
+
+    if to_reset:
+        Reminder.objects.bulk_update(to_reset, RESET_FIELDS, batch_size=500)
+    Reminder.objects.bulk_create(to_create, batch_size=500)
+    logger.info(f"[ReminderPlan] Planned {len(to_create)} new and {len(to_reset)} reset reminder(s) for {len(assignments)} duty(ies)")
+    return len(to_create) + len(to_reset)
@@ -0,0 +1,63 @@
+"""
+Buffered reminder writes.
+
+Each send attempt used to save its Reminder fields and create a ReminderLog
+row straight away (two or three round trips per channel). The senders now
+record those writes in a ReminderWriteBuffer instead; the dispatcher flushes
+it once per claimed batch with one bulk_update per set of changed fields and
+one bulk_create for the logs, together with the batch's final statuses.
+
+If a worker dies before the flush, the batch's attempt counters and logs are
+lost and its claims are released after REMINDER_CLAIM_TIMEOUT_SECONDS, as
+before: at most one batch is affected.
+"""
+
+import threading
+import logging
+
+from ..models import Reminder, ReminderLog
+
+logger = logging.getLogger('registrations')
+
+
+class ReminderWriteBuffer:
+    """Pending Reminder field updates and ReminderLog rows, shared by the sender threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reminders = {}
+        self._fields = {}
+        self._logs = []
+
+    def __len__(self):
+        with self._lock:
+            return len(self._reminders) + len(self._logs)
+
+    def update(self, reminder, *fields):
+        """Mark fields of `reminder` as changed; the values are read at flush time."""
+        with self._lock:
+            self._reminders[reminder.id] = reminder
+            self._fields.setdefault(reminder.id, set()).update(fields)
+
+    def log(self, reminder, channel, success, message):
+        with self._lock:
+            self._logs.append(ReminderLog(reminder_id=reminder.id, channel=channel, success=success, message=message))
+
+    def flush(self):
+        """Write everything recorded so far. Returns (reminders updated, logs created)."""
+        with self._lock:
+            reminders, fields, logs = self._reminders, self._fields, self._logs
+            self._reminders, self._fields, self._logs = {}, {}, []
+
+        # bulk_update takes one field list, so group reminders by what changed
+        groups = {}
+        for reminder_id, changed in fields.items():
+            groups.setdefault(tuple(sorted(changed)), []).append(reminders[reminder_id])
+        for changed, objs in groups.items():
+            Reminder.objects.bulk_update(objs, list(changed), batch_size=500)
+        if logs:
+            # A reminder deleted mid-send (its duty was removed) would fail the insert
+            alive = set(Reminder.objects.filter(id__in={l.reminder_id for l in logs}).values_list('id', flat=True))
+            logs = [l for l in logs if l.reminder_id in alive]
+            ReminderLog.objects.bulk_create(logs, batch_size=500)
+        return len(reminders), len(logs)
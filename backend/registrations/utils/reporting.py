@@ -1,46 +1,193 @@
+"""
+Reporting times.
+
+When a duty's volunteer has to report is configured in the DutySchedule
+table (admin: Duty schedules): a reporting time per namaaz type, optionally
+overridden for a single date. Each DutyAssignment stores the result as
+`reporting_at` (aware, indexed), computed on save and refreshed when the
+schedule changes, so consumers read one column and window queries
+("reporting in the next 3 hours") are an index range scan.
+
+DEFAULT_REPORTING_TIMES seeds the table and covers any namaaz type without
+a row:
+- Pre-Fajr (Sanah, Tajweed, Joshan, Yaseen): 04:30 AM
+- Fajar (Azaan, Takbira): 05:20 AM
+- Zohr/Ashar (Azaan, Takbira): 12:30 PM
+- Magrib/Isha (Azaan, Takbira): 05:40 PM
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta, time as clock
+
+import pytz
+
+logger = logging.getLogger('registrations')
+
+IST = pytz.timezone('Asia/Kolkata')
+
+PRE_FAJR = clock(4, 30)
+FAJAR = clock(5, 20)
+ZOHR = clock(12, 30)
+MAGRIB = clock(17, 40)
+
+DEFAULT_REPORTING_TIMES = {
+    'SANAH': PRE_FAJR,
+    'TAJWEED': PRE_FAJR,
+    'DUA_E_JOSHAN': PRE_FAJR,
+    'YASEEN': PRE_FAJR,
+    'JOSHAN': PRE_FAJR,
+    'TILAWAT': PRE_FAJR,
+    'FAJAR_AZAAN': FAJAR,
+    'FAJAR_TAKBIRA': FAJAR,
+    # Spelling variations of older rows
+    'ZOHR_AZAAN': ZOHR, 'ZOHAR_AZAAN': ZOHR,
+    'ZOHR_TAKBIRA': ZOHR, 'ZOHAR_TAKBIRA': ZOHR,
+    'ASHAR_AZAAN': ZOHR, 'ASAR_AZAAN': ZOHR,
+    'ASHAR_TAKBIRA': ZOHR, 'ASAR_TAKBIRA': ZOHR,
+    'MAGRIB_AZAAN': MAGRIB,
+    'MAGRIB_TAKBIRA': MAGRIB,
+    'ISHA_AZAAN': MAGRIB, 'ISHAA_AZAAN': MAGRIB,
+    'ISHA_TAKBIRA': MAGRIB, 'ISHAA_TAKBIRA': MAGRIB,
+}
+
+# The schedule is a few dozen rows; each process keeps a copy for a minute
+# (changes made in this process drop it at once, see signals.py)
+SCHEDULE_CACHE_SECONDS = 60
+_schedule = {'rows': None, 'loaded_at': 0.0}
+
+
+def load_schedule():
+    """{(namaaz_type, duty_date or None): reporting time} from DutySchedule."""
+    if _schedule['rows'] is None or time.monotonic() - _schedule['loaded_at'] > SCHEDULE_CACHE_SECONDS:
+        from ..models import DutySchedule
+        _schedule['rows'] = {
+            (namaaz_type, duty_date): reporting_time
+            for namaaz_type, duty_date, reporting_time in DutySchedule.objects.values_list(
+                'namaaz_type', 'duty_date', 'reporting_time'
+            )
+        }
+        _schedule['loaded_at'] = time.monotonic()
+    return _schedule['rows']
+
+
+def forget_schedule():
+    _schedule['rows'] = None
+
+
+def reporting_time_for(namaaz_type, duty_date=None):
+    """
+    Wall-clock (IST) reporting time of a namaaz type on a date: the date's
+    override, else the type's schedule row, else the built-in default.
+    """
+    namaaz_type = (namaaz_type or '').upper()
+    schedule = load_schedule()
+    if duty_date is not None and (namaaz_type, duty_date) in schedule:
+        return schedule[(namaaz_type, duty_date)]
+    if (namaaz_type, None) in schedule:
+        return schedule[(namaaz_type, None)]
+    return DEFAULT_REPORTING_TIMES.get(namaaz_type)
+
+
+def compute_reporting_at(namaaz_type, duty_date):
+    """Aware reporting datetime of a slot, or None when there is no rule."""
+    reporting_time = reporting_time_for(namaaz_type, duty_date)
+    if reporting_time is None or duty_date is None:
+        return None
+    return IST.localize(datetime.combine(duty_date, reporting_time))
+
+
+def get_reporting_datetime(assignment):
+    """
+    Aware reporting datetime of an assignment (its stored `reporting_at`),
+    or None when its namaaz type has no reporting time rule.
+    """
+    if assignment.reporting_at is not None:
+        return assignment.reporting_at
+    return compute_reporting_at(assignment.namaaz_type, assignment.duty_date)
+
+
 def get_reporting_time(assignment):
     """
-    Returns the reporting time string based on the assignment's namaaz type.
-    
-    Rules:
-    - Pre-Fajr (Sanah, Tajweed, Joshan, Yaseen): 04:30 AM
-    - Fajar (Azaan, Takbira): 05:20 AM
-    - Zohr/Ashar (Azaan, Takbira): 12:30 PM
-    - Magrib/Isha (Azaan, Takbira): 05:40 PM
-    """
-    
-    pre_fajr_khidmat = [
-        "SANAH",
-        "TAJWEED",
-        "DUA_E_JOSHAN",
-        "YASEEN",
-        "JOSHAN", # Added JOSHAN to match model choices
-        "TILAWAT", # Added TILAWAT to match model choices
-    ]
-
-    # Normalize to upper case just in case, though model choices are upper
-    namaaz_type = assignment.namaaz_type.upper()
-
-    if namaaz_type in pre_fajr_khidmat:
-        return "04:30 AM"
-
-    if namaaz_type in ["FAJAR_AZAAN", "FAJAR_TAKBIRA"]:
-        return "05:20 AM"
-
-    if namaaz_type in [
-        "ZOHR_AZAAN", "ZOHAR_AZAAN", # Handle potential spelling variations
-        "ZOHR_TAKBIRA", "ZOHAR_TAKBIRA",
-        "ASHAR_AZAAN", "ASAR_AZAAN",
-        "ASHAR_TAKBIRA", "ASAR_TAKBIRA"
-    ]:
-        return "12:30 PM"
-
-    if namaaz_type in [
-        "MAGRIB_AZAAN",
-        "MAGRIB_TAKBIRA",
-        "ISHA_AZAAN", "ISHAA_AZAAN",
-        "ISHA_TAKBIRA", "ISHAA_TAKBIRA"
-    ]:
-        return "05:40 PM"
-
-    return None
+    Returns the reporting time string (e.g. "04:30 AM") of an assignment.
+    An assignment without a date gets its namaaz type's default.
+    """
+    if assignment.duty_date is None:
+        reporting_time = reporting_time_for(assignment.namaaz_type)
+        return reporting_time.strftime("%I:%M %p") if reporting_time else None
+    reporting_at = get_reporting_datetime(assignment)
+    return reporting_at.astimezone(IST).strftime("%I:%M %p") if reporting_at else None
+
+
+def refresh_reporting_at(namaaz_type, duty_date=None):
+    """
+    Recompute `reporting_at` of the slots a schedule row covers (one date,
+    or every date of the type without its own override) and move their
+    pending reporting-anchored reminders. bulk_update skips the signals, so
+    status documents, live events and the roster grid are refreshed here.
+    Returns the number of duties changed.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from ..models import DutyAssignment
+    from .status_docs import schedule_status_rebuild
+    from .live_events import publish_events, duty_event_data
+    from .roster_grid import schedule_grid_refresh
+
+    forget_schedule()
+    assignments = DutyAssignment.objects.filter(namaaz_type=namaaz_type)
+    if duty_date is not None:
+        assignments = assignments.filter(duty_date=duty_date)
+    else:
+        overridden = [d for (t, d) in load_schedule() if t == namaaz_type and d is not None]
+        assignments = assignments.exclude(duty_date__in=overridden)
+
+    now = timezone.now()
+    changed = []
+    for assignment in assignments.select_related('assigned_user'):
+        reporting_at = compute_reporting_at(assignment.namaaz_type, assignment.duty_date)
+        if reporting_at != assignment.reporting_at:
+            assignment.reporting_at = reporting_at
+            # bulk_update skips auto_now; keep the /api/changes/ feed current
+            assignment.updated_at = now
+            changed.append(assignment)
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        DutyAssignment.objects.bulk_update(changed, ['reporting_at', 'updated_at'], batch_size=500)
+        moved = _move_reporting_reminders(changed)
+        # Run after commit
+        for registration_id in {a.assigned_user_id for a in changed if a.assigned_user_id}:
+            schedule_status_rebuild(registration_id)
+        publish_events([('duty.updated', duty_event_data(a)) for a in changed])
+        schedule_grid_refresh(*{a.duty_date for a in changed})
+
+    logger.info(
+        f"[Reporting] {namaaz_type} {duty_date or '(all dates)'}: re-timed {len(changed)} duty(ies) "
+        f"and {len(moved)} pending reminder(s)"
+    )
+    return len(changed)
+
+
+def _move_reporting_reminders(changed):
+    """Re-time the pending reporting-anchored reminders of re-timed duties. Returns them."""
+    from ..models import Reminder, ReminderStage
+    from .reminder_dispatch import revoke_eta_tasks
+
+    reporting = {a.id: a.reporting_at for a in changed}
+    moved = []
+    for reminder in Reminder.objects.filter(
+        duty_assignment_id__in=reporting,
+        status='PENDING',
+        stage__anchor=ReminderStage.ANCHOR_REPORTING
+    ).select_related('stage'):
+        if reporting[reminder.duty_assignment_id] is None:
+            continue
+        reminder.scheduled_datetime = reporting[reminder.duty_assignment_id] + timedelta(minutes=reminder.stage.offset_minutes)
+        moved.append(reminder)
+    revoke_eta_tasks([r.eta_task_id for r in moved])
+    for reminder in moved:
+        reminder.eta_task_id = None
+    Reminder.objects.bulk_update(moved, ['scheduled_datetime', 'eta_task_id'], batch_size=500)
+    return moved
@@ -0,0 +1,126 @@
+"""
+Materialized roster grid.
+
+`DutyAssignmentViewSet.grid` used to rebuild the whole grid from every
+DutyAssignment on each call. The grid is now stored per duty date in
+RosterGridSnapshot and refreshed after commit for just the date that
+changed, so serving a window costs one small query regardless of how many
+days are filled. The ETag is derived from an aggregate over the window's
+snapshot versions, so unchanged windows answer 304 with a single query.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from rest_framework import serializers
+
+from ..models import DutyAssignment, RosterGridSnapshot
+
+logger = logging.getLogger('registrations')
+
+_datetime_field = serializers.DateTimeField()
+
+# Registration fields copied into grid cells
+CELL_USER_FIELDS = {'full_name', 'its_number', 'email', 'phone_number'}
+# DutyAssignment fields that appear in grid cells
+CELL_ASSIGNMENT_FIELDS = {'duty_date', 'namaaz_type', 'assigned_user', 'assigned_user_id', 'locked', 'locked_at'}
+
+
+def build_cell(assignment):
+    """Same cell shape the grid endpoint has always returned."""
+    user = assignment.assigned_user
+    return {
+        'id': assignment.id,
+        'user_id': user.id if user else None,
+        'user_name': user.full_name if user else None,
+        'user_its': user.its_number if user else None,
+        'user_email': user.email if user else None,
+        'user_phone': user.phone_number if user else None,
+        'locked': assignment.locked,
+        'locked_at': _datetime_field.to_representation(assignment.locked_at) if assignment.locked_at else None,
+    }
+
+
+def refresh_grid_dates(duty_dates):
+    """Rebuild the snapshots for the given dates (at most one row per namaaz type each)."""
+    duty_dates = set(duty_dates)
+    missing = duty_dates - set(
+        RosterGridSnapshot.objects.filter(duty_date__in=duty_dates).values_list('duty_date', flat=True)
+    )
+    if missing:
+        RosterGridSnapshot.objects.bulk_create([
+            RosterGridSnapshot(duty_date=duty_date, cells={}, version=0) for duty_date in missing
+        ], ignore_conflicts=True)
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock first, read after: concurrent refreshes of a date queue up here,
+        # so the last writer always saw the latest assignments
+        snapshots = list(RosterGridSnapshot.objects.select_for_update().filter(duty_date__in=duty_dates))
+
+        cells = {duty_date: {} for duty_date in duty_dates}
+        for a in DutyAssignment.objects.filter(duty_date__in=duty_dates).select_related('assigned_user'):
+            cells[a.duty_date][a.namaaz_type] = build_cell(a)
+
+        for snapshot in snapshots:
+            snapshot.cells = cells[snapshot.duty_date]
+            snapshot.version += 1
+            snapshot.updated_at = now
+        RosterGridSnapshot.objects.bulk_update(snapshots, ['cells', 'version', 'updated_at'])
+
+
+def schedule_grid_refresh(*duty_dates):
+    """Refresh the given dates after the current transaction commits."""
+    dates = {d for d in duty_dates if d}
+    if not dates:
+        return
+
+    def _refresh():
+        try:
+            refresh_grid_dates(dates)
+        except Exception as e:
+            logger.error(f"[Grid] Snapshot refresh failed for {sorted(dates)}: {str(e)}")
+
+    transaction.on_commit(_refresh)
+
+
+def schedule_grid_refresh_for_user(registration_id):
+    """A registrant's name/ITS/contact changed: refresh the dates they hold."""
+    dates = DutyAssignment.objects.filter(
+        assigned_user_id=registration_id
+    ).values_list('duty_date', flat=True).distinct()
+    schedule_grid_refresh(*dates)
+
+
+def _window(date_from=None, date_to=None):
+    snapshots = RosterGridSnapshot.objects.all()
+    if date_from:
+        snapshots = snapshots.filter(duty_date__gte=date_from)
+    if date_to:
+        snapshots = snapshots.filter(duty_date__lte=date_to)
+    return snapshots
+
+
+def grid_etag(date_from=None, date_to=None):
+    """Weak ETag for a window: changes whenever any snapshot in it is refreshed."""
+    agg = _window(date_from, date_to).aggregate(count=Count('id'), versions=Sum('version'))
+    return f'W/"grid-{date_from or ""}-{date_to or ""}-{agg["count"]}-{agg["versions"] or 0}"'
+
+
+def get_grid(date_from=None, date_to=None):
+    """{iso_date: {namaaz_type: cell}} for the window; empty dates are omitted."""
+    return {
+        duty_date.isoformat(): cells
+        for duty_date, cells in _window(date_from, date_to).values_list('duty_date', 'cells')
+        if cells
+    }
+
+
+def rebuild_grid():
+    """Rebuild every snapshot from DutyAssignment (repair / backfill)."""
+    dates = set(DutyAssignment.objects.values_list('duty_date', flat=True).distinct())
+    dates |= set(RosterGridSnapshot.objects.values_list('duty_date', flat=True))
+    refresh_grid_dates(dates)
+    return len(dates)
@@ -0,0 +1,182 @@
+"""
+Reminder send windows.
+
+Reminders for a duty date go out the evening before, spread over
+REMINDER_WINDOW_START..REMINDER_WINDOW_END (IST) instead of all at one
+minute, so WhatsApp, SMTP and the Meta rate limits see a flat curve.
+
+- Each assignment gets a deterministic jitter (a hash of its id), so the
+  same assignment always lands on the same minute and re-planning is stable.
+- At most REMINDER_SEND_BUDGET_PER_MINUTE reminders share a minute (0 = no
+  limit); a reminder whose minute is full moves to the next free one, past
+  the window end if the whole window is full.
+- A window whose end is before its start (e.g. 23:45-00:15) runs past
+  midnight into the duty date itself.
+- Only window-anchored reminder stages (utils/reminder_plan.py) use it.
+- The schedule is written to Reminder.scheduled_datetime when reminders are
+  created, so `load_curve()` (GET /api/reminders/schedule/) shows the real
+  load before the day.
+"""
+
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+
+from ..models import Reminder, ReminderStage
+
+logger = logging.getLogger('registrations')
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def _clock(value, default):
+    try:
+        hour, minute = (int(part) for part in str(value).split(':'))
+        time(hour, minute)
+        return hour, minute
+    except (TypeError, ValueError):
+        logger.warning(f"[SendWindow] Invalid window time {value!r}, using {default[0]:02d}:{default[1]:02d}")
+        return default
+
+
+def window_bounds(duty_date):
+    """(start, end) of the send window for a duty date: from the previous day, IST."""
+    day = duty_date - timedelta(days=1)
+    start = _clock(getattr(settings, 'REMINDER_WINDOW_START', '17:30'), (17, 30))
+    end = _clock(getattr(settings, 'REMINDER_WINDOW_END', '18:30'), (18, 30))
+    start_dt = IST.localize(datetime.combine(day, time(*start)))
+    end_dt = IST.localize(datetime.combine(day, time(*end)))
+    if end_dt < start_dt:
+        # Crosses midnight
+        end_dt += timedelta(days=1)
+    return start_dt, end_dt
+
+
+def budget_per_minute():
+    return getattr(settings, 'REMINDER_SEND_BUDGET_PER_MINUTE', 20)
+
+
+def jitter(assignment_id):
+    """Stable fraction in [0, 1) for an assignment."""
+    digest = hashlib.sha256(f"reminder:{assignment_id}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def _window_minutes(start, end):
+    return max(int((end - start).total_seconds() // 60), 1)
+
+
+def preferred_send_time(duty_date, assignment_id):
+    """Jittered time inside the window, ignoring the budget."""
+    start, end = window_bounds(duty_date)
+    if end == start:
+        return start
+    return start + timedelta(seconds=int(jitter(assignment_id) * (end - start).total_seconds()))
+
+
+def _minute_load(start, exclude_assignment_ids=()):
+    """Reminders already scheduled per minute offset from `start` (next 24h)."""
+    taken = Reminder.objects.filter(
+        stage__anchor=ReminderStage.ANCHOR_WINDOW,
+        status__in=['PENDING', 'PROCESSING'],
+        scheduled_datetime__gte=start,
+        scheduled_datetime__lt=start + timedelta(days=1)
+    ).exclude(duty_assignment_id__in=exclude_assignment_ids).values_list('scheduled_datetime', flat=True)
+    return Counter(int((t - start).total_seconds() // 60) for t in taken)
+
+
+def plan_send_times(duty_date, assignment_ids, load=None):
+    """
+    {assignment_id: send time} for reminders of one duty date, honouring the
+    per-minute budget on top of `load` (minute offset -> already scheduled).
+    """
+    start, end = window_bounds(duty_date)
+    minutes = _window_minutes(start, end)
+    budget = budget_per_minute()
+    load = Counter(load or {})
+
+    planned = {}
+    overflow = 0
+    for assignment_id in sorted(assignment_ids, key=lambda a: (jitter(a), a)):
+        position = jitter(assignment_id) * minutes if end > start else 0
+        minute = int(position)
+        if budget:
+            while load[minute] >= budget:
+                minute += 1
+        if minute >= minutes and end > start:
+            overflow += 1
+        if minute == int(position):
+            second = int((position - minute) * 60)
+        else:
+            # Moved: take the next evenly spaced slot in that minute
+            second = load[minute] * 60 // budget
+        load[minute] += 1
+        planned[assignment_id] = start + timedelta(minutes=minute, seconds=second)
+
+    if overflow:
+        logger.warning(
+            f"[SendWindow] {overflow} reminder(s) for {duty_date} spill past the window end "
+            f"({budget}/min over {minutes} min)"
+        )
+    return planned
+
+
+def send_times(duty_date, assignment_ids):
+    """Plan new reminders for a duty date around what is already scheduled."""
+    start, _ = window_bounds(duty_date)
+    return plan_send_times(duty_date, assignment_ids, _minute_load(start, exclude_assignment_ids=assignment_ids))
+
+
+def replan_date(duty_date):
+    """
+    Re-spread the PENDING reminders of a duty date (after changing the window
+    or budget). Moved reminders lose their ETA task. Returns how many moved.
+    """
+    from .reminder_dispatch import revoke_eta_tasks
+
+    reminders = list(Reminder.objects.filter(
+        status='PENDING', duty_assignment__duty_date=duty_date
+    ).select_related('stage').filter(stage__anchor=ReminderStage.ANCHOR_WINDOW))
+    start, _ = window_bounds(duty_date)
+    load = _minute_load(start, exclude_assignment_ids=[r.duty_assignment_id for r in reminders])
+    planned = plan_send_times(duty_date, [r.duty_assignment_id for r in reminders], load)
+
+    moved = []
+    for reminder in reminders:
+        send_at = planned[reminder.duty_assignment_id] + timedelta(minutes=reminder.stage.offset_minutes)
+        if reminder.scheduled_datetime != send_at:
+            revoke_eta_tasks([reminder.eta_task_id])
+            reminder.scheduled_datetime = send_at
+            reminder.eta_task_id = None
+            moved.append(reminder)
+    if moved:
+        Reminder.objects.bulk_update(moved, ['scheduled_datetime', 'eta_task_id'])
+    return len(moved)
+
+
+def load_curve(duty_date):
+    """Per-minute reminder count for a duty date's window, from the stored schedule."""
+    start, end = window_bounds(duty_date)
+    budget = budget_per_minute()
+    # Keyed by the whole minute (not HH:MM) so a window past midnight stays in order
+    counts = Counter(
+        t.astimezone(IST).replace(second=0, microsecond=0)
+        for t in Reminder.objects.filter(
+            duty_assignment__duty_date=duty_date,
+            stage__anchor=ReminderStage.ANCHOR_WINDOW
+        ).exclude(status='CANCELLED').values_list('scheduled_datetime', flat=True)
+    )
+    return {
+        'duty_date': duty_date.isoformat(),
+        'window_start': start.isoformat(),
+        'window_end': end.isoformat(),
+        'budget_per_minute': budget,
+        'total': sum(counts.values()),
+        'peak_per_minute': max(counts.values(), default=0),
+        'over_budget_minutes': [m.strftime('%H:%M') for m in sorted(counts) if budget and counts[m] > budget],
+        'minutes': [{'minute': m.strftime('%H:%M'), 'count': counts[m]} for m in sorted(counts)],
+    }
@@ -0,0 +1,204 @@
+"""
+Precomputed public status documents (khidmat/status.php lookups).
+
+One JSON document per registration, holding everything the public ITS
+search returns. Documents are rebuilt after commit whenever the
+registration, its duty assignments, khidmat requests or audition files
+change, and are stored twice:
+- Redis (`registrations:status:<its>`): zero-query hot path
+- StatusDocument table: one-query fallback when the Redis copy is missing
+
+Audition files are stored by storage name and signed at serve time, so a
+cached document never hands out an expired link.
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+
+from ..models import Registration, DutyAssignment, KhidmatRequest, StatusDocument
+from .redis_client import get_redis
+from .reporting import get_reporting_time
+
+logger = logging.getLogger('registrations')
+
+DOC_KEY = 'registrations:status:{}'
+METRICS_KEY = 'registrations:status:metrics'
+MISSING = '__missing__'
+
+
+def _doc_ttl():
+    return getattr(settings, 'STATUS_DOCUMENT_TTL', 24 * 3600)
+
+
+def _status_queryset():
+    return Registration.objects.prefetch_related(
+        Prefetch(
+            'duty_assignments',
+            queryset=DutyAssignment.objects.all().prefetch_related(
+                Prefetch(
+                    'requests',
+                    queryset=KhidmatRequest.objects.filter(status='pending'),
+                    to_attr='pending_requests'
+                )
+            )
+        ),
+        'audition_files'
+    )
+
+
+def build_status_document(registration):
+    """Same payload as the public search, minus signed URLs."""
+    duties = []
+    for duty in registration.duty_assignments.all():
+        display_name = duty.get_namaaz_type_display()
+        # Split "Fajar Azaan" into ["Fajar", "Azaan"]
+        parts = display_name.split(' ')
+        pending_request = getattr(duty, 'pending_requests', [])
+
+        duties.append({
+            "id": duty.id,
+            "date": duty.duty_date.strftime('%d/%m/%Y'),
+            "namaaz": parts[0] if len(parts) > 0 else display_name,
+            "type": parts[1] if len(parts) > 1 else "",
+            "request_status": pending_request[0].status if pending_request else None,
+            "request_type": pending_request[0].request_type if pending_request else None,
+            "reporting_time": get_reporting_time(duty)
+        })
+
+    audition_files = [{
+        "id": f.id,
+        "file": f.audition_file_path.name if f.audition_file_path else "",
+        "type": f.audition_file_type,
+        "name": f.audition_display_name
+    } for f in registration.audition_files.all()]
+
+    return {
+        "full_name": registration.full_name,
+        "its_number": registration.its_number,
+        "register_for": registration.get_preference_display(),
+        "status": registration.status,
+        "duties": duties,
+        "audition_files": audition_files
+    }
+
+
+def rebuild_status_document(registration_id):
+    """Recompute and store the document for one registration. Returns it (or None)."""
+    registration = _status_queryset().filter(pk=registration_id).first()
+    if registration is None:
+        return None
+
+    document = build_status_document(registration)
+    previous_its = StatusDocument.objects.filter(
+        registration_id=registration_id
+    ).values_list('its_number', flat=True).first()
+    StatusDocument.objects.update_or_create(
+        registration_id=registration_id,
+        defaults={'its_number': registration.its_number, 'document': document}
+    )
+
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.set(DOC_KEY.format(registration.its_number), json.dumps(document), ex=_doc_ttl())
+            if previous_its and previous_its != registration.its_number:
+                pipe.delete(DOC_KEY.format(previous_its))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[StatusDoc] Redis write failed for {registration.its_number}: {str(e)}")
+    return document
+
+
+def schedule_status_rebuild(registration_id):
+    """Rebuild after the current transaction commits (immediately outside one)."""
+    if not registration_id:
+        return
+
+    def _rebuild():
+        try:
+            rebuild_status_document(registration_id)
+        except Exception as e:
+            logger.error(f"[StatusDoc] Rebuild failed for registration {registration_id}: {str(e)}")
+
+    transaction.on_commit(_rebuild)
+
+
+def forget_status_document(its_number):
+    """Drop the Redis copy (the table row goes with the registration via CASCADE)."""
+    r = get_redis()
+    if r is not None and its_number:
+        try:
+            r.delete(DOC_KEY.format(its_number))
+        except Exception as e:
+            logger.warning(f"[StatusDoc] Redis delete failed for {its_number}: {str(e)}")
+
+
+def _record(r, tier):
+    if r is not None:
+        try:
+            r.hincrby(METRICS_KEY, tier, 1)
+        except Exception:
+            pass
+
+
+def get_status_document(its_number):
+    """
+    Returns the document for `its_number` or None.
+    Lookup order: Redis (0 queries) -> StatusDocument (1 query) -> live build.
+    Unknown ITS numbers are negatively cached for STATUS_DOCUMENT_MISSING_TTL.
+    """
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = r.get(DOC_KEY.format(its_number))
+        except Exception as e:
+            logger.warning(f"[StatusDoc] Redis read failed: {str(e)}")
+            raw, r = None, None
+        if raw == MISSING:
+            _record(r, 'negative_hits')
+            return None
+        if raw:
+            _record(r, 'redis_hits')
+            return json.loads(raw)
+
+    document = StatusDocument.objects.filter(its_number=its_number).values_list('document', flat=True).first()
+    if document is not None:
+        _record(r, 'table_hits')
+        if r is not None:
+            try:
+                r.set(DOC_KEY.format(its_number), json.dumps(document), ex=_doc_ttl())
+            except Exception:
+                pass
+        return document
+
+    _record(r, 'misses')
+    registration_id = Registration.objects.filter(its_number=its_number).values_list('id', flat=True).first()
+    if registration_id is None:
+        if r is not None:
+            try:
+                r.set(DOC_KEY.format(its_number), MISSING, ex=getattr(settings, 'STATUS_DOCUMENT_MISSING_TTL', 60))
+            except Exception:
+                pass
+        return None
+    return rebuild_status_document(registration_id)
+
+
+def get_status_metrics():
+    """Hit/miss counters since the metrics were last reset."""
+    counters = {'redis_hits': 0, 'table_hits': 0, 'negative_hits': 0, 'misses': 0}
+    r = get_redis()
+    if r is not None:
+        try:
+            counters.update({k: int(v) for k, v in r.hgetall(METRICS_KEY).items()})
+        except Exception as e:
+            logger.warning(f"[StatusDoc] Redis metrics read failed: {str(e)}")
+
+    total = sum(counters.values())
+    counters['total'] = total
+    counters['hit_rate'] = round((total - counters['misses']) / total, 4) if total else None
+    return counters
@@ -0,0 +1,229 @@
+"""
+Resumable audition upload helpers.
+
+Upload sessions (AuditionUpload) stream each chunk straight to a spool file
+on disk, so worker memory stays flat no matter how large the file is.
+A finished upload is hashed when it is completed and attached to a
+Registration by hard-linking the spool into the blob store after commit,
+which keeps the registration transaction short.
+"""
+
+import os
+import uuid
+import shutil
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import AuditionUpload
+from .blobs import store_local_file, create_audition_file, hash_file
+
+logger = logging.getLogger('registrations')
+
+# Shared with the legacy multipart path in RegistrationViewSet.create
+MAX_AUDITION_FILES = 6
+MAX_AUDITION_FILE_SIZE = 15 * 1024 * 1024  # 15MB
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when a chunk or an attach request cannot be applied."""
+    pass
+
+
+def parse_upload_id(value):
+    """Canonical form of an upload id. Raises UploadError when it is not a UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise UploadError(f"Invalid upload id: {str(value)[:64]}")
+
+
+def parse_upload_ids(values):
+    """Upload ids from form or JSON data (a list, or a single id). Raises UploadError."""
+    if not values:
+        return []
+    if isinstance(values, (str, uuid.UUID)):
+        values = [values]
+    if not isinstance(values, (list, tuple)):
+        raise UploadError("upload_ids must be a list of upload ids.")
+    return [parse_upload_id(value) for value in values if value]
+
+
+def get_spool_dir():
+    spool_dir = getattr(
+        settings, 'AUDITION_UPLOAD_SPOOL_DIR',
+        os.path.join(settings.MEDIA_ROOT, 'uploads_tmp')
+    )
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+def spool_path(upload):
+    return os.path.join(get_spool_dir(), f"{upload.id}.part")
+
+
+def append_chunk(upload_id, stream, offset, length):
+    """
+    Append one chunk to an upload session.
+
+    The request body is first copied to a private temp file (no locks held
+    while a slow client is still sending), then the session row is locked,
+    the offset is checked and the chunk is appended to the spool.
+
+    Returns the refreshed AuditionUpload.
+    """
+    max_chunk = getattr(settings, 'AUDITION_UPLOAD_CHUNK_MAX_SIZE', 5 * 1024 * 1024)
+    if length <= 0:
+        raise UploadError("Empty chunk.")
+    if length > max_chunk:
+        raise UploadError(f"Chunk exceeds {max_chunk} bytes.")
+
+    fd, part_path = tempfile.mkstemp(dir=get_spool_dir(), suffix='.chunk')
+    try:
+        received = 0
+        with os.fdopen(fd, 'wb') as part:
+            while received < length:
+                block = stream.read(min(COPY_BUFFER_SIZE, length - received))
+                if not block:
+                    break
+                part.write(block)
+                received += len(block)
+
+        if received != length:
+            raise UploadError(f"Incomplete chunk: expected {length} bytes, got {received}.")
+
+        with transaction.atomic():
+            upload = AuditionUpload.objects.select_for_update().get(pk=upload_id)
+
+            if upload.status != 'UPLOADING':
+                raise UploadError("Upload is already complete.")
+            if offset != upload.received_bytes:
+                raise UploadError(f"Offset mismatch: expected {upload.received_bytes}, got {offset}.")
+            if upload.received_bytes + length > upload.total_size:
+                raise UploadError("Chunk exceeds declared file size.")
+
+            path = spool_path(upload)
+            mode = 'r+b' if os.path.exists(path) else 'wb'
+            with open(part_path, 'rb') as part, open(path, mode) as spool:
+                # Drop any tail left behind by an earlier append that failed mid-write
+                spool.truncate(upload.received_bytes)
+                spool.seek(upload.received_bytes)
+                shutil.copyfileobj(part, spool, COPY_BUFFER_SIZE)
+
+            upload.received_bytes += length
+            upload.save(update_fields=['received_bytes', 'updated_at'])
+            return upload
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def _check_complete(upload):
+    on_disk = os.path.getsize(spool_path(upload)) if os.path.exists(spool_path(upload)) else 0
+    if upload.received_bytes != upload.total_size or on_disk != upload.total_size:
+        raise UploadError(
+            f"Upload incomplete: {upload.received_bytes}/{upload.total_size} bytes received."
+        )
+
+
+def complete_upload(upload_id, expected_sha256=None):
+    """
+    Mark an upload as complete once every byte has arrived, recording its
+    digest. A full spool accepts no more chunks, so it is hashed before the
+    row is locked.
+
+    When the client sends the SHA-256 it computed and it does not match, the
+    session is rewound to offset 0 so the file can be sent again.
+    """
+    upload = AuditionUpload.objects.get(pk=upload_id)
+    if upload.status != 'UPLOADING':
+        return upload
+    _check_complete(upload)
+    digest = hash_file(spool_path(upload))
+
+    with transaction.atomic():
+        upload = AuditionUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != 'UPLOADING':
+            return upload
+        _check_complete(upload)
+
+        mismatch = bool(expected_sha256) and expected_sha256.lower() != digest
+        if mismatch:
+            # The next chunk truncates the spool back to received_bytes
+            upload.received_bytes = 0
+            upload.save(update_fields=['received_bytes', 'updated_at'])
+        else:
+            upload.status = 'COMPLETE'
+            upload.sha256 = digest
+            upload.save(update_fields=['status', 'sha256', 'updated_at'])
+
+    if mismatch:
+        logger.warning(f"[Upload] Session {upload.id} failed its checksum, restarting")
+        raise UploadError("Checksum mismatch: the upload was discarded, send it again from offset 0.")
+    logger.info(f"[Upload] Session {upload.id} complete ({upload.total_size} bytes)")
+    return upload
+
+
+def attach_uploads(registration, upload_ids):
+    """
+    Attach completed upload sessions to a registration.
+    Must be called inside the registration transaction.
+
+    The spool file (hashed on completion) is linked into the content-addressed
+    blob store (see utils/blobs.py) and unlinked after commit; a rolled back
+    registration leaves it in place and can simply be retried with the same
+    upload ids.
+    """
+    upload_ids = parse_upload_ids(upload_ids)
+    if not upload_ids:
+        return []
+
+    uploads = list(
+        AuditionUpload.objects.select_for_update().filter(pk__in=upload_ids, status='COMPLETE')
+    )
+    if len(uploads) != len(set(upload_ids)):
+        raise UploadError("One or more uploads are missing, incomplete or already attached.")
+
+    attached = []
+    for upload in uploads:
+        src = spool_path(upload)
+        # Sessions completed before digests were recorded are hashed here
+        blob = store_local_file(src, upload.filename, digest=upload.sha256 or None)
+        audition = create_audition_file(registration, blob, upload.filename)
+
+        upload.status = 'ATTACHED'
+        upload.audition_file = audition
+        upload.save(update_fields=['status', 'audition_file', 'updated_at'])
+
+        transaction.on_commit(lambda path=src: os.path.exists(path) and os.remove(path))
+        attached.append(audition)
+
+    logger.info(f"[Upload] Attached {len(attached)} upload(s) to registration {registration.id}")
+    return attached
+
+
+def cleanup_stale_uploads():
+    """
+    Remove abandoned sessions and their spool files.
+    Attached sessions have already released their spool and only the row is removed.
+    """
+    expiry_hours = getattr(settings, 'AUDITION_UPLOAD_EXPIRY_HOURS', 24)
+    cutoff = timezone.now() - timedelta(hours=expiry_hours)
+
+    stale = AuditionUpload.objects.filter(updated_at__lt=cutoff)
+    removed = 0
+    for upload in stale.exclude(status='ATTACHED').iterator():
+        path = spool_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+        removed += 1
+
+    deleted, _ = stale.delete()
+    logger.info(f"[Upload] Cleaned up {deleted} stale upload session(s), {removed} spool file(s)")
+    return {'deleted': deleted, 'spools_removed': removed}
@@ -9,6 +9,11 @@ It allows for:
 
 Architecture:
 - Internal helper `_send_template_message` handles the raw API call with robust logging and error handling.
+- Requests go through the pooled per-process session in `whatsapp_client.py` (shared with vajebaat).
+- Every message passes the outbound gateway (`whatsapp_gateway.py`): a shared send rate, and
+  reminders ahead of confirmations ahead of bulk notices (`TEMPLATE_PRIORITIES`).
+  Under backpressure the result has `"busy": True`; nothing was sent and the caller may retry.
+  A lost gateway reply (`GatewayNoReply`) is reported like a read timeout: it may have been sent.
 - Public wrapper functions (`send_duty_allotment`, etc.) strictly define the parameters and templates.
 
 Configuration:
@@ -23,13 +28,14 @@ Usage:
 
 """
 
-import requests
 import logging
 import json
 from typing import Dict, Any, Optional, List
-from django.conf import settings
 from requests.exceptions import Timeout, ConnectionError, RequestException
 
+from .whatsapp_client import whatsapp_config, post_message
+from .whatsapp_gateway import GatewayBusy, PRIORITY_REMINDER, PRIORITY_CONFIRMATION, PRIORITY_BULK
+
 # Configure Logger to use the 'registrations' logger defined in settings
 logger = logging.getLogger("registrations")
 
@@ -52,6 +58,13 @@ TEMPLATE_CANCELLATION_APPROVED = "cancellation_approved_v1"
 
 LANGUAGE_CODE = "en"  # Default Language
 
+# Gateway priority per template (others: PRIORITY_CONFIRMATION)
+TEMPLATE_PRIORITIES = {
+    TEMPLATE_DUTY_REMINDER: PRIORITY_REMINDER,
+    # Sent in bursts by bulk assignment and roster publishing
+    TEMPLATE_DUTY_ALLOTMENT: PRIORITY_BULK,
+}
+
 def _mask_phone_number(phone: str) -> str:
     """
     Masks phone number for logging privacy.
@@ -67,15 +80,52 @@ def _mask_phone_number(phone: str) -> str:
 
 from .phone import normalize_phone_number
 
+# Body parameters each template expects
+TEMPLATE_PARAM_COUNTS = {
+    TEMPLATE_DUTY_ALLOTMENT: 4,
+    TEMPLATE_DUTY_REMINDER: 4,
+    TEMPLATE_REGISTRATION_RECEIVED: 2,
+    TEMPLATE_CORRECTION_REQ_V1: 4,
+    TEMPLATE_CORRECTION_DONE_V1: 1,
+    TEMPLATE_REALLOCATION_REQ: 3,
+    TEMPLATE_REALLOCATION_APPROVED: 4,
+    TEMPLATE_CANCELLATION_REQ: 3,
+    TEMPLATE_CANCELLATION_APPROVED: 3,
+}
+
+
+def _clean_param(v):
+    """Meta Restriction: No newlines, no >4 consecutive spaces"""
+    if v is None: return ""
+    return " ".join(str(v).replace('\n', ' ').replace('\r', ' ').split())
+
+
+def build_template_payload(normalized_to: str, template_name: str, parameters: List[str]) -> Dict[str, Any]:
+    """Cloud API body of a template message (parameters sanitized)."""
+    return {
+        "messaging_product": "whatsapp",
+        "to": normalized_to,
+        "type": "template",
+        "template": {
+            "name": template_name,
+            "language": {"code": LANGUAGE_CODE},
+            "components": [
+                {
+                    "type": "body",
+                    "parameters": [{"type": "text", "text": _clean_param(p)} for p in parameters]
+                }
+            ]
+        }
+    }
+
+
 def _send_template_message(phone: str, template_name: str, parameters: List[str]) -> Dict[str, Any]:
     """
     Internal helper to send a WhatsApp template message.
     ...
     """
     # 1. Configuration & Setup
-    api_version = getattr(settings, "WHATSAPP_API_VERSION", "v24.0")
-    phone_id = getattr(settings, "WHATSAPP_PHONE_NUMBER_ID", None)
-    access_token = getattr(settings, "WHATSAPP_ACCESS_TOKEN", None)
+    phone_id, access_token, _ = whatsapp_config()
     
     if not phone_id or not access_token:
         logger.critical("[WhatsApp] CRITICAL: Missing WHATSAPP_PHONE_NUMBER_ID or WHATSAPP_ACCESS_TOKEN in settings.")
@@ -97,51 +147,11 @@ def _send_template_message(phone: str, template_name: str, parameters: List[str]
             "response": {"error": f"Invalid Phone Number: {str(e)}"}
         }
 
-    url = f"https://graph.facebook.com/{api_version}/{phone_id}/messages"
-    
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-
     # 2. Build Payload
-    # 1. Sanitize Parameters (Meta Restriction: No newlines, no >4 consecutive spaces)
-    def clean_p(v):
-        if v is None: return ""
-        return " ".join(str(v).replace('\n', ' ').replace('\r', ' ').split())
-
-    component_parameters = [{"type": "text", "text": clean_p(p)} for p in parameters]
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": normalized_to,
-        "type": "template",
-        "template": {
-            "name": template_name,
-            "language": {"code": LANGUAGE_CODE},
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": component_parameters
-                }
-            ]
-        }
-    }
+    payload = build_template_payload(normalized_to, template_name, parameters)
 
     # 2.5 Validation: Parameter Count Check
-    TEMPLATE_PARAMS_CHECK = {
-        TEMPLATE_DUTY_ALLOTMENT: 4,
-        TEMPLATE_DUTY_REMINDER: 4,
-        TEMPLATE_REGISTRATION_RECEIVED: 2,
-        TEMPLATE_CORRECTION_REQ_V1: 4,
-        TEMPLATE_CORRECTION_DONE_V1: 1,
-        TEMPLATE_REALLOCATION_REQ: 3,
-        TEMPLATE_REALLOCATION_APPROVED: 4,
-        TEMPLATE_CANCELLATION_REQ: 3,
-        TEMPLATE_CANCELLATION_APPROVED: 3,
-    }
-
-    expected_count = TEMPLATE_PARAMS_CHECK.get(template_name)
+    expected_count = TEMPLATE_PARAM_COUNTS.get(template_name)
     if expected_count is not None and len(parameters) != expected_count:
         err_msg = f"[WhatsApp] Parameter mismatch for '{template_name}': Expected {expected_count}, got {len(parameters)}"
         logger.error(err_msg)
@@ -154,14 +164,13 @@ def _send_template_message(phone: str, template_name: str, parameters: List[str]
     # 3. Log Request (Masked)
     masked_phone = _mask_phone_number(normalized_to)
     logger.info(f"[WhatsApp] Sending '{template_name}' to {masked_phone} with params: {parameters}")
-    logger.debug(f"[WhatsApp] Request URL: {url}")
     # Do NOT log the full payload if it contains sensitive info, but here params are usually safe-ish.
     # We will log it for debug purposes but be careful in high security environments.
     logger.debug(f"[WhatsApp] Payload: {json.dumps(payload)}")
 
     # 4. Execute Request
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = post_message(payload, priority=TEMPLATE_PRIORITIES.get(template_name, PRIORITY_CONFIRMATION))
         
         try:
             response_data = response.json()
@@ -196,8 +205,19 @@ def _send_template_message(phone: str, template_name: str, parameters: List[str]
 
             raise WhatsAppAPIException(f"Meta API Error {status_code}: {error_msg}")
 
-    except Timeout:
-        logger.error(f"[WhatsApp] ⚠️ Timeout (10s) sending to {masked_phone}")
+    except GatewayBusy as e:
+        logger.warning(f"[WhatsApp] Gateway busy, '{template_name}' to {masked_phone} not sent: {str(e)}")
+        return {
+            "success": False,
+            "busy": True,
+            "status_code": 429,
+            "message_id": None,
+            "response": {"error": str(e)}
+        }
+
+    except Timeout as e:
+        # Includes GatewayNoReply: the message may have been sent, never retried as busy
+        logger.error(f"[WhatsApp] ⚠️ Timeout sending to {masked_phone}: {str(e)}")
         return {
             "success": False,
             "status_code": 408, # Request Timeout
@@ -319,9 +339,7 @@ def _send_text_message(phone: str, text: str) -> Dict[str, Any]:
     """
     Send a plain text WhatsApp message (non-template). Used for admin alerts.
     """
-    api_version = getattr(settings, "WHATSAPP_API_VERSION", "v24.0")
-    phone_id = getattr(settings, "WHATSAPP_PHONE_NUMBER_ID", None)
-    access_token = getattr(settings, "WHATSAPP_ACCESS_TOKEN", None)
+    phone_id, access_token, _ = whatsapp_config()
 
     if not phone_id or not access_token:
         logger.critical("[WhatsApp] CRITICAL: Missing WHATSAPP_PHONE_NUMBER_ID or WHATSAPP_ACCESS_TOKEN in settings.")
@@ -333,8 +351,6 @@ def _send_text_message(phone: str, text: str) -> Dict[str, Any]:
         logger.error(f"[WhatsApp] Invalid phone number: {_mask_phone_number(str(phone))} - {str(e)}")
         return {"success": False, "status_code": None, "response": {"error": f"Invalid Phone Number: {str(e)}"}}
 
-    url = f"https://graph.facebook.com/{api_version}/{phone_id}/messages"
-    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
     payload = {
         "messaging_product": "whatsapp",
         "to": normalized_to,
@@ -346,7 +362,7 @@ def _send_text_message(phone: str, text: str) -> Dict[str, Any]:
     logger.info(f"[WhatsApp] Sending text message to {masked_phone}")
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
+        resp = post_message(payload)
         try:
             data = resp.json()
         except ValueError:
@@ -360,6 +376,10 @@ def _send_text_message(phone: str, text: str) -> Dict[str, Any]:
             logger.error(f"[WhatsApp] ❌ Text API Error: {resp.status_code} | Response: {data}")
             return {"success": False, "status_code": resp.status_code, "response": data}
 
+    except GatewayBusy as e:
+        logger.warning(f"[WhatsApp] Gateway busy, text to {masked_phone} not sent: {str(e)}")
+        return {"success": False, "busy": True, "status_code": 429, "response": {"error": str(e)}}
+
     except Exception as e:
         logger.exception(f"[WhatsApp] Text send failed: {str(e)}")
         return {"success": False, "status_code": 500, "response": {"error": str(e)}}
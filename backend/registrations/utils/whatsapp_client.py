@@ -0,0 +1,106 @@
+"""
+Shared HTTP client for the Meta WhatsApp Cloud API.
+
+Every WhatsApp message (registrations/utils/whatsapp.py and
+vajebaat/notifications.py) goes through one requests.Session per process,
+so a reminder batch reuses kept-alive TLS connections to graph.facebook.com
+instead of paying a handshake per message. The session carries the auth
+headers and a connection pool sized for the dispatcher's sender threads
+(WHATSAPP_HTTP_POOL_SIZE).
+
+Retries only cover failures where Meta cannot have sent the message:
+connection errors and 429 / 503 answers (honouring Retry-After), up to
+WHATSAPP_HTTP_RETRIES times. Read timeouts are never retried, since the
+message may already be on its way.
+
+Sessions are not shared across fork(): a Celery prefork child builds its own
+on first use.
+
+post_message() hands the message to the outbound gateway (whatsapp_gateway.py),
+which applies the shared send rate and priorities before send_now() posts it.
+"""
+
+import os
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('registrations')
+
+GRAPH_API_URL = "https://graph.facebook.com"
+
+_session = {'pid': None, 'token': None, 'session': None}
+_lock = threading.Lock()
+
+
+def whatsapp_config():
+    """(phone number id, access token, API version); id/token are None when not configured."""
+    return (
+        getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', None),
+        getattr(settings, 'WHATSAPP_ACCESS_TOKEN', None),
+        getattr(settings, 'WHATSAPP_API_VERSION', 'v24.0'),
+    )
+
+
+def _build_session(access_token):
+    retries = getattr(settings, 'WHATSAPP_HTTP_RETRIES', 2)
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=[429, 503],
+        allowed_methods=['POST'],
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = getattr(settings, 'WHATSAPP_HTTP_POOL_SIZE', 10)
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+    session.headers.update({
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json",
+    })
+    return session
+
+
+def get_session():
+    """This process's WhatsApp session (rebuilt after a fork or a token change)."""
+    _, access_token, _ = whatsapp_config()
+    pid = os.getpid()
+    current = _session
+    if current['session'] is not None and current['pid'] == pid and current['token'] == access_token:
+        return current['session']
+    with _lock:
+        if _session['session'] is None or _session['pid'] != pid or _session['token'] != access_token:
+            if _session['session'] is not None and _session['pid'] == pid:
+                _session['session'].close()
+            _session.update(pid=pid, token=access_token, session=_build_session(access_token))
+            logger.debug(f"[WhatsApp] New HTTP session for process {pid}")
+        return _session['session']
+
+
+def send_now(payload, timeout):
+    """POST a message payload to the phone number's /messages endpoint, bypassing the gateway."""
+    phone_id, _, api_version = whatsapp_config()
+    return get_session().post(f"{GRAPH_API_URL}/{api_version}/{phone_id}/messages", json=payload, timeout=timeout)
+
+
+def post_message(payload, timeout=None, priority=None):
+    """
+    Send a message payload through the outbound gateway (rate limit and
+    priority, see whatsapp_gateway.py). Raises requests exceptions like
+    requests.post, GatewayBusy under backpressure; call only when configured.
+    """
+    from .whatsapp_gateway import submit, PRIORITY_CONFIRMATION
+
+    timeout = timeout or (
+        getattr(settings, 'WHATSAPP_CONNECT_TIMEOUT', 3.05),
+        getattr(settings, 'WHATSAPP_READ_TIMEOUT', 10),
+    )
+    return submit(payload, timeout, priority or PRIORITY_CONFIRMATION)
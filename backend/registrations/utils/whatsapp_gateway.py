@@ -0,0 +1,450 @@
+"""
+Outbound WhatsApp gateway.
+
+Every Meta Cloud API message (whatsapp_client.post_message) passes through
+here, so one rate limit and one order apply to all senders: reminders,
+registration / correction / khidmat confirmations, allotment notices and
+Vajebaat.
+
+- Rate: a token bucket in Redis shared by all processes, refilled at
+  WHATSAPP_SEND_RATE messages per second up to WHATSAPP_SEND_BURST, sized
+  to the account's Meta throughput tier.
+- Order: while a gateway process is running (manage.py run_whatsapp_gateway)
+  callers push their message onto a Redis list per priority and wait for
+  the result; the gateway's sender threads pop the lists in PRIORITIES
+  order, so reminders go ahead of confirmations ahead of bulk notices.
+- Backpressure: a caller is refused at once when its priority's list holds
+  WHATSAPP_GATEWAY_MAX_QUEUE messages, and gives up when its message was
+  not picked up within WHATSAPP_GATEWAY_WAIT_SECONDS. Both raise
+  GatewayBusy; the gateway never sends a message after its deadline, so
+  the caller can safely retry later.
+- Once the gateway has picked a message up it may have been sent: a
+  missing reply (gateway died, Redis lost) raises GatewayNoReply, a
+  requests.Timeout, and callers treat it like a read timeout.
+
+Without a running gateway callers send themselves, still taking tokens from
+the shared bucket (a per-process bucket without Redis); priorities then do
+not apply.
+
+Sent / failed / throttled counts per priority and minute feed
+gateway_stats() (GET /api/whatsapp/gateway/).
+"""
+
+import json
+import time
+import uuid
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .redis_client import get_redis, reset_redis
+
+logger = logging.getLogger('registrations')
+
+PRIORITY_REMINDER = 'reminder'
+PRIORITY_CONFIRMATION = 'confirmation'
+PRIORITY_BULK = 'bulk'
+# Highest first
+PRIORITIES = (PRIORITY_REMINDER, PRIORITY_CONFIRMATION, PRIORITY_BULK)
+
+QUEUE_PREFIX = 'registrations:whatsapp:outbox:'
+REPLY_PREFIX = 'registrations:whatsapp:reply:'
+BUCKET_KEY = 'registrations:whatsapp:bucket'
+HEARTBEAT_KEY = 'registrations:whatsapp:gateway'
+STATS_PREFIX = 'registrations:whatsapp:stats:'
+
+HEARTBEAT_SECONDS = 10
+STATS_RETENTION_SECONDS = 2 * 60 * 60
+# Redis commands on the shared client time out after 2 s; block for less
+POLL_SECONDS = 1
+
+OUTCOMES = ('sent', 'failed', 'throttled', 'busy', 'expired', 'unknown')
+
+# Refill, then take a token if there is one. Returns the seconds until the
+# next token ("0" when one was taken).
+BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 60)
+return tostring(wait)
+"""
+
+
+class GatewayBusy(requests.RequestException):
+    """The message was not sent: queue full or no send slot in time. Safe to retry."""
+
+
+class GatewayNoReply(requests.Timeout):
+    """The gateway picked the message up but no result came back: it may have been sent."""
+
+
+def queue_key(priority):
+    return f"{QUEUE_PREFIX}{priority}"
+
+
+def send_rate():
+    """(messages per second, burst)."""
+    rate = max(0.1, float(getattr(settings, 'WHATSAPP_SEND_RATE', 20)))
+    return rate, max(1, int(getattr(settings, 'WHATSAPP_SEND_BURST', 20)))
+
+
+class _LocalBucket:
+    """Per-process token bucket, used without Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._ts = None
+
+    def take(self):
+        rate, burst = send_rate()
+        with self._lock:
+            now = time.monotonic()
+            if self._tokens is None:
+                self._tokens, self._ts = burst, now
+            self._tokens = min(burst, self._tokens + (now - self._ts) * rate)
+            self._ts = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+
+_local_bucket = _LocalBucket()
+
+
+def try_take_token():
+    """Seconds to wait for a token (0: taken)."""
+    r = get_redis()
+    if r is not None:
+        rate, burst = send_rate()
+        try:
+            return float(r.eval(BUCKET_SCRIPT, 1, BUCKET_KEY, rate, burst, time.time()))
+        except Exception as e:
+            reset_redis()
+            logger.warning(f"[WhatsAppGateway] Shared rate limit unavailable, limiting per process: {str(e)}")
+    return _local_bucket.take()
+
+
+def take_token(deadline):
+    """Wait for a send token until `deadline` (time.time()). False when none came in time."""
+    while True:
+        wait = try_take_token()
+        if wait <= 0:
+            return True
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        time.sleep(min(wait, remaining))
+
+
+def record_outcome(priority, outcome):
+    """Count a send outcome (OUTCOMES) for gateway_stats()."""
+    r = get_redis()
+    if r is None:
+        return
+    key = f"{STATS_PREFIX}{int(time.time() // 60)}"
+    try:
+        pipe = r.pipeline()
+        pipe.hincrby(key, f"{priority}:{outcome}", 1)
+        pipe.expire(key, STATS_RETENTION_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[WhatsAppGateway] Could not record send stats: {str(e)}")
+
+
+def _post(payload, timeout, priority):
+    """Send now and record the outcome. Raises requests exceptions."""
+    from .whatsapp_client import send_now
+
+    try:
+        response = send_now(payload, timeout)
+    except requests.RequestException:
+        record_outcome(priority, 'failed')
+        raise
+    if response.status_code in (200, 201):
+        record_outcome(priority, 'sent')
+    elif response.status_code == 429:
+        # Meta throttled us despite the bucket: WHATSAPP_SEND_RATE is too high
+        record_outcome(priority, 'throttled')
+        logger.warning("[WhatsAppGateway] Meta answered 429; consider lowering WHATSAPP_SEND_RATE")
+    else:
+        record_outcome(priority, 'failed')
+    return response
+
+
+def _reply_wait(timeout):
+    """Seconds a sent message may take in the gateway (request, retries and backoff)."""
+    retries = getattr(settings, 'WHATSAPP_HTTP_RETRIES', 2)
+    return sum(timeout) * (retries + 1) + retries * 2 + 5
+
+
+# --- Callers ---
+
+def queued_ahead(priority):
+    """Messages queued at a higher priority than `priority` (0 without Redis)."""
+    r = get_redis()
+    if r is None:
+        return 0
+    try:
+        return sum(r.llen(queue_key(p)) for p in PRIORITIES[:PRIORITIES.index(priority)])
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[WhatsAppGateway] Queue depth check failed: {str(e)}")
+        return 0
+
+
+def gateway_running(r=None):
+    r = r or get_redis()
+    if r is None:
+        return False
+    try:
+        return bool(r.exists(HEARTBEAT_KEY))
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[WhatsAppGateway] Heartbeat check failed: {str(e)}")
+        return False
+
+
+def _send_direct(payload, timeout, priority, deadline):
+    if not take_token(deadline):
+        record_outcome(priority, 'busy')
+        raise GatewayBusy("No WhatsApp send slot free in time")
+    return _post(payload, timeout, priority)
+
+
+def _to_response(reply):
+    """requests.Response (or raised exception) for a gateway reply."""
+    if reply.get('expired'):
+        raise GatewayBusy("WhatsApp gateway did not pick up the message in time")
+    error = reply.get('error')
+    if error == 'timeout':
+        raise requests.Timeout(reply.get('detail'))
+    if error == 'connection':
+        raise requests.ConnectionError(reply.get('detail'))
+    if error:
+        raise requests.RequestException(reply.get('detail'))
+    response = requests.Response()
+    response.status_code = reply['status_code']
+    response._content = reply['content'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = reply.get('content_type') or 'application/json'
+    return response
+
+
+def submit(payload, timeout, priority=PRIORITY_CONFIRMATION):
+    """
+    Send a message through the gateway (or directly when none is running)
+    and return the requests.Response. Raises GatewayBusy under backpressure
+    (not sent) and GatewayNoReply when the outcome is unknown.
+    """
+    priority = priority if priority in PRIORITIES else PRIORITY_CONFIRMATION
+    deadline = time.time() + getattr(settings, 'WHATSAPP_GATEWAY_WAIT_SECONDS', 30)
+    r = get_redis()
+    if r is None or not gateway_running(r):
+        return _send_direct(payload, timeout, priority, deadline)
+
+    job_id = uuid.uuid4().hex
+    key = queue_key(priority)
+    job = json.dumps({
+        'id': job_id, 'priority': priority, 'payload': payload,
+        'timeout': list(timeout), 'deadline': deadline,
+    })
+    try:
+        if r.llen(key) >= getattr(settings, 'WHATSAPP_GATEWAY_MAX_QUEUE', 2000):
+            record_outcome(priority, 'busy')
+            raise GatewayBusy(f"WhatsApp {priority} queue is full")
+        r.rpush(key, job)
+    except GatewayBusy:
+        raise
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[WhatsAppGateway] Could not queue message, sending directly: {str(e)}")
+        return _send_direct(payload, timeout, priority, deadline)
+
+    give_up = None
+    try:
+        while give_up is None or time.time() < give_up:
+            item = r.blpop(REPLY_PREFIX + job_id, timeout=POLL_SECONDS)
+            if item is not None:
+                return _to_response(json.loads(item[1]))
+            if give_up is None and time.time() >= deadline:
+                if r.lrem(key, 1, job):
+                    # Still queued: withdrawn, never sent
+                    record_outcome(priority, 'busy')
+                    raise GatewayBusy(f"WhatsApp {priority} queue did not move in time")
+                # Picked up: the gateway is sending it
+                give_up = deadline + _reply_wait(timeout)
+    except requests.RequestException:
+        raise
+    except Exception as e:
+        reset_redis()
+        # The job may have been picked up and sent meanwhile
+        raise GatewayNoReply(f"Lost the WhatsApp gateway reply: {str(e)}")
+    record_outcome(priority, 'unknown')
+    raise GatewayNoReply("No reply from the WhatsApp gateway; the message may have been sent")
+
+
+# --- Gateway process ---
+
+def _process(job):
+    """Send one queued message. Returns the reply for its caller."""
+    priority = job.get('priority', PRIORITY_CONFIRMATION)
+    if time.time() >= job['deadline'] or not take_token(job['deadline']):
+        # The caller has given up (or is about to); it retries later
+        record_outcome(priority, 'expired')
+        return {'expired': True}
+    try:
+        response = _post(job['payload'], tuple(job['timeout']), priority)
+    except requests.Timeout as e:
+        return {'error': 'timeout', 'detail': str(e)}
+    except requests.ConnectionError as e:
+        return {'error': 'connection', 'detail': str(e)}
+    except requests.RequestException as e:
+        return {'error': 'request', 'detail': str(e)}
+    return {
+        'status_code': response.status_code,
+        'content': response.text,
+        'content_type': response.headers.get('Content-Type'),
+    }
+
+
+def _serve(stop):
+    """Sender thread: pop the highest-priority message, send it, reply."""
+    keys = [queue_key(priority) for priority in PRIORITIES]
+    while not stop.is_set():
+        r = get_redis()
+        if r is None:
+            stop.wait(POLL_SECONDS)
+            continue
+        try:
+            # BLPOP checks the keys in order: highest priority first
+            item = r.blpop(keys, timeout=POLL_SECONDS)
+        except Exception as e:
+            reset_redis()
+            logger.warning(f"[WhatsAppGateway] Queue read failed: {str(e)}")
+            stop.wait(POLL_SECONDS)
+            continue
+        if item is None:
+            continue
+
+        try:
+            job = json.loads(item[1])
+            reply = _process(job)
+        except Exception as e:
+            logger.exception(f"[WhatsAppGateway] Could not send queued message: {str(e)}")
+            continue
+        try:
+            pipe = r.pipeline()
+            pipe.rpush(REPLY_PREFIX + job['id'], json.dumps(reply))
+            pipe.expire(REPLY_PREFIX + job['id'], 60)
+            pipe.execute()
+        except Exception as e:
+            reset_redis()
+            logger.error(f"[WhatsAppGateway] Could not reply for message {job['id']}: {str(e)}")
+
+
+def run_gateway(threads=None, stop=None):
+    """
+    Serve the outbound queues with `threads` sender threads until `stop` is
+    set. Several gateway processes may run; they share the bucket.
+    """
+    threads = threads or getattr(settings, 'WHATSAPP_GATEWAY_THREADS', 8)
+    stop = stop or threading.Event()
+    workers = [
+        threading.Thread(target=_serve, args=(stop,), name=f'whatsapp-gateway-{i}', daemon=True)
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"[WhatsAppGateway] Started with {threads} sender thread(s) at {send_rate()[0]} msg/s")
+    try:
+        while not stop.is_set():
+            r = get_redis()
+            if r is not None:
+                try:
+                    r.set(HEARTBEAT_KEY, timezone.now().isoformat(), ex=HEARTBEAT_SECONDS)
+                except Exception as e:
+                    reset_redis()
+                    logger.warning(f"[WhatsAppGateway] Heartbeat failed: {str(e)}")
+            stop.wait(HEARTBEAT_SECONDS / 3)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        logger.info("[WhatsAppGateway] Stopped")
+
+
+# --- Metrics ---
+
+def gateway_stats(minutes=5):
+    """Queue depth, bucket level and send counts of the last `minutes` minutes."""
+    rate, burst = send_rate()
+    stats = {
+        'redis': False,
+        'gateway_running': False,
+        'rate_limit': {'per_second': rate, 'burst': burst, 'tokens': None},
+        'queues': {priority: None for priority in PRIORITIES},
+        'window_minutes': minutes,
+        'by_priority': {priority: dict.fromkeys(OUTCOMES, 0) for priority in PRIORITIES},
+        'last_minute': dict.fromkeys(OUTCOMES, 0),
+        'sent_per_second': 0.0,
+    }
+    r = get_redis()
+    if r is None:
+        return stats
+
+    now_minute = int(time.time() // 60)
+    try:
+        pipe = r.pipeline()
+        pipe.exists(HEARTBEAT_KEY)
+        pipe.hmget(BUCKET_KEY, 'tokens', 'ts')
+        for priority in PRIORITIES:
+            pipe.llen(queue_key(priority))
+        for minute in range(now_minute - minutes + 1, now_minute + 1):
+            pipe.hgetall(f"{STATS_PREFIX}{minute}")
+        results = pipe.execute()
+    except Exception as e:
+        reset_redis()
+        logger.warning(f"[WhatsAppGateway] Could not read stats: {str(e)}")
+        return stats
+
+    stats['redis'] = True
+    stats['gateway_running'] = bool(results[0])
+    tokens, ts = results[1]
+    if tokens is not None:
+        level = float(tokens) + max(0.0, time.time() - float(ts)) * rate
+        stats['rate_limit']['tokens'] = round(min(burst, level), 1)
+    for priority, depth in zip(PRIORITIES, results[2:2 + len(PRIORITIES)]):
+        stats['queues'][priority] = depth
+
+    minute_counts = results[2 + len(PRIORITIES):]
+    for index, counts in enumerate(minute_counts):
+        for field, value in counts.items():
+            priority, _, outcome = field.partition(':')
+            if priority in stats['by_priority'] and outcome in OUTCOMES:
+                stats['by_priority'][priority][outcome] += int(value)
+                if index == len(minute_counts) - 1:
+                    stats['last_minute'][outcome] += int(value)
+
+    # The current minute is partial: average over the elapsed time
+    elapsed = (minutes - 1) * 60 + (time.time() % 60)
+    sent = sum(counts['sent'] for counts in stats['by_priority'].values())
+    stats['sent_per_second'] = round(sent / elapsed, 2) if elapsed else 0.0
+    return stats
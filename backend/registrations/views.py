@@ -7,29 +7,71 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db import transaction
-from django.db.models import Prefetch
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views import View
+from urllib.parse import quote
+import hmac
 import logging
+import mimetypes
+import os
+import re
+import time
 
 from .models import (
-    Registration, AuditionFile, DutyAssignment, 
-    UnlockLog, Reminder, ReminderLog, KhidmatRequest, RegistrationCorrection
+    Registration, AuditionFile, AuditionUpload, DutyAssignment, 
+    UnlockLog, Reminder, ReminderLog, ReminderArchive, KhidmatRequest, RegistrationCorrection, AllotmentDraft,
+    Broadcast
 )
 from .serializers import (
-    RegistrationSerializer, RegistrationCreateSerializer,
-    AuditionFileSerializer, DutyAssignmentSerializer,
-    DutyAssignmentCreateSerializer, UnlockSerializer,
-    UnlockLogSerializer, ReminderSerializer, ReminderLogSerializer,
-    KhidmatRequestSerializer, RegistrationCorrectionSerializer
+    RegistrationSerializer, RegistrationCreateSerializer, RegistrationIntakeSerializer,
+    AuditionFileSerializer, AuditionUploadSerializer, DutyAssignmentSerializer,
+    DutyAssignmentCreateSerializer, DutyAssignmentCellSerializer, DutyAssignmentBulkSerializer,
+    UnlockSerializer, UnlockLogSerializer, ReminderSerializer, ReminderLogSerializer, ReminderArchiveSerializer,
+    KhidmatRequestSerializer, RegistrationCorrectionSerializer,
+    AllotmentDraftSerializer, AllotmentDraftCreateSerializer,
+    BroadcastSerializer, BroadcastCreateSerializer
 )
 from .utils import (
     create_reminder_for_assignment, cancel_reminders_for_assignment,
     safe_task_delay, get_reporting_time
 )
+from .utils.uploads import (
+    UploadError, append_chunk, complete_upload, attach_uploads, parse_upload_id, parse_upload_ids,
+    MAX_AUDITION_FILES, MAX_AUDITION_FILE_SIZE
+)
+from .utils.blobs import save_audition_upload
+from .utils.intake import intake_enabled, enqueue_submission, get_submission_status
+from .utils.changes import (
+    CursorError, CursorExpired, collect_changes, decode_cursor, encode_cursor
+)
+from .utils.status_docs import get_status_document, get_status_metrics
+from .utils.roster_grid import get_grid, grid_etag
+from .utils.bulk_assign import bulk_assign
+from .utils.occupancy import find_conflicts
+from .utils.send_window import load_curve
+from .utils.allotment import AllotmentError, create_draft, publish_draft
+from .utils.broadcast import (
+    BroadcastError, create_broadcast, resume_broadcast, cancel_broadcast, describe_audiences
+)
+from .utils.call_status import enqueue_call_status
+from .utils.whatsapp_gateway import gateway_stats
+from .utils.live_events import (
+    InvalidStreamTicket, issue_stream_ticket, read_stream_ticket, open_subscription, event_stream
+)
+from .utils.signed_media import (
+    InvalidMediaToken, unsign_media_token, signed_media_url, parse_range, iter_file_range
+)
 from .tasks import sync_to_sheets_task
 from .tasks import send_registration_confirmation_task
-from django.contrib.auth import authenticate
+from django.contrib.auth import authenticate, get_user_model
+from asgiref.sync import sync_to_async
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
@@ -63,6 +105,199 @@ class MeView(APIView):
         })
 
 
+class ChangesView(APIView):
+    """
+    Delta-sync feed for admin clients.
+
+    GET /api/changes/                 -> {"cursor": ...} (take a cursor, then do the full load)
+    GET /api/changes/?since=<cursor>  -> rows created/updated since the cursor, plus deleted ids
+
+    Responds 410 when the cursor is older than the tombstone retention window,
+    and sets "full_resync" when more rows changed than CHANGES_MAX_ROWS;
+    in both cases the client should reload everything.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    SERIALIZERS = {
+        'registrations': RegistrationSerializer,
+        'duty_assignments': DutyAssignmentSerializer,
+        'khidmat_requests': KhidmatRequestSerializer,
+        'corrections': RegistrationCorrectionSerializer,
+    }
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if not since:
+            return Response({'cursor': encode_cursor(timezone.now())})
+
+        try:
+            cursor, rows, deleted, truncated = collect_changes(decode_cursor(since))
+        except CursorError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired as e:
+            return Response({'error': str(e), 'full_resync': True}, status=status.HTTP_410_GONE)
+
+        if truncated:
+            return Response({'cursor': cursor, 'full_resync': True})
+
+        context = {'request': request}
+        payload = {'cursor': cursor, 'full_resync': False, 'deleted': deleted}
+        for key, serializer_class in self.SERIALIZERS.items():
+            payload[key] = serializer_class(rows[key], many=True, context=context).data
+        return Response(payload)
+
+
+class EventTicketView(APIView):
+    """
+    POST /api/events/ticket/ -> short-lived ticket for opening /api/events/
+    (EventSource cannot send the JWT header).
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        return Response({
+            'ticket': issue_stream_ticket(request.user),
+            'expires_in': getattr(settings, 'EVENTS_TICKET_TTL', 60),
+        })
+
+
+class EventStreamView(View):
+    """
+    Server-Sent Events stream of roster / request changes for admin dashboards
+    (see utils/live_events.py). GET /api/events/?ticket=<ticket>
+
+    Async so an open stream costs an event-loop task rather than a worker;
+    serve it from ASGI workers.
+    """
+
+    async def get(self, request):
+        try:
+            user_id = read_stream_ticket(request.GET.get('ticket', ''))
+        except InvalidStreamTicket as e:
+            return HttpResponse(str(e), status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+
+        is_admin = await sync_to_async(
+            get_user_model().objects.filter(pk=user_id, is_active=True, is_staff=True).exists
+        )()
+        if not is_admin:
+            return HttpResponse('Forbidden', status=status.HTTP_403_FORBIDDEN, content_type='text/plain')
+
+        subscription = await open_subscription()
+        if subscription is None:
+            return HttpResponse('Live updates unavailable', status=status.HTTP_503_SERVICE_UNAVAILABLE, content_type='text/plain')
+
+        response = StreamingHttpResponse(event_stream(*subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ExotelCallStatusView(APIView):
+    """
+    Exotel StatusCallback for reminder calls (see utils/call_status.py).
+    POST /api/exotel/call-status/?token=<EXOTEL_CALLBACK_TOKEN>
+
+    Only queues the outcome; it is applied in batches.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        token = getattr(settings, 'EXOTEL_CALLBACK_TOKEN', '')
+        if not token or not hmac.compare_digest(request.query_params.get('token', ''), token):
+            return Response({'error': 'Invalid token'}, status=status.HTTP_403_FORBIDDEN)
+
+        call_sid = request.data.get('CallSid')
+        call_status = request.data.get('Status') or request.data.get('CallStatus')
+        if not call_sid or not call_status:
+            return Response({'error': 'CallSid and Status are required'}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue_call_status(call_sid, call_status)
+        return Response({'status': 'queued'})
+
+
+class WhatsAppGatewayView(APIView):
+    """
+    Outbound WhatsApp gateway metrics (see utils/whatsapp_gateway.py).
+    GET /api/whatsapp/gateway/?minutes=5
+
+    Queue depth per priority, the shared bucket's level, and sent / failed /
+    throttled / busy / expired counts over the last `minutes` (1-120).
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get('minutes', 5))
+        except ValueError:
+            return Response({'error': 'minutes must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= minutes <= 120:
+            return Response({'error': 'minutes must be between 1 and 120'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(gateway_stats(minutes))
+
+
+class SignedMediaView(View):
+    """
+    Serves audition media behind short-lived signed URLs (see utils/signed_media.py).
+
+    With MEDIA_SENDFILE_BACKEND set, the response only carries an
+    X-Accel-Redirect / X-Sendfile header and the web server streams the
+    bytes (including Range requests). Otherwise the file is streamed here
+    with single-range support.
+    """
+
+    def get(self, request, token, filename=None):
+        try:
+            name, expires_at = unsign_media_token(token)
+        except InvalidMediaToken as e:
+            return HttpResponse(str(e), status=status.HTTP_403_FORBIDDEN, content_type='text/plain')
+
+        try:
+            path = default_storage.path(name)
+        except SuspiciousFileOperation:
+            return HttpResponse('Invalid media link', status=status.HTTP_403_FORBIDDEN, content_type='text/plain')
+        if not os.path.isfile(path):
+            raise Http404('Media not found')
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        max_age = max(int(expires_at - time.time()), 0)
+        backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', '')
+
+        if backend == 'nginx':
+            response = HttpResponse(content_type=content_type)
+            prefix = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name.replace(os.sep, '/'))
+        elif backend in ('apache', 'lighttpd'):
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = path
+        else:
+            response = self._stream(request, path, content_type)
+
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = f'private, max-age={max_age}'
+        response['Content-Disposition'] = f'inline; filename="{os.path.basename(name)}"'
+        return response
+
+    def _stream(self, request, path, content_type):
+        size = os.path.getsize(path)
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response['Content-Length'] = size
+            return response
+
+        start, end = byte_range
+        response = StreamingHttpResponse(iter_file_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        return response
+
+
 class RegistrationViewSet(viewsets.ModelViewSet):
     """
     API endpoint for user registrations.
@@ -76,6 +311,8 @@ class RegistrationViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         if self.action == 'search':
             return [AllowAny()]
+        if self.action == 'intake_status':
+            return [AllowAny()]
         return [IsAuthenticated(), IsAdminUser()]
     
     def get_serializer_class(self):
@@ -91,6 +328,11 @@ class RegistrationViewSet(viewsets.ModelViewSet):
         Heavy lifting (Notifications, Sheets) moved to Celery via on_commit.
         """
         try:
+            # 0. Intake mode: queue the submission and answer immediately.
+            # Raw multipart files still take the direct path below.
+            if intake_enabled() and not request.FILES:
+                return self._enqueue_intake(request)
+
             # 1. Fast Validation
             its_number = request.data.get('its_number')
             if its_number and Registration.objects.filter(its_number=its_number).exists():
@@ -108,27 +350,41 @@ class RegistrationViewSet(viewsets.ModelViewSet):
             
             # 3. Handle Files (Sync Save but minimal meta)
             files = request.FILES.getlist('audition_files') or request.FILES.getlist('media_files')
+            # Files pre-uploaded through /api/audition-uploads/ are referenced by id
+            try:
+                upload_ids = parse_upload_ids(
+                    request.data.getlist('upload_ids') if hasattr(request.data, 'getlist') else request.data.get('upload_ids', [])
+                )
+            except UploadError as e:
+                transaction.set_rollback(True)
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
             # Validation: Max 6 files
-            if files and len(files) > 6:
+            if len(files) + len(upload_ids) > MAX_AUDITION_FILES:
                 transaction.set_rollback(True)
                 return Response(
-                    {'error': 'Maximum 6 audition files allowed'},
+                    {'error': f'Maximum {MAX_AUDITION_FILES} audition files allowed'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             # Validation & Saving Loop
             for f in files:
                 # Max 15MB (15 * 1024 * 1024 bytes)
-                if f.size > 15 * 1024 * 1024:
+                if f.size > MAX_AUDITION_FILE_SIZE:
                     transaction.set_rollback(True)
                     return Response(
                         {'error': f'File {f.name} exceeds 15MB limit.'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Use .create() instead of bulk_create to ensure file storage works
-                AuditionFile.objects.create(registration=registration, audition_file_path=f)
+                # Stored once per SHA-256 digest; identical recordings share a blob
+                save_audition_upload(registration, f)
+
+            try:
+                attach_uploads(registration, upload_ids)
+            except UploadError as e:
+                transaction.set_rollback(True)
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
             # 4. Schedule Background Tasks
             def schedule_registration_tasks():
@@ -154,6 +410,38 @@ class RegistrationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def _enqueue_intake(self, request):
+        """
+        Validate fields only and append the submission to the intake queue.
+        The batch drainer creates the Registration; poll the status URL for the outcome.
+        """
+        serializer = RegistrationIntakeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = dict(serializer.validated_data)
+        upload_ids = data.pop('upload_ids', [])
+        tracking_id = enqueue_submission(data, upload_ids)
+
+        return Response({
+            'tracking_id': tracking_id,
+            'status': 'QUEUED',
+            'status_url': request.build_absolute_uri(
+                reverse('registration-intake-status', kwargs={'tracking_id': tracking_id})
+            ),
+            'message': 'Registration received'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='intake/(?P<tracking_id>[0-9a-fA-F-]{36})')
+    def intake_status(self, request, tracking_id=None):
+        """
+        Status of a queued submission: QUEUED, COMMITTED (with registration_id) or REJECTED (with error).
+        """
+        result = get_submission_status(tracking_id)
+        if result is None:
+            return Response({'error': 'Unknown tracking id'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
     @action(detail=True, methods=['get'])
     def auditions(self, request, pk=None):
         """
@@ -161,7 +449,10 @@ class RegistrationViewSet(viewsets.ModelViewSet):
         """
         registration = self.get_object()
         auditions = registration.audition_files.all().order_by('-uploaded_at')
-        serializer = AuditionFileSerializer(auditions, many=True)
+        serializer = AuditionFileSerializer(auditions, many=True, context={
+            'request': request,
+            'original': request.query_params.get('original') in ('1', 'true')
+        })
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
@@ -175,78 +466,29 @@ class RegistrationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            # Optimize with prefetch for duties and their pending requests
-            registration = Registration.objects.prefetch_related(
-                Prefetch(
-                    'duty_assignments',
-                    queryset=DutyAssignment.objects.all().prefetch_related(
-                        Prefetch(
-                            'requests',
-                            queryset=KhidmatRequest.objects.filter(status='pending'),
-                            to_attr='pending_requests'
-                        )
-                    )
-                ),
-                'audition_files'
-            ).get(its_number=its_number)
-            
-            assignments = registration.duty_assignments.all()
-            
-            # Map duties as per requested format
-            duties = []
-            for duty in assignments:
-                display_name = duty.get_namaaz_type_display()
-                # Split "Fajar Azaan" into ["Fajar", "Azaan"]
-                parts = display_name.split(' ')
-                namaaz = parts[0] if len(parts) > 0 else display_name
-                duty_type = parts[1] if len(parts) > 1 else ""
-                
-                # Check for pending requests
-                pending_request = getattr(duty, 'pending_requests', [])
-                request_status = pending_request[0].status if pending_request else None
-                request_type = pending_request[0].request_type if pending_request else None
-                
-                duties.append({
-                    "id": duty.id,
-                    "date": duty.duty_date.strftime('%d/%m/%Y'),
-                    "namaaz": namaaz,
-                    "type": duty_type,
-                    "request_status": request_status,
-                    "request_type": request_type,
-                    "reporting_time": get_reporting_time(duty)
-                })
-            
-            # Map audition files
-            audition_files = []
-            for file in registration.audition_files.all():
-                url = file.audition_file_path.url if file.audition_file_path else ""
-                # Ensure full URL for absolute paths
-                if url and not url.startswith('http'):
-                    url = request.build_absolute_uri(url)
-                
-                audition_files.append({
-                    "id": file.id,
-                    "url": url,
-                    "type": file.audition_file_type,
-                    "name": file.audition_display_name
-                })
-
-            return Response({
-                "full_name": registration.full_name,
-                "its_number": registration.its_number,
-                "register_for": registration.get_preference_display(),
-                "status": registration.status,
-                "duties": duties,
-                "audition_files": audition_files
-            })
-            
-        except Registration.DoesNotExist:
+        # Precomputed document: Redis (0 queries) or StatusDocument (1 query)
+        document = get_status_document(its_number)
+        if document is None:
             return Response(
                 {'error': 'No registration found for this ITS number'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Links are signed per request so cached documents never carry expired URLs
+        audition_files = [{
+            "id": f["id"],
+            "url": signed_media_url(f["file"], request) or "",
+            "type": f["type"],
+            "name": f["name"]
+        } for f in document.get("audition_files", [])]
+
+        return Response({**document, "audition_files": audition_files})
+
+    @action(detail=False, methods=['get'], url_path='status-metrics', permission_classes=[IsAuthenticated, IsAdminUser])
+    def status_metrics(self, request):
+        """Hit rate of the precomputed public status documents."""
+        return Response(get_status_metrics())
+
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
     def sync_to_sheets(self, request):
         """Trigger manual bulk sync to Google Sheets."""
@@ -300,6 +542,94 @@ class AuditionFileViewSet(viewsets.GenericViewSet, viewsets.mixins.RetrieveModel
         return Response(serializer.data)
 
 
+class AuditionUploadViewSet(viewsets.GenericViewSet, viewsets.mixins.CreateModelMixin, viewsets.mixins.RetrieveModelMixin):
+    """
+    Resumable, chunked audition uploads for the public registration form.
+
+    1. POST   /api/audition-uploads/                 {filename, total_size} -> upload_id
+    2. PUT    /api/audition-uploads/{id}/chunk/      raw bytes, `Upload-Offset` header
+    3. GET    /api/audition-uploads/{id}/            current offset (resume point)
+    4. POST   /api/audition-uploads/{id}/complete/   finalize
+    5. POST   /api/registrations/                    with `upload_ids`
+    """
+    queryset = AuditionUpload.objects.all()
+    serializer_class = AuditionUploadSerializer
+    permission_classes = [AllowAny]
+
+    @action(detail=True, methods=['put', 'patch'])
+    def chunk(self, request, pk=None):
+        """
+        Append raw bytes at `Upload-Offset`.
+        The body is streamed to disk and never parsed into memory.
+        """
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            pk = parse_upload_id(pk)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = append_chunk(pk, request.stream, offset, length)
+        except AuditionUpload.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        except UploadError as e:
+            current = AuditionUpload.objects.filter(pk=pk).values_list('received_bytes', flat=True).first()
+            return Response(
+                {'error': str(e), 'received_bytes': current},
+                status=status.HTTP_409_CONFLICT,
+                headers={'Upload-Offset': str(current or 0)}
+            )
+
+        return Response(
+            self.get_serializer(upload).data,
+            headers={'Upload-Offset': str(upload.received_bytes)}
+        )
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Finalize the upload once every byte has been received.
+        An optional `sha256` (hex) is checked against the received file.
+        """
+        try:
+            pk = parse_upload_id(pk)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        sha256 = str(request.data.get('sha256') or '')
+        if sha256 and not re.fullmatch(r'[0-9a-fA-F]{64}', sha256):
+            return Response({'error': 'sha256 must be 64 hex digits'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = complete_upload(pk, sha256 or None)
+        except AuditionUpload.DoesNotExist:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response(self.get_serializer(upload).data)
+
+
+def _date_window(request):
+    """Optional ?from=&to= (YYYY-MM-DD) as (date_from, date_to); ValueError when malformed."""
+    window = []
+    for key in ('from', 'to'):
+        raw = request.query_params.get(key)
+        try:
+            value = parse_date(raw) if raw else None
+        except ValueError:
+            value = None
+        if raw and value is None:
+            raise ValueError(f'{key} must be a YYYY-MM-DD date')
+        window.append(value)
+    return tuple(window)
+
+
 class DutyAssignmentViewSet(viewsets.ModelViewSet):
     """
     API endpoint for duty roster management.
@@ -445,35 +775,234 @@ class DutyAssignmentViewSet(viewsets.ModelViewSet):
         
         return Response({'success': True})
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @transaction.atomic
+    def bulk(self, request):
+        """
+        Assign many grid cells in one transaction.
+        Body: {"cells": [{"duty_date", "namaaz_type", "assigned_user_id"}, ...]}
+        Returns one result per cell (same order); invalid cells do not block the rest.
+        """
+        serializer = DutyAssignmentBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = [None] * len(serializer.validated_data['cells'])
+        valid_cells = []
+        valid_indexes = []
+        for index, cell in enumerate(serializer.validated_data['cells']):
+            cell_serializer = DutyAssignmentCellSerializer(data=cell)
+            if cell_serializer.is_valid():
+                valid_cells.append(cell_serializer.validated_data)
+                valid_indexes.append(index)
+            else:
+                results[index] = {'index': index, 'status': 'error', 'error': cell_serializer.errors}
+
+        try:
+            cell_results, assignments = bulk_assign(valid_cells) if valid_cells else ([], {})
+        except IntegrityError:
+            # A concurrent single assignment took one of the new slots
+            transaction.set_rollback(True)
+            return Response(
+                {'error': 'One or more slots were assigned concurrently. Reload the grid and retry.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        for index, result in zip(valid_indexes, cell_results):
+            results[index] = {'index': index, **result}
+
+        assigned = len(assignments)
+        logger.info(f"Bulk duty assignment: {assigned} assigned, {len(results) - assigned} failed")
+        return Response({
+            'assigned': assigned,
+            'failed': len(results) - assigned,
+            'results': results
+        })
+
+    @action(detail=False, methods=['get'])
+    def conflicts(self, request):
+        """
+        Over-allocated registrants across the season: days with two duties at the
+        same reporting time or over DUTY_MAX_PER_DAY, and weeks over DUTY_MAX_PER_WEEK.
+        Optional ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+        """
+        try:
+            date_from, date_to = _date_window(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        conflicts = find_conflicts(date_from, date_to)
+        return Response({
+            'max_per_day': getattr(settings, 'DUTY_MAX_PER_DAY', 1),
+            'max_per_week': getattr(settings, 'DUTY_MAX_PER_WEEK', 0),
+            **conflicts
+        })
+
+    @action(detail=False, methods=['get'])
+    def reporting(self, request):
+        """
+        Duties whose volunteer reports within the next ?hours=3 (max 72),
+        earliest first. Add ?assigned=true to skip empty slots.
+        """
+        from datetime import timedelta
+
+        try:
+            hours = float(request.query_params.get('hours', 3))
+        except ValueError:
+            return Response({'error': 'hours must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < hours <= 72:
+            return Response({'error': 'hours must be between 0 and 72'}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        duties = self.queryset.filter(
+            reporting_at__gte=now,
+            reporting_at__lte=now + timedelta(hours=hours)
+        ).order_by('reporting_at')
+        if request.query_params.get('assigned') == 'true':
+            duties = duties.filter(assigned_user__isnull=False)
+        return Response(DutyAssignmentSerializer(duties, many=True).data)
+
     @action(detail=False, methods=['get'])
     def grid(self, request):
         """
         Get roster data in Excel-style grid format.
         Returns data organized by date and namaaz type.
+
+        Served from per-date snapshots (RosterGridSnapshot). Optional
+        `?from=YYYY-MM-DD&to=YYYY-MM-DD` limits the window; `If-None-Match`
+        with the previous ETag answers 304 when nothing in the window changed.
         """
-        assignments = self.get_queryset()
-        
-        # Organize by date
-        grid_data = {}
-        for assignment in assignments:
-            date_key = assignment.duty_date.isoformat()
-            
-            if date_key not in grid_data:
-                grid_data[date_key] = {}
-            
-            user = assignment.assigned_user
-            grid_data[date_key][assignment.namaaz_type] = {
-                'id': assignment.id,
-                'user_id': user.id if user else None,
-                'user_name': user.full_name if user else None,
-                'user_its': user.its_number if user else None,
-                'user_email': user.email if user else None,
-                'user_phone': user.phone_number if user else None,
-                'locked': assignment.locked,
-                'locked_at': assignment.locked_at
-            }
-        
-        return Response(grid_data)
+        try:
+            date_from, date_to = _date_window(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = grid_etag(date_from, date_to)
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(get_grid(date_from, date_to))
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class AllotmentDraftViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Automatic roster allotment (see utils/allotment.py).
+
+    - POST   /api/allotment-drafts/               {date_from, date_to, seed?} -> solve into a draft
+    - GET    /api/allotment-drafts/{id}/          draft with its cells, for review
+    - POST   /api/allotment-drafts/{id}/publish/  assign the cells (per-cell results)
+    - POST   /api/allotment-drafts/{id}/discard/  drop a draft without publishing
+    """
+    queryset = AllotmentDraft.objects.all().select_related('created_by')
+    serializer_class = AllotmentDraftSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_cells'] = self.action == 'retrieve'
+        return context
+
+    def create(self, request):
+        serializer = AllotmentDraftCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            draft = create_draft(
+                serializer.validated_data['date_from'],
+                serializer.validated_data['date_to'],
+                user=request.user,
+                seed=serializer.validated_data.get('seed')
+            )
+        except AllotmentError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AllotmentDraftSerializer(draft).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def publish(self, request, pk=None):
+        try:
+            results = publish_draft(pk)
+        except AllotmentError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            transaction.set_rollback(True)
+            return Response(
+                {'error': 'One or more slots were assigned concurrently. Try publishing again.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        assigned = sum(1 for r in results if r.get('status') == 'assigned')
+        return Response({
+            'draft': AllotmentDraftSerializer(AllotmentDraft.objects.get(pk=pk)).data,
+            'assigned': assigned,
+            'failed': len(results) - assigned,
+            'results': results
+        })
+
+    @action(detail=True, methods=['post'])
+    def discard(self, request, pk=None):
+        updated = AllotmentDraft.objects.filter(pk=pk, status='DRAFT').update(status='DISCARDED')
+        if not updated:
+            return Response({'error': 'Only drafts can be discarded'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True})
+
+
+class BroadcastViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    WhatsApp broadcasts to a whole audience (see utils/broadcast.py).
+
+    - GET    /api/broadcasts/audiences/      audiences with their filters and parameter fields
+    - POST   /api/broadcasts/                {audience, filters, template, parameters} -> queued broadcast
+    - GET    /api/broadcasts/{id}/           progress, plus failed recipients
+    - POST   /api/broadcasts/{id}/cancel/    stop sending
+    - POST   /api/broadcasts/{id}/resume/    re-send to pending recipients of a failed / stalled broadcast
+    """
+    queryset = Broadcast.objects.all().select_related('created_by')
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_failures'] = self.action == 'retrieve'
+        return context
+
+    def create(self, request):
+        serializer = BroadcastCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                broadcast = create_broadcast(
+                    serializer.validated_data['audience'],
+                    serializer.validated_data['filters'],
+                    serializer.validated_data['template'],
+                    serializer.validated_data['parameters'],
+                    user=request.user
+                )
+        except BroadcastError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BroadcastSerializer(broadcast).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def audiences(self, request):
+        return Response(describe_audiences())
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        broadcast = self.get_object()
+        if not cancel_broadcast(broadcast.id):
+            return Response({'error': 'Only pending or running broadcasts can be cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True})
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        broadcast = self.get_object()
+        try:
+            resume_broadcast(broadcast.id)
+        except BroadcastError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True})
 
 
 class UnlockLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -491,7 +1020,7 @@ class ReminderViewSet(viewsets.ReadOnlyModelViewSet):
     API endpoint for viewing reminders.
     Read-only - reminders are created/updated automatically.
     """
-    queryset = Reminder.objects.all().select_related('duty_assignment', 'duty_assignment__assigned_user')
+    queryset = Reminder.objects.all().select_related('stage', 'duty_assignment', 'duty_assignment__assigned_user')
     serializer_class = ReminderSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
     
@@ -519,6 +1048,17 @@ class ReminderViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(upcoming, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def schedule(self, request):
+        """Per-minute send load for a duty date's reminder window (?date=YYYY-MM-DD)"""
+        try:
+            duty_date = parse_date(request.query_params.get('date') or '')
+        except ValueError:
+            duty_date = None
+        if duty_date is None:
+            return Response({'error': 'date (YYYY-MM-DD) is required'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(load_curve(duty_date))
+
 
 class ReminderLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -530,6 +1070,49 @@ class ReminderLogViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
 
+class ReminderArchiveViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Archived reminder history (see utils/reminder_archive.py).
+
+    Filters: ?season=, ?status=, ?its=, ?from=&to= (duty date).
+    """
+    queryset = ReminderArchive.objects.all()
+    serializer_class = ReminderArchiveSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return queryset.prefetch_related('logs')
+
+        params = self.request.query_params
+        if params.get('season', '').isdigit():
+            queryset = queryset.filter(season=int(params['season']))
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'].upper())
+        if params.get('its'):
+            queryset = queryset.filter(its_number=params['its'])
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_logs'] = self.action == 'retrieve'
+        return context
+
+    def list(self, request, *args, **kwargs):
+        try:
+            date_from, date_to = _date_window(request)
+        except ValueError:
+            return Response({'error': 'from/to must be valid dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        if date_from:
+            queryset = queryset.filter(duty_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(duty_date__lte=date_to)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
 class KhidmatRequestViewSet(viewsets.ModelViewSet):
     """
     API endpoint for Khidmat (duty) cancellation and reallocation requests.
@@ -727,6 +1310,12 @@ class AuditionFileViewSet(viewsets.GenericViewSet, viewsets.mixins.RetrieveModel
     serializer_class = AuditionFileSerializer
     permission_classes = [IsAdminUser]
 
+    def get_serializer_context(self):
+        """`?original=1` serves the uploaded file instead of the rendition."""
+        context = super().get_serializer_context()
+        context['original'] = self.request.query_params.get('original') in ('1', 'true')
+        return context
+
     @action(detail=True, methods=['patch'])
     def select_audition(self, request, pk=None):
         """
@@ -836,12 +1425,24 @@ class CorrectionViewSet(viewsets.ModelViewSet):
             
             if field_name == 'audition_files':
                 files = request.FILES.getlist('audition_files')
-                if not files:
+                try:
+                    upload_ids = parse_upload_ids(
+                        request.data.getlist('upload_ids') if hasattr(request.data, 'getlist') else request.data.get('upload_ids', [])
+                    )
+                except UploadError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                if not files and not upload_ids:
                     return Response({'error': 'No files uploaded'}, status=status.HTTP_400_BAD_REQUEST)
                 
                 # Logic to add files (create AuditionFile objects)
                 for f in files:
-                    AuditionFile.objects.create(registration=registration, audition_file_path=f)
+                    save_audition_upload(registration, f)
+
+                try:
+                    with transaction.atomic():
+                        attach_uploads(registration, upload_ids)
+                except UploadError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
                     
             else:
                 # Standard field update
@@ -21,12 +21,12 @@ app.autodiscover_tasks()
 
 # Celery Beat Schedule - Periodic Tasks
 app.conf.beat_schedule = {
-    # Process pending reminders every 15 minutes
-    'process-reminders-every-15-min': {
-        'task': 'registrations.process_reminders',
-        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+    # Reminders are sent by ETA tasks; this arms upcoming ones and sends stragglers
+    'reconcile-reminders-every-5-min': {
+        'task': 'registrations.reconcile_reminders',
+        'schedule': crontab(minute='*/5'),
         'options': {
-            'expires': 600,  # Task expires after 10 minutes
+            'expires': 240,
         }
     },
     
@@ -39,12 +39,39 @@ app.conf.beat_schedule = {
         }
     },
 
-    # Process voice reminders every 5 minutes
-    'process-voice-reminders-every-5-min': {
-        'task': 'registrations.process_due_reminder_calls',
-        'schedule': crontab(minute='*/5'),
+    # Remove abandoned resumable audition uploads daily at 3 AM
+    'cleanup-stale-uploads-daily': {
+        'task': 'registrations.cleanup_stale_uploads',
+        'schedule': crontab(hour=3, minute=0),
+        'options': {
+            'expires': 3600,
+        }
+    },
+
+    # Prune change-feed tombstones daily at 3:30 AM
+    'prune-change-tombstones-daily': {
+        'task': 'registrations.prune_change_tombstones',
+        'schedule': crontab(hour=3, minute=30),
+        'options': {
+            'expires': 3600,
+        }
+    },
+
+    # Persist queued registrations (intake mode) in batches
+    'drain-registration-intake': {
+        'task': 'registrations.drain_registration_intake',
+        'schedule': 5.0,  # Every 5 seconds
+        'options': {
+            'expires': 5,
+        }
+    },
+
+    # Apply queued Exotel call status callbacks in batches
+    'apply-call-statuses': {
+        'task': 'registrations.apply_call_statuses',
+        'schedule': 10.0,  # Every 10 seconds
         'options': {
-            'expires': 200,
+            'expires': 10,
         }
     },
 }
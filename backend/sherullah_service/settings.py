@@ -47,7 +47,8 @@ ALLOWED_HOSTS = [
 
 # Upload Limits (100MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
+# Multipart files above this size are streamed to a temp file instead of held in worker memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
 
 
@@ -247,6 +248,25 @@ CORS_ALLOWED_ORIGINS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resumable audition uploads (chunks are spooled here, then hard-linked into MEDIA_ROOT)
+AUDITION_UPLOAD_SPOOL_DIR = os.getenv('AUDITION_UPLOAD_SPOOL_DIR', os.path.join(MEDIA_ROOT, 'uploads_tmp'))
+AUDITION_UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('AUDITION_UPLOAD_CHUNK_MAX_SIZE', 5 * 1024 * 1024))  # 5MB
+AUDITION_UPLOAD_EXPIRY_HOURS = int(os.getenv('AUDITION_UPLOAD_EXPIRY_HOURS', '24'))
+
+# Signed audition media URLs (served by /api/media/<token>/<filename>)
+# MEDIA_SENDFILE_BACKEND: 'nginx' (X-Accel-Redirect), 'apache'/'lighttpd' (X-Sendfile), '' (stream from Django)
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND', '')
+MEDIA_SENDFILE_PREFIX = os.getenv('MEDIA_SENDFILE_PREFIX', '/protected-media/')
+MEDIA_SIGNED_URL_TTL = int(os.getenv('MEDIA_SIGNED_URL_TTL', '3600'))  # 1 hour
+MEDIA_SIGNED_URL_SHEETS_TTL = int(os.getenv('MEDIA_SIGNED_URL_SHEETS_TTL', 365 * 24 * 3600))  # Google Sheets links
+
+# Audition transcoding (light renditions + previews for admin playback)
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+AUDITION_RENDITION_BITRATE = os.getenv('AUDITION_RENDITION_BITRATE', '64k')
+AUDITION_PREVIEW_SECONDS = int(os.getenv('AUDITION_PREVIEW_SECONDS', '30'))
+AUDITION_TRANSCODE_TIMEOUT = int(os.getenv('AUDITION_TRANSCODE_TIMEOUT', '300'))
+
 # ==========================================
 # REST FRAMEWORK SETTINGS
 # ==========================================
@@ -302,6 +322,38 @@ if not CELERY_ENABLED:
     CELERY_TASK_ALWAYS_EAGER = True
     CELERY_TASK_EAGER_PROPAGATES = True
 
+# Redis for application data (intake queue, caches); defaults to the broker
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+
+# Registration intake mode: queue submissions and persist them in batches
+REGISTRATION_INTAKE_ENABLED = os.getenv('REGISTRATION_INTAKE_ENABLED', 'False') == 'True'
+REGISTRATION_INTAKE_BATCH_SIZE = int(os.getenv('REGISTRATION_INTAKE_BATCH_SIZE', '200'))
+REGISTRATION_INTAKE_MAX_BATCHES_PER_RUN = int(os.getenv('REGISTRATION_INTAKE_MAX_BATCHES_PER_RUN', '20'))
+REGISTRATION_INTAKE_CLAIM_IDLE_SECONDS = int(os.getenv('REGISTRATION_INTAKE_CLAIM_IDLE_SECONDS', '60'))
+REGISTRATION_INTAKE_STATUS_TTL = int(os.getenv('REGISTRATION_INTAKE_STATUS_TTL', 7 * 24 * 3600))  # 7 days
+
+# Precomputed public status documents (registration search by ITS)
+STATUS_DOCUMENT_TTL = int(os.getenv('STATUS_DOCUMENT_TTL', 24 * 3600))  # Redis copy; the table is durable
+STATUS_DOCUMENT_MISSING_TTL = int(os.getenv('STATUS_DOCUMENT_MISSING_TTL', '60'))  # Negative cache for unknown ITS
+
+# Admin change feed (/api/changes/)
+CHANGE_TOMBSTONE_RETENTION_DAYS = int(os.getenv('CHANGE_TOMBSTONE_RETENTION_DAYS', '30'))
+CHANGES_SAFETY_WINDOW_SECONDS = int(os.getenv('CHANGES_SAFETY_WINDOW_SECONDS', '5'))
+CHANGES_MAX_ROWS = int(os.getenv('CHANGES_MAX_ROWS', '1000'))
+
+# Bulk duty assignment (/api/duty-assignments/bulk/)
+DUTY_BULK_ASSIGN_MAX_CELLS = int(os.getenv('DUTY_BULK_ASSIGN_MAX_CELLS', '500'))  # 30 days x 12 types = 360
+
+# Duty limits per registrant, enforced on assignment and by the allotment solver.
+# Raise DUTY_MAX_PER_DAY above 1 to allow several duties a day (and with them reminder digests).
+DUTY_MAX_PER_DAY = int(os.getenv('DUTY_MAX_PER_DAY', '1'))
+DUTY_MAX_PER_WEEK = int(os.getenv('DUTY_MAX_PER_WEEK', '0'))  # 0 = no weekly limit
+
+# Live dashboard events (/api/events/, Server-Sent Events over Redis pub/sub)
+EVENTS_TICKET_TTL = int(os.getenv('EVENTS_TICKET_TTL', '60'))  # Seconds a stream ticket can be used to connect
+EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_RETRY_MS = int(os.getenv('EVENTS_RETRY_MS', '5000'))  # Browser reconnect delay
+
 # Celery Beat (Scheduler) Database
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
@@ -348,6 +400,24 @@ META_WA_ACCESS_TOKEN = WHATSAPP_ACCESS_TOKEN
 META_WA_BUSINESS_ACCOUNT_ID = WHATSAPP_BUSINESS_ACCOUNT_ID
 META_WA_API_VERSION = WHATSAPP_API_VERSION
 
+# Shared WhatsApp HTTP session (registrations/utils/whatsapp_client.py)
+WHATSAPP_HTTP_POOL_SIZE = int(os.getenv('WHATSAPP_HTTP_POOL_SIZE', '10'))  # Kept-alive connections per process (>= REMINDER_DISPATCH_WORKERS)
+WHATSAPP_HTTP_RETRIES = int(os.getenv('WHATSAPP_HTTP_RETRIES', '2'))  # Connection errors and 429/503 only
+WHATSAPP_CONNECT_TIMEOUT = float(os.getenv('WHATSAPP_CONNECT_TIMEOUT', '3.05'))
+WHATSAPP_READ_TIMEOUT = float(os.getenv('WHATSAPP_READ_TIMEOUT', '10'))
+
+# Outbound WhatsApp gateway (registrations/utils/whatsapp_gateway.py, manage.py run_whatsapp_gateway)
+WHATSAPP_SEND_RATE = float(os.getenv('WHATSAPP_SEND_RATE', '20'))  # Messages per second across all workers (Meta throughput tier)
+WHATSAPP_SEND_BURST = int(os.getenv('WHATSAPP_SEND_BURST', '20'))
+WHATSAPP_GATEWAY_THREADS = int(os.getenv('WHATSAPP_GATEWAY_THREADS', '8'))  # Sender threads per gateway process
+WHATSAPP_GATEWAY_WAIT_SECONDS = int(os.getenv('WHATSAPP_GATEWAY_WAIT_SECONDS', '30'))  # Then the caller retries later
+WHATSAPP_GATEWAY_MAX_QUEUE = int(os.getenv('WHATSAPP_GATEWAY_MAX_QUEUE', '2000'))  # Per priority; callers are refused beyond
+
+# WhatsApp broadcasts (registrations/utils/broadcast.py), sent within WHATSAPP_SEND_RATE
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '16'))  # Requests in flight per broadcast
+BROADCAST_FLUSH_SECONDS = float(os.getenv('BROADCAST_FLUSH_SECONDS', '2'))  # Progress writes
+BROADCAST_STALE_SECONDS = int(os.getenv('BROADCAST_STALE_SECONDS', '300'))  # RUNNING without progress = resumable
+
 # ==========================================
 # REMINDER CONFIGURATION
 # ==========================================
@@ -356,6 +426,42 @@ META_WA_API_VERSION = WHATSAPP_API_VERSION
 REMINDER_TIME_HOUR = int(os.getenv('REMINDER_TIME_HOUR', '18'))  # 6 PM IST
 REMINDER_TIME_MINUTE = int(os.getenv('REMINDER_TIME_MINUTE', '0'))
 
+# Reminders are spread over a window around that time (HH:MM IST), at most N per minute (0 = no limit)
+# (wrapped around midnight; a window whose end is before its start ends the next day)
+_reminder_minutes = REMINDER_TIME_HOUR * 60 + REMINDER_TIME_MINUTE
+_window_start = (_reminder_minutes - 30) % 1440
+_window_end = (_reminder_minutes + 30) % 1440
+REMINDER_WINDOW_START = os.getenv('REMINDER_WINDOW_START', f"{_window_start // 60:02d}:{_window_start % 60:02d}")
+REMINDER_WINDOW_END = os.getenv('REMINDER_WINDOW_END', f"{_window_end // 60:02d}:{_window_end % 60:02d}")
+REMINDER_SEND_BUDGET_PER_MINUTE = int(os.getenv('REMINDER_SEND_BUDGET_PER_MINUTE', '20'))
+
+# Reminder dispatcher (utils/reminder_dispatch.py)
+REMINDER_DISPATCH_BATCH_SIZE = int(os.getenv('REMINDER_DISPATCH_BATCH_SIZE', '100'))  # Reminders claimed per batch
+REMINDER_DISPATCH_WORKERS = int(os.getenv('REMINDER_DISPATCH_WORKERS', '8'))  # Concurrent sends per process
+REMINDER_DISPATCH_MAX_BATCHES = int(os.getenv('REMINDER_DISPATCH_MAX_BATCHES', '50'))  # Per run
+REMINDER_DISPATCH_TASKS = int(os.getenv('REMINDER_DISPATCH_TASKS', '4'))  # Parallel Celery tasks when a backlog is due
+REMINDER_CLAIM_TIMEOUT_SECONDS = int(os.getenv('REMINDER_CLAIM_TIMEOUT_SECONDS', '900'))  # Release claims of dead workers
+# ETA tasks are only enqueued this close to send time (keep below the Redis visibility timeout, 1h)
+REMINDER_ETA_HORIZON_SECONDS = int(os.getenv('REMINDER_ETA_HORIZON_SECONDS', '1800'))
+REMINDER_ETA_GRACE_SECONDS = int(os.getenv('REMINDER_ETA_GRACE_SECONDS', '120'))  # Overdue by this much = straggler
+# One email / WhatsApp / call per registrant and day listing all their duties (utils/reminder_digest.py).
+# Only has an effect when DUTY_MAX_PER_DAY > 1.
+REMINDER_DIGEST_ENABLED = os.getenv('REMINDER_DIGEST_ENABLED', 'True') == 'True'
+
+# Exotel reminder calls (utils/call_slots.py): calls in progress at once across all workers
+EXOTEL_MAX_CONCURRENT_CALLS = int(os.getenv('EXOTEL_MAX_CONCURRENT_CALLS', '4'))
+EXOTEL_CALL_SLOT_WAIT_SECONDS = int(os.getenv('EXOTEL_CALL_SLOT_WAIT_SECONDS', '30'))  # Then retried next run
+# Call outcomes (utils/call_status.py): secret in the StatusCallback URL (empty = no callbacks, calls are not retried)
+EXOTEL_CALLBACK_TOKEN = os.getenv('EXOTEL_CALLBACK_TOKEN', '')
+EXOTEL_CALLBACK_BATCH_SIZE = int(os.getenv('EXOTEL_CALLBACK_BATCH_SIZE', '500'))
+# Busy / unanswered calls are repeated after these delays (minutes), up to this close to reporting time
+EXOTEL_CALL_RETRY_MINUTES = [int(m) for m in os.getenv('EXOTEL_CALL_RETRY_MINUTES', '15,30').split(',') if m.strip()]
+EXOTEL_CALL_RETRY_CUTOFF_MINUTES = int(os.getenv('EXOTEL_CALL_RETRY_CUTOFF_MINUTES', '30'))
+
+# Reminder archive (utils/reminder_archive.py): finished reminders move to ReminderArchive after N days
+REMINDER_ARCHIVE_AFTER_DAYS = int(os.getenv('REMINDER_ARCHIVE_AFTER_DAYS', '90'))
+REMINDER_ARCHIVE_BATCH_SIZE = int(os.getenv('REMINDER_ARCHIVE_BATCH_SIZE', '1000'))  # Reminders moved per transaction
+
 # ==========================================
 # GOOGLE SHEETS CONFIGURATION
 # ==========================================
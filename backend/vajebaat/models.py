@@ -206,6 +206,14 @@ class VajebaatAppointment(models.Model):
     def __str__(self):
         return f"Appointment - {self.name} ({self.its_number})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Loaded status / slot, so the live event signal only fires on real changes
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_slot_id = instance.__dict__.get('slot_id')
+        return instance
+
 
 # ============================================================
 # Signal: Auto-create 8 slots when a VajebaatDate is created
@@ -227,6 +235,30 @@ def create_default_slots(sender, instance, created, **kwargs):
         ]
         VajebaatSlot.objects.bulk_create(slots)
 
+
+# ============================================================
+# Signal: Push appointment changes to the admin dashboard (SSE)
+# ============================================================
+@receiver(post_save, sender=VajebaatAppointment)
+def appointment_live_event(sender, instance, created, **kwargs):
+    """
+    Publish booking / status / slot changes on the shared admin event stream
+    (registrations/utils/live_events.py).
+    """
+    previous_slot_id = getattr(instance, '_loaded_slot_id', None)
+    if not created and getattr(instance, '_loaded_status', None) == instance.status and previous_slot_id == instance.slot_id:
+        return
+    instance._loaded_status = instance.status
+    instance._loaded_slot_id = instance.slot_id
+    from registrations.utils.live_events import publish_event
+    publish_event('vajebaat.appointment', {
+        'id': instance.id,
+        'status': instance.status,
+        'slot_id': instance.slot_id,
+        'previous_slot_id': previous_slot_id,
+        'created': created,
+    })
+
 # ============================================================
 # NEW: Legacy Member & Vajebaat Records
 # ============================================================
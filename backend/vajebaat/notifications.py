@@ -9,12 +9,17 @@ Templates:
 - vajebaat_appointment_cancel_v1 → Admin cancels appointment
 
 All templates use variables: {{1}} Name, {{2}} Date, {{3}} Slot Time
+
+Messages go through the shared pooled WhatsApp session
+(registrations/utils/whatsapp_client.py).
 """
 
 import logging
 import requests
 from django.conf import settings
 
+from registrations.utils.whatsapp_client import whatsapp_config, post_message
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,9 +68,7 @@ def send_whatsapp_template(phone, template_name, variables):
 
     phone = _clean_phone(phone)
 
-    phone_id = getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', None)
-    access_token = getattr(settings, 'WHATSAPP_ACCESS_TOKEN', None)
-    api_version = getattr(settings, 'WHATSAPP_API_VERSION', 'v24.0')
+    phone_id, access_token, _ = whatsapp_config()
 
     if not phone_id or not access_token:
         logger.warning("WhatsApp API credentials (WHATSAPP_*) not configured, skipping template '%s'.", template_name)
@@ -77,8 +80,6 @@ def send_whatsapp_template(phone, template_name, variables):
         logger.error(f"[WhatsApp] Parameter mismatch for '{template_name}': Expected 3, got {len(variables)}")
         return False
 
-    url = f"https://graph.facebook.com/{api_version}/{phone_id}/messages"
-
     # Build template parameters with sanitization
     components = []
     if variables:
@@ -102,16 +103,11 @@ def send_whatsapp_template(phone, template_name, variables):
         },
     }
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-    }
-
     masked_phone = _mask_phone(phone)
     logger.info(f"[WhatsApp] Sending template '{template_name}' to {masked_phone} with params: {variables}")
 
     try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=15)
+        resp = post_message(payload, timeout=(3.05, 15))
         import json
         try:
             response_data = resp.json()
@@ -114,6 +114,7 @@
 
 <script src="<?= BASE_URL ?>/assets/js/main.js"></script>
 <script src="<?= BASE_URL ?>/assets/js/audition-modal.js"></script>
+<script src="<?= BASE_URL ?>/assets/js/live-events.js"></script>
 <script src="<?= BASE_URL ?>/assets/js/dashboard.js"></script>
 
 <script>
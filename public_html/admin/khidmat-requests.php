@@ -134,6 +134,7 @@
 
 
 <script src="<?= BASE_URL ?>/assets/js/main.js"></script>
+<script src="<?= BASE_URL ?>/assets/js/live-events.js"></script>
 <?php include '../includes/footer.php'; ?>
 
 <script>
@@ -146,6 +147,14 @@
         if (initialLoader) initialLoader.innerHTML = ICONS.loader2;
         
         loadRequests();
+
+        // Reload when a request is raised or reviewed elsewhere (debounced for bursts)
+        let liveReload = null;
+        connectLiveEvents(event => {
+            if (!event.type || !event.type.startsWith('khidmat_request.')) return;
+            clearTimeout(liveReload);
+            liveReload = setTimeout(loadRequests, 1000);
+        });
     });
 
     async function loadRequests() {
@@ -448,8 +448,8 @@
                     : 'bg-white text-gray-700 border border-gray-300 hover:bg-gray-50';
                 const btnText = isSelected ? 'Selected' : 'Select';
                 
-                // Fix URL
-                let url = file.audition_file_path;
+                // Fix URL (prefer the light rendition once it is ready)
+                let url = file.playback_url || file.audition_file_path;
                 if (url && !url.startsWith('http')) {
                     url = window.API_BASE + (url.startsWith('/') ? '' : '/') + url;
                 }
@@ -209,6 +209,7 @@
 <script src="https://cdn.jsdelivr.net/npm/flatpickr"></script>
 
 <script src="<?= BASE_URL ?>/assets/js/main.js"></script>
+<script src="<?= BASE_URL ?>/assets/js/live-events.js"></script>
 <?php include '../includes/footer.php'; ?>
 
 <script>
@@ -238,6 +239,14 @@
 
         loadAppointments();
         loadDashboardStats();
+
+        // Reload on bookings / confirmations made elsewhere (loadAppointments also refreshes the stats)
+        let liveReload = null;
+        connectLiveEvents(event => {
+            if (event.type !== 'vajebaat.appointment') return;
+            clearTimeout(liveReload);
+            liveReload = setTimeout(loadAppointments, 1000);
+        });
     });
 
     // ============================================================
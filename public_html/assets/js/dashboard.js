@@ -2,6 +2,9 @@
  * Dashboard JS - Roster Logic
  */
 
+// Poll /api/changes/ instead of reloading the full registration list and grid
+const CHANGE_POLL_INTERVAL_MS = 30000;
+
 const DUTY_COLUMNS = [
     { key: 'SANAH', label: 'Sanah' },
     { key: 'TAJWEED', label: 'Tajwid' },
@@ -31,6 +34,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     let dates = generateRamazaanDates();
     let editingCell = null; // { date, duty }
     let detailsPanelData = null; // { user, date, duty, dutyLabel }
+    let changeCursor = null; // Opaque cursor for /api/changes/
 
     // DOM Elements
     const gridContainer = document.getElementById('roster-grid-container');
@@ -47,6 +51,8 @@ document.addEventListener('DOMContentLoaded', async () => {
     // 2. Initialize
     renderHeader();
     await fetchData();
+    setInterval(syncChanges, CHANGE_POLL_INTERVAL_MS);
+    if (typeof connectLiveEvents === 'function') connectLiveEvents(applyLiveEvent);
 
     // --- Helpers ---
 
@@ -264,25 +270,16 @@ document.addEventListener('DOMContentLoaded', async () => {
         gridContainer.classList.add('hidden');
 
         try {
+            // 0. Change cursor (taken before the full load so nothing is missed)
+            const cursorRes = await apiFetch('/api/changes/', { throwOnError: false });
+            if (cursorRes.ok) changeCursor = (await cursorRes.json()).cursor;
+
             // 1. Users
             const usersRes = await apiFetch('/api/registrations/');
             if (!usersRes.ok) throw new Error('Failed to fetch users');
             const userData = await usersRes.json();
 
-            users = userData.map(u => ({
-                id: String(u.id),
-                fullName: u.full_name,
-                itsNumber: u.its_number,
-                email: u.email,
-                whatsappNumber: u.phone_number,
-                registerFor: u.preference,
-                auditionFiles: u.audition_files.map(af => ({
-                    id: af.id,
-                    url: af.audition_file_path.startsWith('http') ? af.audition_file_path : `${window.API_BASE}${af.audition_file_path}`,
-                    type: af.audition_file_type,
-                    name: af.audition_display_name
-                }))
-            }));
+            users = userData.map(mapUser);
 
             // 2. Grid
             const gridRes = await apiFetch('/api/duty-assignments/grid/');
@@ -298,6 +295,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 Object.keys(gridData[isoDate]).forEach(dutyKey => {
                     const cell = gridData[isoDate][dutyKey];
                     assignments.set(getCellKey(formattedDate, dutyKey), {
+                        id: cell.id,
                         userId: String(cell.user_id || ""),
                         date: formattedDate,
                         duty: dutyKey,
@@ -318,6 +316,111 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     }
 
+    function mapUser(u) {
+        return {
+            id: String(u.id),
+            fullName: u.full_name,
+            itsNumber: u.its_number,
+            email: u.email,
+            whatsappNumber: u.phone_number,
+            registerFor: u.preference,
+            auditionFiles: u.audition_files.map(af => {
+                const src = af.playback_url || af.audition_file_path;
+                return {
+                    id: af.id,
+                    url: src.startsWith('http') ? src : `${window.API_BASE}${src}`,
+                    type: af.audition_file_type,
+                    name: af.audition_display_name
+                };
+            })
+        };
+    }
+
+    async function syncChanges() {
+        // Don't re-render under an open dropdown
+        if (!changeCursor || editingCell) return;
+
+        try {
+            const res = await apiFetch(`/api/changes/?since=${encodeURIComponent(changeCursor)}`, { throwOnError: false });
+            // Cursor expired: reload everything
+            if (res.status === 410) return fetchData();
+            if (!res.ok) return;
+
+            const changes = await res.json();
+            if (changes.full_resync) return fetchData();
+            changeCursor = changes.cursor;
+
+            // Registrations: upsert, then drop deleted
+            changes.registrations.forEach(u => {
+                const mapped = mapUser(u);
+                const idx = users.findIndex(x => x.id === mapped.id);
+                if (idx >= 0) users[idx] = mapped; else users.push(mapped);
+            });
+            const removedUsers = new Set(changes.deleted.registrations.map(String));
+            users = users.filter(u => !removedUsers.has(u.id));
+
+            // Duty assignments: upsert assigned cells, clear unassigned/deleted ones
+            const removedDuties = new Set(changes.deleted.duty_assignments);
+            changes.duty_assignments.forEach(a => {
+                if (!a.assigned_user) removedDuties.add(a.id);
+            });
+            assignments.forEach((cell, key) => {
+                if (removedDuties.has(cell.id)) assignments.delete(key);
+            });
+            changes.duty_assignments.forEach(a => {
+                if (!a.assigned_user) return;
+                const [y, m, d] = a.duty_date.split('-');
+                const formattedDate = `${d}/${m}/${y}`;
+                assignments.set(getCellKey(formattedDate, a.namaaz_type), {
+                    id: a.id,
+                    userId: String(a.assigned_user),
+                    date: formattedDate,
+                    duty: a.namaaz_type,
+                    locked: a.locked
+                });
+            });
+
+            const changed = changes.registrations.length + changes.duty_assignments.length
+                + removedUsers.size + changes.deleted.duty_assignments.length;
+            if (changed) renderBody();
+        } catch (e) {
+            // Transient network errors: try again on the next tick
+        }
+    }
+
+    function applyLiveEvent(event) {
+        if (!event.type || !event.type.startsWith('duty.')) return;
+        // Don't re-render under an open dropdown; the next poll picks it up
+        if (editingCell) return;
+
+        const data = event.data;
+        const toDisplayDate = (iso) => {
+            const [y, m, d] = iso.split('-');
+            return `${d}/${m}/${y}`;
+        };
+        const date = toDisplayDate(data.duty_date);
+        const key = getCellKey(date, data.namaaz_type);
+
+        if (data.previous_duty_date) {
+            assignments.delete(getCellKey(toDisplayDate(data.previous_duty_date), data.namaaz_type));
+        }
+        const cell = data.cell;
+        if (event.type === 'duty.deleted' || !cell || !cell.user_id) {
+            assignments.delete(key);
+        } else {
+            assignments.set(key, {
+                id: cell.id,
+                userId: String(cell.user_id),
+                date: date,
+                duty: data.namaaz_type,
+                locked: cell.locked
+            });
+            // Registrant not loaded yet (new registration): fetch it through the change feed
+            if (!getUserById(cell.user_id)) syncChanges();
+        }
+        renderBody();
+    }
+
     // --- Actions ---
 
     async function confirmAssignment(user, date, duty) {
@@ -0,0 +1,54 @@
+/**
+ * Live admin events (Server-Sent Events from /api/events/).
+ *
+ * EventSource cannot send the JWT header, so each connection first takes a
+ * short-lived ticket from /api/events/ticket/. Tickets expire, which is why
+ * reconnects are done here (with backoff) instead of by the browser.
+ * Events are hints: pages keep their /api/changes/ or reload fallbacks for
+ * whatever a dropped connection missed.
+ *
+ * Usage: connectLiveEvents(event => { ... event.type, event.data ... });
+ */
+
+const LIVE_EVENTS_MAX_BACKOFF_MS = 60000;
+
+function connectLiveEvents(onEvent) {
+    if (!window.EventSource) return;
+
+    let source = null;
+    let backoff = 2000;
+
+    async function open() {
+        try {
+            const res = await apiFetch('/api/events/ticket/', { method: 'POST', throwOnError: false });
+            if (!res.ok) return retry();
+            const { ticket } = await res.json();
+
+            source = new EventSource(`${window.API_BASE}/api/events/?ticket=${encodeURIComponent(ticket)}`);
+            source.onopen = () => { backoff = 2000; };
+            source.onmessage = (e) => {
+                let event;
+                try {
+                    event = JSON.parse(e.data);
+                } catch (err) {
+                    return;
+                }
+                onEvent(event);
+            };
+            source.onerror = () => {
+                // The ticket may have expired by the time the browser retries: get a new one
+                source.close();
+                retry();
+            };
+        } catch (e) {
+            retry();
+        }
+    }
+
+    function retry() {
+        setTimeout(open, backoff);
+        backoff = Math.min(backoff * 2, LIVE_EVENTS_MAX_BACKOFF_MS);
+    }
+
+    open();
+}